@@ -0,0 +1,85 @@
+import json
+from pathlib import Path
+from typing import Annotated, Any, Optional
+import typer
+from benchmarks.harness import (
+    SCENARIOS,
+    BenchmarkOptions,
+    BenchmarkResult,
+    benchmark,
+    compare,
+)
+from benchmarks.server import MockLibrary, ServerProfile
+
+app: typer.Typer = typer.Typer()
+
+
+@app.command()
+def run(
+    scenarios: Annotated[
+        Optional[list[str]],
+        typer.Argument(help=f"The scenarios to run, among {', '.join(SCENARIOS)}"),
+    ] = None,
+    chapters: Annotated[
+        int, typer.Option(help="The number of chapters of the manga")
+    ] = 20,
+    pages: Annotated[int, typer.Option(help="The number of pages per chapter")] = 10,
+    page_size: Annotated[int, typer.Option(help="The size of a page in bytes")] = (
+        200 * 1024
+    ),
+    latency: Annotated[
+        float, typer.Option(help="The seconds the server waits before answering")
+    ] = 0.0,
+    throttle_every: Annotated[
+        int, typer.Option(help="Throttle every nth API request with a 429")
+    ] = 0,
+    bandwidth: Annotated[
+        Optional[int], typer.Option(help="The bytes per second of each response")
+    ] = None,
+    chapter_concurrency: Annotated[
+        int, typer.Option(help="The number of chapters downloaded at the same time")
+    ] = 3,
+    image_concurrency: Annotated[
+        int, typer.Option(help="The number of images downloaded at the same time")
+    ] = 10,
+    rate_limits: Annotated[
+        bool, typer.Option(help="Keep to the rate limits of MangaDex")
+    ] = False,
+    save: Annotated[
+        Optional[Path], typer.Option(help="Save the metrics to this JSON file")
+    ] = None,
+    baseline: Annotated[
+        Optional[Path],
+        typer.Option(help="Fail if the metrics regressed since this JSON file"),
+    ] = None,
+    tolerance: Annotated[
+        float, typer.Option(help="The relative change allowed against the baseline")
+    ] = 0.1,
+) -> None:
+    """Benchmark pymanga against a local mock MangaDex server."""
+
+    unknown: set[str] = set(scenarios or []) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        raise typer.Exit(2)
+    results: list[BenchmarkResult] = benchmark(
+        scenarios or list(SCENARIOS),
+        MockLibrary(chapters=chapters, pages=pages, page_size=page_size),
+        ServerProfile(latency, throttle_every, bandwidth),
+        BenchmarkOptions(chapter_concurrency, image_concurrency, rate_limits),
+    )
+    for result in results:
+        print(result.summary())
+    if save is not None:
+        save.write_text(json.dumps([result.metrics() for result in results], indent=2))
+    if baseline is not None:
+        previous: list[dict[str, Any]] = json.loads(baseline.read_text())
+        regressions: list[str] = compare(results, previous, tolerance)
+        for regression in regressions:
+            print(f"Regression | {regression}")
+        if regressions:
+            raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    app()
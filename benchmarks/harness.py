@@ -0,0 +1,260 @@
+from __future__ import annotations
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from dataclasses import asdict, dataclass
+import multiprocessing
+import os
+from pathlib import Path
+import sys
+from tempfile import TemporaryDirectory
+import time
+from typing import Any, Awaitable, Callable
+from unittest.mock import patch
+from zipfile import ZipFile
+from benchmarks.server import MockLibrary, MockServer, ServerProfile
+from pymanga.__main__ import _download_manga
+from pymanga.client import Client
+from pymanga.models.download_chapter_info import DownloadInfo
+from pymanga.ratelimit import RateLimiter, default_rate_limiter
+from pymanga.scheduler import DownloadSettings
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+__all__: list[str] = [
+    "BenchmarkOptions",
+    "BenchmarkResult",
+    "SCENARIOS",
+    "benchmark",
+    "compare",
+    "run_scenario",
+]
+
+
+@dataclass(frozen=True)
+class BenchmarkOptions:
+    """Configures pymanga for the benchmarks.
+
+    The rate limits of MangaDex are lifted by default, so the benchmarks measure
+    pymanga rather than the limits it keeps to.
+    """
+
+    chapter_concurrency: int = 3
+    image_concurrency: int = 10
+    rate_limits: bool = False
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    scenario: str
+    seconds: float
+    chapters: int
+    pages: int
+    cpu_seconds: float
+    peak_rss: int | None
+
+    @property
+    def chapters_per_minute(self) -> float:
+        return 60 * self.chapters / self.seconds if self.seconds else 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    @property
+    def cpu_per_chapter(self) -> float:
+        return self.cpu_seconds / self.chapters if self.chapters else 0.0
+
+    def metrics(self) -> dict[str, Any]:
+        return dict(
+            asdict(self),
+            chapters_per_minute=self.chapters_per_minute,
+            pages_per_second=self.pages_per_second,
+            cpu_per_chapter=self.cpu_per_chapter,
+        )
+
+    def summary(self) -> str:
+        rss: str = (
+            f"{self.peak_rss / 2**20:.1f} MiB" if self.peak_rss is not None else "n/a"
+        )
+        return (
+            f"{self.scenario}: {self.chapters} chapters, {self.pages} pages in "
+            f"{self.seconds:.2f}s | {self.chapters_per_minute:.1f} chapters/min | "
+            f"{self.pages_per_second:.1f} pages/s | "
+            f"{1000 * self.cpu_per_chapter:.1f} ms CPU/chapter | peak RSS {rss}"
+        )
+
+
+async def _client_scenario(
+    url: str, options: BenchmarkOptions, output: Path
+) -> tuple[int, int]:
+    """Lists the chapters of a manga and looks up their at-home nodes."""
+
+    async with Client(url, output) as client:
+        mangas: list[Any] = await client.get_mangas("Manga")
+        chapters: list[Any] = [
+            chapter async for chapter in client.iter_chapters(mangas[0].id, "en")
+        ]
+        infos: list[DownloadInfo] = await asyncio.gather(
+            *(client.get_chapter_download_info(chapter.id) for chapter in chapters)
+        )
+    return len(chapters), sum(len(info.chapter.data) for info in infos)
+
+
+async def _download_scenario(
+    url: str, options: BenchmarkOptions, output: Path
+) -> tuple[int, int]:
+    """Downloads every chapter of a manga, as the download command does."""
+
+    settings: DownloadSettings = DownloadSettings(
+        chapter_concurrency=options.chapter_concurrency,
+        image_concurrency=options.image_concurrency,
+        report=False,
+        api_url=url,
+    )
+    with patch("builtins.input", return_value="1"):
+        await _download_manga(
+            "Manga", "en", None, None, [], [], [], output, False, settings
+        )
+    archives: list[Path] = list(output.glob("*.cbz"))
+    pages: int = 0
+    for archive in archives:
+        with ZipFile(archive) as zip_file:
+            pages += len(zip_file.namelist())
+    return len(archives), pages
+
+
+SCENARIOS: dict[
+    str, Callable[[str, BenchmarkOptions, Path], Awaitable[tuple[int, int]]]
+] = {"client": _client_scenario, "download": _download_scenario}
+
+
+def _unthrottle(rate_limiter: RateLimiter) -> None:
+    for bucket in rate_limiter.buckets.values():
+        bucket.rate = bucket.capacity = bucket.tokens = 1e9
+
+
+def _peak_rss() -> int | None:
+    if resource is None:  # pragma: no cover
+        return None
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_scenario(scenario: str, url: str, options: BenchmarkOptions) -> BenchmarkResult:
+    """Runs a scenario against a server, in the current process.
+
+    The output of pymanga is discarded, its cost still being measured.
+
+    Args:
+        scenario: The name of the scenario.
+        url: The base url of the mock server.
+        options: How to configure pymanga.
+
+    Returns:
+        The measures of the run, the peak RSS being the one of the process.
+    """
+
+    if not options.rate_limits:
+        _unthrottle(default_rate_limiter())
+    with (
+        TemporaryDirectory() as directory,
+        open(os.devnull, "w") as devnull,
+        redirect_stdout(devnull),
+    ):
+        cpu: float = time.process_time()
+        start: float = time.perf_counter()
+        chapters, pages = asyncio.run(
+            SCENARIOS[scenario](url, options, Path(directory))
+        )
+        seconds: float = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+    return BenchmarkResult(scenario, seconds, chapters, pages, cpu, _peak_rss())
+
+
+def benchmark(
+    scenarios: list[str],
+    library: MockLibrary | None = None,
+    profile: ServerProfile | None = None,
+    options: BenchmarkOptions | None = None,
+) -> list[BenchmarkResult]:
+    """Runs scenarios against a mock server, each in a fresh process.
+
+    A fresh process per scenario keeps the peak RSS and the CPU time of each one
+    apart, and away from the server, which runs in the current process.
+
+    Args:
+        scenarios: The names of the scenarios to run.
+        library: The mangas served. Defaults to None, the default library.
+        profile: How the server behaves. Defaults to None, a perfect server.
+        options: How to configure pymanga. Defaults to None, the default options.
+
+    Returns:
+        The measures of every scenario, in order.
+    """
+
+    results: list[BenchmarkResult] = []
+    with MockServer(library or MockLibrary(), profile or ServerProfile()) as server:
+        for scenario in scenarios:
+            with ProcessPoolExecutor(
+                1, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                results.append(
+                    executor.submit(
+                        run_scenario,
+                        scenario,
+                        server.url,
+                        options or BenchmarkOptions(),
+                    ).result()
+                )
+    return results
+
+
+def compare(
+    results: list[BenchmarkResult],
+    baseline: list[dict[str, Any]],
+    tolerance: float = 0.1,
+) -> list[str]:
+    """Finds the measures that regressed since a baseline.
+
+    Throughput regresses when it drops by more than the tolerance, CPU time and
+    memory when they grow by more than the tolerance.
+
+    Args:
+        results: The measures of the current run.
+        baseline: The metrics of a previous run, as saved by the harness.
+        tolerance: The relative change allowed. Defaults to 0.1, 10%.
+
+    Returns:
+        The descriptions of the regressions.
+    """
+
+    previous: dict[str, dict[str, Any]] = {
+        metrics["scenario"]: metrics for metrics in baseline
+    }
+    regressions: list[str] = []
+    for result in results:
+        if (before := previous.get(result.scenario)) is None:
+            continue
+        current: dict[str, Any] = result.metrics()
+        for metric, higher_is_better in [
+            ("chapters_per_minute", True),
+            ("pages_per_second", True),
+            ("cpu_per_chapter", False),
+            ("peak_rss", False),
+        ]:
+            old, new = before.get(metric), current[metric]
+            if not old or new is None:
+                continue
+            change: float = (new - old) / old
+            if (higher_is_better and change < -tolerance) or (
+                not higher_is_better and change > tolerance
+            ):
+                regressions.append(
+                    f"{result.scenario} {metric}: {old:.4g} -> {new:.4g} "
+                    f"({change:+.1%})"
+                )
+    return regressions
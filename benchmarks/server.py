@@ -0,0 +1,286 @@
+from __future__ import annotations
+import asyncio
+from copy import deepcopy
+from dataclasses import dataclass, field
+import json
+from pathlib import Path
+import re
+import threading
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+from pymanga.integrity import PNG_SIGNATURE
+
+__all__: list[str] = ["MockLibrary", "ServerProfile", "MockServer"]
+
+SAMPLES: Path = Path(__file__).parent.parent / "tests" / "samples"
+REASONS: dict[int, str] = {200: "OK", 404: "Not Found", 429: "Too Many Requests"}
+
+
+@dataclass(frozen=True)
+class MockLibrary:
+    """Describes the mangas served by the mock server.
+
+    Every manga has the same number of chapters, each with the same number of
+    pages of `page_size` bytes, framed as PNG images so they pass the checks of
+    the downloads.
+    """
+
+    mangas: int = 1
+    chapters: int = 20
+    pages: int = 10
+    page_size: int = 200 * 1024
+
+
+@dataclass(frozen=True)
+class ServerProfile:
+    """Describes how badly the mock server behaves.
+
+    Every request waits `latency` seconds before its answer, every
+    `throttle_every`th API request is throttled with a 429 status, and the
+    bodies are sent at `bandwidth` bytes per second at most, per response.
+    """
+
+    latency: float = 0.0
+    throttle_every: int = 0
+    bandwidth: int | None = None
+
+
+@dataclass
+class ServerStats:
+    requests: int = 0
+    throttled: int = 0
+    sent: int = 0
+
+
+@dataclass
+class MockServer:
+    """Serves a fake MangaDex API and at-home node over HTTP/1.1 on localhost.
+
+    The server runs its own event loop in a background thread, so it does not
+    compete with the benchmarked code for its loop. The at-home nodes it hands
+    out point back to itself.
+    """
+
+    library: MockLibrary = field(default_factory=MockLibrary)
+    profile: ServerProfile = field(default_factory=ServerProfile)
+    stats: ServerStats = field(default_factory=ServerStats, init=False)
+    url: str = field(default="", init=False)
+    _loop: asyncio.AbstractEventLoop | None = field(default=None, init=False)
+    _server: asyncio.Server | None = field(default=None, init=False)
+    _thread: threading.Thread | None = field(default=None, init=False)
+    _connections: set[asyncio.StreamWriter] = field(default_factory=set, init=False)
+
+    def __post_init__(self) -> None:
+        self._manga: dict[str, Any] = json.loads(
+            (SAMPLES / "manga.json").read_text(encoding="utf-8")
+        )
+        self._chapter: dict[str, Any] = json.loads(
+            (SAMPLES / "chapter.json").read_text(encoding="utf-8")
+        )
+        self._tags: bytes = (SAMPLES / "tag_results.json").read_bytes()
+        filler: bytes = bytes(range(256)) * (self.library.page_size // 256 + 1)
+        self._page: bytes = (
+            PNG_SIGNATURE
+            + filler[: max(self.library.page_size - 20, 0)]
+            + b"\x00\x00\x00\x00IEND\xaeB`\x82"
+        )
+
+    def _manga_item(self, index: int) -> dict[str, Any]:
+        manga: dict[str, Any] = deepcopy(self._manga)
+        manga["id"] = f"manga-{index}"
+        manga["attributes"]["title"] = {"en": f"Manga {index}"}
+        return manga
+
+    def _chapter_item(self, manga_id: str, number: int) -> dict[str, Any]:
+        chapter: dict[str, Any] = deepcopy(self._chapter)
+        chapter["id"] = f"{manga_id}-chapter-{number}"
+        chapter["attributes"].update(
+            chapter=str(number),
+            volume=str(number // 10 + 1),
+            pages=self.library.pages,
+            createdAt=f"2020-01-01T00:{number // 60 % 60:02}:{number % 60:02}+00:00",
+        )
+        chapter["relationships"] = [
+            {
+                "id": "group",
+                "type": "scanlation_group",
+                "attributes": {"name": "Group"},
+            },
+            {
+                "id": manga_id,
+                "type": "manga",
+                "attributes": {"title": {"en": f"Manga {manga_id.split('-')[-1]}"}},
+            },
+        ]
+        return chapter
+
+    def _listing(self, items: list[Any], query: dict[str, list[str]]) -> bytes:
+        limit: int = int(query.get("limit", ["10"])[0])
+        offset: int = int(query.get("offset", ["0"])[0])
+        return json.dumps(
+            {
+                "result": "ok",
+                "response": "collection",
+                "data": items[offset : offset + limit],
+                "limit": limit,
+                "offset": offset,
+                "total": len(items),
+            }
+        ).encode()
+
+    def _route(self, target: str) -> tuple[int, bytes, bool]:
+        """Answers a request.
+
+        Args:
+            target: The path and query of the request.
+
+        Returns:
+            The status and body of the response, and whether it was an API call.
+        """
+
+        url = urlsplit(target)
+        query: dict[str, list[str]] = parse_qs(url.query)
+        if url.path == "/manga":
+            mangas: list[Any] = [
+                self._manga_item(index) for index in range(self.library.mangas)
+            ]
+            return 200, self._listing(mangas, query), True
+        if url.path == "/manga/tag":
+            return 200, self._tags, True
+        manga_id: str | None = (query.get("manga") or [None])[0]
+        if match := re.fullmatch(r"/manga/([^/]+)/feed", url.path):
+            manga_id = match.group(1)
+        if url.path == "/chapter" or match:
+            chapters: list[Any] = [
+                self._chapter_item(manga_id or "manga-0", number)
+                for number in range(1, self.library.chapters + 1)
+            ]
+            return 200, self._listing(chapters, query), True
+        if match := re.fullmatch(r"/at-home/server/([^/]+)", url.path):
+            filenames: list[str] = [
+                f"{page}.png" for page in range(1, self.library.pages + 1)
+            ]
+            body: dict[str, Any] = {
+                "result": "ok",
+                "baseUrl": self.url,
+                "chapter": {
+                    "hash": match.group(1),
+                    "data": filenames,
+                    "dataSaver": filenames,
+                },
+            }
+            return 200, json.dumps(body).encode(), True
+        if re.fullmatch(r"/data(-saver)?/[^/]+/[^/]+", url.path):
+            return 200, self._page, False
+        return 404, b"", False
+
+    async def _send(self, writer: asyncio.StreamWriter, body: bytes) -> None:
+        if self.profile.bandwidth is None:
+            writer.write(body)
+            await writer.drain()
+            return
+        chunk: int = max(1, self.profile.bandwidth // 20)
+        for start in range(0, len(body), chunk):
+            writer.write(body[start : start + chunk])
+            await writer.drain()
+            await asyncio.sleep(
+                len(body[start : start + chunk]) / self.profile.bandwidth
+            )
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._connections.add(writer)
+        try:
+            while request := await reader.readuntil(b"\r\n\r\n"):
+                lines: list[str] = request.decode("latin-1").split("\r\n")
+                target: str = lines[0].split(" ")[1]
+                headers: dict[str, str] = {
+                    name.strip().lower(): value.strip()
+                    for name, _, value in (line.partition(":") for line in lines[1:])
+                    if name
+                }
+                if length := int(headers.get("content-length", "0")):
+                    await reader.readexactly(length)
+                self.stats.requests += 1
+                status, body, api = self._route(target)
+                if (
+                    api
+                    and self.profile.throttle_every
+                    and self.stats.requests % self.profile.throttle_every == 0
+                ):
+                    self.stats.throttled += 1
+                    status, body = 429, b""
+                if self.profile.latency:
+                    await asyncio.sleep(self.profile.latency)
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                        f"Content-Length: {len(body)}\r\n"
+                        "Content-Type: application/octet-stream\r\n"
+                        + ("Retry-After: 0\r\n" if status == 429 else "")
+                        + "\r\n"
+                    ).encode()
+                )
+                await self._send(writer, body)
+                self.stats.sent += len(body)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    def start(self) -> str:
+        """Starts serving in the background.
+
+        Returns:
+            The base url of the server.
+        """
+
+        started: threading.Event = threading.Event()
+
+        async def serve() -> None:
+            self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+            host, port = self._server.sockets[0].getsockname()[:2]
+            self.url = f"http://{host}:{port}"
+            started.set()
+            try:
+                await self._server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+            handlers: set[asyncio.Task[Any]] = asyncio.all_tasks() - {
+                asyncio.current_task()  # type: ignore[arg-type]
+            }
+            for connection in list(self._connections):
+                connection.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(serve())
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="mock-mangadex", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.url
+
+    def stop(self) -> None:
+        """Stops serving and waits for the background thread."""
+
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> MockServer:
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
@@ -1,7 +1,13 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import timedelta
 from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+import zipfile
 import pytest
 from pymanga.client import Client
+from pymanga.ratelimit import Backoff
+
+PAGE: bytes = b"\x89PNG\r\n\x1a\nfake\x00\x00\x00\x00IEND\xaeB`\x82"
 
 
 @pytest.fixture
@@ -9,6 +15,7 @@ def client() -> Client:
     return Client(
         base_url="https://api.mangadex.org",
         output=Path("tests/output"),
+        backoff=Backoff(base=0.0),
     )
 
 
@@ -16,9 +23,39 @@ def client() -> Client:
 class FakeResponse:
     json_data: dict[str, str]
     content: bytes
+    status_code: int = 200
+    headers: dict[str, str] = field(default_factory=dict)
+    elapsed: timedelta = timedelta()
 
     def json(self) -> dict[str, str]:
         return self.json_data
 
     def raise_for_status(self) -> None:
         pass
+
+    async def aiter_bytes(self, chunk_size: int | None = None) -> AsyncIterator[bytes]:
+        yield self.content
+
+    async def __aenter__(self) -> "FakeResponse":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass
+
+
+def write_cbz(path: Path, pages: int) -> None:
+    """Writes an archive holding the pages of a chapter, as the downloads do."""
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as archive:
+        for index in range(pages):
+            archive.writestr(f"{index + 1:04d}.png", PAGE)
+
+
+def async_iter(items: list[Any]) -> Callable[..., AsyncIterator[Any]]:
+    """Builds a side effect replacing an async generator method by the items."""
+
+    async def iterate(*args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        for item in items:
+            yield item
+
+    return iterate
@@ -1,86 +1,432 @@
 import asyncio
+from contextlib import aclosing
+from dataclasses import replace
+import multiprocessing
+from multiprocessing.context import BaseContext
+from multiprocessing.process import BaseProcess
+import os
 from pathlib import Path
-from typing import Annotated, Optional
+from typing import Annotated, Any, AsyncIterator, Optional
 import typer
+from pymanga.batch import BatchDownload
+from pymanga.cache import ResponseCache
+from pymanga.catalogue import (
+    RELEASE_CRITERIA,
+    CatalogueEntry,
+    ChapterCatalogue,
+    ReleasePolicy,
+)
 from pymanga.client import Client, SearchTags
+from pymanga.exception import MangadexClientError
+from pymanga.index import ChapterIndex, IndexedChapter
+from pymanga.integrity import ArchiveCheck, check_archive
+from pymanga.jobqueue import JobQueue, QueueWorker, enqueue_all
+from pymanga.manifest import ManifestEntry, load_manifest
+from pymanga.metrics import Metrics, MetricsHook, SpanLog
 from pymanga.models.chapter import Chapter
-from pymanga.models.download_chapter_info import DownloadInfo
-from pymanga.models.manga import Manga
+from pymanga.models.manga import MangaSummary
+from pymanga.scheduler import ChapterJob, DownloadScheduler, DownloadSettings
+from pymanga.session import SessionSettings
+from pymanga.shaping import BandwidthSchedule
+from pymanga.sync import LibrarySync
+from pymanga.transcode import TranscodeOptions
+from pymanga.workers import WorkerPool
 
 app: typer.Typer = typer.Typer()
 
+# The chapters selected while streaming are checked against the index by batches
+# of a listing page, so the downloads start before the listing ends.
+LISTING_BATCH: int = 100
+
+# The options shared by the downloading commands.
+ChapterConcurrency = Annotated[
+    int,
+    typer.Option(min=1, help="The number of chapters downloaded at the same time"),
+]
+ImageConcurrency = Annotated[
+    int,
+    typer.Option(min=1, help="The number of images downloaded at the same time"),
+]
+ArchiveWorkers = Annotated[
+    int, typer.Option(min=1, help="The number of threads writing the archives")
+]
+PageWorkers = Annotated[
+    int, typer.Option(min=1, help="The number of workers processing the pages")
+]
+MemoryBudget = Annotated[
+    int,
+    typer.Option(min=1, help="The MiB of pages held in memory, the rest going to disk"),
+]
+ProcessPages = Annotated[
+    bool, typer.Option(help="Process the pages in processes instead of threads")
+]
+Width = Annotated[Optional[int], typer.Option(help="The maximum width of the pages")]
+Height = Annotated[Optional[int], typer.Option(help="The maximum height of the pages")]
+Grayscale = Annotated[bool, typer.Option(help="Convert the pages to grayscale")]
+ImageFormat = Annotated[
+    Optional[str], typer.Option(help="Recompress the pages to webp, jpeg or png")
+]
+Quality = Annotated[int, typer.Option(help="The quality of the recompressed pages")]
+SplitSpreads = Annotated[
+    bool, typer.Option(help="Split the double-page spreads in two pages")
+]
+AllReleases = Annotated[
+    bool, typer.Option(help="Download the releases of every group of a chapter")
+]
+PreferredGroups = Annotated[
+    str, typer.Option(help="The scanlation groups to prefer, by name or id")
+]
+ReleaseCriteria = Annotated[
+    str,
+    typer.Option(help="How releases are compared: groups, version, pages, newest"),
+]
+DataSaverFallback = Annotated[
+    bool,
+    typer.Option(help="Download the data saver image of a page failing to load"),
+]
+CacheDir = Annotated[
+    Optional[Path], typer.Option(help="The directory to cache API responses in")
+]
+Report = Annotated[
+    bool, typer.Option(help="Report the image downloads to MangaDex@Home")
+]
+Http2 = Annotated[
+    bool, typer.Option(help="Multiplex the requests to a host over HTTP/2")
+]
+MetricsPath = Annotated[
+    Optional[Path],
+    typer.Option(help="Export metrics to this Prometheus or .jsonl file"),
+]
+TracePath = Annotated[
+    Optional[Path], typer.Option(help="Append the spans to this JSON lines file")
+]
+Bandwidth = Annotated[
+    Optional[str],
+    typer.Option(
+        help="The Mbit/s of the image downloads, then windows of the day, as "
+        "8,22:00-07:00=unlimited"
+    ),
+]
+
+
+def _client(output: Path, settings: DownloadSettings) -> Client:
+    """Builds the API client, with a response cache if the settings have one.
+
+    The spans of the client are appended to the trace file of the settings, if
+    they have one.
+
+    Args:
+        output: The output directory to save the mangas.
+        settings: The concurrency and cache settings of the download.
+
+    Returns:
+        The API client.
+    """
+
+    cache: ResponseCache | None = None
+    if settings.cache_dir is not None:
+        cache = ResponseCache(
+            settings.cache_dir / "responses.sqlite", bypass=settings.refresh_cache
+        )
+    hooks: list[MetricsHook] = []
+    if settings.trace_path is not None:
+        hooks.append(SpanLog(settings.trace_path))
+    return Client(
+        base_url=settings.api_url,
+        output=output,
+        cache=cache,
+        sessions=settings.sessions,
+        metrics=Metrics(hooks),
+    )
+
+
+def _transcode(
+    width: int | None,
+    height: int | None,
+    grayscale: bool,
+    image_format: str | None,
+    quality: int,
+    split_spreads: bool,
+) -> TranscodeOptions | None:
+    """Builds the transcoding options of the pages.
+
+    Args:
+        width: The maximum width of the pages.
+        height: The maximum height of the pages.
+        grayscale: Convert the pages to grayscale.
+        image_format: The format to recompress the pages to.
+        quality: The quality of the recompressed pages.
+        split_spreads: Split the double-page spreads in two pages.
+
+    Returns:
+        The transcoding options, None if the pages are kept as served.
+    """
+
+    if not (width or height or grayscale or image_format or split_spreads):
+        return None
+    return TranscodeOptions(
+        width, height, grayscale, image_format, quality, split_spreads
+    )
+
+
+def _release_policy(
+    all_releases: bool, preferred_groups: str, release_criteria: str
+) -> ReleasePolicy | None:
+    """Builds the policy picking a single release of each chapter.
+
+    Args:
+        all_releases: Download the release of every group.
+        preferred_groups: The comma-separated groups to prefer, by name or id.
+        release_criteria: The comma-separated criteria comparing the releases.
+
+    Returns:
+        The policy, None if every release is downloaded.
+    """
+
+    if all_releases:
+        return None
+    return ReleasePolicy(
+        preferred_groups.split(",") if preferred_groups else [],
+        release_criteria.split(","),
+    )
+
+
+def _settings(
+    *,
+    http2: bool,
+    bandwidth: str | None,
+    memory_budget: int = 64,
+    width: int | None = None,
+    height: int | None = None,
+    grayscale: bool = False,
+    image_format: str | None = None,
+    quality: int = 80,
+    split_spreads: bool = False,
+    **settings: Any,
+) -> DownloadSettings | None:
+    """Builds the download settings from the options of a command.
+
+    The invalid options are reported, and the command stops there.
+
+    Args:
+        http2: Multiplex the requests to a host over HTTP/2.
+        bandwidth: The bandwidth schedule of the image downloads, if any.
+        memory_budget: The MiB of pages held in memory. Defaults to 64.
+        width: The maximum width of the pages. Defaults to None.
+        height: The maximum height of the pages. Defaults to None.
+        grayscale: Convert the pages to grayscale. Defaults to False.
+        image_format: The format to recompress the pages to. Defaults to None.
+        quality: The quality of the recompressed pages. Defaults to 80.
+        split_spreads: Split the double-page spreads in two pages. Defaults to
+            False.
+        **settings: The other fields of the settings, taken as they are.
+
+    Returns:
+        The settings, None if an option is invalid.
+    """
+
+    try:
+        sessions: SessionSettings = SessionSettings(http2=http2)
+    except ValueError as e:
+        print(f"Invalid session: {e}")
+        return None
+    try:
+        schedule: BandwidthSchedule | None = (
+            BandwidthSchedule.parse(bandwidth) if bandwidth else None
+        )
+    except ValueError as e:
+        print(f"Invalid bandwidth: {e}")
+        return None
+    try:
+        transcode: TranscodeOptions | None = _transcode(
+            width, height, grayscale, image_format, quality, split_spreads
+        )
+    except ValueError as e:
+        print(f"Invalid transcoding: {e}")
+        return None
+    return DownloadSettings(
+        memory_budget=memory_budget * 2**20,
+        transcode=transcode,
+        sessions=sessions,
+        bandwidth=schedule,
+        **settings,
+    )
+
 
 async def _download_manga(
     manga_name: str,
     language: str,
-    from_chapter: int | None,
-    to_chapter: int | None,
+    from_chapter: float | None,
+    to_chapter: float | None,
     included_tags: list[str],
     excluded_tags: list[str],
     content_rating: list[str],
     output: Path,
     data_saver: bool,
+    settings: DownloadSettings | None = None,
+    *,
+    latest: int | None = None,
+    volume: float | None = None,
+    policy: ReleasePolicy | None = None,
 ) -> None:
     """Download a manga from mangadex.
 
+    The chapters are selected by number, not by position in the listing, so
+    gaps and decimal numbers are handled. A range or volume is selected as the
+    chapters are listed, so the downloads start with the first page of the
+    listing, a single release of each chapter being picked once the next
+    chapter is listed. The latest chapters need the whole listing in a
+    catalogue first.
+
     Args:
         manga_name: The name of the manga to download.
         language: The language of the manga.
-        from_chapter: The chapter to start downloading from.
-        to_chapter: The chapter to stop downloading at.
+        from_chapter: The number of the first chapter to download.
+        to_chapter: The number of the last chapter to download.
         included_tags: The tags to include in the search query.
         excluded_tags: The tags to exclude in the search query.
         content_rating: The content rating of the manga.
         output: The output directory to save the manga.
         data_saver: Use data saver mode to download the manga.
+        settings: The concurrency and cache settings of the download. Defaults to
+            None.
+        latest: Only download this many of the latest chapters, instead of a
+            range. Defaults to None.
+        volume: Only download the chapters of this volume, instead of a range.
+            Defaults to None.
+        policy: Picks a single release of each chapter among the groups, before
+            any of them is looked up. Defaults to None, every release.
     """
 
-    client: Client = Client(base_url="https://api.mangadex.org", output=output)
-    search_tags: SearchTags | None = None
-    if len(included_tags) or len(excluded_tags):
-        search_tags = await client.get_tags(included_tags, excluded_tags)
-    mangas: list[Manga] = await client.get_mangas(
-        manga_name, search_tags, content_rating
-    )
-    if not mangas:
-        print("No mangas found.")
-        return
-    print(f"Found {len(mangas)} mangas, choose one to download:")
-    for i, manga in enumerate(mangas):
-        if manga.attributes.title.get("en") is None:
-            continue
-        print(f"{i + 1}. {manga.attributes.title.get('en')}")
-    try:
-        manga_index: int = int(input("Enter the index of the manga: ")) - 1
-        choosen_manga: Manga = mangas[manga_index]
-    except ValueError:
-        print("Invalid input, please enter a number.")
-        return
-    except IndexError:
-        print("Invalid index, please enter a valid index.")
-        return
-    chapters: list[Chapter] = await client.get_chapters(
-        choosen_manga.id, language, content_rating
-    )
-    if from_chapter is not None:
-        chapters = chapters[from_chapter - 1 :]
-    if to_chapter is not None:
-        chapters = chapters[: to_chapter - 1]
-    if not chapters:
-        print("No chapters found.")
-        return
-    for chapter in chapters:
-        chapter_name: str = (
-            f"{chapter.attributes.chapter} - {choosen_manga.attributes.title.get('en')}"
-            f" -{chapter.attributes.title}"
+    settings = settings or DownloadSettings()
+    async with _client(output, settings) as client:
+        search_tags: SearchTags | None = None
+        if len(included_tags) or len(excluded_tags):
+            search_tags = await client.get_tags(included_tags, excluded_tags)
+        mangas: list[MangaSummary] = await client.get_mangas(
+            manga_name, search_tags, content_rating, model=MangaSummary
+        )
+        if not mangas:
+            print("No mangas found.")
+            return
+        print(f"Found {len(mangas)} mangas, choose one to download:")
+        for i, manga in enumerate(mangas):
+            if manga.attributes.title.get("en") is None:
+                continue
+            print(f"{i + 1}. {manga.attributes.title.get('en')}")
+        try:
+            manga_index: int = int(input("Enter the index of the manga: ")) - 1
+            choosen_manga: MangaSummary = mangas[manga_index]
+        except ValueError:
+            print("Invalid input, please enter a number.")
+            return
+        except IndexError:
+            print("Invalid index, please enter a valid index.")
+            return
+        index: ChapterIndex = ChapterIndex(output / ".index.sqlite")
+        title: str | None = choosen_manga.attributes.title.get("en")
+        found: int = 0
+
+        async def pending(
+            entries: list[tuple[Chapter, CatalogueEntry]],
+        ) -> list[ChapterJob]:
+            nonlocal found
+            found += len(entries)
+            downloaded: set[str] = await index.run(
+                index.downloaded,
+                [
+                    (chapter, output.joinpath(entry.job.name).with_suffix(".cbz"))
+                    for chapter, entry in entries
+                ],
+            )
+            jobs: list[ChapterJob] = []
+            for _, entry in entries:
+                if entry.job.chapter_id in downloaded:
+                    print(f"Skipping | {entry.job.name}")
+                else:
+                    jobs.append(entry.job)
+            return jobs
+
+        def pick(
+            releases: list[tuple[Chapter, CatalogueEntry]],
+        ) -> list[tuple[Chapter, CatalogueEntry]]:
+            if policy is None:
+                return releases
+            kept: set[str] = {
+                entry.job.chapter_id
+                for entry in policy.select(entry for _, entry in releases)
+            }
+            return [
+                release for release in releases if release[1].job.chapter_id in kept
+            ]
+
+        async def streamed() -> AsyncIterator[ChapterJob]:
+            batch: list[tuple[Chapter, CatalogueEntry]] = []
+            releases: list[tuple[Chapter, CatalogueEntry]] = []
+            async with aclosing(
+                client.iter_chapters(choosen_manga.id, language, content_rating)
+            ) as chapters:
+                async for chapter in chapters:
+                    entry: CatalogueEntry = CatalogueEntry.from_chapter(chapter, title)
+                    if not (
+                        entry.volume == volume
+                        if volume is not None
+                        else entry.within(from_chapter, to_chapter)
+                    ):
+                        continue
+                    # The listing is ordered by chapter, so the releases of a
+                    # chapter are all known once the next chapter starts.
+                    if releases and releases[0][1].number != entry.number:
+                        batch.extend(pick(releases))
+                        releases = []
+                        if len(batch) >= LISTING_BATCH:
+                            for job in await pending(batch):
+                                yield job
+                            batch = []
+                    releases.append((chapter, entry))
+            batch.extend(pick(releases))
+            for job in await pending(batch):
+                yield job
+
+        async def catalogued() -> AsyncIterator[ChapterJob]:
+            catalogue: ChapterCatalogue = ChapterCatalogue()
+            listed: dict[str, Chapter] = {}
+            async with aclosing(
+                client.iter_chapters(choosen_manga.id, language, content_rating)
+            ) as chapters:
+                async for chapter in chapters:
+                    listed[chapter.id] = chapter
+                    catalogue.add(CatalogueEntry.from_chapter(chapter, title))
+            selected: list[CatalogueEntry] = (
+                catalogue.volume(volume)
+                if volume is not None
+                else (
+                    catalogue.latest(latest)
+                    if latest is not None
+                    else catalogue.range(from_chapter, to_chapter)
+                )
+            )
+            if policy is not None:
+                selected = policy.select(selected)
+            for job in await pending(
+                [(listed[entry.job.chapter_id], entry) for entry in selected]
+            ):
+                yield job
+
+        scheduler: DownloadScheduler = DownloadScheduler(
+            client, client.output, settings, data_saver, index=index
         )
-        chapter_name = chapter_name.replace(".", ",").replace("/", ",")
-        if output.joinpath(chapter_name).with_suffix(".cbz").exists():
-            print(f"Skipping | {chapter_name}")
-            continue
-        download_info: DownloadInfo = await client.get_chapter_download_info(chapter.id)
-        print(f"Downloading | {chapter_name}")
-        await download_info.download(client.output, chapter_name, client.session)
+        try:
+            failed: list[ChapterJob] = await scheduler.run(
+                streamed() if latest is None else catalogued()
+            )
+        finally:
+            index.close()
+        if not found:
+            print("No chapters found.")
+            return
+        if failed:
+            print(f"Failed to download {len(failed)} chapters.")
 
 
 @app.command()
@@ -90,10 +436,18 @@ def download(
     ],
     language: Annotated[str, typer.Option(help="The language of the manga")] = "en",
     from_chapter: Annotated[
-        Optional[int], typer.Option(help="The chapter to start downloading from")
+        Optional[float], typer.Option(help="The number of the first chapter")
     ] = None,
     to_chapter: Annotated[
-        Optional[int], typer.Option(help="The chapter to stop downloading at")
+        Optional[float], typer.Option(help="The number of the last chapter")
+    ] = None,
+    latest: Annotated[
+        Optional[int],
+        typer.Option(help="Only download the latest chapters, instead of a range"),
+    ] = None,
+    volume: Annotated[
+        Optional[float],
+        typer.Option(help="Only download the chapters of a volume, instead of a range"),
     ] = None,
     included_tags: Annotated[
         Optional[str], typer.Option(help="The tags to include in the search query")
@@ -110,9 +464,65 @@ def download(
     data_saver: Annotated[
         bool, typer.Option(help="Use data saver mode to download the manga")
     ] = False,
+    chapter_concurrency: ChapterConcurrency = 3,
+    image_concurrency: ImageConcurrency = 10,
+    archive_workers: ArchiveWorkers = 2,
+    page_workers: PageWorkers = 2,
+    memory_budget: MemoryBudget = 64,
+    process_pages: ProcessPages = False,
+    width: Width = None,
+    height: Height = None,
+    grayscale: Grayscale = False,
+    image_format: ImageFormat = None,
+    quality: Quality = 80,
+    split_spreads: SplitSpreads = False,
+    all_releases: AllReleases = False,
+    preferred_groups: PreferredGroups = "",
+    release_criteria: ReleaseCriteria = ",".join(RELEASE_CRITERIA),
+    data_saver_fallback: DataSaverFallback = False,
+    cache_dir: CacheDir = None,
+    refresh_cache: Annotated[
+        bool, typer.Option(help="Ignore the cached API responses and refresh them")
+    ] = False,
+    report: Report = True,
+    http2: Http2 = False,
+    metrics: MetricsPath = None,
+    trace: TracePath = None,
+    bandwidth: Bandwidth = None,
 ) -> None:
     """Download a manga from mangadex."""
 
+    settings: DownloadSettings | None = _settings(
+        chapter_concurrency=chapter_concurrency,
+        image_concurrency=image_concurrency,
+        archive_workers=archive_workers,
+        page_workers=page_workers,
+        memory_budget=memory_budget,
+        process_pages=process_pages,
+        width=width,
+        height=height,
+        grayscale=grayscale,
+        image_format=image_format,
+        quality=quality,
+        split_spreads=split_spreads,
+        data_saver_fallback=data_saver_fallback,
+        cache_dir=cache_dir,
+        refresh_cache=refresh_cache,
+        report=report,
+        http2=http2,
+        metrics_path=metrics,
+        trace_path=trace,
+        bandwidth=bandwidth,
+    )
+    if settings is None:
+        return
+    try:
+        policy: ReleasePolicy | None = _release_policy(
+            all_releases, preferred_groups, release_criteria
+        )
+    except ValueError as e:
+        print(f"Invalid release selection: {e}")
+        return
     asyncio.run(
         _download_manga(
             manga_name,
@@ -124,6 +534,566 @@ def download(
             content_rating.split(",") if content_rating else [],
             output,
             data_saver,
+            settings,
+            latest=latest,
+            volume=volume,
+            policy=policy,
+        )
+    )
+
+
+async def _sync_library(
+    manga_ids: list[str],
+    language: str,
+    content_rating: list[str],
+    output: Path,
+    data_saver: bool,
+    settings: DownloadSettings | None = None,
+    policy: ReleasePolicy | None = None,
+) -> None:
+    """Download the new and updated chapters of followed mangas.
+
+    Args:
+        manga_ids: The ids of the followed mangas.
+        language: The language of the chapters.
+        content_rating: The content rating of the mangas.
+        output: The output directory to save the mangas.
+        data_saver: Use data saver mode to download the mangas.
+        settings: The concurrency and cache settings of the download. Defaults to
+            None.
+        policy: The policy picking a release of each chapter, None to download
+            them all. Defaults to None.
+    """
+
+    settings = settings or DownloadSettings()
+    async with _client(output, settings) as client:
+        index: ChapterIndex = ChapterIndex(output / ".index.sqlite")
+        scheduler: DownloadScheduler = DownloadScheduler(
+            client, client.output, settings, data_saver, index=index
+        )
+        try:
+            failed: list[ChapterJob] = await LibrarySync(
+                client, index, language, content_rating, policy=policy
+            ).run(manga_ids, scheduler)
+        except MangadexClientError as e:
+            print(f"Failed to list the chapters: {e}")
+            return
+        finally:
+            index.close()
+        if failed:
+            print(f"Failed to download {len(failed)} chapters.")
+
+
+@app.command()
+def sync(
+    manga_ids: Annotated[
+        list[str], typer.Argument(help="The ids of the followed mangas")
+    ],
+    language: Annotated[str, typer.Option(help="The language of the mangas")] = "en",
+    content_rating: Annotated[
+        Optional[str], typer.Option(help="The content rating of the mangas")
+    ] = "",
+    output: Annotated[
+        Path, typer.Option(help="The output directory to save the mangas")
+    ] = Path("output"),
+    data_saver: Annotated[
+        bool, typer.Option(help="Use data saver mode to download the mangas")
+    ] = False,
+    chapter_concurrency: ChapterConcurrency = 3,
+    image_concurrency: ImageConcurrency = 10,
+    archive_workers: ArchiveWorkers = 2,
+    page_workers: PageWorkers = 2,
+    memory_budget: MemoryBudget = 64,
+    process_pages: ProcessPages = False,
+    width: Width = None,
+    height: Height = None,
+    grayscale: Grayscale = False,
+    image_format: ImageFormat = None,
+    quality: Quality = 80,
+    split_spreads: SplitSpreads = False,
+    all_releases: AllReleases = False,
+    preferred_groups: PreferredGroups = "",
+    release_criteria: ReleaseCriteria = ",".join(RELEASE_CRITERIA),
+    cache_dir: CacheDir = None,
+    data_saver_fallback: DataSaverFallback = False,
+    report: Report = True,
+    http2: Http2 = False,
+    metrics: MetricsPath = None,
+    trace: TracePath = None,
+    bandwidth: Bandwidth = None,
+) -> None:
+    """Download the chapters of followed mangas added or updated since the last sync."""
+
+    settings: DownloadSettings | None = _settings(
+        chapter_concurrency=chapter_concurrency,
+        image_concurrency=image_concurrency,
+        archive_workers=archive_workers,
+        page_workers=page_workers,
+        memory_budget=memory_budget,
+        process_pages=process_pages,
+        width=width,
+        height=height,
+        grayscale=grayscale,
+        image_format=image_format,
+        quality=quality,
+        split_spreads=split_spreads,
+        data_saver_fallback=data_saver_fallback,
+        cache_dir=cache_dir,
+        report=report,
+        http2=http2,
+        metrics_path=metrics,
+        trace_path=trace,
+        bandwidth=bandwidth,
+    )
+    if settings is None:
+        return
+    try:
+        policy: ReleasePolicy | None = _release_policy(
+            all_releases, preferred_groups, release_criteria
+        )
+    except ValueError as e:
+        print(f"Invalid release selection: {e}")
+        return
+    asyncio.run(
+        _sync_library(
+            manga_ids,
+            language,
+            content_rating.split(",") if content_rating else [],
+            output,
+            data_saver,
+            settings,
+            policy,
+        )
+    )
+
+
+async def _batch_download(
+    manifest: Path,
+    output: Path,
+    data_saver: bool,
+    settings: DownloadSettings | None = None,
+    *,
+    policy: ReleasePolicy | None = None,
+) -> None:
+    """Download the mangas listed in a manifest.
+
+    Args:
+        manifest: The path of the manifest, a JSON, YAML or CSV file.
+        output: The output directory to save the mangas.
+        data_saver: Use data saver mode to download the mangas.
+        settings: The concurrency and cache settings of the download. Defaults to
+            None.
+        policy: Picks a single release of each chapter among the groups.
+            Defaults to None, every release.
+    """
+
+    try:
+        entries: list[ManifestEntry] = load_manifest(manifest)
+    except (OSError, ValueError) as e:
+        print(f"Invalid manifest: {e}")
+        return
+    settings = settings or DownloadSettings()
+    async with _client(output, settings) as client:
+        index: ChapterIndex = ChapterIndex(output / ".index.sqlite")
+        scheduler: DownloadScheduler = DownloadScheduler(
+            client, client.output, settings, data_saver, index=index
+        )
+        batch: BatchDownload = BatchDownload(client, index, policy=policy)
+        try:
+            failed: list[ChapterJob] = await batch.run(entries, scheduler)
+        except MangadexClientError as e:
+            print(f"Failed to list the chapters: {e}")
+            return
+        finally:
+            index.close()
+        if batch.failed:
+            print(f"Failed to resolve {len(batch.failed)} mangas.")
+        if failed:
+            print(f"Failed to download {len(failed)} chapters.")
+
+
+@app.command()
+def batch(
+    manifest: Annotated[
+        Path, typer.Argument(help="The JSON, YAML or CSV manifest of the mangas")
+    ],
+    output: Annotated[
+        Path, typer.Option(help="The output directory to save the mangas")
+    ] = Path("output"),
+    data_saver: Annotated[
+        bool, typer.Option(help="Use data saver mode to download the mangas")
+    ] = False,
+    chapter_concurrency: ChapterConcurrency = 3,
+    image_concurrency: ImageConcurrency = 10,
+    archive_workers: ArchiveWorkers = 2,
+    page_workers: PageWorkers = 2,
+    memory_budget: MemoryBudget = 64,
+    process_pages: ProcessPages = False,
+    width: Width = None,
+    height: Height = None,
+    grayscale: Grayscale = False,
+    image_format: ImageFormat = None,
+    quality: Quality = 80,
+    split_spreads: SplitSpreads = False,
+    all_releases: AllReleases = False,
+    preferred_groups: PreferredGroups = "",
+    release_criteria: ReleaseCriteria = ",".join(RELEASE_CRITERIA),
+    cache_dir: CacheDir = None,
+    data_saver_fallback: DataSaverFallback = False,
+    report: Report = True,
+    http2: Http2 = False,
+    metrics: MetricsPath = None,
+    trace: TracePath = None,
+    bandwidth: Bandwidth = None,
+) -> None:
+    """Download the mangas of a manifest, by id or exact title, without prompting."""
+
+    settings: DownloadSettings | None = _settings(
+        chapter_concurrency=chapter_concurrency,
+        image_concurrency=image_concurrency,
+        archive_workers=archive_workers,
+        page_workers=page_workers,
+        memory_budget=memory_budget,
+        process_pages=process_pages,
+        width=width,
+        height=height,
+        grayscale=grayscale,
+        image_format=image_format,
+        quality=quality,
+        split_spreads=split_spreads,
+        data_saver_fallback=data_saver_fallback,
+        cache_dir=cache_dir,
+        report=report,
+        http2=http2,
+        metrics_path=metrics,
+        trace_path=trace,
+        bandwidth=bandwidth,
+    )
+    if settings is None:
+        return
+    try:
+        policy: ReleasePolicy | None = _release_policy(
+            all_releases, preferred_groups, release_criteria
+        )
+    except ValueError as e:
+        print(f"Invalid release selection: {e}")
+        return
+    asyncio.run(
+        _batch_download(
+            manifest,
+            output,
+            data_saver,
+            settings,
+            policy=policy,
+        )
+    )
+
+
+async def _enqueue(
+    manifest: Path,
+    output: Path,
+    queue_path: Path | None = None,
+    settings: DownloadSettings | None = None,
+    policy: ReleasePolicy | None = None,
+) -> None:
+    """Queue the chapters of the mangas listed in a manifest for the workers.
+
+    Args:
+        manifest: The path of the manifest, a JSON, YAML or CSV file.
+        output: The output directory shared by the workers.
+        queue_path: The path of the shared queue. Defaults to a queue in the
+            output directory.
+        settings: The cache settings of the listing. Defaults to None.
+        policy: The policy picking a release of each chapter, None to queue them
+            all. Defaults to None.
+    """
+
+    try:
+        entries: list[ManifestEntry] = load_manifest(manifest)
+    except (OSError, ValueError) as e:
+        print(f"Invalid manifest: {e}")
+        return
+    async with _client(output, settings or DownloadSettings()) as client:
+        index: ChapterIndex = ChapterIndex(output / ".index.sqlite")
+        queue: JobQueue = JobQueue(queue_path or output / ".queue.sqlite")
+        try:
+            async with aclosing(
+                BatchDownload(client, index, policy=policy).jobs(entries, output)
+            ) as jobs:
+                total: int = await enqueue_all(queue, jobs)
+        finally:
+            index.close()
+            queue.close()
+        print(f"Queued {total} chapters.")
+
+
+async def _work(
+    output: Path,
+    queue_path: Path | None,
+    data_saver: bool,
+    settings: DownloadSettings,
+    batch_size: int,
+    lease: float,
+    shares: int = 1,
+) -> None:
+    """Download the chapters of a shared queue until it is drained.
+
+    Each worker process exports its metrics to its own file, suffixed with its
+    process id, when the machine runs several, and takes its share of the
+    bandwidth.
+
+    Args:
+        output: The output directory shared by the workers.
+        queue_path: The path of the shared queue, None for the queue in the
+            output directory.
+        data_saver: Use data saver mode to download the chapters.
+        settings: The concurrency and cache settings of the download.
+        batch_size: The number of chapters claimed at once.
+        lease: The number of seconds a claimed chapter stays with the worker
+            without news from it.
+        shares: The number of workers started on the machine, sharing its rate
+            limits. Defaults to 1.
+    """
+
+    if shares > 1 and settings.metrics_path is not None:
+        path: Path = settings.metrics_path
+        settings = replace(
+            settings, metrics_path=path.with_stem(f"{path.stem}-{os.getpid()}")
+        )
+    if shares > 1 and settings.bandwidth is not None:
+        settings = replace(settings, bandwidth=settings.bandwidth.split(shares))
+    async with _client(output, settings) as client:
+        client.rate_limiter.split(shares)
+        index: ChapterIndex = ChapterIndex(output / ".index.sqlite")
+        queue: JobQueue = JobQueue(queue_path or output / ".queue.sqlite")
+        worker: QueueWorker = QueueWorker(
+            queue,
+            DownloadScheduler(client, client.output, settings, data_saver, index=index),
+            batch_size=batch_size,
+            lease=lease,
+        )
+        try:
+            downloaded: int = await worker.run()
+        finally:
+            index.close()
+            queue.close()
+        print(f"Downloaded {downloaded} chapters | {worker.worker}")
+
+
+def _work_process(*args: Any) -> None:
+    asyncio.run(_work(*args))
+
+
+@app.command()
+def enqueue(
+    manifest: Annotated[
+        Path, typer.Argument(help="The JSON, YAML or CSV manifest of the mangas")
+    ],
+    output: Annotated[
+        Path, typer.Option(help="The output directory shared by the workers")
+    ] = Path("output"),
+    queue: Annotated[
+        Optional[Path],
+        typer.Option(help="The shared queue, defaults to one in the output"),
+    ] = None,
+    all_releases: AllReleases = False,
+    preferred_groups: PreferredGroups = "",
+    release_criteria: ReleaseCriteria = ",".join(RELEASE_CRITERIA),
+    cache_dir: CacheDir = None,
+) -> None:
+    """Queue the chapters of a manifest for the workers."""
+
+    try:
+        policy: ReleasePolicy | None = _release_policy(
+            all_releases, preferred_groups, release_criteria
+        )
+    except ValueError as e:
+        print(f"Invalid release selection: {e}")
+        return
+    asyncio.run(
+        _enqueue(manifest, output, queue, DownloadSettings(cache_dir=cache_dir), policy)
+    )
+
+
+@app.command()
+def work(
+    output: Annotated[
+        Path, typer.Option(help="The output directory shared by the workers")
+    ] = Path("output"),
+    queue: Annotated[
+        Optional[Path],
+        typer.Option(help="The shared queue, defaults to one in the output"),
+    ] = None,
+    data_saver: Annotated[
+        bool, typer.Option(help="Use data saver mode to download the mangas")
+    ] = False,
+    processes: Annotated[
+        int, typer.Option(help="The number of worker processes to start")
+    ] = 1,
+    batch_size: Annotated[
+        int, typer.Option(help="The number of chapters claimed at once")
+    ] = 10,
+    lease: Annotated[
+        float, typer.Option(help="The seconds a worker keeps a chapter without news")
+    ] = 300.0,
+    chapter_concurrency: ChapterConcurrency = 3,
+    image_concurrency: ImageConcurrency = 10,
+    archive_workers: ArchiveWorkers = 2,
+    page_workers: PageWorkers = 2,
+    memory_budget: MemoryBudget = 64,
+    process_pages: ProcessPages = False,
+    width: Width = None,
+    height: Height = None,
+    grayscale: Grayscale = False,
+    image_format: ImageFormat = None,
+    quality: Quality = 80,
+    split_spreads: SplitSpreads = False,
+    data_saver_fallback: DataSaverFallback = False,
+    report: Report = True,
+    http2: Http2 = False,
+    metrics: MetricsPath = None,
+    trace: TracePath = None,
+    bandwidth: Bandwidth = None,
+) -> None:
+    """Download the queued chapters, with one or several worker processes."""
+
+    settings: DownloadSettings | None = _settings(
+        chapter_concurrency=chapter_concurrency,
+        image_concurrency=image_concurrency,
+        archive_workers=archive_workers,
+        page_workers=page_workers,
+        memory_budget=memory_budget,
+        process_pages=process_pages,
+        width=width,
+        height=height,
+        grayscale=grayscale,
+        image_format=image_format,
+        quality=quality,
+        split_spreads=split_spreads,
+        data_saver_fallback=data_saver_fallback,
+        report=report,
+        http2=http2,
+        metrics_path=metrics,
+        trace_path=trace,
+        bandwidth=bandwidth,
+    )
+    if settings is None:
+        return
+    args: tuple = (
+        output,
+        queue,
+        data_saver,
+        settings,
+        batch_size,
+        lease,
+        processes,
+    )
+    if processes <= 1:
+        _work_process(*args)
+        return
+    context: BaseContext = multiprocessing.get_context("spawn")
+    workers: list[BaseProcess] = [
+        context.Process(target=_work_process, args=args) for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+async def _verify_library(
+    output: Path,
+    repair: bool,
+    data_saver: bool,
+    workers: int = 4,
+    settings: DownloadSettings | None = None,
+) -> list[ArchiveCheck]:
+    """Check the archives of a library, and repair the damaged ones.
+
+    The archives are checked in parallel, offline, so only the gaps in their
+    numbering count as missing pages. A damaged archive is repaired from the
+    index, keeping its intact pages and downloading the others.
+
+    Args:
+        output: The output directory of the library.
+        repair: Download the damaged and missing pages again.
+        data_saver: Use data saver mode to download the pages.
+        workers: The number of archives checked at the same time. Defaults to 4.
+        settings: The concurrency and cache settings of the repair. Defaults to
+            None.
+
+    Returns:
+        The checks of the damaged archives.
+    """
+
+    settings = settings or DownloadSettings()
+    async with WorkerPool(workers) as pool:
+        checks: list[ArchiveCheck] = await asyncio.gather(
+            *[pool.run(check_archive, path) for path in sorted(output.glob("*.cbz"))]
+        )
+    damaged: list[ArchiveCheck] = [check for check in checks if not check.intact]
+    for check in damaged:
+        problems: list[str] = check.problems[:3] + (
+            [f"{check.missing} pages missing"] if check.missing else []
+        )
+        print(f"Damaged | {check.path.stem}: {'; '.join(problems)}")
+    print(f"Checked {len(checks)} archives, {len(damaged)} damaged.")
+    if not repair or not damaged:
+        return damaged
+    index: ChapterIndex = ChapterIndex(output / ".index.sqlite")
+    try:
+        jobs: list[ChapterJob] = []
+        for check in damaged:
+            indexed: IndexedChapter | None = index.locate(check.path)
+            if indexed is None:
+                print(f"Cannot repair | {check.path.stem}: not in the index")
+                continue
+            jobs.append(
+                ChapterJob(
+                    indexed.chapter_id,
+                    check.path.stem,
+                    indexed.version,
+                    indexed.updated_at,
+                    salvage=str(check.path),
+                )
+            )
+        if jobs:
+            async with _client(output, settings) as client:
+                failed: list[ChapterJob] = await DownloadScheduler(
+                    client, client.output, settings, data_saver, index=index
+                ).run(jobs)
+            print(f"Repaired {len(jobs) - len(failed)} of {len(jobs)} archives.")
+    finally:
+        index.close()
+    return damaged
+
+
+@app.command()
+def verify(
+    output: Annotated[
+        Path, typer.Option(help="The output directory of the library")
+    ] = Path("output"),
+    repair: Annotated[
+        bool, typer.Option(help="Download the damaged and missing pages again")
+    ] = False,
+    data_saver: Annotated[
+        bool, typer.Option(help="Use data saver mode to download the pages")
+    ] = False,
+    workers: Annotated[
+        int, typer.Option(min=1, help="The number of archives checked at once")
+    ] = 4,
+    image_concurrency: ImageConcurrency = 10,
+    report: Report = True,
+) -> None:
+    """Check the archives of a library, and repair the damaged ones."""
+
+    asyncio.run(
+        _verify_library(
+            output,
+            repair,
+            data_saver,
+            workers,
+            DownloadSettings(image_concurrency=image_concurrency, report=report),
         )
     )
 
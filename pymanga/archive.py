@@ -0,0 +1,245 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+import hashlib
+import os
+from pathlib import Path
+import threading
+import time
+from types import TracebackType
+from typing import IO
+import zipfile
+from pymanga.buffers import CHUNK_SIZE
+
+__all__: list[str] = ["CbzWriter"]
+
+
+@dataclass
+class CbzWriter:
+    """Writes the pages of a chapter into a cbz file as soon as they are fetched.
+
+    Pages are stored without compression, images being already compressed, and
+    named after their index so the archive lists them in reading order whatever
+    the order they were written in. The archive is written to a `.part` file and
+    only renamed to its final path once complete.
+
+    A resumable writer keeps its `.part` file when the download fails, and
+    reopens it on the next run with the pages that are still intact.
+    """
+
+    path: Path
+    part: Path | None = None
+    resumable: bool = False
+    completed: set[str] = field(default_factory=set, init=False, repr=False)
+    _zip: zipfile.ZipFile | None = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def part_path(self) -> Path:
+        return self.part or self.path.with_name(f"{self.path.name}.part")
+
+    @staticmethod
+    def entry_name(index: int, filename: str, part: int | None = None) -> str:
+        """Computes the name of a page inside the archive.
+
+        Args:
+            index: The index of the page in the chapter.
+            filename: The name of the page on the server, used for its extension.
+            part: The number of the part of a page split in several entries.
+                Defaults to None, a whole page.
+
+        Returns:
+            The zero-padded index of the page, its part if any, and its extension.
+        """
+
+        number: str = f"{index + 1:04d}" if part is None else f"{index + 1:04d}-{part}"
+        return f"{number}{Path(filename).suffix}"
+
+    @staticmethod
+    def _readable(archive: zipfile.ZipFile, name: str) -> bool:
+        try:
+            with archive.open(name) as entry:
+                while entry.read(1024 * 1024):
+                    pass
+        except (zipfile.BadZipFile, OSError):
+            return False
+        return True
+
+    def _resume(self) -> bool:
+        """Reopens the `.part` archive, dropping the pages that are corrupted.
+
+        Returns:
+            True if the archive could be reopened, False otherwise.
+        """
+
+        rebuilt_path: Path = self.part_path.with_name(f"{self.part_path.name}.tmp")
+        try:
+            with zipfile.ZipFile(self.part_path) as archive:
+                names: list[str] = archive.namelist()
+                intact: list[str] = [
+                    name for name in names if self._readable(archive, name)
+                ]
+                if len(intact) != len(names):
+                    with zipfile.ZipFile(
+                        rebuilt_path, "w", zipfile.ZIP_STORED
+                    ) as rebuilt:
+                        for name in intact:
+                            rebuilt.writestr(archive.getinfo(name), archive.read(name))
+        except (zipfile.BadZipFile, OSError):
+            return False
+        if rebuilt_path.exists():
+            rebuilt_path.replace(self.part_path)
+        self._zip = zipfile.ZipFile(self.part_path, "a", zipfile.ZIP_STORED)
+        self.completed = set(intact)
+        return True
+
+    def open(self) -> None:
+        """Opens the `.part` archive for writing, resuming it if possible."""
+
+        self.part_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.resumable and self.part_path.exists() and self._resume():
+            return
+        self._zip = zipfile.ZipFile(self.part_path, "w", zipfile.ZIP_STORED)
+
+    def has(self, index: int) -> bool:
+        """Checks if a page is already in the archive, whatever its format.
+
+        Args:
+            index: The index of the page in the chapter.
+
+        Returns:
+            True if the page was written by a previous run.
+        """
+
+        return self.entry_name(index, "") in {
+            Path(name).stem.split("-")[0] for name in self.completed
+        }
+
+    def write(
+        self, index: int, filename: str, content: bytes, checksum: str | None = None
+    ) -> None:
+        """Writes a page into the archive.
+
+        Args:
+            index: The index of the page in the chapter.
+            filename: The name of the page on the server.
+            content: The content of the page.
+            checksum: The SHA-256 digest of the page, kept in the comment of its
+                entry. Defaults to None.
+        """
+
+        self.write_parts(index, filename, [(content, checksum)])
+
+    def write_parts(
+        self, index: int, filename: str, parts: list[tuple[bytes, str | None]]
+    ) -> None:
+        """Writes a page split in several parts, as a double-page spread.
+
+        The parts are numbered in reading order and written at once, so a
+        resumed archive never holds only some of them.
+
+        Args:
+            index: The index of the page in the chapter.
+            filename: The name of the page, used for the extension of the parts.
+            parts: The content and SHA-256 digest, if any, of each part.
+        """
+
+        with self._lock:
+            if self._zip is None:
+                raise ValueError("The archive is not open.")
+            for part, (content, checksum) in enumerate(parts, start=1):
+                name: str = self.entry_name(
+                    index, filename, part if len(parts) > 1 else None
+                )
+                info: zipfile.ZipInfo = zipfile.ZipInfo(name, time.localtime()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                if checksum is not None:
+                    info.comment = f"sha256:{checksum}".encode()
+                self._zip.writestr(info, content)
+                self.completed.add(name)
+
+    def write_file(self, index: int, filename: str, file: IO[bytes]) -> str:
+        """Copies a page from a file into the archive, a chunk at a time.
+
+        The checksum is computed while copying, the comment of an entry being
+        only written in the archive's directory.
+
+        Args:
+            index: The index of the page in the chapter.
+            filename: The name of the page on the server.
+            file: The file holding the page, read from its start.
+
+        Returns:
+            The SHA-256 digest of the page, in hexadecimal.
+        """
+
+        with self._lock:
+            if self._zip is None:
+                raise ValueError("The archive is not open.")
+            name: str = self.entry_name(index, filename)
+            info: zipfile.ZipInfo = zipfile.ZipInfo(name, time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = file.seek(0, os.SEEK_END)
+            file.seek(0)
+            digest = hashlib.sha256()
+            with self._zip.open(info, "w") as entry:
+                while chunk := file.read(CHUNK_SIZE):
+                    digest.update(chunk)
+                    entry.write(chunk)
+            info.comment = f"sha256:{digest.hexdigest()}".encode()
+            self.completed.add(name)
+            return digest.hexdigest()
+
+    def close(self) -> None:
+        """Writes the archive's directory in reading order and moves it in place."""
+
+        with self._lock:
+            if self._zip is None:
+                return
+            self._zip.filelist.sort(key=lambda info: info.filename)
+            self._zip.close()
+            self._zip = None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.part_path.replace(self.path)
+
+    def suspend(self) -> None:
+        """Closes the incomplete archive, keeping it to resume it later."""
+
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+
+    def abort(self) -> None:
+        """Closes and removes the incomplete archive."""
+
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+            self.part_path.unlink(missing_ok=True)
+
+    def finish(self, success: bool) -> None:
+        """Closes the archive, keeping or removing it if incomplete.
+
+        Args:
+            success: True if every page was written.
+        """
+
+        if success:
+            self.close()
+        elif self.resumable:
+            self.suspend()
+        else:
+            self.abort()
+
+    def __enter__(self) -> CbzWriter:
+        self.open()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.finish(exc_type is None)
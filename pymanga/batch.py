@@ -0,0 +1,193 @@
+from __future__ import annotations
+import asyncio
+from contextlib import aclosing
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import AsyncIterator
+from pymanga.catalogue import CatalogueEntry, ReleasePolicy
+from pymanga.client import Client
+from pymanga.exception import MangadexClientError
+from pymanga.index import ChapterIndex
+from pymanga.manifest import ManifestEntry
+from pymanga.models.chapter import Chapter
+from pymanga.models.manga import MangaSummary
+from pymanga.scheduler import ChapterJob, DownloadScheduler
+from pymanga.shaping import FairQueue
+
+__all__: list[str] = ["BatchDownload"]
+
+
+def _titles(manga: MangaSummary) -> list[str]:
+    titles: list[str] = list(manga.attributes.title.values())
+    for alt_title in manga.attributes.alt_titles:
+        titles.extend(alt_title.values())
+    return [title.casefold() for title in titles]
+
+
+@dataclass
+class BatchDownload:
+    """Downloads the mangas of a manifest without any interaction.
+
+    The entries are resolved and listed a few at a time, concurrently, and their
+    chapters are merged into the single stream fed to the download scheduler, so
+    the downloads start with the first mangas listed whatever the entry. The
+    stream takes the chapters of every manga in turn, by the weight of its
+    entry, so a long series does not hold the others back. With a release
+    policy, a single release of each chapter is kept once the manga is listed,
+    the groups an entry prefers coming first.
+    """
+
+    client: Client
+    index: ChapterIndex
+    resolve_concurrency: int = 8
+    policy: ReleasePolicy | None = None
+    failed: list[ManifestEntry] = field(default_factory=list, init=False)
+
+    async def resolve(self, entry: ManifestEntry) -> str:
+        """Finds the id of the manga of an entry.
+
+        Args:
+            entry: The manifest entry.
+
+        Returns:
+            The id of the manga.
+
+        Raises:
+            MangadexClientError: If no manga has exactly the title of the entry.
+        """
+
+        if entry.id is not None:
+            return entry.id
+        assert entry.title is not None
+        title: str = entry.title.casefold()
+        async with aclosing(
+            self.client.iter_mangas(
+                entry.title, content_rating=entry.content_rating, model=MangaSummary
+            )
+        ) as mangas:
+            async for manga in mangas:
+                if title in _titles(manga):
+                    return manga.id
+        raise MangadexClientError(f"No manga titled {entry.title!r}.")
+
+    async def _list(
+        self,
+        entry: ManifestEntry,
+        queue: FairQueue[ChapterJob],
+        semaphore: asyncio.Semaphore,
+        output: Path,
+    ) -> None:
+        """Queues the chapters of an entry that are not downloaded yet.
+
+        Args:
+            entry: The manifest entry.
+            queue: The queue merging the chapters of every entry.
+            semaphore: Limits the entries resolved and listed at the same time.
+            output: The output directory of the chapters.
+        """
+
+        async with semaphore:
+            try:
+                manga_id: str = await self.resolve(entry)
+                chapters: dict[str, Chapter] = {}
+                releases: list[CatalogueEntry] = []
+                async with aclosing(
+                    self.client.iter_feed(
+                        manga_id, entry.language, entry.content_rating
+                    )
+                ) as feed:
+                    async for chapter in feed:
+                        if entry.includes(chapter.attributes.chapter):
+                            chapters[chapter.id] = chapter
+                            releases.append(
+                                CatalogueEntry.from_chapter(
+                                    chapter, chapter.manga_title
+                                )
+                            )
+                policy: ReleasePolicy | None = self.policy
+                if policy is not None:
+                    if entry.groups:
+                        policy = replace(
+                            policy,
+                            preferred_groups=[
+                                *entry.groups,
+                                *policy.preferred_groups,
+                            ],
+                        )
+                    releases = policy.select(releases)
+                downloaded: set[str] = await self.index.run(
+                    self.index.downloaded,
+                    [
+                        (
+                            chapters[release.job.chapter_id],
+                            output.joinpath(release.job.name).with_suffix(".cbz"),
+                        )
+                        for release in releases
+                    ],
+                )
+                for release in releases:
+                    job: ChapterJob = release.job
+                    if job.chapter_id in downloaded:
+                        continue
+                    await queue.put(
+                        manga_id,
+                        replace(job, series=manga_id, weight=entry.weight),
+                        entry.weight,
+                    )
+            except MangadexClientError as e:
+                print(f"Failed | {entry.name}: {e}")
+                self.failed.append(entry)
+
+    async def jobs(
+        self, entries: list[ManifestEntry], output: Path
+    ) -> AsyncIterator[ChapterJob]:
+        """Iterates over the chapters of every entry, as soon as they are listed.
+
+        Args:
+            entries: The manifest entries.
+            output: The output directory of the chapters.
+
+        Yields:
+            The chapters that are not downloaded yet.
+        """
+
+        queue: FairQueue[ChapterJob] = FairQueue(maxsize=10)
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(self.resolve_concurrency)
+        listing: asyncio.Future = asyncio.gather(
+            *[self._list(entry, queue, semaphore, output) for entry in entries]
+        )
+        getter: asyncio.Future[ChapterJob] | None = None
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait(
+                    [getter, listing], return_when=asyncio.FIRST_COMPLETED
+                )
+                if not getter.done():
+                    getter.cancel()
+                    break
+                yield getter.result()
+            while queue.qsize():
+                yield await queue.get()
+            await listing
+        finally:
+            if getter is not None:
+                getter.cancel()
+            listing.cancel()
+            await asyncio.gather(listing, return_exceptions=True)
+
+    async def run(
+        self, entries: list[ManifestEntry], scheduler: DownloadScheduler
+    ) -> list[ChapterJob]:
+        """Downloads the chapters of every entry with a shared scheduler.
+
+        Args:
+            entries: The manifest entries.
+            scheduler: The scheduler downloading the chapters.
+
+        Returns:
+            The jobs that could not be downloaded.
+        """
+
+        async with aclosing(self.jobs(entries, scheduler.output)) as jobs:
+            return await scheduler.run(jobs)
@@ -0,0 +1,169 @@
+from __future__ import annotations
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from tempfile import SpooledTemporaryFile
+from types import TracebackType
+from typing import IO
+
+__all__: list[str] = ["CHUNK_SIZE", "ByteBudget", "PageBuffer"]
+
+CHUNK_SIZE: int = 64 * 1024
+
+
+@dataclass
+class ByteBudget:
+    """Caps the bytes of the pages held in memory across the downloads.
+
+    The streamed chunks only take the bytes left without waiting, a page going
+    to disk once the budget is spent, so no download ever waits on another one.
+    The steps needing a whole page in memory wait for its bytes instead.
+    """
+
+    limit: int = 64 * 1024 * 1024
+    used: int = field(default=0, init=False)
+    _waiters: deque[asyncio.Future[None]] = field(
+        default_factory=deque, init=False, repr=False
+    )
+
+    def __post_init__(self) -> None:
+        if self.limit < 1:
+            raise ValueError("The memory budget must be at least 1 byte.")
+
+    def try_acquire(self, size: int) -> bool:
+        """Takes bytes from the budget if enough are left.
+
+        Args:
+            size: The number of bytes.
+
+        Returns:
+            True if the bytes were taken.
+        """
+
+        if self.used + size > self.limit:
+            return False
+        self.used += size
+        return True
+
+    async def acquire(self, size: int) -> int:
+        """Waits for bytes to be left in the budget, then takes them.
+
+        A size over the limit takes the whole budget, so it still goes through.
+
+        Args:
+            size: The number of bytes.
+
+        Returns:
+            The number of bytes taken, to release later.
+        """
+
+        size = min(size, self.limit)
+        while not self.try_acquire(size):
+            waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+        return size
+
+    def release(self, size: int) -> None:
+        """Gives bytes back to the budget.
+
+        Args:
+            size: The number of bytes.
+        """
+
+        self.used -= size
+        while self._waiters:
+            waiter: asyncio.Future[None] = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+@dataclass
+class PageBuffer:
+    """Holds the bytes of a page while it streams in.
+
+    The bytes stay in memory while the budget allows it, and are moved to a
+    temporary file as soon as it runs out.
+    """
+
+    budget: ByteBudget | None = None
+    size: int = field(default=0, init=False)
+    reserved: int = field(default=0, init=False)
+    spilled: bool = field(default=False, init=False)
+    file: IO[bytes] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.file = SpooledTemporaryFile(max_size=0)
+
+    def write(self, chunk: bytes) -> None:
+        """Appends a chunk, spilling the page to disk if the budget is spent.
+
+        Args:
+            chunk: The bytes received.
+        """
+
+        if not self.spilled and self.budget is not None:
+            if self.budget.try_acquire(len(chunk)):
+                self.reserved += len(chunk)
+            else:
+                self.file.rollover()  # type: ignore[attr-defined]
+                self.spilled = True
+                self._release()
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    async def hold(self) -> int:
+        """Takes the bytes of the whole page from the budget, to read it.
+
+        The bytes already held in memory are handed over as they are, and a
+        spilled page waits for its bytes to be left in the budget.
+
+        Returns:
+            The number of bytes taken, to release once the page is dropped.
+        """
+
+        if self.budget is None:
+            return 0
+        held: int = self.reserved + await self.budget.acquire(self.size - self.reserved)
+        self.reserved = 0
+        return held
+
+    def read(self) -> bytes:
+        """Reads the whole page.
+
+        Returns:
+            The bytes received.
+        """
+
+        self.file.seek(0)
+        return self.file.read()
+
+    def clear(self) -> None:
+        """Drops the bytes received, to receive the page again."""
+
+        self.file.seek(0)
+        self.file.truncate()
+        self.size = 0
+        self._release()
+
+    def _release(self) -> None:
+        if self.budget is not None and self.reserved:
+            self.budget.release(self.reserved)
+        self.reserved = 0
+
+    def close(self) -> None:
+        """Removes the bytes, from memory or disk, and gives them back."""
+
+        self.file.close()
+        self._release()
+
+    def __enter__(self) -> PageBuffer:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
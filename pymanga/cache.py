@@ -0,0 +1,252 @@
+from __future__ import annotations
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+import re
+import sqlite3
+import time
+from typing import Any, Callable, TypeVar
+from urllib.parse import urlencode, urlparse
+import httpx
+
+__all__: list[str] = ["DEFAULT_TTLS", "CachedResponse", "ResponseCache"]
+
+DEFAULT_TTLS: dict[str, float] = {
+    "/manga/tag": 7 * 24 * 3600,
+    "/manga/*/feed": 0,
+    "/manga": 3600,
+    "/chapter": 600,
+}
+
+T = TypeVar("T")
+
+
+@dataclass
+class CachedResponse:
+    content: bytes
+    etag: str | None
+    last_modified: str | None
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    def validators(self) -> dict[str, str]:
+        """Builds the headers revalidating the response with the server.
+
+        Returns:
+            The conditional request headers.
+        """
+
+        headers: dict[str, str] = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass
+class ResponseCache:
+    """Stores API responses in a SQLite database.
+
+    Responses are fresh for the TTL of the longest matching path prefix, then
+    revalidated with their ETag or Last-Modified header when the server sent one.
+    A `*` in a prefix matches a single path segment, such as an id, and a TTL of
+    0 keeps the responses out of the cache, as for the feeds a sync must see
+    whole. The least recently used responses are evicted past `max_size` bytes,
+    the total size being summed once when the database is opened, then kept up
+    to date as responses are stored and evicted. The access time of a response
+    is only written again once older than `access_interval` seconds.
+
+    The database is only touched from a single thread of its own, through `run`,
+    so the lookups do not block the event loop.
+    """
+
+    path: Path
+    ttls: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_TTLS))
+    default_ttl: float = 300
+    max_size: int = 100 * 1024 * 1024
+    bypass: bool = False
+    access_interval: float = 60
+    _connection: sqlite3.Connection | None = field(default=None, init=False, repr=False)
+    _size: int = field(default=0, init=False, repr=False)
+    _executor: ThreadPoolExecutor | None = field(default=None, init=False, repr=False)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, content BLOB NOT NULL, etag TEXT, "
+                "last_modified TEXT, expires_at REAL NOT NULL, "
+                "last_access REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_access "
+                "ON responses (last_access)"
+            )
+            self._size = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+        return self._connection
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Runs a method of the cache in the thread of the database.
+
+        Args:
+            func: The method to run, such as `get` or `set`.
+            *args: The arguments of the method.
+
+        Returns:
+            The result of the method.
+        """
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="pymanga-cache")
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    @staticmethod
+    def key(url: str, params: dict[str, Any]) -> str:
+        """Computes the cache key of a request.
+
+        Args:
+            url: The full URL of the request.
+            params: The query parameters of the request.
+
+        Returns:
+            The URL followed by its sorted query parameters.
+        """
+
+        return f"{url}?{urlencode(sorted(params.items()), doseq=True)}"
+
+    def ttl(self, url: str) -> float:
+        """Finds the TTL of a URL from the longest matching path prefix.
+
+        Args:
+            url: The full URL of the request.
+
+        Returns:
+            The number of seconds the response stays fresh.
+        """
+
+        path: str = urlparse(url).path
+        prefixes: list[str] = [
+            prefix
+            for prefix in self.ttls
+            if re.match(re.escape(prefix).replace(r"\*", "[^/]+"), path)
+        ]
+        if not prefixes:
+            return self.default_ttl
+        return self.ttls[max(prefixes, key=len)]
+
+    def get(self, key: str) -> CachedResponse | None:
+        """Retrieves a response, fresh or not, from the cache.
+
+        Args:
+            key: The cache key of the request.
+
+        Returns:
+            The cached response, or None if not cached or bypassed.
+        """
+
+        if self.bypass:
+            return None
+        row: tuple | None = self.connection.execute(
+            "SELECT content, etag, last_modified, expires_at, last_access "
+            "FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        now: float = time.time()
+        if now - row[4] >= self.access_interval:
+            with self.connection:
+                self.connection.execute(
+                    "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+                )
+        return CachedResponse(*row[:4])
+
+    def set(self, key: str, url: str, response: httpx.Response) -> None:
+        """Stores a response in the cache, evicting old ones if needed.
+
+        Args:
+            key: The cache key of the request.
+            url: The full URL of the request, used to find its TTL.
+            response: The successful response to store, left out if its TTL is 0.
+        """
+
+        ttl: float = self.ttl(url)
+        if ttl == 0:
+            return
+        now: float = time.time()
+        content: bytes = response.content
+        with self.connection:
+            replaced: tuple[int] | None = self.connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    content,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    now + ttl,
+                    now,
+                    len(content),
+                ),
+            )
+        self._size += len(content) - (replaced[0] if replaced else 0)
+        self.evict()
+
+    def refresh(self, key: str, url: str) -> None:
+        """Marks a revalidated response as fresh again.
+
+        Args:
+            key: The cache key of the request.
+            url: The full URL of the request, used to find its TTL.
+        """
+
+        with self.connection:
+            self.connection.execute(
+                "UPDATE responses SET expires_at = ? WHERE key = ?",
+                (time.time() + self.ttl(url), key),
+            )
+
+    def evict(self) -> None:
+        """Removes the least recently used responses above the maximum size."""
+
+        connection: sqlite3.Connection = self.connection
+        if self._size <= self.max_size:
+            return
+        rows: sqlite3.Cursor = connection.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        )
+        evicted: list[tuple[str]] = []
+        total: int = self._size
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            evicted.append((key,))
+            total -= size
+        rows.close()
+        with connection:
+            connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self._size = total
+
+    def close(self) -> None:
+        """Waits for the running lookups and closes the database."""
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,340 @@
+from __future__ import annotations
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+import math
+import sys
+from typing import Iterable, Iterator
+from pymanga.models.chapter import Chapter
+from pymanga.scheduler import ChapterJob
+
+__all__: list[str] = [
+    "CatalogueEntry",
+    "ChapterCatalogue",
+    "ReleasePolicy",
+    "RELEASE_CRITERIA",
+    "in_range",
+    "parse_number",
+]
+
+RELEASE_CRITERIA: tuple[str, ...] = ("groups", "version", "pages", "newest")
+
+
+def parse_number(value: str | None) -> float | None:
+    """Parses a chapter or volume number.
+
+    Args:
+        value: The number as given by the API, such as "10" or "10.5".
+
+    Returns:
+        The number, None if missing or not numeric.
+    """
+
+    try:
+        number: float = float(value or "")
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def in_range(
+    number: float | None, start: float | None = None, end: float | None = None
+) -> bool:
+    """Tells whether a chapter number is within a range.
+
+    Args:
+        number: The chapter number, None if missing.
+        start: The first chapter number, included. Defaults to None, from the
+            first chapter.
+        end: The last chapter number, included. Defaults to None, up to the last
+            chapter.
+
+    Returns:
+        True if the number is in the range, the chapters without a number only
+        being in an unbounded one.
+    """
+
+    if start is None and end is None:
+        return True
+    return (
+        number is not None
+        and (start is None or number >= start)
+        and (end is None or number <= end)
+    )
+
+
+@dataclass(slots=True)
+class CatalogueEntry:
+    number: float | None
+    volume: float | None
+    language: str
+    group: str | None
+    group_name: str | None
+    pages: int
+    published_at: str
+    job: ChapterJob
+
+    @classmethod
+    def from_chapter(cls, chapter: Chapter, manga_title: str | None) -> CatalogueEntry:
+        """Builds the entry of a chapter, keeping only what selecting it needs.
+
+        The language and group are interned, being shared by many chapters.
+
+        Args:
+            chapter: The chapter from the API.
+            manga_title: The title of the manga of the chapter.
+
+        Returns:
+            The entry of the chapter.
+        """
+
+        group: str | None = chapter.group.id if chapter.group else None
+        group_name: str | None = chapter.group_name
+        return cls(
+            parse_number(chapter.attributes.chapter),
+            parse_number(chapter.attributes.volume),
+            sys.intern(chapter.attributes.translated_language),
+            sys.intern(group) if group is not None else None,
+            sys.intern(group_name) if group_name is not None else None,
+            chapter.attributes.pages,
+            chapter.attributes.publish_at,
+            ChapterJob.from_chapter(chapter, manga_title),
+        )
+
+    def within(self, start: float | None = None, end: float | None = None) -> bool:
+        """Tells whether the chapter is numbered within a range, as selected by
+        `ChapterCatalogue.range`.
+
+        Args:
+            start: The first chapter number, included. Defaults to None, from the
+                first chapter.
+            end: The last chapter number, included. Defaults to None, up to the
+                last chapter.
+
+        Returns:
+            True if the chapter is in the range, the unnumbered chapters only
+            being in an unbounded one.
+        """
+
+        return in_range(self.number, start, end)
+
+
+@dataclass
+class ReleasePolicy:
+    """Picks a single release of each chapter among the scanlation groups.
+
+    Releases share a chapter when they have the same chapter and volume numbers.
+    They are compared criterion by criterion, in order: `groups` prefers the
+    preferred groups, by id or name, in their order, `version` the highest
+    version, `pages` the most pages and `newest` the latest published. The
+    first release listed wins a tie. Chapters without a number are all kept.
+    """
+
+    preferred_groups: list[str] = field(default_factory=list)
+    criteria: list[str] = field(default_factory=lambda: list(RELEASE_CRITERIA))
+    _ranks: dict[str, int] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        unknown: set[str] = set(self.criteria) - set(RELEASE_CRITERIA)
+        if unknown:
+            raise ValueError(f"Unknown release criteria: {', '.join(sorted(unknown))}")
+        self._ranks = {
+            group.casefold(): rank
+            for rank, group in reversed(list(enumerate(self.preferred_groups)))
+        }
+
+    def _rank(self, entry: CatalogueEntry) -> int:
+        return min(
+            (
+                self._ranks[name.casefold()]
+                for name in (entry.group, entry.group_name)
+                if name is not None and name.casefold() in self._ranks
+            ),
+            default=len(self.preferred_groups),
+        )
+
+    def key(self, entry: CatalogueEntry) -> tuple[int | str, ...]:
+        """Computes the sort key of a release, the best one having the highest.
+
+        Args:
+            entry: The release of a chapter.
+
+        Returns:
+            The values of the criteria for the release.
+        """
+
+        values: dict[str, int | str] = {
+            "groups": -self._rank(entry),
+            "version": entry.job.version or 0,
+            "pages": entry.pages,
+            "newest": entry.published_at,
+        }
+        return tuple(values[criterion] for criterion in self.criteria)
+
+    def select(self, entries: Iterable[CatalogueEntry]) -> list[CatalogueEntry]:
+        """Keeps the best release of each chapter.
+
+        Args:
+            entries: The releases of the chapters.
+
+        Returns:
+            The best releases, in the order they were given.
+        """
+
+        entries = list(entries)
+        best: dict[tuple[float, float | None], CatalogueEntry] = {}
+        for entry in entries:
+            if entry.number is None:
+                continue
+            chapter: tuple[float, float | None] = (entry.number, entry.volume)
+            current: CatalogueEntry | None = best.get(chapter)
+            if current is None or self.key(entry) > self.key(current):
+                best[chapter] = entry
+        return [
+            entry
+            for entry in entries
+            if entry.number is None or best[(entry.number, entry.volume)] is entry
+        ]
+
+
+@dataclass
+class _Shelf:
+    """The entries of a language, or of every language, sorted by number."""
+
+    entries: list[CatalogueEntry] = field(default_factory=list)
+    numbers: array = field(default_factory=lambda: array("d"))
+    unnumbered: list[CatalogueEntry] = field(default_factory=list)
+    volumes: dict[float | None, list[CatalogueEntry]] = field(default_factory=dict)
+    pending: list[CatalogueEntry] = field(default_factory=list)
+
+    def add(self, entry: CatalogueEntry) -> None:
+        if entry.number is None:
+            self.unnumbered.append(entry)
+        else:
+            self.pending.append(entry)
+        self.volumes.setdefault(entry.volume, []).append(entry)
+
+    def sort(self) -> None:
+        """Merges the entries added since the last query into the sorted ones."""
+
+        if not self.pending:
+            return
+        self.entries.extend(self.pending)
+        self.entries.sort(key=lambda entry: entry.number)  # type: ignore[arg-type]
+        self.numbers = array("d", [entry.number for entry in self.entries])
+        self.pending = []
+        for volume in self.volumes.values():
+            volume.sort(key=lambda entry: (entry.number is None, entry.number or 0))
+
+
+@dataclass
+class ChapterCatalogue:
+    """Holds the chapters of a library as compact records, indexed for selection.
+
+    Each language has its own shelf, and a shelf keeps its entries sorted by
+    number along with an array of their numbers, so ranges and latest chapters
+    are found by bisection, and its entries grouped by volume. The chapters
+    without a number, such as oneshots, are only listed when no range is given.
+    Added entries are sorted in on the next query.
+    """
+
+    _all: _Shelf = field(default_factory=_Shelf, init=False, repr=False)
+    _languages: dict[str, _Shelf] = field(default_factory=dict, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return (
+            len(self._all.entries) + len(self._all.pending) + len(self._all.unnumbered)
+        )
+
+    def __iter__(self) -> Iterator[CatalogueEntry]:
+        self._all.sort()
+        yield from self._all.entries
+        yield from self._all.unnumbered
+
+    @property
+    def languages(self) -> list[str]:
+        return sorted(self._languages)
+
+    def add(self, entry: CatalogueEntry) -> None:
+        """Adds a chapter to the catalogue.
+
+        Args:
+            entry: The entry of the chapter.
+        """
+
+        self._all.add(entry)
+        self._languages.setdefault(entry.language, _Shelf()).add(entry)
+
+    def _shelf(self, language: str | None) -> _Shelf:
+        shelf: _Shelf = (
+            self._all if language is None else self._languages.get(language, _Shelf())
+        )
+        shelf.sort()
+        return shelf
+
+    def range(
+        self,
+        start: float | None = None,
+        end: float | None = None,
+        language: str | None = None,
+    ) -> list[CatalogueEntry]:
+        """Selects the chapters numbered within a range, in reading order.
+
+        Args:
+            start: The first chapter number, included. Defaults to None, from the
+                first chapter.
+            end: The last chapter number, included. Defaults to None, up to the
+                last chapter.
+            language: Only select the chapters of this language. Defaults to
+                None, every language.
+
+        Returns:
+            The chapters in the range, along with the unnumbered ones when the
+            range is unbounded.
+        """
+
+        shelf: _Shelf = self._shelf(language)
+        if start is None and end is None:
+            return shelf.entries + shelf.unnumbered
+        low: int = 0 if start is None else bisect_left(shelf.numbers, start)
+        high: int = (
+            len(shelf.numbers) if end is None else bisect_right(shelf.numbers, end)
+        )
+        return shelf.entries[low:high]
+
+    def latest(self, count: int, language: str | None = None) -> list[CatalogueEntry]:
+        """Selects the chapters with the highest numbers, in reading order.
+
+        Args:
+            count: The number of chapter numbers to select, every release of
+                each being kept.
+            language: Only select the chapters of this language. Defaults to
+                None, every language.
+
+        Returns:
+            The latest chapters.
+        """
+
+        shelf: _Shelf = self._shelf(language)
+        low: int = len(shelf.numbers)
+        for _ in range(count):
+            if not low:
+                break
+            low = bisect_left(shelf.numbers, shelf.numbers[low - 1], 0, low)
+        return shelf.entries[low:]
+
+    def volume(
+        self, volume: float | None, language: str | None = None
+    ) -> list[CatalogueEntry]:
+        """Selects the chapters of a volume, in reading order.
+
+        Args:
+            volume: The volume number, None for the chapters without a volume.
+            language: Only select the chapters of this language. Defaults to
+                None, every language.
+
+        Returns:
+            The chapters of the volume.
+        """
+
+        return list(self._shelf(language).volumes.get(volume, []))
@@ -0,0 +1,83 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+import shutil
+
+__all__: list[str] = ["ChapterCheckpoint"]
+
+
+@dataclass
+class ChapterCheckpoint:
+    """Keeps the progress of a chapter download between runs.
+
+    The pages already downloaded stay in a partial archive and the bytes of the
+    pages interrupted mid-transfer in `.part` files, both under a directory keyed
+    by the chapter id and the hash of its pages, so a new version of the chapter
+    never resumes from an old one.
+    """
+
+    directory: Path
+
+    @classmethod
+    def for_chapter(cls, output: Path, chapter_id: str, hash: str) -> ChapterCheckpoint:
+        """Builds the checkpoint of a chapter.
+
+        Args:
+            output: The output directory of the chapter.
+            chapter_id: The id of the chapter.
+            hash: The hash of the chapter pages.
+
+        Returns:
+            The checkpoint of the chapter.
+        """
+
+        return cls(output / ".partial" / f"{chapter_id}-{hash}")
+
+    @property
+    def archive(self) -> Path:
+        return self.directory / "pages.cbz"
+
+    def _page(self, index: int) -> Path:
+        return self.directory / f"{index + 1:04d}.part"
+
+    def load_page(self, index: int) -> bytes:
+        """Reads the bytes received for an interrupted page.
+
+        Args:
+            index: The index of the page in the chapter.
+
+        Returns:
+            The bytes received, empty if the page was never interrupted.
+        """
+
+        try:
+            return self._page(index).read_bytes()
+        except FileNotFoundError:
+            return b""
+
+    def save_page(self, index: int, content: bytes) -> None:
+        """Stores the bytes received for an interrupted page.
+
+        Args:
+            index: The index of the page in the chapter.
+            content: The bytes received.
+        """
+
+        if not content:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._page(index).write_bytes(content)
+
+    def clear_page(self, index: int) -> None:
+        """Removes the bytes stored for a page.
+
+        Args:
+            index: The index of the page in the chapter.
+        """
+
+        self._page(index).unlink(missing_ok=True)
+
+    def remove(self) -> None:
+        """Removes the checkpoint once the chapter is complete."""
+
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -1,15 +1,36 @@
 import asyncio
-from dataclasses import dataclass
+from collections import deque
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import Any, Coroutine
-from urllib.parse import urljoin
+import re
+import time
+from types import TracebackType
+from typing import Any, AsyncIterator, Iterator, TypeVar
+from urllib.parse import SplitResult, urljoin, urlsplit
 import httpx
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+from pymanga.cache import CachedResponse, ResponseCache
+from pymanga.coalesce import RequestCoalescer
 from pymanga.exception import MangadexClientError
+from pymanga.metrics import Metrics
 from pymanga.models.chapter import Chapter
-from pymanga.models.common import Response
+from pymanga.models.common import Response, response_adapter
 from pymanga.models.download_chapter_info import DownloadInfo
-from pymanga.models.manga import Manga, Tag
+from pymanga.models.manga import Manga, MangaSummary, Tag
+from pymanga.ratelimit import Backoff, RateLimiter, default_rate_limiter
+from pymanga.session import SessionSettings
+
+MAX_OFFSET: int = 10_000
+MAX_LIMIT: int = 100
+MAX_FEED_LIMIT: int = 500
+MAX_IDS: int = 100
+CONTENT_RATINGS: tuple[str, ...] = ("safe", "suggestive", "erotica", "pornographic")
+UUID: re.Pattern[str] = re.compile(r"[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}")
+
+M = TypeVar("M", bound=MangaSummary)
 
 
 @dataclass
@@ -20,32 +41,177 @@ class SearchTags:
 
 @dataclass
 class Client:
+    """Talks to the mangadex API and its at-home image servers.
+
+    The client owns two sessions, opened on first use: one for the API and one
+    for the images, each with a connection pool of its own. Use the client as an
+    async context manager, or call `aclose`, to close them.
+
+    The lookups of a single manga or chapter by id made within
+    `coalesce_window` seconds of each other, with the same content ratings, are
+    sent as a single request.
+    """
+
     base_url: str
     output: Path
-    session: httpx.AsyncClient = httpx.AsyncClient(
-        transport=httpx.AsyncHTTPTransport(retries=3)
+    rate_limiter: RateLimiter = field(default_factory=default_rate_limiter)
+    max_retries: int = 3
+    cache: ResponseCache | None = None
+    page_prefetch: int = 4
+    sessions: SessionSettings = field(default_factory=SessionSettings)
+    backoff: Backoff = field(default_factory=Backoff)
+    metrics: Metrics = field(default_factory=Metrics)
+    coalesce_window: float = 0.01
+    _session: httpx.AsyncClient | None = field(default=None, init=False, repr=False)
+    _image_session: httpx.AsyncClient | None = field(
+        default=None, init=False, repr=False
+    )
+    _lookups: dict[tuple[str, tuple[str, ...]], RequestCoalescer[Any]] = field(
+        default_factory=dict, init=False, repr=False
     )
 
+    @property
+    def session(self) -> httpx.AsyncClient:
+        """The session of the API requests."""
+
+        if self._session is None:
+            self._session = self.sessions.build(self.sessions.api)
+        return self._session
+
+    @property
+    def image_session(self) -> httpx.AsyncClient:
+        """The session of the image requests, to the at-home nodes."""
+
+        if self._image_session is None:
+            self._image_session = self.sessions.build(self.sessions.images)
+        return self._image_session
+
+    async def aclose(self) -> None:
+        """Closes the sessions opened by the client, its response cache and its
+        metrics hooks."""
+
+        for session in (self._session, self._image_session):
+            if session is not None:
+                await session.aclose()
+        self._session = self._image_session = None
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.close)
+        await asyncio.to_thread(self.metrics.close)
+
+    async def __aenter__(self) -> "Client":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+    async def _get(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        endpoint: str | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> httpx.Response:
+        """Sends a request to the API once the rate limiter allows it.
+
+        Throttled and failed requests, answered with a 429 or 5xx status, are
+        retried after a jittered exponential backoff, on top of the delay asked
+        by the server.
+
+        Args:
+            url: The full URL of the request.
+            params: The query parameters of the request. Defaults to None.
+            endpoint: The key of the endpoint in the rate limiter, if it has a
+                limit of its own. Defaults to None.
+            headers: The headers of the request. Defaults to None.
+
+        Returns:
+            The response of the last attempt.
+        """
+
+        parts: SplitResult = urlsplit(url)
+        label: str = endpoint or UUID.sub("{id}", parts.path)
+        for attempt in range(self.max_retries + 1):
+            async with self.rate_limiter.limit("api", endpoint):
+                start: float = time.monotonic()
+                try:
+                    response: httpx.Response = await self.session.get(
+                        url, params=params, headers=headers
+                    )
+                except httpx.HTTPError:
+                    self.metrics.increment(
+                        "pymanga_requests_total", endpoint=label, status="error"
+                    )
+                    raise
+            self.metrics.observe(
+                "pymanga_request_seconds", time.monotonic() - start, endpoint=label
+            )
+            self.metrics.increment(
+                "pymanga_requests_total", endpoint=label, status=response.status_code
+            )
+            self.metrics.increment(
+                "pymanga_received_bytes_total",
+                len(response.content),
+                host=parts.netloc,
+            )
+            if response.status_code == 429:
+                self.metrics.increment("pymanga_throttled_total", host=parts.netloc)
+            self.rate_limiter.observe("api", response, endpoint)
+            if not self.backoff.retryable(response) or attempt == self.max_retries:
+                break
+            self.metrics.increment("pymanga_retries_total", endpoint=label)
+            await asyncio.sleep(self.backoff.delay(attempt))
+        return response
+
     async def _call(
-        self, url: str, params: dict[str, Any], *, model: type[BaseModel]
+        self,
+        url: str,
+        params: dict[str, Any],
+        *,
+        model: type[BaseModel],
+        use_cache: bool = True,
     ) -> Response:
         """Calls the mangadex API.
 
+        The response is validated straight from its raw bytes, by a validator
+        built once per model. The response cache is read and written in its own
+        thread.
+
         Args:
             url: The URL to concatenate with the base URL.
             model: The model to validate the response.
+            use_cache: If False, do not read nor write the response cache.
 
         Returns:
             The validated response.
         """
 
         full_url: str = urljoin(self.base_url, url)
+        cache: ResponseCache | None = self.cache if use_cache else None
+        key: str = ResponseCache.key(full_url, params)
+        cached: CachedResponse | None = (
+            await cache.run(cache.get, key) if cache else None
+        )
+        adapter: TypeAdapter[Response] = response_adapter(model)
+        if cached is not None and cached.fresh:
+            return adapter.validate_json(cached.content)
         try:
-            response: httpx.Response = await self.session.get(full_url, params=params)
+            response: httpx.Response = await self._get(
+                full_url, params, headers=cached.validators() if cached else None
+            )
+            if cache is not None and cached is not None and response.status_code == 304:
+                await cache.run(cache.refresh, key, full_url)
+                return adapter.validate_json(cached.content)
             response.raise_for_status()
         except httpx.HTTPError as e:
             raise MangadexClientError(e) from e
-        return Response[model].model_validate(response.json())  # type: ignore
+        if cache is not None:
+            await cache.run(cache.set, key, full_url, response)
+        return adapter.validate_json(response.content)
 
     async def get_tags(
         self, included_tags: list[str], excluded_tags: list[str]
@@ -73,21 +239,146 @@ class Client:
         ]
         return SearchTags(included, excluded)
 
-    async def get_mangas(
+    async def _window(
+        self,
+        url: str,
+        params: dict[str, Any],
+        response: Response,
+        *,
+        model: type[BaseModel],
+    ) -> AsyncIterator[Response]:
+        """Iterates over the pages reachable from the first page of a listing.
+
+        Once the first page gives the total, the next `page_prefetch` pages are
+        requested ahead of the consumer, up to the offset ceiling of the API. The
+        pending requests are cancelled when the iteration stops early.
+
+        Args:
+            url: The URL to concatenate with the base URL.
+            params: The query parameters of the listing.
+            response: The first page of the listing.
+            model: The model to validate the items.
+
+        Yields:
+            The validated pages.
+        """
+
+        yield response
+        offsets: Iterator[int] = iter(
+            range(
+                response.offset + response.limit,
+                min(response.total, MAX_OFFSET - response.limit + 1),
+                response.limit,
+            )
+            if response.limit
+            else []
+        )
+        pending: deque[asyncio.Task[Response]] = deque()
+        try:
+            while True:
+                for offset in islice(offsets, self.page_prefetch - len(pending)):
+                    pending.append(
+                        asyncio.create_task(
+                            self._call(url, dict(params, offset=offset), model=model)
+                        )
+                    )
+                if not pending:
+                    break
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _paginate(
+        self,
+        url: str,
+        params: dict[str, Any],
+        *,
+        model: type[BaseModel],
+        limit: int = MAX_LIMIT,
+    ) -> AsyncIterator[Response]:
+        """Iterates over the pages of a listing endpoint, in order.
+
+        The API refuses offsets past 10,000 items. Longer listings are ordered by
+        creation date and split into windows, each one starting with
+        `createdAtSince` at the last item of the previous one, the items seen
+        twice at the boundary being dropped. The first page of a listing already
+        ordered by creation date starts the first window, other listings being
+        requested again in that order.
+
+        Args:
+            url: The URL to concatenate with the base URL.
+            params: The query parameters of the listing.
+            model: The model to validate the items, with a creation date.
+            limit: The size of the pages, the maximum allowed by the endpoint.
+                Defaults to 100.
+
+        Yields:
+            The validated pages.
+        """
+
+        params = dict(params, limit=limit)
+        windowed: dict[str, Any] = {
+            key: value for key, value in params.items() if not key.startswith("order[")
+        }
+        windowed["order[createdAt]"] = "asc"
+        response: Response = await self._call(url, params, model=model)
+        if response.total <= MAX_OFFSET:
+            async with aclosing(
+                self._window(url, params, response, model=model)
+            ) as pages:
+                async for page in pages:
+                    yield page
+            return
+        first: Response | None = response if params == windowed else None
+        since: str | None = None
+        boundary: set[str] = set()
+        while True:
+            window_params: dict[str, Any] = (
+                dict(windowed, createdAtSince=since) if since else windowed
+            )
+            response = first or await self._call(url, window_params, model=model)
+            first = None
+            progressed: bool = False
+            async with aclosing(
+                self._window(url, window_params, response, model=model)
+            ) as pages:
+                async for page in pages:
+                    page.data = [item for item in page.data if item.id not in boundary]
+                    for item in page.data:
+                        created_at: str = item.attributes.created_at[:19]
+                        if created_at != since:
+                            since, boundary = created_at, set()
+                        boundary.add(item.id)
+                        progressed = True
+                    yield page
+            if response.total <= MAX_OFFSET:
+                return
+            if not progressed:
+                raise MangadexClientError(
+                    f"Cannot paginate {url} past {since}, too many items share it."
+                )
+
+    async def iter_mangas(
         self,
         title: str,
         tags: SearchTags | None = None,
         content_rating: list[str] | None = None,
-    ) -> list[Manga]:
-        """Retrieves mangas from the mangadex API.
+        *,
+        model: type[M] = Manga,  # type: ignore[assignment]
+    ) -> AsyncIterator[M]:
+        """Iterates over the mangas from the mangadex API, page by page.
 
         Args:
             title: The title of the manga.
             tags: The included and excluded tags to filter the search. Defaults to None.
             content_rating: The content rating of the manga. Defaults to None.
+            model: The model of the mangas, MangaSummary to only validate their
+                titles. Defaults to Manga.
 
-        Returns:
-            A list of mangas that match the title and tags.
+        Yields:
+            The mangas that match the title and tags.
         """
 
         params: dict[str, Any] = {
@@ -97,20 +388,69 @@ class Client:
         }
         if content_rating:
             params["contentRating[]"] = content_rating
-        mangas: list[Manga] = []
-        response: Response[Manga] = await self._call(f"/manga", params, model=Manga)
-        mangas.extend(response.data)
-        offset: int = response.offset + response.limit
-        tasks: list[Coroutine] = []
-        while response.total > offset:
-            tasks.append(
-                self._call(f"/manga", dict(params, offset=offset), model=Manga)
+        async with aclosing(self._paginate("/manga", params, model=model)) as pages:
+            async for response in pages:
+                for manga in response.data:
+                    yield manga
+
+    async def get_mangas(
+        self,
+        title: str,
+        tags: SearchTags | None = None,
+        content_rating: list[str] | None = None,
+        *,
+        model: type[M] = Manga,  # type: ignore[assignment]
+    ) -> list[M]:
+        """Retrieves mangas from the mangadex API.
+
+        Args:
+            title: The title of the manga.
+            tags: The included and excluded tags to filter the search. Defaults to None.
+            content_rating: The content rating of the manga. Defaults to None.
+            model: The model of the mangas, MangaSummary to only validate their
+                titles. Defaults to Manga.
+
+        Returns:
+            A list of mangas that match the title and tags.
+        """
+
+        return [
+            manga
+            async for manga in self.iter_mangas(
+                title, tags, content_rating, model=model
             )
-            offset += response.limit
-        responses: list[Response[Manga]] = await asyncio.gather(*tasks)
-        for response in responses:
-            mangas.extend(response.data)
-        return mangas
+        ]
+
+    async def iter_chapters(
+        self,
+        manga_id: str,
+        translated_language: str,
+        content_rating: list[str] | None = None,
+    ) -> AsyncIterator[Chapter]:
+        """Iterates over the chapters from the mangadex API, page by page.
+
+        Args:
+            manga_id: The id of the manga.
+            translated_language: The language of the chapters.
+            content_rating: The content rating of the manga. Defaults to None.
+
+        Yields:
+            The chapters from the manga.
+        """
+
+        params: dict[str, Any] = {
+            "manga": manga_id,
+            "includeExternalUrl": 0,
+            "includes[]": ["scanlation_group"],
+            "order[chapter]": "asc",
+            "translatedLanguage[]": translated_language,
+        }
+        if content_rating:
+            params["contentRating[]"] = content_rating
+        async with aclosing(self._paginate("/chapter", params, model=Chapter)) as pages:
+            async for response in pages:
+                for chapter in response.data:
+                    yield chapter
 
     async def get_chapters(
         self,
@@ -127,30 +467,298 @@ class Client:
             A list of chapters from the manga.
         """
 
+        return [
+            chapter
+            async for chapter in self.iter_chapters(
+                manga_id, translated_language, content_rating
+            )
+        ]
+
+    async def _by_ids(
+        self,
+        url: str,
+        params: dict[str, Any],
+        ids: list[str],
+        *,
+        model: type[BaseModel],
+    ) -> dict[str, Any]:
+        """Retrieves items by id, packing the ids into requests of 100 at most.
+
+        Args:
+            url: The URL to concatenate with the base URL.
+            params: The query parameters of the requests, besides the ids.
+            ids: The ids of the items.
+            model: The model to validate the items.
+
+        Returns:
+            The items found, by id.
+        """
+
+        unique: list[str] = list(dict.fromkeys(ids))
+        responses: list[Response] = await asyncio.gather(
+            *[
+                self._call(
+                    url,
+                    dict(params, limit=len(batch), **{"ids[]": batch}),
+                    model=model,
+                )
+                for batch in (
+                    unique[start : start + MAX_IDS]
+                    for start in range(0, len(unique), MAX_IDS)
+                )
+            ]
+        )
+        return {item.id: item for response in responses for item in response.data}
+
+    async def get_mangas_by_ids(
+        self,
+        manga_ids: list[str],
+        content_rating: list[str] | None = None,
+        *,
+        model: type[M] = Manga,  # type: ignore[assignment]
+    ) -> list[M]:
+        """Retrieves mangas by id, 100 per request.
+
+        Args:
+            manga_ids: The ids of the mangas.
+            content_rating: The content rating of the mangas. Defaults to None.
+            model: The model of the mangas, MangaSummary to only validate their
+                titles. Defaults to Manga.
+
+        Returns:
+            The mangas found, in the order of their ids, without duplicates.
+        """
+
+        params: dict[str, Any] = {}
+        if content_rating:
+            params["contentRating[]"] = content_rating
+        found: dict[str, M] = await self._by_ids(
+            "/manga", params, manga_ids, model=model
+        )
+        return [
+            found[manga_id]
+            for manga_id in dict.fromkeys(manga_ids)
+            if manga_id in found
+        ]
+
+    async def get_chapters_by_ids(
+        self, chapter_ids: list[str], content_rating: list[str] | None = None
+    ) -> list[Chapter]:
+        """Retrieves chapters by id, with their manga included, 100 per request.
+
+        Args:
+            chapter_ids: The ids of the chapters.
+            content_rating: The content rating of the mangas. Defaults to None.
+
+        Returns:
+            The chapters found, in the order of their ids, without duplicates.
+        """
+
+        params: dict[str, Any] = {"includes[]": ["manga", "scanlation_group"]}
+        if content_rating:
+            params["contentRating[]"] = content_rating
+        found: dict[str, Chapter] = await self._by_ids(
+            "/chapter", params, chapter_ids, model=Chapter
+        )
+        return [
+            found[chapter_id]
+            for chapter_id in dict.fromkeys(chapter_ids)
+            if chapter_id in found
+        ]
+
+    def _coalescer(
+        self,
+        url: str,
+        params: dict[str, Any],
+        content_rating: list[str] | None,
+        *,
+        model: type[BaseModel],
+    ) -> RequestCoalescer[Any]:
+        """Retrieves the coalescer merging the lookups of an endpoint, one per set
+        of content ratings so the lookups with different filters are not merged.
+
+        Args:
+            url: The URL to concatenate with the base URL.
+            params: The query parameters of the requests, besides the ids and
+                content ratings.
+            content_rating: The content ratings of the lookups, None for all of
+                them.
+            model: The model to validate the items.
+
+        Returns:
+            The coalescer of the lookups.
+        """
+
+        ratings: tuple[str, ...] = tuple(sorted(set(content_rating or CONTENT_RATINGS)))
+        coalescer: RequestCoalescer[Any] | None = self._lookups.get((url, ratings))
+        if coalescer is None:
+            coalescer = self._lookups[url, ratings] = RequestCoalescer(
+                partial(
+                    self._by_ids,
+                    url,
+                    dict(params, **{"contentRating[]": list(ratings)}),
+                    model=model,
+                ),
+                self.coalesce_window,
+                MAX_IDS,
+            )
+        return coalescer
+
+    async def get_manga(
+        self, manga_id: str, content_rating: list[str] | None = None
+    ) -> Manga | None:
+        """Retrieves a manga by id, along with the ones looked up at the same time.
+
+        Args:
+            manga_id: The id of the manga.
+            content_rating: The content ratings the manga may have. Defaults to
+                None, all of them, as the API only returns the mangas of the
+                ratings asked for.
+
+        Returns:
+            The manga, or None if not found.
+        """
+
+        return await self._coalescer("/manga", {}, content_rating, model=Manga).get(
+            manga_id
+        )
+
+    async def get_chapter(
+        self, chapter_id: str, content_rating: list[str] | None = None
+    ) -> Chapter | None:
+        """Retrieves a chapter by id, along with the ones looked up at the same
+        time.
+
+        Args:
+            chapter_id: The id of the chapter.
+            content_rating: The content ratings the manga of the chapter may
+                have. Defaults to None, all of them.
+
+        Returns:
+            The chapter with its manga included, or None if not found.
+        """
+
+        return await self._coalescer(
+            "/chapter",
+            {"includes[]": ["manga", "scanlation_group"]},
+            content_rating,
+            model=Chapter,
+        ).get(chapter_id)
+
+    async def iter_feed(
+        self,
+        manga_id: str,
+        translated_language: str,
+        content_rating: list[str] | None = None,
+        updated_since: str | None = None,
+    ) -> AsyncIterator[Chapter]:
+        """Iterates over the chapters of a manga feed, with the manga included.
+
+        The feed is listed by pages of 500 chapters, the most the endpoint allows.
+
+        Args:
+            manga_id: The id of the manga.
+            translated_language: The language of the chapters.
+            content_rating: The content rating of the manga. Defaults to None.
+            updated_since: Only list the chapters updated since this date, as
+                `YYYY-MM-DDTHH:MM:SS`. Defaults to None, every chapter.
+
+        Yields:
+            The chapters from the manga.
+        """
+
         params: dict[str, Any] = {
-            "manga": manga_id,
             "includeExternalUrl": 0,
+            "includes[]": ["manga", "scanlation_group"],
             "order[chapter]": "asc",
             "translatedLanguage[]": translated_language,
         }
         if content_rating:
             params["contentRating[]"] = content_rating
-        chapters: list[Chapter] = []
-        response: Response[Chapter] = await self._call(
-            f"/chapter", params, model=Chapter
-        )
-        chapters.extend(response.data)
-        offset: int = response.offset + response.limit
-        tasks: list[Coroutine] = []
-        while response.total > offset:
-            tasks.append(
-                self._call(f"/chapter", dict(params, offset=offset), model=Chapter)
+        if updated_since is not None:
+            params["updatedAtSince"] = updated_since
+        async with aclosing(
+            self._paginate(
+                f"/manga/{manga_id}/feed",
+                params,
+                model=Chapter,
+                limit=MAX_FEED_LIMIT,
             )
-            offset += response.limit
-        responses: list[Response[Chapter]] = await asyncio.gather(*tasks)
-        for response in responses:
-            chapters.extend(response.data)
-        return chapters
+        ) as pages:
+            async for response in pages:
+                for chapter in response.data:
+                    yield chapter
+
+    def _updates_params(
+        self,
+        updated_since: str,
+        translated_language: str,
+        content_rating: list[str] | None = None,
+    ) -> dict[str, Any]:
+        params: dict[str, Any] = {
+            "includeExternalUrl": 0,
+            "includes[]": ["manga", "scanlation_group"],
+            "order[createdAt]": "asc",
+            "translatedLanguage[]": translated_language,
+            "updatedAtSince": updated_since,
+        }
+        if content_rating:
+            params["contentRating[]"] = content_rating
+        return params
+
+    async def count_updates(
+        self,
+        updated_since: str,
+        translated_language: str,
+        content_rating: list[str] | None = None,
+    ) -> int:
+        """Counts the chapters of every manga updated since a date.
+
+        Args:
+            updated_since: The date, as `YYYY-MM-DDTHH:MM:SS`.
+            translated_language: The language of the chapters.
+            content_rating: The content rating of the manga. Defaults to None.
+
+        Returns:
+            The number of chapters updated since the date.
+        """
+
+        params: dict[str, Any] = self._updates_params(
+            updated_since, translated_language, content_rating
+        )
+        response: Response = await self._call(
+            "/chapter", dict(params, limit=1), model=Chapter, use_cache=False
+        )
+        return response.total
+
+    async def iter_updates(
+        self,
+        updated_since: str,
+        translated_language: str,
+        content_rating: list[str] | None = None,
+    ) -> AsyncIterator[Chapter]:
+        """Iterates over the chapters of every manga updated since a date.
+
+        The chapters are listed by creation date, the order in which a listing
+        of more than 10,000 chapters is windowed, so its first page is not
+        requested twice.
+
+        Args:
+            updated_since: The date, as `YYYY-MM-DDTHH:MM:SS`.
+            translated_language: The language of the chapters.
+            content_rating: The content rating of the manga. Defaults to None.
+
+        Yields:
+            The chapters updated since the date, with their manga included.
+        """
+
+        params: dict[str, Any] = self._updates_params(
+            updated_since, translated_language, content_rating
+        )
+        async with aclosing(self._paginate("/chapter", params, model=Chapter)) as pages:
+            async for response in pages:
+                for chapter in response.data:
+                    yield chapter
 
     async def get_chapter_download_info(self, chapter_id: str) -> DownloadInfo:
         """Retrieves the download information for a chapter.
@@ -164,8 +772,10 @@ class Client:
 
         full_url: str = urljoin(self.base_url, f"/at-home/server/{chapter_id}")
         try:
-            response: httpx.Response = await self.session.get(full_url)
+            response: httpx.Response = await self._get(
+                full_url, endpoint="at-home-server"
+            )
             response.raise_for_status()
         except httpx.HTTPError as e:
             raise MangadexClientError(e) from e
-        return DownloadInfo.model_validate(response.json())
+        return DownloadInfo.model_validate_json(response.content)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Generic, TypeVar
+
+__all__: list[str] = ["RequestCoalescer"]
+
+T = TypeVar("T")
+
+
+@dataclass
+class RequestCoalescer(Generic[T]):
+    """Merges the lookups of single ids made concurrently into batched requests.
+
+    The ids asked for within `window` seconds of the first one are fetched by a
+    single call, sent early once it holds `max_batch` ids. The tasks asking for
+    the same id, queued or in flight, share its lookup, and a task cancelled
+    while waiting leaves the lookup to the others.
+    """
+
+    fetch: Callable[[list[str]], Awaitable[dict[str, T]]]
+    window: float = 0.01
+    max_batch: int = 100
+    _pending: dict[str, asyncio.Future[T | None]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _in_flight: dict[str, asyncio.Future[T | None]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _timer: asyncio.TimerHandle | None = field(default=None, init=False, repr=False)
+    _tasks: set[asyncio.Task[None]] = field(default_factory=set, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.max_batch < 1:
+            raise ValueError("A batch must hold at least one id.")
+
+    async def get(self, key: str) -> T | None:
+        """Looks an id up, in the next batch.
+
+        Args:
+            key: The id to look up.
+
+        Returns:
+            The item of the id, None if the batch did not return it.
+
+        Raises:
+            Exception: Whatever the batched call raised.
+        """
+
+        future: asyncio.Future[T | None] | None = self._pending.get(
+            key
+        ) or self._in_flight.get(key)
+        if future is None:
+            loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch: dict[str, asyncio.Future[T | None]] = self._pending
+        self._pending = {}
+        self._in_flight.update(batch)
+        task: asyncio.Task[None] = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: dict[str, asyncio.Future[T | None]]) -> None:
+        """Fetches a batch and hands every waiting task its item.
+
+        Args:
+            batch: The ids of the batch, and the futures of their items.
+        """
+
+        try:
+            found: dict[str, T] = await self.fetch(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Marked as retrieved, in case every waiter was cancelled.
+                    future.exception()
+        except BaseException:
+            for future in batch.values():
+                future.cancel()
+            raise
+        else:
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(found.get(key))
+        finally:
+            for key in batch:
+                self._in_flight.pop(key, None)
@@ -0,0 +1,267 @@
+from __future__ import annotations
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+import sqlite3
+import time
+from typing import Any, Callable, TypeVar
+from pymanga.integrity import check_archive
+from pymanga.models.chapter import Chapter
+
+__all__: list[str] = ["IndexedChapter", "SyncPlan", "ChapterIndex"]
+
+T = TypeVar("T")
+
+
+@dataclass
+class IndexedChapter:
+    chapter_id: str
+    version: int
+    updated_at: str
+    hash: str | None
+    path: str
+    size: int
+    downloaded_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class SyncPlan:
+    fetch: list[Chapter] = field(default_factory=list)
+    refetch: list[Chapter] = field(default_factory=list)
+    skip: list[Chapter] = field(default_factory=list)
+
+
+@dataclass
+class ChapterIndex:
+    """Keeps the chapters already downloaded in a SQLite database.
+
+    Chapters are keyed by their id, so a renamed chapter is still known, and a
+    chapter with a newer version or update date than the downloaded one is
+    fetched again. The index also keeps the date each followed manga was last
+    synced at. Chapters are looked up by batches of `batch_size`, below the
+    SQLite limit on query parameters.
+
+    Listings are checked through `run`, on a single thread of its own, as
+    adopting a chapter reads its archive from the disk.
+    """
+
+    path: Path
+    batch_size: int = 500
+    _connection: sqlite3.Connection | None = field(default=None, init=False, repr=False)
+    _executor: ThreadPoolExecutor | None = field(default=None, init=False, repr=False)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS chapters ("
+                "chapter_id TEXT PRIMARY KEY, version INTEGER NOT NULL, "
+                "updated_at TEXT NOT NULL, hash TEXT, path TEXT NOT NULL, "
+                "size INTEGER NOT NULL, downloaded_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS chapters_path ON chapters (path)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS series ("
+                "manga_id TEXT PRIMARY KEY, synced_at TEXT NOT NULL)"
+            )
+        return self._connection
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Runs a method of the index in its own thread, away from the event loop.
+
+        Args:
+            func: The method to run, such as `downloaded`.
+            *args: The arguments of the method.
+
+        Returns:
+            The result of the method.
+        """
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="pymanga-index")
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    def get(self, chapter_id: str) -> IndexedChapter | None:
+        """Retrieves a downloaded chapter.
+
+        Args:
+            chapter_id: The id of the chapter.
+
+        Returns:
+            The indexed chapter, or None if it was never downloaded.
+        """
+
+        row: tuple | None = self.connection.execute(
+            "SELECT * FROM chapters WHERE chapter_id = ?", (chapter_id,)
+        ).fetchone()
+        return IndexedChapter(*row) if row is not None else None
+
+    def record(self, chapter: IndexedChapter) -> None:
+        """Stores a downloaded chapter, replacing its previous download.
+
+        Args:
+            chapter: The chapter that was downloaded.
+        """
+
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO chapters VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    chapter.chapter_id,
+                    chapter.version,
+                    chapter.updated_at,
+                    chapter.hash,
+                    chapter.path,
+                    chapter.size,
+                    chapter.downloaded_at,
+                ),
+            )
+
+    def adopt(self, chapter: Chapter, path: Path) -> bool:
+        """Indexes a chapter downloaded before the index existed.
+
+        The archive is only adopted if its central directory lists every page
+        of the chapter, so a download interrupted back then is fetched again.
+        The pages are not read back, which is left to the `verify` command.
+
+        Args:
+            chapter: The chapter missing from the index.
+            path: The path the chapter would have been downloaded to.
+
+        Returns:
+            True if the chapter was already downloaded, False otherwise.
+        """
+
+        try:
+            size: int = path.stat().st_size
+        except FileNotFoundError:
+            return False
+        if not check_archive(path, chapter.attributes.pages, read=False).intact:
+            return False
+        self.record(
+            IndexedChapter(
+                chapter.id,
+                chapter.attributes.version,
+                chapter.attributes.updated_at,
+                None,
+                str(path),
+                size,
+            )
+        )
+        return True
+
+    def locate(self, path: Path) -> IndexedChapter | None:
+        """Retrieves the downloaded chapter saved at a path.
+
+        Args:
+            path: The path of the archive.
+
+        Returns:
+            The indexed chapter, or None if no chapter was saved there.
+        """
+
+        row: tuple | None = self.connection.execute(
+            "SELECT * FROM chapters WHERE path = ?", (str(path),)
+        ).fetchone()
+        return IndexedChapter(*row) if row is not None else None
+
+    def plan(self, chapters: list[Chapter]) -> SyncPlan:
+        """Sorts the chapters by what a sync has to do with them.
+
+        Args:
+            chapters: The chapters listed by the API.
+
+        Returns:
+            The chapters never downloaded, the ones outdated and the ones up to
+            date.
+        """
+
+        plan: SyncPlan = SyncPlan()
+        ids: list[str] = [chapter.id for chapter in chapters]
+        rows: dict[str, tuple[int, str]] = {}
+        for start in range(0, len(ids), self.batch_size):
+            batch: list[str] = ids[start : start + self.batch_size]
+            rows.update(
+                (chapter_id, (version, updated_at))
+                for chapter_id, version, updated_at in self.connection.execute(
+                    "SELECT chapter_id, version, updated_at FROM chapters "
+                    f"WHERE chapter_id IN ({', '.join('?' * len(batch))})",
+                    batch,
+                )
+            )
+        for chapter in chapters:
+            indexed: tuple[int, str] | None = rows.get(chapter.id)
+            if indexed is None:
+                plan.fetch.append(chapter)
+            elif indexed < (chapter.attributes.version, chapter.attributes.updated_at):
+                plan.refetch.append(chapter)
+            else:
+                plan.skip.append(chapter)
+        return plan
+
+    def downloaded(self, chapters: list[tuple[Chapter, Path]]) -> set[str]:
+        """Finds the chapters of a listing that are downloaded and up to date.
+
+        The listing is planned at once, and only the chapters missing from the
+        index have their archive looked for, to be adopted.
+
+        Args:
+            chapters: The chapters listed, with the path each one would be
+                downloaded to.
+
+        Returns:
+            The ids of the chapters that do not need downloading.
+        """
+
+        paths: dict[str, Path] = {chapter.id: path for chapter, path in chapters}
+        plan: SyncPlan = self.plan([chapter for chapter, _ in chapters])
+        return {chapter.id for chapter in plan.skip} | {
+            chapter.id
+            for chapter in plan.fetch
+            if self.adopt(chapter, paths[chapter.id])
+        }
+
+    def last_synced(self, manga_id: str) -> str | None:
+        """Retrieves the date a manga was last synced at.
+
+        Args:
+            manga_id: The id of the manga.
+
+        Returns:
+            The date as `YYYY-MM-DDTHH:MM:SS`, or None if never synced.
+        """
+
+        row: tuple[str] | None = self.connection.execute(
+            "SELECT synced_at FROM series WHERE manga_id = ?", (manga_id,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def mark_synced(self, manga_id: str, synced_at: str) -> None:
+        """Stores the date a manga was synced at.
+
+        Args:
+            manga_id: The id of the manga.
+            synced_at: The date the sync started at, as `YYYY-MM-DDTHH:MM:SS`.
+        """
+
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO series VALUES (?, ?)", (manga_id, synced_at)
+            )
+
+    def close(self) -> None:
+        """Waits for the running checks and closes the database."""
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
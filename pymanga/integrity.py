@@ -0,0 +1,217 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+import hashlib
+import os
+from pathlib import Path
+import re
+from typing import IO
+import zipfile
+from pymanga.buffers import CHUNK_SIZE
+
+__all__: list[str] = [
+    "IMAGE_SUFFIXES",
+    "check_image",
+    "check_file",
+    "ArchiveCheck",
+    "check_archive",
+    "salvage",
+]
+
+IMAGE_SUFFIXES: frozenset[str] = frozenset({".jpg", ".jpeg", ".png", ".gif", ".webp"})
+
+HEAD_SIZE: int = 12
+TAIL_SIZE: int = 32
+
+PNG_SIGNATURE: bytes = b"\x89PNG\r\n\x1a\n"
+PNG_END: bytes = b"IEND\xaeB`\x82"
+
+_PAGE_NAME: re.Pattern[str] = re.compile(r"(\d{4})(?:-\d+)?")
+
+
+def check_image(head: bytes, tail: bytes, size: int) -> str | None:
+    """Checks that an image starts with its signature and ends with its trailer.
+
+    Only the first and last bytes are read, so a truncated or mangled transfer
+    is caught without decoding the image.
+
+    Args:
+        head: The first bytes of the image, 12 at least.
+        tail: The last bytes of the image.
+        size: The size of the image in bytes.
+
+    Returns:
+        The problem found, None if the image looks whole.
+    """
+
+    if head.startswith(b"\xff\xd8\xff"):
+        return None if b"\xff\xd9" in tail else "truncated JPEG"
+    if head.startswith(PNG_SIGNATURE):
+        return None if PNG_END in tail else "truncated PNG"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return None if tail.rstrip(b"\x00").endswith(b";") else "truncated GIF"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        declared: int = int.from_bytes(head[4:8], "little") + 8
+        return None if size >= declared else "truncated WebP"
+    return "not an image"
+
+
+def check_file(file: IO[bytes]) -> str | None:
+    """Checks the image held in a file, reading only its first and last bytes.
+
+    Args:
+        file: The file holding the image.
+
+    Returns:
+        The problem found, None if the image looks whole.
+    """
+
+    size: int = file.seek(0, os.SEEK_END)
+    file.seek(0)
+    head: bytes = file.read(HEAD_SIZE)
+    file.seek(max(size - TAIL_SIZE, 0))
+    tail: bytes = file.read()
+    file.seek(0)
+    return check_image(head, tail, size)
+
+
+def _page_index(name: str) -> int | None:
+    match: re.Match[str] | None = _PAGE_NAME.fullmatch(Path(name).stem)
+    return int(match.group(1)) - 1 if match else None
+
+
+def _check_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> str | None:
+    """Reads an entry whole, checking its CRC, its checksum if any and its image.
+
+    Args:
+        archive: The archive holding the entry.
+        info: The entry.
+
+    Returns:
+        The problem found, None if the entry is intact.
+    """
+
+    digest = hashlib.sha256()
+    head: bytes = b""
+    tail: bytes = b""
+    try:
+        with archive.open(info) as entry:
+            while chunk := entry.read(CHUNK_SIZE):
+                digest.update(chunk)
+                if len(head) < HEAD_SIZE:
+                    head += chunk[: HEAD_SIZE - len(head)]
+                tail = (tail + chunk)[-TAIL_SIZE:]
+    except (zipfile.BadZipFile, OSError) as e:
+        return str(e)
+    comment: str = info.comment.decode(errors="replace")
+    if comment.startswith("sha256:") and comment[7:] != digest.hexdigest():
+        return "checksum mismatch"
+    return check_image(head, tail, info.file_size)
+
+
+@dataclass
+class ArchiveCheck:
+    """The outcome of checking the pages of an archive.
+
+    The pages are known by the index in their entry name, the archives written
+    before the pages were numbered only having a count of intact pages.
+    """
+
+    path: Path
+    expected: int | None = None
+    pages: set[int] = field(default_factory=set)
+    damaged: set[int] = field(default_factory=set)
+    unnumbered: int = 0
+    problems: list[str] = field(default_factory=list)
+
+    @property
+    def missing(self) -> int:
+        """Counts the pages missing, from the number expected if known, or else
+        from the gaps in the numbering."""
+
+        found: int = len(self.pages) + len(self.damaged) + self.unnumbered
+        if self.expected is not None:
+            return max(self.expected - found, 0)
+        if self.unnumbered:
+            return 0
+        return max(self.pages | self.damaged, default=-1) + 1 - found
+
+    @property
+    def intact(self) -> bool:
+        return not self.problems and not self.missing
+
+
+def check_archive(
+    path: Path, expected: int | None = None, *, read: bool = True
+) -> ArchiveCheck:
+    """Checks every page of an archive.
+
+    A page is damaged when its entry cannot be read back, does not match the
+    checksum in its comment, or is not a whole image. The entries that are not
+    images are left out.
+
+    Args:
+        path: The path of the archive.
+        expected: The number of pages of the chapter, if known. Defaults to None,
+            only the gaps in the numbering being missing pages.
+        read: Read every page back. Defaults to True, False only checking that
+            the central directory lists every page.
+
+    Returns:
+        The intact and damaged pages of the archive.
+    """
+
+    check: ArchiveCheck = ArchiveCheck(path, expected)
+    try:
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if Path(info.filename).suffix.lower() not in IMAGE_SUFFIXES:
+                    continue
+                index: int | None = _page_index(info.filename)
+                problem: str | None = _check_entry(archive, info) if read else None
+                if problem is not None:
+                    check.problems.append(f"{info.filename}: {problem}")
+                    if index is not None:
+                        check.damaged.add(index)
+                elif index is None:
+                    check.unnumbered += 1
+                else:
+                    check.pages.add(index)
+    except (zipfile.BadZipFile, OSError) as e:
+        check.problems.append(str(e))
+    check.pages -= check.damaged
+    return check
+
+
+def salvage(source: Path, target: Path, expected: int | None = None) -> int:
+    """Copies the intact pages of a damaged archive into a new one.
+
+    Only the numbered pages are kept, with all their parts, so a resumed
+    download of the new archive fetches the others.
+
+    Args:
+        source: The damaged archive.
+        target: The archive to create.
+        expected: The number of pages of the chapter, the pages past it being
+            dropped. Defaults to None.
+
+    Returns:
+        The number of pages copied.
+    """
+
+    check: ArchiveCheck = check_archive(source, expected)
+    pages: set[int] = {
+        index for index in check.pages if expected is None or index < expected
+    }
+    if not pages:
+        return 0
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with (
+        zipfile.ZipFile(source) as archive,
+        zipfile.ZipFile(target, "w", zipfile.ZIP_STORED) as copy,
+    ):
+        for info in archive.infolist():
+            if _page_index(info.filename) in pages:
+                with archive.open(info) as entry, copy.open(info, "w") as written:
+                    while chunk := entry.read(CHUNK_SIZE):
+                        written.write(chunk)
+    return len(pages)
@@ -0,0 +1,342 @@
+from __future__ import annotations
+import asyncio
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import os
+from pathlib import Path
+import socket
+import sqlite3
+import threading
+import time
+from typing import AsyncIterable, Iterable, Iterator
+from pymanga.scheduler import ChapterJob, DownloadScheduler
+
+__all__: list[str] = ["JobQueue", "QueueWorker", "default_worker_id", "enqueue_all"]
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+@dataclass
+class JobQueue:
+    """Shares chapter jobs between worker processes through a SQLite database.
+
+    Workers claim jobs with a lease and renew it while downloading. A job whose
+    lease expired, its worker being gone, is claimed again by another worker,
+    until it was attempted `max_attempts` times. Workers on other machines can
+    share the queue from a network storage, as long as it supports the file
+    locks SQLite relies on. The queue can be used from any thread, one call at
+    a time.
+    """
+
+    path: Path
+    max_attempts: int = 3
+    timeout: float = 30.0
+    _connection: sqlite3.Connection | None = field(default=None, init=False, repr=False)
+    _lock: threading.RLock = field(
+        default_factory=threading.RLock, init=False, repr=False
+    )
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._connection is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                connection: sqlite3.Connection = sqlite3.connect(
+                    self.path,
+                    timeout=self.timeout,
+                    isolation_level=None,
+                    check_same_thread=False,
+                )
+                connection.execute("BEGIN IMMEDIATE")
+                with connection:
+                    connection.execute(
+                        "CREATE TABLE IF NOT EXISTS jobs ("
+                        "chapter_id TEXT PRIMARY KEY, name TEXT NOT NULL, "
+                        "version INTEGER, updated_at TEXT, series TEXT, "
+                        "weight REAL NOT NULL DEFAULT 1, "
+                        "status TEXT NOT NULL DEFAULT 'pending', "
+                        "attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, "
+                        "lease_expires REAL NOT NULL DEFAULT 0, error TEXT)"
+                    )
+                    # The queues created before the jobs kept their series.
+                    columns: set[str] = {
+                        row[1] for row in connection.execute("PRAGMA table_info(jobs)")
+                    }
+                    if "series" not in columns:
+                        connection.execute("ALTER TABLE jobs ADD COLUMN series TEXT")
+                    if "weight" not in columns:
+                        connection.execute(
+                            "ALTER TABLE jobs ADD COLUMN weight REAL NOT NULL DEFAULT 1"
+                        )
+                    connection.execute(
+                        "CREATE INDEX IF NOT EXISTS jobs_status "
+                        "ON jobs (status, lease_expires)"
+                    )
+                self._connection = connection
+            return self._connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Runs a transaction holding the write lock until it ends.
+
+        Yields:
+            The connection, the transaction committing on success.
+        """
+
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            with self.connection:
+                yield self.connection
+
+    def enqueue(self, jobs: Iterable[ChapterJob]) -> None:
+        """Adds jobs to the queue.
+
+        A job already queued is left as is, unless the new one is for a newer
+        version of the chapter, in which case it is queued again. The series
+        and weight of the jobs are kept, to share the downloads between the
+        series when the jobs are claimed.
+
+        Args:
+            jobs: The chapters to download.
+        """
+
+        with self._transaction():
+            self.connection.executemany(
+                "INSERT INTO jobs (chapter_id, name, version, updated_at, series, "
+                "weight) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (chapter_id) DO UPDATE SET "
+                "name = excluded.name, version = excluded.version, "
+                "updated_at = excluded.updated_at, series = excluded.series, "
+                "weight = excluded.weight, status = 'pending', "
+                "attempts = 0, worker = NULL, lease_expires = 0, error = NULL "
+                "WHERE (excluded.version, excluded.updated_at) "
+                "> (jobs.version, jobs.updated_at)",
+                [
+                    (
+                        job.chapter_id,
+                        job.name,
+                        job.version,
+                        job.updated_at,
+                        job.series,
+                        job.weight,
+                    )
+                    for job in jobs
+                ],
+            )
+
+    def claim(self, worker: str, limit: int, lease: float) -> list[ChapterJob]:
+        """Leases the next jobs to a worker.
+
+        Args:
+            worker: The id of the worker.
+            limit: The maximum number of jobs to lease.
+            lease: The duration of the lease in seconds.
+
+        Returns:
+            The leased jobs, empty if none is available.
+        """
+
+        now: float = time.time()
+        with self._transaction():
+            self.connection.execute(
+                "UPDATE jobs SET status = 'failed', worker = NULL, "
+                "error = COALESCE(error, 'Lease expired') "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            rows: list[tuple[str, str, int | None, str | None, str | None, float]] = (
+                self.connection.execute(
+                    "SELECT chapter_id, name, version, updated_at, series, weight "
+                    "FROM jobs WHERE status = 'pending' "
+                    "OR (status = 'leased' AND lease_expires < ?) "
+                    "ORDER BY rowid LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+            )
+            self.connection.executemany(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE chapter_id = ?",
+                [(worker, now + lease, row[0]) for row in rows],
+            )
+        return [ChapterJob(*row) for row in rows]
+
+    def renew(self, worker: str, chapter_ids: Iterable[str], lease: float) -> None:
+        """Extends the leases a worker still holds.
+
+        Args:
+            worker: The id of the worker.
+            chapter_ids: The ids of the chapters being downloaded.
+            lease: The duration of the lease in seconds, from now.
+        """
+
+        with self._transaction():
+            self.connection.executemany(
+                "UPDATE jobs SET lease_expires = ? "
+                "WHERE chapter_id = ? AND worker = ? AND status = 'leased'",
+                [
+                    (time.time() + lease, chapter_id, worker)
+                    for chapter_id in chapter_ids
+                ],
+            )
+
+    def complete(self, worker: str, chapter_id: str) -> None:
+        """Records a job as done.
+
+        Args:
+            worker: The id of the worker.
+            chapter_id: The id of the downloaded chapter.
+        """
+
+        with self._transaction():
+            self.connection.execute(
+                "UPDATE jobs SET status = 'done', error = NULL "
+                "WHERE chapter_id = ? AND worker = ? AND status = 'leased'",
+                (chapter_id, worker),
+            )
+
+    def fail(self, worker: str, chapter_id: str, error: str) -> None:
+        """Records a failed attempt, queuing the job again if it has attempts left.
+
+        Args:
+            worker: The id of the worker.
+            chapter_id: The id of the chapter that failed.
+            error: The reason of the failure.
+        """
+
+        with self._transaction():
+            self.connection.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < ? "
+                "THEN 'pending' ELSE 'failed' END, "
+                "worker = NULL, lease_expires = 0, error = ? "
+                "WHERE chapter_id = ? AND worker = ? AND status = 'leased'",
+                (self.max_attempts, error, chapter_id, worker),
+            )
+
+    def counts(self) -> dict[str, int]:
+        """Counts the jobs by status.
+
+        Returns:
+            The number of jobs for each status in the queue.
+        """
+
+        with self._lock:
+            return dict(
+                self.connection.execute(
+                    "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+                ).fetchall()
+            )
+
+    def close(self) -> None:
+        """Closes the database."""
+
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+@dataclass
+class QueueWorker:
+    """Downloads the jobs of a shared queue until none is left.
+
+    Jobs are claimed in batches and downloaded by the scheduler of the worker,
+    their leases being renewed until the batch is over. The queue is used from
+    a thread, so waiting on its lock does not hold up the downloads.
+    """
+
+    queue: JobQueue
+    scheduler: DownloadScheduler
+    worker: str = field(default_factory=default_worker_id)
+    batch_size: int = 10
+    lease: float = 300.0
+    poll_interval: float = 5.0
+
+    async def _renew(self, chapter_ids: list[str]) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await asyncio.to_thread(
+                self.queue.renew, self.worker, chapter_ids, self.lease
+            )
+
+    async def run_batch(self, jobs: list[ChapterJob]) -> list[ChapterJob]:
+        """Downloads a batch of claimed jobs and records their results.
+
+        Args:
+            jobs: The jobs claimed by the worker.
+
+        Returns:
+            The jobs that could not be downloaded.
+        """
+
+        renewing: asyncio.Task[None] = asyncio.create_task(
+            self._renew([job.chapter_id for job in jobs])
+        )
+        try:
+            failed: list[ChapterJob] = await self.scheduler.run(jobs)
+        finally:
+            renewing.cancel()
+            await asyncio.gather(renewing, return_exceptions=True)
+        failed_ids: set[str] = {job.chapter_id for job in failed}
+        for job in jobs:
+            if job.chapter_id in failed_ids:
+                await asyncio.to_thread(
+                    self.queue.fail, self.worker, job.chapter_id, "Download failed"
+                )
+            else:
+                await asyncio.to_thread(
+                    self.queue.complete, self.worker, job.chapter_id
+                )
+        return failed
+
+    async def run(self) -> int:
+        """Claims and downloads jobs until the queue is drained.
+
+        The worker waits while other workers hold leases, as their jobs come
+        back to the queue if they fail or stop.
+
+        Returns:
+            The number of jobs downloaded by the worker.
+        """
+
+        downloaded: int = 0
+        while True:
+            jobs: list[ChapterJob] = await asyncio.to_thread(
+                self.queue.claim, self.worker, self.batch_size, self.lease
+            )
+            if jobs:
+                print(f"Claimed {len(jobs)} jobs | {self.worker}")
+                failed: list[ChapterJob] = await self.run_batch(jobs)
+                downloaded += len(jobs) - len(failed)
+                continue
+            counts: dict[str, int] = await asyncio.to_thread(self.queue.counts)
+            if not counts.get("pending") and not counts.get("leased"):
+                return downloaded
+            await asyncio.sleep(self.poll_interval)
+
+
+async def enqueue_all(
+    queue: JobQueue, jobs: AsyncIterable[ChapterJob], batch_size: int = 500
+) -> int:
+    """Adds jobs to the queue as they are listed, in batches.
+
+    Args:
+        queue: The shared queue.
+        jobs: The chapters to download.
+        batch_size: The number of jobs added per transaction. Defaults to 500.
+
+    Returns:
+        The number of jobs listed.
+    """
+
+    batch: list[ChapterJob] = []
+    total: int = 0
+    async for job in jobs:
+        batch.append(job)
+        if len(batch) >= batch_size:
+            await asyncio.to_thread(queue.enqueue, batch)
+            total += len(batch)
+            batch = []
+    await asyncio.to_thread(queue.enqueue, batch)
+    return total + len(batch)
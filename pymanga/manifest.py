@@ -0,0 +1,119 @@
+from __future__ import annotations
+import csv
+import json
+from pathlib import Path
+from typing import Any
+from pydantic import (
+    BaseModel,
+    Field,
+    ValidationError,
+    field_validator,
+    model_validator,
+)
+from pymanga.catalogue import in_range, parse_number
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover
+    yaml = None
+
+__all__: list[str] = ["ManifestEntry", "load_manifest"]
+
+
+class ManifestEntry(BaseModel):
+    id: str | None = None
+    title: str | None = None
+    language: str = "en"
+    from_chapter: float | None = None
+    to_chapter: float | None = None
+    content_rating: list[str] = []
+    groups: list[str] = []
+    weight: float = Field(1.0, gt=0)
+
+    @field_validator("content_rating", "groups", mode="before")
+    @classmethod
+    def _split(cls, value: Any) -> Any:
+        return value.split(",") if isinstance(value, str) else value
+
+    @model_validator(mode="after")
+    def _check_manga(self) -> ManifestEntry:
+        if self.id is None and self.title is None:
+            raise ValueError("An entry needs the id or the exact title of a manga.")
+        return self
+
+    @property
+    def name(self) -> str:
+        return self.title or str(self.id)
+
+    def includes(self, chapter: str | None) -> bool:
+        """Checks if a chapter number is within the range of the entry.
+
+        Args:
+            chapter: The number of the chapter, None for a oneshot.
+
+        Returns:
+            True if the chapter should be downloaded.
+        """
+
+        return in_range(parse_number(chapter), self.from_chapter, self.to_chapter)
+
+
+def _read(path: Path) -> list[dict[str, Any]]:
+    """Reads the raw entries of a manifest from its format.
+
+    Args:
+        path: The path of the manifest, a JSON, YAML or CSV file.
+
+    Returns:
+        The entries as dictionaries.
+    """
+
+    suffix: str = path.suffix.lower()
+    if suffix == ".csv":
+        with path.open(newline="") as file:
+            return list(csv.DictReader(file))
+    if suffix == ".json":
+        data: Any = json.loads(path.read_text())
+    elif suffix in (".yaml", ".yml"):
+        if yaml is None:
+            raise ValueError(
+                "Reading a YAML manifest requires PyYAML, install pymanga[yaml]."
+            )
+        data = yaml.safe_load(path.read_text())
+    else:
+        raise ValueError(f"Unsupported manifest format: {path.suffix}")
+    if isinstance(data, dict):
+        data = data.get("mangas", [])
+    if not isinstance(data, list):
+        raise ValueError("A manifest must be a list of mangas.")
+    return data
+
+
+def load_manifest(path: Path) -> list[ManifestEntry]:
+    """Loads the mangas listed in a manifest.
+
+    Args:
+        path: The path of the manifest, a JSON, YAML or CSV file. JSON and YAML
+            manifests are a list of entries, or hold it under a `mangas` key.
+
+    Returns:
+        The entries of the manifest.
+    """
+
+    entries: list[ManifestEntry] = []
+    for line, raw in enumerate(_read(path), start=1):
+        if not isinstance(raw, dict):
+            raise ValueError(f"Invalid entry {line} in {path}: not a mapping.")
+        try:
+            entries.append(
+                ManifestEntry.model_validate(
+                    {
+                        key: value
+                        for key, value in raw.items()
+                        if value not in ("", None)
+                    }
+                )
+            )
+        except ValidationError as e:
+            raise ValueError(f"Invalid entry {line} in {path}: {e}") from e
+    return entries
@@ -0,0 +1,476 @@
+from __future__ import annotations
+import asyncio
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import json
+import os
+from pathlib import Path
+import secrets
+import threading
+import time
+from types import TracebackType
+from typing import IO, Any, Callable, Iterator, TypeVar
+
+__all__: list[str] = [
+    "Histogram",
+    "Span",
+    "MetricsHook",
+    "SpanLog",
+    "Metrics",
+    "MetricsExporter",
+]
+
+T = TypeVar("T")
+Labels = tuple[tuple[str, str], ...]
+
+BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+_current_span: ContextVar[Span | None] = ContextVar("pymanga_span", default=None)
+
+
+def _labels(labels: dict[str, Any]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, **extra: str) -> str:
+    pairs: list[tuple[str, str]] = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+@dataclass
+class Histogram:
+    """Counts the observed values per bucket, the buckets being upper bounds."""
+
+    buckets: tuple[float, ...] = BUCKETS
+    counts: list[int] = field(init=False)
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Counts the values under each bucket, as Prometheus exposes them.
+
+        Returns:
+            The upper bound of each bucket, `+Inf` last, and its count.
+        """
+
+        bounds: list[str] = [f"{bucket:g}" for bucket in self.buckets] + ["+Inf"]
+        total: int = 0
+        cumulative: list[tuple[str, int]] = []
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+
+@dataclass
+class Span:
+    """Times an operation, nested in the span it was started from.
+
+    Spans follow the OpenTelemetry data model: they share the trace id of their
+    root span, and point to their parent by its id.
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start: float
+    attributes: dict[str, Any] = field(default_factory=dict)
+    end: float | None = None
+    status: str = "ok"
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def payload(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "end": self.end,
+            "duration": self.duration,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class MetricsHook:
+    """Receives the measures as they are recorded, to forward or profile them.
+
+    Hooks are called on the hot path, from the event loop and from the worker
+    threads, so they should return quickly.
+    """
+
+    def record(self, kind: str, name: str, value: float, labels: Labels) -> None:
+        """Receives a measure.
+
+        Args:
+            kind: The kind of the metric, `counter`, `gauge` or `histogram`.
+            name: The name of the metric.
+            value: The increment of a counter, or the value of a gauge or of an
+                observation.
+            labels: The labels of the metric, sorted by name.
+        """
+
+    def finish(self, span: Span) -> None:
+        """Receives a span once it ended.
+
+        Args:
+            span: The ended span.
+        """
+
+    def close(self) -> None:
+        """Writes out what the hook still holds, once the run is over."""
+
+
+@dataclass
+class SpanLog(MetricsHook):
+    """Appends the ended spans to a file, one JSON object per line.
+
+    The lines are held in memory and appended by a background thread every
+    `interval` seconds, the file staying open until the log is closed.
+    """
+
+    path: Path
+    interval: float = 1.0
+    _lines: list[str] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+    _file: IO[str] | None = field(default=None, init=False, repr=False, compare=False)
+    _thread: threading.Thread | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _closed: threading.Event = field(
+        default_factory=threading.Event, init=False, repr=False, compare=False
+    )
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+    _write_lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def finish(self, span: Span) -> None:
+        line: str = json.dumps(span.payload(), default=str)
+        with self._lock:
+            self._lines.append(line)
+            if self._thread is None:
+                self._closed.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="pymanga-spans", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed.wait(self.interval):
+            self.flush()
+
+    def flush(self) -> None:
+        """Appends the lines held in memory to the file."""
+
+        with self._lock:
+            lines: list[str] = self._lines
+            self._lines = []
+        if not lines:
+            return
+        with self._write_lock:
+            if self._file is None:
+                self._file = self.path.open("a", encoding="utf-8")
+            self._file.write("".join(f"{line}\n" for line in lines))
+            self._file.flush()
+
+    def close(self) -> None:
+        """Stops the background thread, then writes the last lines and closes
+        the file."""
+
+        with self._lock:
+            thread: threading.Thread | None = self._thread
+            self._thread = None
+        if thread is not None:
+            self._closed.set()
+            thread.join()
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+@dataclass
+class Metrics:
+    """Collects counters, gauges, histograms and spans in memory.
+
+    Every measure is also handed to the hooks. The metrics are exported in the
+    Prometheus text format or as JSON.
+    """
+
+    hooks: list[MetricsHook] = field(default_factory=list)
+    counters: dict[tuple[str, Labels], float] = field(default_factory=dict)
+    gauges: dict[tuple[str, Labels], float] = field(default_factory=dict)
+    histograms: dict[tuple[str, Labels], Histogram] = field(default_factory=dict)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def increment(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Increments a counter.
+
+        Args:
+            name: The name of the counter.
+            value: The increment. Defaults to 1.
+            **labels: The labels of the counter.
+        """
+
+        key: tuple[str, Labels] = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+        for hook in self.hooks:
+            hook.record("counter", name, value, key[1])
+
+    def gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Sets a gauge.
+
+        Args:
+            name: The name of the gauge.
+            value: The current value.
+            **labels: The labels of the gauge.
+        """
+
+        key: tuple[str, Labels] = (name, _labels(labels))
+        with self._lock:
+            self.gauges[key] = value
+        for hook in self.hooks:
+            hook.record("gauge", name, value, key[1])
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Adds a value to a histogram.
+
+        Args:
+            name: The name of the histogram.
+            value: The observed value, in seconds for durations.
+            **labels: The labels of the histogram.
+        """
+
+        key: tuple[str, Labels] = (name, _labels(labels))
+        with self._lock:
+            histogram: Histogram | None = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+        for hook in self.hooks:
+            hook.record("histogram", name, value, key[1])
+
+    @contextmanager
+    def span(self, name: str, /, **attributes: Any) -> Iterator[Span]:
+        """Times an operation, as a child of the current span if any.
+
+        The duration is also added to the `pymanga_span_seconds` histogram. The
+        tasks created within the span inherit it as their current span.
+
+        Args:
+            name: The name of the operation.
+            **attributes: The attributes of the span.
+
+        Yields:
+            The span, whose status is `error` if the operation raised.
+        """
+
+        parent: Span | None = _current_span.get()
+        span: Span = Span(
+            name,
+            parent.trace_id if parent else secrets.token_hex(16),
+            secrets.token_hex(8),
+            parent.span_id if parent else None,
+            time.time(),
+            attributes,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end = time.time()
+            self.observe("pymanga_span_seconds", span.duration, span=name)
+            for hook in self.hooks:
+                hook.finish(span)
+
+    def timed(
+        self, name: str, func: Callable[..., T], **labels: Any
+    ) -> Callable[..., T]:
+        """Wraps a blocking function to add its durations to a histogram.
+
+        The wrapper is meant for thread pools, it cannot be sent to a process.
+
+        Args:
+            name: The name of the histogram.
+            func: The function to time.
+            **labels: The labels of the histogram.
+
+        Returns:
+            The wrapped function.
+        """
+
+        def timed(*args: Any) -> T:
+            start: float = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self.observe(name, time.perf_counter() - start, **labels)
+
+        return timed
+
+    def snapshot(self) -> dict[str, list[dict[str, Any]]]:
+        """Copies the current values of the metrics.
+
+        Returns:
+            The counters, gauges and histograms, with their labels.
+        """
+
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                "gauges": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.gauges.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "buckets": dict(histogram.cumulative()),
+                        "sum": histogram.sum,
+                        "count": histogram.count,
+                    }
+                    for (name, labels), histogram in sorted(
+                        self.histograms.items(), key=lambda item: item[0]
+                    )
+                ],
+            }
+
+    def close(self) -> None:
+        """Closes the hooks, writing out what they still hold."""
+
+        for hook in self.hooks:
+            hook.close()
+
+    def prometheus(self) -> str:
+        """Formats the metrics in the Prometheus text exposition format.
+
+        Returns:
+            The metrics, one sample per line.
+        """
+
+        lines: list[str] = []
+        typed: set[str] = set()
+
+        def declare(name: str, kind: str) -> None:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                declare(name, "counter")
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                declare(name, "gauge")
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for (name, labels), histogram in sorted(
+                self.histograms.items(), key=lambda item: item[0]
+            ):
+                declare(name, "histogram")
+                for bound, count in histogram.cumulative():
+                    lines.append(
+                        f"{name}_bucket{_format_labels(labels, le=bound)} {count}"
+                    )
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:g}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Path) -> None:
+        """Writes the metrics to a file.
+
+        A `.jsonl` file gets a snapshot appended as a JSON line, any other file is
+        replaced by the metrics in the Prometheus text format, atomically so a
+        collector never reads a partial file.
+
+        Args:
+            path: The path of the file.
+        """
+
+        if path.suffix == ".jsonl":
+            line: str = json.dumps({"time": time.time(), **self.snapshot()})
+            with path.open("a", encoding="utf-8") as file:
+                file.write(line + "\n")
+            return
+        temporary: Path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        temporary.write_text(self.prometheus(), encoding="utf-8")
+        os.replace(temporary, path)
+
+
+@dataclass
+class MetricsExporter:
+    """Exports the metrics to a file periodically, and once more when closed."""
+
+    metrics: Metrics
+    path: Path
+    interval: float = 15.0
+    _task: asyncio.Task[None] | None = field(default=None, init=False)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.metrics.export, self.path)
+
+    async def __aenter__(self) -> MetricsExporter:
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.to_thread(self.metrics.export, self.path)
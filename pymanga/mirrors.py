@@ -0,0 +1,78 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+__all__: list[str] = ["NodeStats", "MirrorRanking"]
+
+
+@dataclass
+class NodeStats:
+    requests: int = 0
+    failures: int = 0
+    latency: float = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.failures / self.requests if self.requests else 0.0
+
+    def record(self, latency: float | None) -> None:
+        """Records the outcome of a request to the node.
+
+        Args:
+            latency: The time to the response headers in seconds, None if the
+                request failed.
+        """
+
+        self.requests += 1
+        if latency is None:
+            self.failures += 1
+            return
+        successes: int = self.requests - self.failures
+        self.latency += (latency - self.latency) / min(successes, 10)
+
+
+@dataclass
+class MirrorRanking:
+    """Ranks the MangaDex@Home nodes met during the session.
+
+    A node is bad once it answered at least `min_requests` requests with an error
+    rate above `max_error_rate` or an average latency above `max_latency`.
+    Nodes are identified by their host, the base url also holding a token.
+    """
+
+    max_latency: float = 5.0
+    max_error_rate: float = 0.3
+    min_requests: int = 3
+    nodes: dict[str, NodeStats] = field(default_factory=dict)
+
+    @staticmethod
+    def host(base_url: str) -> str:
+        return urlparse(base_url).netloc
+
+    def record(self, base_url: str, latency: float | None) -> None:
+        """Records the outcome of a request to a node.
+
+        Args:
+            base_url: The base url of the node.
+            latency: The time to the response headers in seconds, None if the
+                request failed.
+        """
+
+        self.nodes.setdefault(self.host(base_url), NodeStats()).record(latency)
+
+    def is_bad(self, base_url: str) -> bool:
+        """Checks if a node is too slow or failing too often.
+
+        Args:
+            base_url: The base url of the node.
+
+        Returns:
+            True if the node should be avoided.
+        """
+
+        stats: NodeStats | None = self.nodes.get(self.host(base_url))
+        if stats is None or stats.requests < self.min_requests:
+            return False
+        return (
+            stats.error_rate > self.max_error_rate or stats.latency > self.max_latency
+        )
@@ -22,6 +22,7 @@ class Attributes(BaseModel):
 class Relationship(BaseModel):
     id: str
     type: str
+    attributes: dict[str, Any] | None = None
 
 
 class Chapter(BaseModel):
@@ -29,3 +30,31 @@ class Chapter(BaseModel):
     type: str
     attributes: Attributes
     relationships: list[Relationship]
+
+    def _relationship(self, type: str) -> Relationship | None:
+        return next(
+            (
+                relationship
+                for relationship in self.relationships
+                if relationship.type == type
+            ),
+            None,
+        )
+
+    @property
+    def manga(self) -> Relationship | None:
+        return self._relationship("manga")
+
+    @property
+    def group(self) -> Relationship | None:
+        return self._relationship("scanlation_group")
+
+    @property
+    def manga_title(self) -> str | None:
+        attributes: dict[str, Any] = (self.manga and self.manga.attributes) or {}
+        return attributes.get("title", {}).get("en")
+
+    @property
+    def group_name(self) -> str | None:
+        attributes: dict[str, Any] = (self.group and self.group.attributes) or {}
+        return attributes.get("name")
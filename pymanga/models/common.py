@@ -1,7 +1,8 @@
-from typing import Generic, TypeVar
-from pydantic import BaseModel
+from functools import cache
+from typing import Any, Generic, TypeVar
+from pydantic import BaseModel, TypeAdapter
 
-__all__: list[str] = ["Response"]
+__all__: list[str] = ["Response", "response_adapter"]
 
 T = TypeVar("T")
 
@@ -13,3 +14,17 @@ class Response(BaseModel, Generic[T]):
     limit: int
     offset: int
     total: int
+
+
+@cache
+def response_adapter(model: type[BaseModel]) -> TypeAdapter[Response[Any]]:
+    """Builds the validator of the responses listing a model, once per model.
+
+    Args:
+        model: The model of the items.
+
+    Returns:
+        The validator of the responses.
+    """
+
+    return TypeAdapter(Response[model])  # type: ignore[valid-type]
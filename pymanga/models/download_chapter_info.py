@@ -1,13 +1,33 @@
 from __future__ import annotations
 import asyncio
+from dataclasses import dataclass, field
 from pathlib import Path
-import shutil
-import tempfile
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+from urllib.parse import urlsplit
 import httpx
 from pydantic import BaseModel, Field
-from pymanga.exception import DownloadImageError
+from pymanga.archive import CbzWriter
+from pymanga.buffers import CHUNK_SIZE, ByteBudget, PageBuffer
+from pymanga.checkpoint import ChapterCheckpoint
+from pymanga.exception import DownloadImageError, MangadexClientError
+from pymanga.integrity import check_file
+from pymanga.metrics import Metrics
+from pymanga.mirrors import MirrorRanking
+from pymanga.ratelimit import RateLimiter, default_rate_limiter
+from pymanga.report import PageReport, ReportQueue
+from pymanga.shaping import BandwidthShaper, FairSemaphore
+from pymanga.transcode import TranscodeOptions
+from pymanga.workers import WorkerPool, process_page
 
-__all__: list[str] = ["Chapter", "DownloadInfo"]
+__all__: list[str] = [
+    "ChapterLinks",
+    "DownloadInfo",
+    "DownloadOptions",
+    "ChapterDownload",
+]
+
+T = TypeVar("T")
 
 
 class ChapterLinks(BaseModel):
@@ -21,32 +41,24 @@ class DownloadInfo(BaseModel):
     base_url: str = Field(..., alias="baseUrl")
     chapter: ChapterLinks
 
-    async def _download(
-        self,
-        url: str,
-        session: httpx.AsyncClient,
-        tmp_dir: Path,
-        semaphore: asyncio.Semaphore,
-    ) -> None:
-        """Download the image from the url and save it to the tmp_dir.
+    def url(self, index: int, data_saver: bool = False) -> str:
+        """Builds the url of a page on the current at-home node.
 
         Args:
-            url (str): The url of the image to download.
-            session: The httpx.AsyncClient session to use for the download.
-            tmp_dir: The temporary directory to save the image.
-            semaphore: The semaphore to use for the download.
+            index: The index of the page in the chapter.
+            data_saver: If True, build the url of the data saver page.
+
+        Returns:
+            The url of the page.
         """
 
-        async with semaphore:
-            print(f"Downloading {url}")
-            try:
-                response: httpx.Response = await session.get(url)
-                response.raise_for_status()
-            except httpx.HTTPError as e:
-                print(f"Failed to download {url}: {e}")
-                raise DownloadImageError(f"Failed to download {url}")
-            tmp_file: Path = tmp_dir / url.split("/")[-1]
-            tmp_file.write_bytes(response.content)
+        filenames: list[str] = (
+            self.chapter.data_saver if data_saver else self.chapter.data
+        )
+        return (
+            f"{self.base_url}/{'data-saver' if data_saver else 'data'}"
+            f"/{self.chapter.hash}/{filenames[index]}"
+        )
 
     async def download(
         self,
@@ -54,35 +66,456 @@ class DownloadInfo(BaseModel):
         chapter_name: str,
         session: httpx.AsyncClient,
         data_saver: bool = False,
+        *,
+        options: DownloadOptions | None = None,
+        chapter_id: str | None = None,
+        refresh: Callable[[], Awaitable[DownloadInfo]] | None = None,
     ) -> None:
         """Downloads the chapter images and saves them as a cbz file.
 
+        When the id of the chapter is given, the progress is checkpointed so a
+        failed download resumes from the pages it already has on the next run.
+
         Args:
             output: The output directory to save the images.
             chapter_name: The name of the chapter.
             session: The httpx.AsyncClient session to use for the download.
             data_saver: If True, download the data saver images.
+            options: The options shared between the chapters downloaded
+                concurrently. Defaults to 5 images at a time, the archive and
+                pages being written from a thread.
+            chapter_id: The id of the chapter, to checkpoint the download.
+                Defaults to None.
+            refresh: Requests a new at-home node for the chapter, when the current
+                one is failing. Defaults to None, no failover.
         """
 
         output.mkdir(parents=True, exist_ok=True)
-        urls: list[str] = (
-            self.chapter.data if not data_saver else self.chapter.data_saver
+        checkpoint: ChapterCheckpoint | None = None
+        if chapter_id is not None:
+            checkpoint = ChapterCheckpoint.for_chapter(
+                output, chapter_id, self.chapter.hash
+            )
+        options = options or DownloadOptions()
+        writer: CbzWriter = CbzWriter(
+            (output / chapter_name).with_suffix(".cbz"),
+            checkpoint.archive if checkpoint else None,
+            resumable=checkpoint is not None,
+        )
+        await _offload(options.archive_pool, writer.open)
+        try:
+            await ChapterDownload(
+                self, session, writer, options, data_saver, checkpoint, refresh
+            ).run()
+        except BaseException:
+            # Shielded, so a second cancellation cannot leave the archive open.
+            await asyncio.shield(_offload(options.archive_pool, writer.finish, False))
+            raise
+        await _offload(
+            options.archive_pool,
+            options.metrics.timed(
+                "pymanga_archive_seconds", writer.finish, step="finish"
+            ),
+            True,
+        )
+        if checkpoint is not None:
+            await _offload(options.archive_pool, checkpoint.remove)
+
+
+async def _offload(pool: WorkerPool | None, func: Callable[..., T], *args: Any) -> T:
+    """Runs a blocking function in a pool, or in a thread without one.
+
+    Args:
+        pool: The pool to run the function in.
+        func: The blocking function.
+        *args: The arguments of the function.
+
+    Returns:
+        The result of the function.
+    """
+
+    if pool is None:
+        return await asyncio.to_thread(func, *args)
+    return await pool.run(func, *args)
+
+
+async def _submit(
+    pool: WorkerPool | None, func: Callable[..., T], *args: Any
+) -> asyncio.Future[T]:
+    """Hands a blocking function over to a pool, or to a thread without one.
+
+    Args:
+        pool: The pool to run the function in.
+        func: The blocking function.
+        *args: The arguments of the function.
+
+    Returns:
+        The future of the result.
+    """
+
+    if pool is None:
+        return asyncio.ensure_future(asyncio.to_thread(func, *args))
+    return await pool.submit(func, *args)
+
+
+@dataclass
+class DownloadOptions:
+    semaphore: asyncio.Semaphore | FairSemaphore = field(
+        default_factory=lambda: asyncio.Semaphore(5)
+    )
+    archive_pool: WorkerPool | None = None
+    page_pool: WorkerPool | None = None
+    transcode: TranscodeOptions | None = None
+    rate_limiter: RateLimiter = field(default_factory=default_rate_limiter)
+    mirrors: MirrorRanking | None = None
+    reports: ReportQueue | None = None
+    max_attempts: int = 3
+    max_refreshes: int = 3
+    data_saver_fallback: bool = False
+    metrics: Metrics = field(default_factory=Metrics)
+    buffers: ByteBudget = field(default_factory=ByteBudget)
+    bandwidth: BandwidthShaper | None = None
+
+    def __post_init__(self) -> None:
+        if self.max_attempts < 1:
+            raise ValueError("A page must be attempted at least once.")
+
+
+@dataclass
+class ChapterDownload:
+    """Downloads the pages of a chapter into its archive.
+
+    A failing page is retried on a new at-home node, requested once for all the
+    pages that failed on the same node, and on its data saver variant for the
+    last attempt if enabled. The node is also replaced as soon as the session
+    ranks it as bad.
+    """
+
+    info: DownloadInfo
+    session: httpx.AsyncClient
+    writer: CbzWriter
+    options: DownloadOptions
+    data_saver: bool = False
+    checkpoint: ChapterCheckpoint | None = None
+    refresh: Callable[[], Awaitable[DownloadInfo]] | None = None
+    refreshes: int = field(default=0, init=False)
+    _refreshing: asyncio.Task[None] | None = field(default=None, init=False)
+
+    async def _fetch(self, url: str, index: int, resume: bool) -> PageBuffer:
+        """Streams a page into a buffer, resuming its interrupted transfer if any.
+
+        Args:
+            url: The url of the page.
+            index: The index of the page in the chapter.
+            resume: If True, resume the transfer saved by the checkpoint and save
+                it again if interrupted.
+
+        Returns:
+            The buffer holding the page, to close once the page is written.
+        """
+
+        checkpoint: ChapterCheckpoint | None = self.checkpoint if resume else None
+        rate_limiter: RateLimiter = self.options.rate_limiter
+        buffer: PageBuffer = PageBuffer(self.options.buffers)
+        try:
+            if checkpoint is not None:
+                buffer.write(
+                    await _offload(
+                        self.options.archive_pool, checkpoint.load_page, index
+                    )
+                )
+            await self._stream(url, index, buffer, checkpoint, rate_limiter)
+        except BaseException:
+            buffer.close()
+            raise
+        return buffer
+
+    async def _stream(
+        self,
+        url: str,
+        index: int,
+        buffer: PageBuffer,
+        checkpoint: ChapterCheckpoint | None,
+        rate_limiter: RateLimiter,
+    ) -> None:
+        """Receives a page a chunk at a time, after the bytes already buffered.
+
+        A transfer shorter than its `Content-Length` is saved to be resumed, and
+        a page that is not a whole image once received is dropped, both failing
+        the attempt so the page is fetched again.
+
+        Args:
+            url: The url of the page.
+            index: The index of the page in the chapter.
+            buffer: The buffer receiving the page.
+            checkpoint: The checkpoint saving the page if interrupted, if any.
+            rate_limiter: The rate limiter of the at-home nodes.
+        """
+
+        headers: dict[str, str] = (
+            {"Range": f"bytes={buffer.size}-"} if buffer.size else {}
         )
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path: Path = Path(temp_dir)
-            semaphore: asyncio.Semaphore = asyncio.Semaphore(5)
-            await asyncio.gather(
-                *[
-                    self._download(
-                        f"{self.base_url}/{'data-saver' if data_saver else 'data'}"
-                        f"/{self.chapter.hash}/{url}",
-                        session,
-                        temp_path,
-                        semaphore,
+        received: int = 0
+        latency: float | None = None
+        cached: bool = False
+        status: str = "error"
+        start: float = time.monotonic()
+        try:
+            async with rate_limiter.limit("at-home"):
+                async with self.session.stream("GET", url, headers=headers) as response:
+                    latency = time.monotonic() - start
+                    status = str(response.status_code)
+                    cached = response.headers.get("X-Cache", "").startswith("HIT")
+                    rate_limiter.observe("at-home", response, latency=latency)
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        buffer.clear()
+                    length: str | None = response.headers.get("Content-Length")
+                    try:
+                        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                            buffer.write(chunk)
+                            received += len(chunk)
+                            await self._shape(len(chunk))
+                        if (
+                            length is not None
+                            and "Content-Encoding" not in response.headers
+                            and received != int(length)
+                        ):
+                            raise httpx.RemoteProtocolError(
+                                f"Received {received} of {length} bytes"
+                            )
+                    except httpx.HTTPError:
+                        if checkpoint is not None:
+                            await _offload(
+                                self.options.archive_pool,
+                                checkpoint.save_page,
+                                index,
+                                buffer.read(),
+                            )
+                        raise
+                    if problem := check_file(buffer.file):
+                        self.options.metrics.increment(
+                            "pymanga_corrupted_pages_total", host=urlsplit(url).netloc
+                        )
+                        raise httpx.DecodingError(f"Corrupted page: {problem}")
+        except httpx.HTTPError as e:
+            self._report(url, None, received, time.monotonic() - start, cached, status)
+            if checkpoint is not None and (
+                isinstance(e, httpx.DecodingError)
+                or isinstance(e, httpx.HTTPStatusError)
+                and e.response.status_code == 416
+            ):
+                await _offload(self.options.archive_pool, checkpoint.clear_page, index)
+            raise
+        self._report(url, latency, received, time.monotonic() - start, cached, status)
+
+    async def _shape(self, size: int) -> None:
+        """Waits for the bytes received to fit in the bandwidth, if limited.
+
+        Args:
+            size: The number of bytes received.
+        """
+
+        if self.options.bandwidth is None:
+            return
+        if waited := await self.options.bandwidth.consume(size):
+            self.options.metrics.increment("pymanga_shaped_seconds_total", waited)
+
+    def _report(
+        self,
+        url: str,
+        latency: float | None,
+        size: int,
+        duration: float,
+        cached: bool,
+        status: str = "error",
+    ) -> None:
+        """Records the outcome of a page request for the metrics, the node stats
+        and the reports.
+
+        Args:
+            url: The url of the page.
+            latency: The time to the response headers in seconds, None if the
+                request failed.
+            size: The number of bytes received.
+            duration: The time spent on the whole request in seconds.
+            cached: True if the node served the page from its cache.
+            status: The status code of the response, `error` if none was
+                received. Defaults to `error`.
+        """
+
+        metrics: Metrics = self.options.metrics
+        host: str = urlsplit(url).netloc
+        metrics.observe("pymanga_request_seconds", duration, endpoint="at-home")
+        metrics.increment("pymanga_requests_total", endpoint="at-home", status=status)
+        metrics.increment("pymanga_received_bytes_total", size, host=host)
+        if status == "429":
+            metrics.increment("pymanga_throttled_total", host=host)
+
+        if self.options.mirrors is not None:
+            self.options.mirrors.record(url, latency)
+        if self.options.reports is not None:
+            self.options.reports.put(
+                PageReport(url, latency is not None, size, duration, cached)
+            )
+
+    async def _switch_node(self, base_url: str) -> None:
+        """Replaces the at-home node of the chapter.
+
+        Pages failing on the same node wait for a single refresh, and a node
+        already replaced is not replaced again.
+
+        Args:
+            base_url: The base url of the node to replace.
+        """
+
+        if self.refresh is None or self.info.base_url != base_url:
+            return
+        if self._refreshing is None:
+            if self.refreshes >= self.options.max_refreshes:
+                return
+            self.refreshes += 1
+            self._refreshing = asyncio.create_task(self._refresh())
+        await asyncio.shield(self._refreshing)
+
+    async def _refresh(self) -> None:
+        assert self.refresh is not None
+        try:
+            self.info.base_url = (await self.refresh()).base_url
+        except MangadexClientError as e:
+            print(f"Failed to replace {self.info.base_url}: {e}")
+        finally:
+            self._refreshing = None
+
+    async def download_page(self, index: int) -> None:
+        """Downloads a page, on another node if needed, into the archive.
+
+        The page streams into a buffer bounded by the memory budget, then from
+        the buffer into the archive. A transcoded page is read whole instead,
+        its bytes taken from the budget before it is read and until it is
+        written, and keeps its download slot until the page pool takes it over,
+        so the downloads only wait for the processing when the pool is full.
+
+        Args:
+            index: The index of the page in the chapter.
+        """
+
+        if self.writer.has(index):
+            return
+        metrics: Metrics = self.options.metrics
+        budget: ByteBudget = self.options.buffers
+        with metrics.span("page", index=index):
+            processing: asyncio.Future[tuple[str, list[tuple[bytes, str]]]] | None = (
+                None
+            )
+            held: int = 0
+            async with self.options.semaphore:
+                for attempt in range(self.options.max_attempts):
+                    base_url: str = self.info.base_url
+                    fallback: bool = (
+                        self.options.data_saver_fallback
+                        and not self.data_saver
+                        and attempt > 0
+                        and attempt == self.options.max_attempts - 1
+                    )
+                    data_saver: bool = self.data_saver or fallback
+                    url: str = self.info.url(index, data_saver)
+                    try:
+                        buffer: PageBuffer = await self._fetch(url, index, not fallback)
+                        break
+                    except httpx.HTTPError as e:
+                        print(f"Failed to download {url}: {e}")
+                        if attempt == self.options.max_attempts - 1:
+                            raise DownloadImageError(f"Failed to download {url}")
+                        metrics.increment("pymanga_retries_total", endpoint="at-home")
+                        await self._switch_node(base_url)
+                filename: str = url.split("/")[-1]
+                try:
+                    if (
+                        self.options.mirrors is not None
+                        and self.options.mirrors.is_bad(base_url)
+                    ):
+                        await self._switch_node(base_url)
+                    if self.options.transcode is not None:
+                        with buffer:
+                            held = await buffer.hold()
+                            content: bytes = buffer.read()
+                        processing = await _submit(
+                            self.options.page_pool,
+                            process_page,
+                            content,
+                            filename,
+                            self.options.transcode,
+                        )
+                except BaseException:
+                    buffer.close()
+                    budget.release(held)
+                    raise
+                if self.options.page_pool is not None and processing is not None:
+                    metrics.gauge(
+                        "pymanga_queue_depth",
+                        self.options.page_pool.pending,
+                        queue="pages",
+                    )
+            try:
+                if processing is None:
+                    with buffer:
+                        await _offload(
+                            self.options.archive_pool,
+                            metrics.timed(
+                                "pymanga_archive_seconds",
+                                self.writer.write_file,
+                                step="write",
+                            ),
+                            index,
+                            filename,
+                            buffer.file,
+                        )
+                else:
+                    filename, parts = await processing
+                    await _offload(
+                        self.options.archive_pool,
+                        metrics.timed(
+                            "pymanga_archive_seconds",
+                            self.writer.write_parts,
+                            step="write",
+                        ),
+                        index,
+                        filename,
+                        parts,
                     )
-                    for url in urls
-                ]
+            finally:
+                budget.release(held)
+            if self.checkpoint is not None:
+                await _offload(
+                    self.options.archive_pool, self.checkpoint.clear_page, index
+                )
+
+    async def run(self) -> None:
+        """Downloads every page, cancelling the others when one fails.
+
+        Raises:
+            DownloadImageError: If a page failed, or the archive does not hold
+                every page of the chapter links.
+        """
+
+        pages: int = len(
+            self.info.chapter.data_saver if self.data_saver else self.info.chapter.data
+        )
+        tasks: list[asyncio.Task] = [
+            asyncio.create_task(self.download_page(index)) for index in range(pages)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        missing: list[int] = [
+            index for index in range(pages) if not self.writer.has(index)
+        ]
+        if missing:
+            raise DownloadImageError(
+                f"Missing {len(missing)} of {pages} pages in the archive"
             )
-            zip_path: Path = output / chapter_name
-            zip_file: str = shutil.make_archive(zip_path.as_posix(), "zip", temp_dir)
-            Path(zip_file).rename(zip_path.with_suffix(".cbz"))
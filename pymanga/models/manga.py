@@ -7,8 +7,10 @@ __all__: list[str] = [
     "Links",
     "TagAttributes",
     "Tag",
+    "SummaryAttributes",
     "Attributes",
     "Relationship",
+    "MangaSummary",
     "Manga",
 ]
 
@@ -61,9 +63,13 @@ class Tag(BaseModel):
     relationships: list[Relationship]
 
 
-class Attributes(BaseModel):
+class SummaryAttributes(BaseModel):
     title: dict[str, str]
     alt_titles: list[dict[str, str]] = Field(..., alias="altTitles")
+    created_at: str = Field(..., alias="createdAt")
+
+
+class Attributes(SummaryAttributes):
     description: Description
     is_locked: bool = Field(..., alias="isLocked")
     links: Links | None = None
@@ -79,7 +85,6 @@ class Attributes(BaseModel):
     chapter_numbers_reset_on_new_volume: bool = Field(
         ..., alias="chapterNumbersResetOnNewVolume"
     )
-    created_at: str = Field(..., alias="createdAt")
     updated_at: str = Field(..., alias="updatedAt")
     version: int
     available_translated_languages: list[str | None] = Field(
@@ -94,8 +99,19 @@ class Relationship(BaseModel):
     related: str | None = None
 
 
-class Manga(BaseModel):
+class MangaSummary(BaseModel):
+    """The fields of a manga needed to pick it from a listing, and to page
+    through a listing past the offset ceiling by creation date.
+
+    The other fields of the response are skipped instead of validated, which
+    makes long search results much cheaper to go through.
+    """
+
     id: str
     type: str
+    attributes: SummaryAttributes
+
+
+class Manga(MangaSummary):
     attributes: Attributes
     relationships: list[Relationship]
@@ -0,0 +1,313 @@
+from __future__ import annotations
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+import random
+import time
+from typing import AsyncIterator
+import httpx
+
+__all__: list[str] = [
+    "Backoff",
+    "TokenBucket",
+    "AdaptiveConcurrency",
+    "RateLimiter",
+    "default_rate_limiter",
+]
+
+
+@dataclass
+class TokenBucket:
+    """Spaces out requests to stay under `rate` requests per second.
+
+    Tokens may go negative: each reservation takes its token right away and
+    waits for the debt to be refilled, which keeps concurrent callers in line
+    without needing a lock.
+    """
+
+    rate: float
+    capacity: float
+    tokens: float = field(init=False)
+    updated: float = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Takes tokens from the bucket.
+
+        Args:
+            tokens: The number of tokens to take.
+
+        Returns:
+            The number of seconds to wait before the tokens can be used.
+        """
+
+        self._refill(time.monotonic())
+        self.tokens -= tokens
+        return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Waits until tokens are available.
+
+        Args:
+            tokens: The number of tokens to take.
+        """
+
+        delay: float = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Empties the bucket so no token is available for the given time.
+
+        Args:
+            seconds: The number of seconds to pause the bucket for.
+        """
+
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, -self.rate * seconds)
+
+
+@dataclass
+class AdaptiveConcurrency:
+    """Bounds the number of requests in flight, adapting the bound to the server.
+
+    The limit grows additively while requests answer under `latency_target` and
+    shrinks multiplicatively on slow answers and on errors.
+    """
+
+    limit: float = 8.0
+    minimum: int = 1
+    maximum: int = 32
+    latency_target: float = 1.0
+    active: int = field(default=0, init=False)
+    _waiters: deque[asyncio.Future[None]] = field(
+        default_factory=deque, init=False, repr=False
+    )
+
+    def _wake(self) -> None:
+        free: int = int(self.limit) - self.active
+        while free > 0 and self._waiters:
+            waiter: asyncio.Future[None] = self._waiters.popleft()
+            if waiter.done() or waiter.get_loop().is_closed():
+                continue
+            waiter.set_result(None)
+            free -= 1
+
+    async def acquire(self) -> None:
+        """Waits for a free slot."""
+
+        while self.active >= int(self.limit):
+            waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+        self.active += 1
+
+    def release(self) -> None:
+        """Frees a slot."""
+
+        self.active -= 1
+        self._wake()
+
+    def record_latency(self, latency: float) -> None:
+        """Adapts the limit to the latency of a successful request.
+
+        Args:
+            latency: The duration of the request, in seconds.
+        """
+
+        if latency <= self.latency_target:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        else:
+            self.limit = max(self.minimum, self.limit * 0.9)
+        self._wake()
+
+    def record_failure(self) -> None:
+        """Halves the limit after a failed or throttled request."""
+
+        self.limit = max(self.minimum, self.limit / 2)
+
+
+@dataclass(frozen=True)
+class Backoff:
+    """Spaces out the retries of the requests the server could not answer.
+
+    Throttled and failed requests, answered with a 429 or 5xx status, are retried
+    after a random delay of up to `base` seconds doubled on every attempt and
+    capped at `cap` seconds, so the clients failing together do not retry
+    together.
+    """
+
+    base: float = 0.5
+    cap: float = 30.0
+
+    @staticmethod
+    def retryable(response: httpx.Response) -> bool:
+        return response.status_code == 429 or response.status_code >= 500
+
+    def delay(self, attempt: int) -> float:
+        """Draws the delay before retrying a request.
+
+        Args:
+            attempt: The number of the failed attempt, from 0.
+
+        Returns:
+            The number of seconds to wait.
+        """
+
+        return random.uniform(0.0, min(self.cap, self.base * 2**attempt))
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    """Reads how long to wait before the next request from the response headers.
+
+    Args:
+        response: The response to read the headers from.
+
+    Returns:
+        The number of seconds to wait, or None if the headers do not say.
+    """
+
+    if (value := response.headers.get("Retry-After")) is not None:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    if response.headers.get("X-RateLimit-Remaining") == "0" or (
+        response.status_code == 429
+    ):
+        if (value := response.headers.get("X-RateLimit-Retry-After")) is not None:
+            try:
+                return max(0.0, float(value) - time.time())
+            except ValueError:
+                pass
+    if response.status_code == 429:
+        return 1.0
+    return None
+
+
+@dataclass
+class RateLimiter:
+    """Rate limits and bounds the concurrency of requests per host.
+
+    Every host has a token bucket and an adaptive concurrency, some endpoints
+    have an additional bucket of their own.
+    """
+
+    buckets: dict[str, TokenBucket]
+    concurrency: dict[str, AdaptiveConcurrency]
+
+    def split(self, shares: int) -> None:
+        """Divides the rates between the processes sharing the same address.
+
+        Args:
+            shares: The number of processes sending requests from the machine.
+        """
+
+        for bucket in self.buckets.values():
+            bucket.rate /= shares
+            bucket.capacity = max(1.0, bucket.capacity / shares)
+            bucket.tokens = min(bucket.tokens, bucket.capacity)
+
+    @asynccontextmanager
+    async def limit(
+        self, host: str, endpoint: str | None = None
+    ) -> AsyncIterator[None]:
+        """Waits for the host, and the endpoint if any, to accept a request.
+
+        Args:
+            host: The key of the host the request is sent to.
+            endpoint: The key of the endpoint the request is sent to, if it has a
+                bucket of its own. Defaults to None.
+        """
+
+        concurrency: AdaptiveConcurrency = self.concurrency[host]
+        await concurrency.acquire()
+        try:
+            await self.buckets[host].acquire()
+            if endpoint is not None:
+                await self.buckets[endpoint].acquire()
+            try:
+                yield
+            except httpx.HTTPStatusError:
+                raise
+            except httpx.HTTPError:
+                concurrency.record_failure()
+                raise
+        finally:
+            concurrency.release()
+
+    def observe(
+        self,
+        host: str,
+        response: httpx.Response,
+        endpoint: str | None = None,
+        latency: float | None = None,
+    ) -> float | None:
+        """Updates the limits of the host from a response.
+
+        Args:
+            host: The key of the host the request was sent to.
+            response: The response of the request.
+            endpoint: The key of the endpoint the request was sent to, if it has a
+                bucket of its own. Defaults to None.
+            latency: The latency of the request, for streamed responses whose
+                body is not read yet. Defaults to the elapsed time of the response.
+
+        Returns:
+            The number of seconds the host asked to wait, or None.
+        """
+
+        concurrency: AdaptiveConcurrency = self.concurrency[host]
+        if response.status_code == 429 or response.status_code >= 500:
+            concurrency.record_failure()
+        else:
+            concurrency.record_latency(
+                latency if latency is not None else response.elapsed.total_seconds()
+            )
+        delay: float | None = _retry_after(response)
+        if delay is not None:
+            self.buckets[endpoint or host].pause(delay)
+        return delay
+
+
+_rate_limiter: RateLimiter | None = None
+
+
+def default_rate_limiter() -> RateLimiter:
+    """Returns the rate limiter shared by the whole process.
+
+    The API allows around 5 requests per second per IP, and 40 requests per
+    minute on the at-home server endpoint.
+    """
+
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(
+            buckets={
+                "api": TokenBucket(rate=5, capacity=5),
+                "at-home-server": TokenBucket(rate=40 / 60, capacity=40),
+                "at-home": TokenBucket(rate=20, capacity=20),
+            },
+            concurrency={
+                "api": AdaptiveConcurrency(limit=5, maximum=10),
+                "at-home": AdaptiveConcurrency(limit=10, maximum=32),
+            },
+        )
+    return _rate_limiter
@@ -0,0 +1,158 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass, field
+from types import TracebackType
+from typing import Awaitable, Callable
+from urllib.parse import urlparse
+import httpx
+
+__all__: list[str] = ["PageReport", "ReportSink", "AtHomeReporter", "ReportQueue"]
+
+REPORT_URL: str = "https://api.mangadex.network/report"
+
+
+@dataclass
+class PageReport:
+    url: str
+    success: bool
+    size: int
+    duration: float
+    cached: bool = False
+
+    def payload(self) -> dict[str, str | bool | int]:
+        """Builds the body expected by the MangaDex@Home report endpoint.
+
+        Returns:
+            The report, with its duration in milliseconds.
+        """
+
+        return {
+            "url": self.url,
+            "success": self.success,
+            "cached": self.cached,
+            "bytes": self.size,
+            "duration": round(self.duration * 1000),
+        }
+
+
+ReportSink = Callable[[list[PageReport]], Awaitable[None]]
+
+
+@dataclass
+class AtHomeReporter:
+    """Sends the page reports to the MangaDex@Home network.
+
+    The pages served by the MangaDex servers themselves are not part of the
+    network and are not reported.
+    """
+
+    session: httpx.AsyncClient
+    url: str = REPORT_URL
+    excluded_hosts: tuple[str, ...] = ("mangadex.org",)
+
+    def _reported(self, report: PageReport) -> bool:
+        host: str = urlparse(report.url).hostname or ""
+        return not any(
+            host == excluded or host.endswith(f".{excluded}")
+            for excluded in self.excluded_hosts
+        )
+
+    async def __call__(self, reports: list[PageReport]) -> None:
+        for report in filter(self._reported, reports):
+            try:
+                response: httpx.Response = await self.session.post(
+                    self.url, json=report.payload()
+                )
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                print(f"Failed to report {report.url}: {e}")
+
+
+@dataclass
+class ReportQueue:
+    """Hands the page reports over to a sink in batches, off the download path.
+
+    Adding a report never waits: when `max_pending` reports are already waiting
+    for the sink, the new one is dropped and counted in `dropped`. A batch is
+    sent once `batch_size` reports are waiting or `flush_interval` seconds after
+    its first report.
+    """
+
+    sink: ReportSink
+    batch_size: int = 50
+    flush_interval: float = 5.0
+    max_pending: int = 1000
+    dropped: int = field(default=0, init=False)
+    _queue: asyncio.Queue[PageReport | None] | None = field(default=None, init=False)
+    _task: asyncio.Task[None] | None = field(default=None, init=False)
+
+    def put(self, report: PageReport) -> None:
+        """Adds a report to the queue without waiting.
+
+        Args:
+            report: The report of a page download.
+        """
+
+        if self._queue is None:
+            raise ValueError("The report queue is not started.")
+        try:
+            self._queue.put_nowait(report)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run(self, queue: asyncio.Queue[PageReport | None]) -> None:
+        """Sends the reports in batches until the queue is closed.
+
+        Args:
+            queue: The queue of the pending reports, closed by None.
+        """
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        closed: bool = False
+        while not closed:
+            report: PageReport | None = await queue.get()
+            if report is None:
+                break
+            batch: list[PageReport] = [report]
+            deadline: float = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    report = await asyncio.wait_for(queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                if report is None:
+                    closed = True
+                    break
+                batch.append(report)
+            try:
+                await self.sink(batch)
+            except Exception as e:
+                print(f"Failed to send {len(batch)} reports: {e}")
+
+    async def start(self) -> None:
+        """Starts sending the reports in the background."""
+
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._run(self._queue))
+
+    async def close(self) -> None:
+        """Sends the reports still pending then stops the background task."""
+
+        if self._queue is None or self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._queue = None
+        self._task = None
+
+    async def __aenter__(self) -> ReportQueue:
+        await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.close()
@@ -0,0 +1,359 @@
+from __future__ import annotations
+import asyncio
+import contextlib
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, Iterable
+import zipfile
+from pymanga.buffers import ByteBudget
+from pymanga.checkpoint import ChapterCheckpoint
+from pymanga.client import Client
+from pymanga.exception import DownloadImageError, MangadexClientError
+from pymanga.index import ChapterIndex, IndexedChapter
+from pymanga.integrity import salvage
+from pymanga.metrics import Metrics, MetricsExporter
+from pymanga.mirrors import MirrorRanking
+from pymanga.models.chapter import Chapter
+from pymanga.models.download_chapter_info import DownloadInfo, DownloadOptions
+from pymanga.report import AtHomeReporter, ReportQueue, ReportSink
+from pymanga.session import SessionSettings
+from pymanga.shaping import BandwidthSchedule, BandwidthShaper, FairSemaphore
+from pymanga.transcode import TranscodeOptions
+from pymanga.workers import WorkerPool
+
+__all__: list[str] = ["DownloadSettings", "ChapterJob", "DownloadScheduler"]
+
+
+@dataclass
+class DownloadSettings:
+    chapter_concurrency: int = 3
+    image_concurrency: int = 10
+    archive_workers: int = 2
+    page_workers: int = 2
+    memory_budget: int = 64 * 2**20
+    process_pages: bool = False
+    transcode: TranscodeOptions | None = None
+    cache_dir: Path | None = None
+    refresh_cache: bool = False
+    max_attempts: int = 3
+    data_saver_fallback: bool = False
+    report: bool = True
+    sessions: SessionSettings = field(default_factory=SessionSettings)
+    api_url: str = "https://api.mangadex.org"
+    metrics_path: Path | None = None
+    trace_path: Path | None = None
+    metrics_interval: float = 15.0
+    bandwidth: BandwidthSchedule | None = None
+
+
+@dataclass(slots=True)
+class ChapterJob:
+    chapter_id: str
+    name: str
+    version: int | None = None
+    updated_at: str | None = None
+    series: str | None = None
+    weight: float = 1.0
+    salvage: str | None = None
+
+    @property
+    def flow(self) -> str:
+        return self.series or self.chapter_id
+
+    @classmethod
+    def from_chapter(cls, chapter: Chapter, manga_title: str | None) -> ChapterJob:
+        """Builds the job of a chapter, named after its number and titles.
+
+        Args:
+            chapter: The chapter to download.
+            manga_title: The title of the manga of the chapter.
+
+        Returns:
+            The job downloading the chapter.
+        """
+
+        name: str = (
+            f"{chapter.attributes.chapter} - {manga_title} -{chapter.attributes.title}"
+        )
+        return cls(
+            chapter.id,
+            name.replace(".", ",").replace("/", ","),
+            chapter.attributes.version,
+            chapter.attributes.updated_at,
+            chapter.manga.id if chapter.manga else None,
+        )
+
+
+async def _iterate(
+    items: Iterable[ChapterJob] | AsyncIterable[ChapterJob],
+) -> AsyncIterator[ChapterJob]:
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+@dataclass
+class DownloadScheduler:
+    client: Client
+    output: Path
+    settings: DownloadSettings = field(default_factory=DownloadSettings)
+    data_saver: bool = False
+    mirrors: MirrorRanking = field(default_factory=MirrorRanking)
+    report_sink: ReportSink | None = None
+    index: ChapterIndex | None = None
+
+    def __post_init__(self) -> None:
+        if self.settings.chapter_concurrency < 1:
+            raise ValueError("At least one chapter must be downloaded at a time.")
+        if self.settings.image_concurrency < 1:
+            raise ValueError("At least one image must be downloaded at a time.")
+
+    async def _download_info(self, chapter_id: str) -> DownloadInfo:
+        """Retrieves the download information of a chapter, avoiding bad nodes.
+
+        The at-home server endpoint picks the node, so it is asked again while it
+        returns a node the session ranked as bad, a few times at most.
+
+        Args:
+            chapter_id: The id of the chapter.
+
+        Returns:
+            The download information of the chapter.
+        """
+
+        for _ in range(self.settings.max_attempts):
+            download_info: DownloadInfo = await self.client.get_chapter_download_info(
+                chapter_id
+            )
+            if not self.mirrors.is_bad(download_info.base_url):
+                break
+        return download_info
+
+    def _index(self, job: ChapterJob, download_info: DownloadInfo) -> None:
+        """Records a downloaded chapter, removing its previous download if renamed.
+
+        Args:
+            job: The chapter that was downloaded.
+            download_info: The download information of the chapter.
+        """
+
+        if self.index is None or job.version is None or job.updated_at is None:
+            return
+        path: Path = (self.output / job.name).with_suffix(".cbz")
+        try:
+            size: int = path.stat().st_size
+        except FileNotFoundError:
+            return
+        previous: IndexedChapter | None = self.index.get(job.chapter_id)
+        if previous is not None and Path(previous.path) != path:
+            Path(previous.path).unlink(missing_ok=True)
+        self.index.record(
+            IndexedChapter(
+                job.chapter_id,
+                job.version,
+                job.updated_at,
+                download_info.chapter.hash,
+                str(path),
+                size,
+            )
+        )
+
+    async def _salvage(self, job: ChapterJob, download_info: DownloadInfo) -> None:
+        """Seeds the checkpoint of a chapter with the intact pages of its damaged
+        archive, so only the other pages are downloaded again.
+
+        Nothing is kept from an archive of another version of the chapter.
+
+        Args:
+            job: The chapter to repair, with the path of its damaged archive.
+            download_info: The download information of the chapter.
+        """
+
+        if job.salvage is None:
+            return
+        indexed: IndexedChapter | None = (
+            self.index.get(job.chapter_id) if self.index is not None else None
+        )
+        if indexed is not None and indexed.hash not in (
+            None,
+            download_info.chapter.hash,
+        ):
+            return
+        checkpoint: ChapterCheckpoint = ChapterCheckpoint.for_chapter(
+            self.output, job.chapter_id, download_info.chapter.hash
+        )
+        if checkpoint.archive.exists():
+            return
+        pages: int = len(
+            download_info.chapter.data_saver
+            if self.data_saver
+            else download_info.chapter.data
+        )
+        kept: int = await asyncio.to_thread(
+            salvage, Path(job.salvage), checkpoint.archive, pages
+        )
+        print(f"Repairing | {job.name}: {pages - kept} of {pages} pages to download")
+
+    async def _lookup(
+        self,
+        jobs: Iterable[ChapterJob] | AsyncIterable[ChapterJob],
+        queue: asyncio.Queue[tuple[ChapterJob, DownloadInfo] | None],
+        failed: list[ChapterJob],
+    ) -> None:
+        """Retrieves the download information of the jobs ahead of the workers.
+
+        The queue is bounded, so at-home lookups only run a few chapters ahead of
+        the downloads and the returned base urls do not expire before being used.
+
+        Args:
+            jobs: The chapters to download, in order.
+            queue: The queue feeding the download workers.
+            failed: The list where the jobs that failed are stored.
+        """
+
+        async for job in _iterate(jobs):
+            try:
+                download_info: DownloadInfo = await self._download_info(job.chapter_id)
+            except MangadexClientError as e:
+                print(f"Failed | {job.name}: {e}")
+                failed.append(job)
+                continue
+            await queue.put((job, download_info))
+            self.client.metrics.gauge(
+                "pymanga_queue_depth", queue.qsize(), queue="chapters"
+            )
+        for _ in range(self.settings.chapter_concurrency):
+            await queue.put(None)
+
+    async def _worker(
+        self,
+        queue: asyncio.Queue[tuple[ChapterJob, DownloadInfo] | None],
+        options: DownloadOptions,
+        failed: list[ChapterJob],
+    ) -> None:
+        """Downloads the chapters from the queue until the lookup is exhausted.
+
+        A chapter whose pages cannot be downloaded, processed or archived fails
+        alone, the worker going on with the next one.
+
+        Args:
+            queue: The queue filled by the lookup stage.
+            options: The options shared by every chapter download.
+            failed: The list where the jobs that failed are stored.
+        """
+
+        metrics: Metrics = self.client.metrics
+        while (item := await queue.get()) is not None:
+            job, download_info = item
+            metrics.gauge("pymanga_queue_depth", queue.qsize(), queue="chapters")
+            print(f"Downloading | {job.name}")
+            try:
+                with (
+                    metrics.span("chapter", chapter=job.chapter_id, name=job.name),
+                    FairSemaphore.flow(job.flow, job.weight),
+                ):
+                    await self._salvage(job, download_info)
+                    await download_info.download(
+                        self.output,
+                        job.name,
+                        self.client.image_session,
+                        self.data_saver,
+                        options=options,
+                        chapter_id=job.chapter_id,
+                        refresh=partial(self._download_info, job.chapter_id),
+                    )
+            except (DownloadImageError, ValueError, OSError, zipfile.BadZipFile) as e:
+                print(f"Failed | {job.name}: {e}")
+                metrics.increment("pymanga_chapters_total", status="failed")
+                failed.append(job)
+                continue
+            metrics.increment("pymanga_chapters_total", status="downloaded")
+            self._index(job, download_info)
+
+    async def run(
+        self, jobs: Iterable[ChapterJob] | AsyncIterable[ChapterJob]
+    ) -> list[ChapterJob]:
+        """Downloads the chapters, looking up the next ones while downloading.
+
+        The image downloads are reported in the background while the chapters
+        run, to MangaDex@Home unless another sink is set. The archives are
+        written and the pages processed in worker pools shared by the chapters,
+        and the pages held in memory share a single budget. The image slots go
+        to the series, or the chapters without one, in turn by weight, and the
+        transfers keep to the bandwidth of the settings if any.
+        The metrics of the client are exported periodically if a path is set.
+
+        Args:
+            jobs: The chapters to download, in order. An asynchronous iterable
+                lets the downloads start before the whole listing is known.
+
+        Returns:
+            The jobs that could not be downloaded.
+
+        Raises:
+            MangadexClientError: If the listing of the chapters failed, the
+                chapters in progress being cancelled.
+        """
+
+        failed: list[ChapterJob] = []
+        queue: asyncio.Queue[tuple[ChapterJob, DownloadInfo] | None] = asyncio.Queue(
+            maxsize=self.settings.chapter_concurrency
+        )
+        reports: ReportQueue | None = None
+        if self.settings.report:
+            reports = ReportQueue(
+                self.report_sink or AtHomeReporter(self.client.session)
+            )
+        options: DownloadOptions = DownloadOptions(
+            semaphore=FairSemaphore(self.settings.image_concurrency),
+            archive_pool=WorkerPool(self.settings.archive_workers),
+            page_pool=WorkerPool(
+                self.settings.page_workers, self.settings.process_pages
+            ),
+            transcode=self.settings.transcode,
+            rate_limiter=self.client.rate_limiter,
+            mirrors=self.mirrors,
+            reports=reports,
+            max_attempts=self.settings.max_attempts,
+            data_saver_fallback=self.settings.data_saver_fallback,
+            metrics=self.client.metrics,
+            buffers=ByteBudget(self.settings.memory_budget),
+            bandwidth=(
+                BandwidthShaper(self.settings.bandwidth)
+                if self.settings.bandwidth is not None
+                else None
+            ),
+        )
+        exporter: MetricsExporter | None = None
+        if self.settings.metrics_path is not None:
+            exporter = MetricsExporter(
+                self.client.metrics,
+                self.settings.metrics_path,
+                self.settings.metrics_interval,
+            )
+        async with (
+            options.archive_pool,
+            options.page_pool,
+            reports or contextlib.nullcontext(),
+            exporter or contextlib.nullcontext(),
+        ):
+            tasks: list[asyncio.Task[None]] = [
+                asyncio.create_task(self._lookup(jobs, queue, failed)),
+                *[
+                    asyncio.create_task(self._worker(queue, options, failed))
+                    for _ in range(self.settings.chapter_concurrency)
+                ],
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                # A failed listing leaves the workers waiting on the queue.
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+        return failed
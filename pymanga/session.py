@@ -0,0 +1,91 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+import httpx
+
+try:
+    import h2
+except ImportError:  # pragma: no cover
+    h2 = None
+
+__all__: list[str] = ["PoolSettings", "SessionSettings"]
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Tunes the connection pool and timeouts of the requests to a kind of host.
+
+    Connections idle for `keepalive_expiry` seconds are closed, and at most
+    `max_keepalive_connections` are kept open between requests. The timeouts are
+    given per phase of a request, a None timeout waiting forever. The transport
+    retries the requests that could not connect `retries` times.
+    """
+
+    max_connections: int = 10
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    connect_timeout: float | None = 5.0
+    read_timeout: float | None = 30.0
+    write_timeout: float | None = 10.0
+    pool_timeout: float | None = 30.0
+    retries: int = 3
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+
+@dataclass(frozen=True)
+class SessionSettings:
+    """Configures the sessions of a client, one for the API and one for images.
+
+    The image pool is larger, in line with the concurrency allowed on the
+    at-home nodes, and never times out waiting for a connection since the
+    downloads already bound how many pages are requested at once. With `http2`,
+    the requests to a host are multiplexed over a single connection when the
+    host supports it.
+    """
+
+    http2: bool = False
+    api: PoolSettings = field(default_factory=lambda: PoolSettings(read_timeout=15.0))
+    images: PoolSettings = field(
+        default_factory=lambda: PoolSettings(
+            max_connections=32,
+            max_keepalive_connections=32,
+            keepalive_expiry=60.0,
+            pool_timeout=None,
+        )
+    )
+
+    def __post_init__(self) -> None:
+        if self.http2 and h2 is None:
+            raise ValueError("HTTP/2 requires h2, install pymanga[http2].")
+
+    def build(self, pool: PoolSettings) -> httpx.AsyncClient:
+        """Opens a session with the settings of a pool.
+
+        Args:
+            pool: The settings of the connection pool.
+
+        Returns:
+            The session, to be closed by its owner.
+        """
+
+        return httpx.AsyncClient(
+            timeout=pool.timeout,
+            transport=httpx.AsyncHTTPTransport(
+                http2=self.http2, limits=pool.limits, retries=pool.retries
+            ),
+        )
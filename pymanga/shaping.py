@@ -0,0 +1,328 @@
+from __future__ import annotations
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from datetime import datetime, time
+from types import TracebackType
+from typing import Generic, Iterator, TypeVar
+from pymanga.ratelimit import TokenBucket
+
+__all__: list[str] = [
+    "BandwidthWindow",
+    "BandwidthSchedule",
+    "BandwidthShaper",
+    "FairQueue",
+    "FairSemaphore",
+]
+
+T = TypeVar("T")
+
+BYTES_PER_MBIT: int = 125_000
+
+_current_flow: ContextVar[tuple[str, float]] = ContextVar(
+    "pymanga_flow", default=("", 1.0)
+)
+
+
+def _rate(value: str) -> float | None:
+    if value.strip().lower() in ("unlimited", "none"):
+        return None
+    rate: float = float(value)
+    if rate <= 0:
+        raise ValueError(f"A bandwidth must be positive: {value}")
+    return rate * BYTES_PER_MBIT
+
+
+def _time(value: str) -> time:
+    hours, _, minutes = value.strip().partition(":")
+    return time(int(hours), int(minutes or 0))
+
+
+@dataclass(frozen=True)
+class BandwidthWindow:
+    """Sets the bandwidth between two times of the day, over midnight if the end
+    comes first."""
+
+    start: time
+    end: time
+    rate: float | None
+
+    def includes(self, moment: time) -> bool:
+        if self.start <= self.end:
+            return self.start <= moment < self.end
+        return moment >= self.start or moment < self.end
+
+
+@dataclass(frozen=True)
+class BandwidthSchedule:
+    """The bandwidth of the image transfers, in bytes per second, at any time.
+
+    The first window including the time of the day wins, the default rate
+    applying outside of every window. A rate of None is unlimited.
+    """
+
+    rate: float | None = None
+    windows: tuple[BandwidthWindow, ...] = ()
+
+    @classmethod
+    def parse(cls, spec: str) -> BandwidthSchedule:
+        """Reads a schedule from its command line form.
+
+        The form is a comma separated list of a default rate and of windows,
+        `22:00-07:00=50` for instance, the rates being in Mbit/s or `unlimited`.
+
+        Args:
+            spec: The schedule, `8,22:00-07:00=unlimited` for instance.
+
+        Returns:
+            The schedule.
+
+        Raises:
+            ValueError: If a rate or a window is invalid.
+        """
+
+        rate: float | None = None
+        windows: list[BandwidthWindow] = []
+        for item in spec.split(","):
+            hours, separator, value = item.partition("=")
+            try:
+                if not separator:
+                    rate = _rate(item)
+                    continue
+                start, _, end = hours.partition("-")
+                windows.append(BandwidthWindow(_time(start), _time(end), _rate(value)))
+            except ValueError as e:
+                raise ValueError(f"{item!r}: {e}") from e
+        return cls(rate, tuple(windows))
+
+    def rate_at(self, moment: datetime) -> float | None:
+        """Finds the rate at a moment.
+
+        Args:
+            moment: The local date and time.
+
+        Returns:
+            The rate in bytes per second, None if unlimited.
+        """
+
+        for window in self.windows:
+            if window.includes(moment.time()):
+                return window.rate
+        return self.rate
+
+    def split(self, shares: int) -> BandwidthSchedule:
+        """Divides the rates between the processes sharing the bandwidth.
+
+        Args:
+            shares: The number of processes downloading from the machine.
+
+        Returns:
+            The schedule of each process.
+        """
+
+        def divide(rate: float | None) -> float | None:
+            return rate / shares if rate is not None else None
+
+        return BandwidthSchedule(
+            divide(self.rate),
+            tuple(replace(window, rate=divide(window.rate)) for window in self.windows),
+        )
+
+
+@dataclass
+class BandwidthShaper:
+    """Keeps the image transfers under the rate of a schedule.
+
+    A token bucket holds a second of transfer at the current rate, its rate
+    following the schedule as the time of the day changes.
+    """
+
+    schedule: BandwidthSchedule
+    bucket: TokenBucket | None = field(default=None, init=False)
+
+    async def consume(self, size: int) -> float:
+        """Waits for the bytes received to fit in the bandwidth.
+
+        Args:
+            size: The number of bytes received.
+
+        Returns:
+            The number of seconds waited.
+        """
+
+        rate: float | None = self.schedule.rate_at(datetime.now())
+        if rate is None:
+            return 0.0
+        if self.bucket is None:
+            self.bucket = TokenBucket(rate, rate)
+        elif self.bucket.rate != rate:
+            self.bucket.rate = self.bucket.capacity = rate
+            self.bucket.tokens = min(self.bucket.tokens, rate)
+        delay: float = self.bucket.reserve(size)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+@dataclass
+class _FairClock:
+    """Orders the flows by start-time fair queuing.
+
+    Every grant advances the virtual time of its flow by the inverse of its
+    weight, and the flow with the earliest virtual time goes next, so a flow of
+    weight 2 is served twice as often as a flow of weight 1.
+    """
+
+    virtual: float = 0.0
+    finish: dict[str, float] = field(default_factory=dict)
+
+    def start(self, flow: str) -> float:
+        return max(self.virtual, self.finish.get(flow, 0.0))
+
+    def next(self, flows: list[str]) -> str:
+        return min(flows, key=self.start)
+
+    def charge(self, flow: str, weight: float) -> None:
+        self.virtual = self.start(flow)
+        self.finish[flow] = self.virtual + 1 / weight
+        for name in [name for name, end in self.finish.items() if end <= self.virtual]:
+            del self.finish[name]
+
+
+@dataclass
+class FairQueue(Generic[T]):
+    """Queues items per flow, and hands them out interleaved by weight.
+
+    A flow holds `maxsize` items at most, unbounded if not positive, so a flow
+    filling up never keeps the others from queuing.
+    """
+
+    maxsize: int = 0
+    weights: dict[str, float] = field(default_factory=dict)
+    _flows: dict[str, deque[T]] = field(default_factory=dict, init=False)
+    _clock: _FairClock = field(default_factory=_FairClock, init=False)
+    _size: int = field(default=0, init=False)
+    _changed: asyncio.Condition = field(default_factory=asyncio.Condition, init=False)
+
+    def qsize(self) -> int:
+        return self._size
+
+    async def put(self, flow: str, item: T, weight: float = 1.0) -> None:
+        """Queues an item, waiting while its flow is full.
+
+        Args:
+            flow: The flow of the item.
+            item: The item.
+            weight: The weight of the flow. Defaults to 1.
+        """
+
+        async with self._changed:
+            await self._changed.wait_for(
+                lambda: self.maxsize <= 0
+                or len(self._flows.get(flow, ())) < self.maxsize
+            )
+            self.weights[flow] = weight
+            self._flows.setdefault(flow, deque()).append(item)
+            self._size += 1
+            self._changed.notify_all()
+
+    async def get(self) -> T:
+        """Takes the next item, from the flow whose turn it is.
+
+        Returns:
+            The item.
+        """
+
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._size > 0)
+            flow: str = self._clock.next(list(self._flows))
+            self._clock.charge(flow, self.weights.get(flow, 1.0))
+            items: deque[T] = self._flows[flow]
+            item: T = items.popleft()
+            if not items:
+                del self._flows[flow]
+            self._size -= 1
+            self._changed.notify_all()
+            return item
+
+
+@dataclass
+class FairSemaphore:
+    """Bounds the transfers in flight, handing the free slots out by flow.
+
+    The flow of a transfer is the one of the context it runs in, set by `flow`,
+    so the pages of every chapter started within it share its weight. A flow
+    waiting for a slot goes before a flow that got more than its share.
+    """
+
+    value: int
+    active: int = field(default=0, init=False)
+    _waiters: dict[str, deque[tuple[asyncio.Future[None], float]]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _clock: _FairClock = field(default_factory=_FairClock, init=False, repr=False)
+
+    @staticmethod
+    @contextmanager
+    def flow(name: str, weight: float = 1.0) -> Iterator[None]:
+        """Sets the flow of the transfers started within the context.
+
+        Args:
+            name: The name of the flow, the series or the chapter downloaded.
+            weight: The weight of the flow. Defaults to 1.
+        """
+
+        token = _current_flow.set((name, weight))
+        try:
+            yield
+        finally:
+            _current_flow.reset(token)
+
+    def _wake(self) -> None:
+        while self.active < self.value and self._waiters:
+            flow: str = self._clock.next(list(self._waiters))
+            waiters: deque[tuple[asyncio.Future[None], float]] = self._waiters[flow]
+            waiter, weight = waiters.popleft()
+            if not waiters:
+                del self._waiters[flow]
+            if waiter.done():
+                continue
+            self._clock.charge(flow, weight)
+            self.active += 1
+            waiter.set_result(None)
+
+    async def acquire(self) -> None:
+        """Waits for a free slot, in the turn of the current flow."""
+
+        flow, weight = _current_flow.get()
+        if self.active < self.value and not self._waiters:
+            self._clock.charge(flow, weight)
+            self.active += 1
+            return
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(flow, deque()).append((waiter, weight))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Frees a slot for the next flow."""
+
+        self.active -= 1
+        self._wake()
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.release()
@@ -0,0 +1,173 @@
+from __future__ import annotations
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import math
+from typing import AsyncIterator
+from pymanga.catalogue import CatalogueEntry, ReleasePolicy
+from pymanga.client import MAX_LIMIT, Client
+from pymanga.exception import MangadexClientError
+from pymanga.index import ChapterIndex
+from pymanga.models.chapter import Chapter, Relationship
+from pymanga.scheduler import ChapterJob, DownloadScheduler
+
+__all__: list[str] = ["LibrarySync"]
+
+
+def _manga_id(chapter: Chapter) -> str | None:
+    manga: Relationship | None = chapter.manga
+    return manga.id if manga is not None else None
+
+
+@dataclass
+class LibrarySync:
+    """Keeps a library of followed mangas up to date.
+
+    Each manga is only listed from the date it was last synced at. The mangas
+    never synced are listed from their own feed. The others share a single
+    listing of the chapters updated since the oldest of their sync dates, by
+    pages of `page_size`, unless it takes more requests than the feeds it
+    replaces. A feed lists up to 500 chapters per request, so the chapters of a
+    manga updated between two syncs take a single one. Sizing the shared
+    listing costs a request of its own, so it is only tried from `min_shared`
+    mangas synced before, below which it could not save a request over their
+    feeds. With a release policy, a single release of each chapter listed is
+    kept. A manga whose feed fails is reported and left for the next sync.
+    """
+
+    client: Client
+    index: ChapterIndex
+    translated_language: str = "en"
+    content_rating: list[str] = field(default_factory=list)
+    page_size: int = MAX_LIMIT
+    min_shared: int = 3
+    policy: ReleasePolicy | None = None
+    failed: list[str] = field(default_factory=list, init=False)
+
+    async def chapters(self, manga_ids: list[str]) -> AsyncIterator[Chapter]:
+        """Iterates over the chapters updated since their manga was last synced.
+
+        Args:
+            manga_ids: The ids of the followed mangas.
+
+        Yields:
+            The chapters updated since the last sync, with their manga included,
+            the chapters of a manga following each other.
+        """
+
+        synced: dict[str, str | None] = {
+            manga_id: self.index.last_synced(manga_id) for manga_id in manga_ids
+        }
+        feeds: list[str] = [
+            manga_id for manga_id, since in synced.items() if since is None
+        ]
+        recent: dict[str, str] = {
+            manga_id: since for manga_id, since in synced.items() if since is not None
+        }
+        if len(recent) >= self.min_shared:
+            oldest: str = min(recent.values())
+            total: int = await self.client.count_updates(
+                oldest, self.translated_language, self.content_rating
+            )
+            if 1 + math.ceil(total / self.page_size) < len(recent):
+                async with aclosing(
+                    self.client.iter_updates(
+                        oldest, self.translated_language, self.content_rating
+                    )
+                ) as updates:
+                    listed: dict[str, list[Chapter]] = {
+                        manga_id: [] for manga_id in recent
+                    }
+                    async for chapter in updates:
+                        manga: Relationship | None = chapter.manga
+                        if (
+                            manga is not None
+                            and manga.id in recent
+                            and chapter.attributes.updated_at[:19] >= recent[manga.id]
+                        ):
+                            listed[manga.id].append(chapter)
+                for chapters in listed.values():
+                    for chapter in chapters:
+                        yield chapter
+                recent = {}
+        for manga_id in [*feeds, *recent]:
+            try:
+                async with aclosing(
+                    self.client.iter_feed(
+                        manga_id,
+                        self.translated_language,
+                        self.content_rating,
+                        synced[manga_id],
+                    )
+                ) as feed:
+                    async for chapter in feed:
+                        yield chapter
+            except MangadexClientError as e:
+                print(f"Failed | {manga_id}: {e}")
+                self.failed.append(manga_id)
+
+    async def run(
+        self, manga_ids: list[str], scheduler: DownloadScheduler
+    ) -> list[ChapterJob]:
+        """Downloads the new and updated chapters of the followed mangas.
+
+        The releases of each manga are picked, then checked against the index
+        together. A manga is marked as synced at the start of the run once all of
+        its chapters are downloaded, so a failed chapter or feed is listed again
+        next time.
+
+        Args:
+            manga_ids: The ids of the followed mangas.
+            scheduler: The scheduler downloading the chapters.
+
+        Returns:
+            The jobs that could not be downloaded.
+        """
+
+        started: str = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+        mangas: dict[str, str] = {}
+
+        async def queue(series: list[Chapter]) -> AsyncIterator[ChapterJob]:
+            releases: list[CatalogueEntry] = [
+                CatalogueEntry.from_chapter(chapter, chapter.manga_title)
+                for chapter in series
+            ]
+            if self.policy is not None:
+                releases = self.policy.select(releases)
+            chapters: dict[str, Chapter] = {chapter.id: chapter for chapter in series}
+            listed: list[tuple[Chapter, ChapterJob]] = [
+                (chapters[release.job.chapter_id], release.job) for release in releases
+            ]
+            downloaded: set[str] = await self.index.run(
+                self.index.downloaded,
+                [
+                    (chapter, scheduler.output.joinpath(job.name).with_suffix(".cbz"))
+                    for chapter, job in listed
+                ],
+            )
+            for chapter, job in listed:
+                if chapter.id in downloaded:
+                    continue
+                if chapter.manga is not None:
+                    mangas[chapter.id] = chapter.manga.id
+                print(f"Queued | {job.name}")
+                yield job
+
+        async def jobs() -> AsyncIterator[ChapterJob]:
+            series: list[Chapter] = []
+            async with aclosing(self.chapters(manga_ids)) as chapters:
+                async for chapter in chapters:
+                    if series and _manga_id(chapter) != _manga_id(series[0]):
+                        async for job in queue(series):
+                            yield job
+                        series = []
+                    series.append(chapter)
+            async for job in queue(series):
+                yield job
+
+        failed: list[ChapterJob] = await scheduler.run(jobs())
+        incomplete: set[str | None] = {mangas.get(job.chapter_id) for job in failed}
+        for manga_id in manga_ids:
+            if manga_id not in incomplete and manga_id not in self.failed:
+                self.index.mark_synced(manga_id, started)
+        return failed
@@ -0,0 +1,92 @@
+from __future__ import annotations
+from dataclasses import dataclass
+import io
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover
+    Image = None
+
+__all__: list[str] = ["TranscodeOptions", "transcode_page"]
+
+FORMATS: dict[str, str] = {"webp": "WEBP", "jpeg": "JPEG", "jpg": "JPEG", "png": "PNG"}
+SUFFIXES: dict[str, str] = {"WEBP": ".webp", "JPEG": ".jpg", "PNG": ".png"}
+
+
+@dataclass(frozen=True)
+class TranscodeOptions:
+    """Describes how the pages are transcoded for e-readers.
+
+    Pages are shrunk to fit within the target resolution, never enlarged, and
+    keep their format unless another one is set. Double-page spreads, the pages
+    wider than tall, can be split in two pages in reading order, right to left
+    by default as in most mangas.
+    """
+
+    width: int | None = None
+    height: int | None = None
+    grayscale: bool = False
+    format: str | None = None
+    quality: int = 80
+    split_spreads: bool = False
+    right_to_left: bool = True
+
+    def __post_init__(self) -> None:
+        if Image is None:
+            raise ValueError(
+                "Transcoding pages requires Pillow, install pymanga[images]."
+            )
+        if self.format is not None and self.format.lower() not in FORMATS:
+            raise ValueError(f"Unsupported image format: {self.format}")
+        if not 1 <= self.quality <= 100:
+            raise ValueError("The quality must be between 1 and 100.")
+
+
+def transcode_page(
+    content: bytes, suffix: str, options: TranscodeOptions
+) -> tuple[str, list[bytes]]:
+    """Transcodes a page for e-readers.
+
+    A page that cannot be decoded is kept as is.
+
+    Args:
+        content: The content of the page.
+        suffix: The extension of the page, as served.
+        options: How to transcode the page.
+
+    Returns:
+        The extension of the transcoded page, and its content, in two parts if it
+        is a spread that was split.
+    """
+
+    try:
+        image: Image.Image = Image.open(io.BytesIO(content))
+        image.load()
+    except (OSError, Image.DecompressionBombError):
+        return suffix, [content]
+    image_format: str = (
+        FORMATS[options.format.lower()]
+        if options.format is not None
+        else image.format if image.format in SUFFIXES else "PNG"
+    )
+    parts: list[Image.Image] = [image]
+    if options.split_spreads and image.width > image.height:
+        half: int = image.width // 2
+        left: Image.Image = image.crop((0, 0, half, image.height))
+        right: Image.Image = image.crop((half, 0, image.width, image.height))
+        parts = [right, left] if options.right_to_left else [left, right]
+    transcoded: list[bytes] = []
+    for part in parts:
+        if options.grayscale:
+            part = part.convert("L")
+        if options.width or options.height:
+            part.thumbnail(
+                (options.width or part.width, options.height or part.height),
+                Image.Resampling.LANCZOS,
+            )
+        if image_format == "JPEG" and part.mode not in ("L", "RGB"):
+            part = part.convert("RGB")
+        buffer: io.BytesIO = io.BytesIO()
+        part.save(buffer, image_format, quality=options.quality)
+        transcoded.append(buffer.getvalue())
+    return SUFFIXES[image_format], transcoded
@@ -0,0 +1,146 @@
+from __future__ import annotations
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+import hashlib
+import multiprocessing
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Callable, TypeVar
+from pymanga.transcode import TranscodeOptions, transcode_page
+
+__all__: list[str] = ["WorkerPool", "page_checksum", "process_page"]
+
+T = TypeVar("T")
+
+
+def page_checksum(content: bytes) -> str:
+    """Computes the checksum of a page.
+
+    Args:
+        content: The content of the page.
+
+    Returns:
+        The SHA-256 digest of the page, in hexadecimal.
+    """
+
+    return hashlib.sha256(content).hexdigest()
+
+
+def process_page(
+    content: bytes, filename: str, transcode: TranscodeOptions | None = None
+) -> tuple[str, list[tuple[bytes, str]]]:
+    """Transcodes a page if enabled and computes the checksum of its parts.
+
+    Args:
+        content: The content of the page.
+        filename: The name of the page on the server.
+        transcode: How to transcode the page. Defaults to None, kept as is.
+
+    Returns:
+        The name of the page, its extension following the transcoded format, and
+        the content and checksum of each of its parts.
+    """
+
+    parts: list[bytes] = [content]
+    if transcode is not None:
+        suffix, parts = transcode_page(content, Path(filename).suffix, transcode)
+        filename = str(Path(filename).with_suffix(suffix))
+    return filename, [(part, page_checksum(part)) for part in parts]
+
+
+@dataclass
+class WorkerPool:
+    """Runs the blocking steps of the downloads away from the event loop.
+
+    At most `max_pending` steps are queued or running at once, twice the number
+    of workers by default, `pending` counting them. The downloads wait for a
+    free slot before handing a page over, so a slow disk or CPU slows them down
+    instead of piling pages up in memory.
+
+    A process pool only runs functions defined at the top level of a module, and
+    copies their arguments to the worker processes.
+    """
+
+    workers: int = 2
+    processes: bool = False
+    max_pending: int | None = None
+    pending: int = field(default=0, init=False)
+    _executor: Executor | None = field(default=None, init=False, repr=False)
+    _slots: asyncio.Semaphore = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.workers < 1:
+            raise ValueError("A worker pool needs at least one worker.")
+        self._slots = asyncio.Semaphore(self.max_pending or 2 * self.workers)
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.processes:
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="pymanga"
+                )
+        return self._executor
+
+    async def submit(self, func: Callable[..., T], *args: Any) -> asyncio.Future[T]:
+        """Hands a function over to the pool once a slot is free.
+
+        Args:
+            func: The blocking function to run.
+            *args: The arguments of the function.
+
+        Returns:
+            The future of the result, the slot being freed once it is done.
+        """
+
+        await self._slots.acquire()
+        try:
+            future: asyncio.Future[T] = asyncio.get_running_loop().run_in_executor(
+                self.executor, func, *args
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        self.pending += 1
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: asyncio.Future[Any]) -> None:
+        self.pending -= 1
+        self._slots.release()
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Runs a function in the pool once a slot is free.
+
+        Args:
+            func: The blocking function to run.
+            *args: The arguments of the function.
+
+        Returns:
+            The result of the function.
+        """
+
+        return await (await self.submit(func, *args))
+
+    def close(self) -> None:
+        """Waits for the running steps and stops the workers."""
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def __aenter__(self) -> WorkerPool:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await asyncio.to_thread(self.close)
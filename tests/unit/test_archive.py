@@ -0,0 +1,116 @@
+import hashlib
+import io
+from pathlib import Path
+import zipfile
+import pytest
+from pymanga.archive import CbzWriter
+
+
+class TestCbzWriter:
+    def test_write_reading_order(self, tmp_path: Path) -> None:
+        path: Path = tmp_path / "chapter.cbz"
+        with CbzWriter(path) as writer:
+            writer.write(10, "11-c.png", b"eleven")
+            writer.write(1, "2-b.jpg", b"two")
+            writer.write(0, "1-a.png", b"one")
+        assert not writer.part_path.exists()
+        with zipfile.ZipFile(path) as archive:
+            assert archive.namelist() == ["0001.png", "0002.jpg", "0011.png"]
+            assert archive.read("0002.jpg") == b"two"
+            for info in archive.infolist():
+                assert info.compress_type == zipfile.ZIP_STORED
+
+    def test_write_checksum(self, tmp_path: Path) -> None:
+        path: Path = tmp_path / "chapter.cbz"
+        with CbzWriter(path) as writer:
+            writer.write(0, "1-a.png", b"one", "abc")
+            writer.write(1, "2-b.png", b"two")
+        with zipfile.ZipFile(path) as archive:
+            assert archive.getinfo("0001.png").comment == b"sha256:abc"
+            assert archive.getinfo("0002.png").comment == b""
+
+    def test_write_file(self, tmp_path: Path) -> None:
+        path: Path = tmp_path / "chapter.cbz"
+        content: bytes = bytes(range(256)) * 1000
+        with CbzWriter(path) as writer:
+            checksum: str = writer.write_file(0, "1-a.png", io.BytesIO(content))
+        assert checksum == hashlib.sha256(content).hexdigest()
+        with zipfile.ZipFile(path) as archive:
+            assert archive.read("0001.png") == content
+            assert archive.getinfo("0001.png").comment == f"sha256:{checksum}".encode()
+            assert archive.getinfo("0001.png").compress_type == zipfile.ZIP_STORED
+
+    def test_write_parts(self, tmp_path: Path) -> None:
+        path: Path = tmp_path / "chapter.cbz"
+        part: Path = tmp_path / "pages.cbz"
+        with pytest.raises(RuntimeError):
+            with CbzWriter(path, part, resumable=True) as writer:
+                writer.write_parts(1, "2.webp", [(b"right", "abc"), (b"left", None)])
+                raise RuntimeError("fake")
+        with CbzWriter(path, part, resumable=True) as writer:
+            assert writer.has(1)
+            assert not writer.has(0)
+            writer.write(0, "1.webp", b"cover")
+        with zipfile.ZipFile(path) as archive:
+            assert archive.namelist() == ["0001.webp", "0002-1.webp", "0002-2.webp"]
+            assert archive.read("0002-1.webp") == b"right"
+            assert archive.getinfo("0002-1.webp").comment == b"sha256:abc"
+
+    def test_write_error(self, tmp_path: Path) -> None:
+        path: Path = tmp_path / "chapter.cbz"
+        with pytest.raises(RuntimeError):
+            with CbzWriter(path) as writer:
+                writer.write(0, "1-a.png", b"one")
+                raise RuntimeError("fake")
+        assert list(tmp_path.iterdir()) == []
+
+    def test_write_not_open(self, tmp_path: Path) -> None:
+        writer: CbzWriter = CbzWriter(tmp_path / "chapter.cbz")
+        with pytest.raises(ValueError):
+            writer.write(0, "1-a.png", b"one")
+        writer.close()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_resume(self, tmp_path: Path) -> None:
+        path: Path = tmp_path / "chapter.cbz"
+        part: Path = tmp_path / "partial" / "pages.cbz"
+        with pytest.raises(RuntimeError):
+            with CbzWriter(path, part, resumable=True) as writer:
+                writer.write(0, "1-a.png", b"one")
+                raise RuntimeError("fake")
+        assert part.exists()
+        with CbzWriter(path, part, resumable=True) as writer:
+            assert writer.has(0)
+            assert not writer.has(1)
+            writer.write(1, "2-b.png", b"two")
+        assert not part.exists()
+        with zipfile.ZipFile(path) as archive:
+            assert archive.namelist() == ["0001.png", "0002.png"]
+            assert archive.read("0001.png") == b"one"
+
+    def test_resume_corrupted_page(self, tmp_path: Path) -> None:
+        path: Path = tmp_path / "chapter.cbz"
+        part: Path = tmp_path / "pages.cbz"
+        first: zipfile.ZipInfo = zipfile.ZipInfo("0001.png")
+        first.comment = b"sha256:abc"
+        with zipfile.ZipFile(part, "w") as archive:
+            archive.writestr(first, b"first page")
+            archive.writestr("0002.png", b"second page")
+        part.write_bytes(part.read_bytes().replace(b"second page", b"second p4ge"))
+        with CbzWriter(path, part, resumable=True) as writer:
+            assert writer.completed == {"0001.png"}
+            writer.write(1, "2-b.png", b"second page")
+        with zipfile.ZipFile(path) as archive:
+            assert archive.namelist() == ["0001.png", "0002.png"]
+            assert archive.testzip() is None
+            assert archive.getinfo("0001.png").comment == b"sha256:abc"
+
+    def test_resume_corrupted_archive(self, tmp_path: Path) -> None:
+        path: Path = tmp_path / "chapter.cbz"
+        part: Path = tmp_path / "pages.cbz"
+        part.write_bytes(b"not a zip")
+        with CbzWriter(path, part, resumable=True) as writer:
+            assert writer.completed == set()
+            writer.write(0, "1-a.png", b"one")
+        with zipfile.ZipFile(path) as archive:
+            assert archive.namelist() == ["0001.png"]
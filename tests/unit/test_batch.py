@@ -0,0 +1,220 @@
+import json
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock
+import pytest
+from pytest_mock import MockerFixture
+from conftest import async_iter
+from pymanga.batch import BatchDownload
+from pymanga.catalogue import ReleasePolicy
+from pymanga.client import Client
+from pymanga.exception import MangadexClientError
+from pymanga.index import ChapterIndex, IndexedChapter
+from pymanga.manifest import ManifestEntry
+from pymanga.models.chapter import Chapter, Relationship
+from pymanga.models.common import Response
+from pymanga.models.manga import Manga, MangaSummary
+from pymanga.scheduler import ChapterJob, DownloadScheduler
+
+
+def make_chapter(
+    chapter_id: str, number: str, manga: str, group: str | None = None
+) -> Chapter:
+    chapter: Chapter = (
+        Response[Chapter]
+        .model_validate(
+            json.loads(Path("tests/samples/chapter_results.json").read_text())
+        )
+        .data[0]
+    )
+    return chapter.model_copy(
+        update={
+            "id": chapter_id,
+            "attributes": chapter.attributes.model_copy(update={"chapter": number}),
+            "relationships": [
+                Relationship(
+                    id=manga, type="manga", attributes={"title": {"en": manga}}
+                ),
+                *(
+                    [
+                        Relationship(
+                            id=group,
+                            type="scanlation_group",
+                            attributes={"name": group},
+                        )
+                    ]
+                    if group
+                    else []
+                ),
+            ],
+        }
+    )
+
+
+@pytest.fixture
+def mangas() -> list[Manga]:
+    return (
+        Response[Manga]
+        .model_validate(
+            json.loads(Path("tests/samples/manga_results.json").read_text())
+        )
+        .data
+    )
+
+
+@pytest.fixture
+def batch(client: Client, tmp_path: Path) -> BatchDownload:
+    return BatchDownload(client, ChapterIndex(tmp_path / "index.sqlite"))
+
+
+@pytest.mark.asyncio
+class TestBatchDownload:
+    @pytest.mark.parametrize("title", ["Naruto", "naruto", "-ナルト-"])
+    async def test_resolve_title(
+        self,
+        batch: BatchDownload,
+        mangas: list[Manga],
+        mocker: MockerFixture,
+        title: str,
+    ) -> None:
+        search_mock: MagicMock = mocker.patch.object(
+            batch.client, "iter_mangas", side_effect=async_iter(mangas)
+        )
+        entry: ManifestEntry = ManifestEntry(title=title, content_rating=["safe"])
+        assert await batch.resolve(entry) == mangas[0].id
+        search_mock.assert_called_once_with(
+            title, content_rating=["safe"], model=MangaSummary
+        )
+
+    async def test_resolve_id(
+        self, batch: BatchDownload, mocker: MockerFixture
+    ) -> None:
+        search_mock: MagicMock = mocker.patch.object(batch.client, "iter_mangas")
+        assert await batch.resolve(ManifestEntry(id="manga")) == "manga"
+        search_mock.assert_not_called()
+
+    async def test_resolve_not_found(
+        self, batch: BatchDownload, mangas: list[Manga], mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(batch.client, "iter_mangas", side_effect=async_iter(mangas))
+        with pytest.raises(MangadexClientError):
+            await batch.resolve(ManifestEntry(title="Naru"))
+
+    async def test_jobs(
+        self, batch: BatchDownload, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        feeds: dict[str, list[Chapter]] = {
+            "a": [make_chapter(f"a{i}", str(i), "a") for i in range(1, 5)],
+            "b": [make_chapter(f"b{i}", str(i), "b") for i in range(1, 3)],
+        }
+
+        async def iter_feed(manga_id: str, *args: Any) -> Any:
+            if manga_id == "missing":
+                raise MangadexClientError("not found")
+            for chapter in feeds[manga_id]:
+                yield chapter
+
+        feed_mock: MagicMock = mocker.patch.object(
+            batch.client, "iter_feed", side_effect=iter_feed
+        )
+        chapter: Chapter = feeds["a"][1]
+        batch.index.record(
+            IndexedChapter(
+                chapter.id,
+                chapter.attributes.version,
+                chapter.attributes.updated_at,
+                None,
+                "a2.cbz",
+                4,
+            )
+        )
+        entries: list[ManifestEntry] = [
+            ManifestEntry(id="a", from_chapter=2, to_chapter=3, language="fr"),
+            ManifestEntry(id="missing"),
+            ManifestEntry(id="b"),
+        ]
+        jobs: list[ChapterJob] = [job async for job in batch.jobs(entries, tmp_path)]
+        assert sorted(job.chapter_id for job in jobs) == ["a3", "b1", "b2"]
+        assert batch.failed == [entries[1]]
+        feed_mock.assert_any_call("a", "fr", [])
+
+    async def test_jobs_weights(
+        self, batch: BatchDownload, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        feeds: dict[str, list[Chapter]] = {
+            "a": [make_chapter(f"a{i}", str(i), "a") for i in range(1, 7)],
+            "b": [make_chapter(f"b{i}", str(i), "b") for i in range(1, 3)],
+        }
+
+        async def iter_feed(manga_id: str, *args: Any) -> Any:
+            for chapter in feeds[manga_id]:
+                yield chapter
+
+        async def run(func: Any, *args: Any) -> Any:
+            return func(*args)
+
+        mocker.patch.object(batch.client, "iter_feed", side_effect=iter_feed)
+        # Both entries are listed before the first job is taken, as the index is
+        # checked inline instead of in its thread.
+        mocker.patch.object(batch.index, "run", side_effect=run)
+        jobs: Any = batch.jobs(
+            [ManifestEntry(id="a"), ManifestEntry(id="b", weight=2)], tmp_path
+        )
+        chapters: list[ChapterJob] = [job async for job in jobs]
+        assert [job.chapter_id for job in chapters][:4] == ["a1", "b1", "b2", "a2"]
+        assert (chapters[1].series, chapters[1].weight) == ("b", 2)
+
+    async def test_jobs_releases(
+        self, batch: BatchDownload, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        mocker.patch.object(
+            batch.client,
+            "iter_feed",
+            side_effect=async_iter(
+                [
+                    make_chapter("1a", "1", "a", "x"),
+                    make_chapter("1b", "1", "a", "y"),
+                    make_chapter("2b", "2", "a", "y"),
+                ]
+            ),
+        )
+        batch.policy = ReleasePolicy(["x"])
+        entry: ManifestEntry = ManifestEntry(id="a")
+        jobs: list[ChapterJob] = [job async for job in batch.jobs([entry], tmp_path)]
+        assert [job.chapter_id for job in jobs] == ["1a", "2b"]
+        entry = ManifestEntry(id="a", groups=["Y"])
+        jobs = [job async for job in batch.jobs([entry], tmp_path)]
+        assert [job.chapter_id for job in jobs] == ["1b", "2b"]
+
+    async def test_jobs_close(
+        self, batch: BatchDownload, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        mocker.patch.object(
+            batch.client,
+            "iter_feed",
+            side_effect=async_iter(
+                [make_chapter(str(i), str(i), "a") for i in range(5)]
+            ),
+        )
+        jobs: Any = batch.jobs([ManifestEntry(id="a")], tmp_path)
+        assert (await jobs.__anext__()).chapter_id == "0"
+        await jobs.aclose()
+
+    async def test_run(
+        self, batch: BatchDownload, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        mocker.patch.object(
+            batch.client,
+            "iter_feed",
+            side_effect=async_iter([make_chapter("1", "1", "a")]),
+        )
+        scheduler: DownloadScheduler = DownloadScheduler(batch.client, tmp_path)
+        queued: list[ChapterJob] = []
+
+        async def run(jobs: Any) -> list[ChapterJob]:
+            queued.extend([job async for job in jobs])
+            return []
+
+        mocker.patch.object(scheduler, "run", side_effect=run)
+        assert await batch.run([ManifestEntry(id="a")], scheduler) == []
+        assert [job.chapter_id for job in queued] == ["1"]
@@ -0,0 +1,67 @@
+from typing import Any
+import httpx
+import pytest
+from benchmarks.harness import (
+    BenchmarkOptions,
+    BenchmarkResult,
+    compare,
+    run_scenario,
+)
+from benchmarks.server import MockLibrary, MockServer, ServerProfile
+
+
+@pytest.fixture
+def server() -> Any:
+    with MockServer(MockLibrary(chapters=3, pages=2, page_size=1000)) as server:
+        yield server
+
+
+class TestMockServer:
+    def test_routes(self) -> None:
+        with (
+            MockServer(
+                MockLibrary(chapters=3, pages=2, page_size=1000),
+                ServerProfile(throttle_every=4),
+            ) as server,
+            httpx.Client(base_url=server.url) as session,
+        ):
+            listing: httpx.Response = session.get(
+                "/chapter", params={"manga": "manga-0", "limit": 2, "offset": 2}
+            )
+            assert listing.json()["total"] == 3
+            assert [chapter["id"] for chapter in listing.json()["data"]] == [
+                "manga-0-chapter-3"
+            ]
+            info: httpx.Response = session.get("/at-home/server/chapter")
+            assert info.json()["baseUrl"] == server.url
+            assert len(session.get("/data/chapter/1.png").content) == 1000
+            assert session.get("/manga/tag").status_code == 429
+            assert session.get("/unknown").status_code == 404
+            assert server.stats.requests == 5
+            assert server.stats.throttled == 1
+
+
+class TestHarness:
+    @pytest.mark.parametrize("scenario", ["client", "download"])
+    def test_run_scenario(self, server: MockServer, scenario: str) -> None:
+        result: BenchmarkResult = run_scenario(
+            scenario, server.url, BenchmarkOptions(rate_limits=True)
+        )
+        assert (result.chapters, result.pages) == (3, 6)
+        assert result.pages_per_second > 0
+        assert result.cpu_per_chapter > 0
+
+    def test_compare(self) -> None:
+        result: BenchmarkResult = BenchmarkResult("download", 2.0, 10, 100, 1.0, 100)
+        baseline: list[dict[str, Any]] = [
+            dict(result.metrics(), pages_per_second=60.0, peak_rss=95),
+            dict(result.metrics(), scenario="client"),
+        ]
+        assert compare([result], baseline) == [
+            "download pages_per_second: 60 -> 50 (-16.7%)"
+        ]
+        assert compare([result], baseline, tolerance=0.2) == []
+        baseline[0]["cpu_per_chapter"] = 0.05
+        assert compare([result], baseline, tolerance=0.2) == [
+            "download cpu_per_chapter: 0.05 -> 0.1 (+100.0%)"
+        ]
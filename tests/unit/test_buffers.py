@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from pymanga.buffers import ByteBudget, PageBuffer
+
+
+@pytest.mark.asyncio
+class TestByteBudget:
+    async def test_try_acquire(self) -> None:
+        budget: ByteBudget = ByteBudget(10)
+        assert budget.try_acquire(6)
+        assert not budget.try_acquire(6)
+        budget.release(6)
+        assert budget.try_acquire(10)
+
+    async def test_acquire(self) -> None:
+        budget: ByteBudget = ByteBudget(10)
+        assert budget.try_acquire(8)
+        waiting: asyncio.Task[int] = asyncio.create_task(budget.acquire(5))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        budget.release(8)
+        assert await waiting == 5
+        assert budget.used == 5
+
+    async def test_acquire_over_limit(self) -> None:
+        budget: ByteBudget = ByteBudget(10)
+        assert await budget.acquire(100) == 10
+        assert budget.used == 10
+
+    async def test_invalid_limit(self) -> None:
+        with pytest.raises(ValueError):
+            ByteBudget(0)
+
+
+class TestPageBuffer:
+    def test_write(self) -> None:
+        budget: ByteBudget = ByteBudget(10)
+        with PageBuffer(budget) as buffer:
+            buffer.write(b"abcd")
+            buffer.write(b"efgh")
+            assert (buffer.size, buffer.spilled, budget.used) == (8, False, 8)
+            assert buffer.read() == b"abcdefgh"
+        assert budget.used == 0
+
+    def test_write_spilled(self) -> None:
+        budget: ByteBudget = ByteBudget(10)
+        other: PageBuffer = PageBuffer(budget)
+        other.write(b"abcdef")
+        with PageBuffer(budget) as buffer:
+            buffer.write(b"abc")
+            buffer.write(b"defgh")
+            assert buffer.spilled
+            assert budget.used == 6
+            buffer.write(b"ijk")
+            assert buffer.read() == b"abcdefghijk"
+            assert buffer.size == 11
+        other.close()
+        assert budget.used == 0
+
+    @pytest.mark.asyncio
+    async def test_hold(self) -> None:
+        budget: ByteBudget = ByteBudget(10)
+        buffer: PageBuffer = PageBuffer(budget)
+        buffer.write(b"abcd")
+        assert await buffer.hold() == 4
+        buffer.close()
+        assert budget.used == 4
+        budget.release(4)
+
+    @pytest.mark.asyncio
+    async def test_hold_spilled(self) -> None:
+        budget: ByteBudget = ByteBudget(10)
+        other: PageBuffer = PageBuffer(budget)
+        other.write(b"abcdef")
+        buffer: PageBuffer = PageBuffer(budget)
+        buffer.write(b"abcdefgh")
+        assert buffer.spilled and budget.used == 6
+        hold: asyncio.Task[int] = asyncio.create_task(buffer.hold())
+        await asyncio.sleep(0)
+        assert not hold.done()
+        other.close()
+        assert await hold == 8
+        assert budget.used == 8
+        buffer.close()
+
+    def test_clear(self) -> None:
+        budget: ByteBudget = ByteBudget(10)
+        with PageBuffer(budget) as buffer:
+            buffer.write(b"abc")
+            buffer.clear()
+            assert (buffer.size, budget.used) == (0, 0)
+            buffer.write(b"de")
+            assert buffer.read() == b"de"
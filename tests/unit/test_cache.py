@@ -0,0 +1,119 @@
+from pathlib import Path
+import time
+import httpx
+import pytest
+from pymanga.cache import CachedResponse, ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> ResponseCache:
+    return ResponseCache(tmp_path / "cache" / "responses.sqlite")
+
+
+class TestResponseCache:
+    def test_key(self) -> None:
+        assert ResponseCache.key(
+            "https://api.mangadex.org/manga", {"title": "a", "ids[]": ["2", "1"]}
+        ) == ResponseCache.key(
+            "https://api.mangadex.org/manga", {"ids[]": ["2", "1"], "title": "a"}
+        )
+
+    @pytest.mark.parametrize(
+        "url, expected",
+        [
+            ("https://api.mangadex.org/manga/tag", 7 * 24 * 3600),
+            ("https://api.mangadex.org/manga", 3600),
+            ("https://api.mangadex.org/manga/a1c7c817/feed", 0),
+            ("https://api.mangadex.org/manga/a1c7c817", 3600),
+            ("https://api.mangadex.org/chapter", 600),
+            ("https://api.mangadex.org/author", 300),
+        ],
+    )
+    def test_ttl(self, cache: ResponseCache, url: str, expected: float) -> None:
+        assert cache.ttl(url) == expected
+
+    def test_set_get(self, cache: ResponseCache) -> None:
+        url: str = "https://api.mangadex.org/manga"
+        response: httpx.Response = httpx.Response(
+            200, content=b"{}", headers={"ETag": '"abc"'}
+        )
+        assert cache.get("key") is None
+        cache.set("key", url, response)
+        cached: CachedResponse | None = cache.get("key")
+        assert cached is not None
+        assert cached.content == b"{}"
+        assert cached.fresh
+        assert cached.validators() == {"If-None-Match": '"abc"'}
+        cache.close()
+        assert cache.get("key") is not None
+
+    def test_refresh(self, cache: ResponseCache) -> None:
+        url: str = "https://api.mangadex.org/manga"
+        response: httpx.Response = httpx.Response(
+            200, content=b"{}", headers={"Last-Modified": "yesterday"}
+        )
+        cache.ttls["/manga"] = -1
+        cache.set("key", url, response)
+        cached: CachedResponse | None = cache.get("key")
+        assert cached is not None and not cached.fresh
+        assert cached.validators() == {"If-Modified-Since": "yesterday"}
+        cache.ttls["/manga"] = 60
+        cache.refresh("key", url)
+        cached = cache.get("key")
+        assert cached is not None and cached.fresh
+
+    def test_set_uncached(self, cache: ResponseCache) -> None:
+        url: str = "https://api.mangadex.org/manga/a1c7c817/feed"
+        cache.set("key", url, httpx.Response(200, content=b"{}"))
+        assert cache.get("key") is None
+
+    def test_bypass(self, cache: ResponseCache) -> None:
+        cache.set("key", "https://api.mangadex.org/manga", httpx.Response(200))
+        cache.bypass = True
+        assert cache.get("key") is None
+
+    def test_evict(self, cache: ResponseCache) -> None:
+        cache.max_size = 10
+        cache.access_interval = 0
+        url: str = "https://api.mangadex.org/manga"
+        cache.set("first", url, httpx.Response(200, content=b"12345"))
+        cache.set("second", url, httpx.Response(200, content=b"12345"))
+        time.sleep(0.01)
+        cache.get("first")
+        cache.set("third", url, httpx.Response(200, content=b"12345"))
+        assert cache.get("first") is not None
+        assert cache.get("second") is None
+        assert cache.get("third") is not None
+
+    def test_size(self, cache: ResponseCache) -> None:
+        url: str = "https://api.mangadex.org/manga"
+        cache.set("first", url, httpx.Response(200, content=b"12345"))
+        cache.set("first", url, httpx.Response(200, content=b"123"))
+        cache.set("second", url, httpx.Response(200, content=b"12"))
+        assert cache._size == 5
+        cache.close()
+        cache.max_size = 4
+        cache.evict()
+        assert cache._size == 2
+        assert cache.get("first") is None
+
+    def test_access_interval(self, cache: ResponseCache) -> None:
+        url: str = "https://api.mangadex.org/manga"
+        cache.set("key", url, httpx.Response(200, content=b"{}"))
+        query: str = "SELECT last_access FROM responses"
+        stored: float = cache.connection.execute(query).fetchone()[0]
+        time.sleep(0.01)
+        cache.get("key")
+        assert cache.connection.execute(query).fetchone()[0] == stored
+        cache.access_interval = 0
+        cache.get("key")
+        assert cache.connection.execute(query).fetchone()[0] > stored
+
+    @pytest.mark.asyncio
+    async def test_run(self, cache: ResponseCache) -> None:
+        url: str = "https://api.mangadex.org/manga"
+        await cache.run(cache.set, "key", url, httpx.Response(200, content=b"{}"))
+        cached: CachedResponse | None = await cache.run(cache.get, "key")
+        assert cached is not None and cached.content == b"{}"
+        cache.close()
+        assert cache._executor is None
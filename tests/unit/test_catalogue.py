@@ -0,0 +1,203 @@
+from pathlib import Path
+import pytest
+from pymanga.catalogue import (
+    CatalogueEntry,
+    ChapterCatalogue,
+    ReleasePolicy,
+    in_range,
+    parse_number,
+)
+from pymanga.models.chapter import Chapter
+from pymanga.scheduler import ChapterJob
+
+
+def make_entry(
+    number: float | None,
+    volume: float | None = None,
+    language: str = "en",
+    group: str | None = None,
+    group_name: str | None = None,
+    pages: int = 20,
+    published_at: str = "2023-01-01T00:00:00+00:00",
+    version: int | None = None,
+) -> CatalogueEntry:
+    return CatalogueEntry(
+        number,
+        volume,
+        language,
+        group,
+        group_name,
+        pages,
+        published_at,
+        ChapterJob(f"{language}-{number}-{group}", "", version=version),
+    )
+
+
+@pytest.fixture
+def catalogue() -> ChapterCatalogue:
+    catalogue: ChapterCatalogue = ChapterCatalogue()
+    for entry in [
+        make_entry(3, 1),
+        make_entry(1, 1),
+        make_entry(2.5, 1),
+        make_entry(2, 1, group="a"),
+        make_entry(2, 1, group="b"),
+        make_entry(10, 2),
+        make_entry(None),
+        make_entry(1, 1, "fr"),
+        make_entry(4, 2, "fr"),
+    ]:
+        catalogue.add(entry)
+    return catalogue
+
+
+def numbers(entries: list[CatalogueEntry]) -> list[float | None]:
+    return [entry.number for entry in entries]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("10", 10.0), ("10.5", 10.5), (None, None), ("", None), ("nan", None)],
+)
+def test_parse_number(value: str | None, expected: float | None) -> None:
+    assert parse_number(value) == expected
+
+
+@pytest.mark.parametrize(
+    "number, start, end, expected",
+    [
+        (None, None, None, True),
+        (None, 1, None, False),
+        (2, 2, 2, True),
+        (2, None, 1.5, False),
+        (2, 2.5, None, False),
+    ],
+)
+def test_in_range(
+    number: float | None, start: float | None, end: float | None, expected: bool
+) -> None:
+    assert in_range(number, start, end) is expected
+
+
+class TestCatalogueEntry:
+    def test_from_chapter(self) -> None:
+        chapter: Chapter = Chapter.model_validate_json(
+            Path("tests/samples/chapter.json").read_bytes()
+        )
+        entry: CatalogueEntry = CatalogueEntry.from_chapter(chapter, "Naruto")
+        assert entry.number == 6
+        assert entry.volume == 1
+        assert entry.language == "en"
+        assert entry.group == chapter.relationships[0].id
+        assert entry.pages == chapter.attributes.pages
+        assert entry.published_at == chapter.attributes.publish_at
+        assert entry.job == ChapterJob.from_chapter(chapter, "Naruto")
+
+    @pytest.mark.parametrize(
+        "start, end",
+        [(None, None), (2, None), (None, 2.5), (2, 3), (2.5, 2.5), (11, None)],
+    )
+    def test_within(
+        self, catalogue: ChapterCatalogue, start: float | None, end: float | None
+    ) -> None:
+        selected: list[CatalogueEntry] = catalogue.range(start, end)
+        assert [entry for entry in catalogue if entry.within(start, end)] == selected
+
+    def test_slots(self) -> None:
+        assert not hasattr(make_entry(1), "__dict__")
+        assert not hasattr(make_entry(1).job, "__dict__")
+
+
+class TestChapterCatalogue:
+    def test_len_iter(self, catalogue: ChapterCatalogue) -> None:
+        assert len(catalogue) == 9
+        assert numbers(list(catalogue)) == [1, 1, 2, 2, 2.5, 3, 4, 10, None]
+        assert catalogue.languages == ["en", "fr"]
+
+    @pytest.mark.parametrize(
+        "start, end, language, expected",
+        [
+            (None, None, "en", [1, 2, 2, 2.5, 3, 10, None]),
+            (2, 3, "en", [2, 2, 2.5, 3]),
+            (2.1, None, "en", [2.5, 3, 10]),
+            (None, 2, None, [1, 1, 2, 2]),
+            (None, 5, "fr", [1, 4]),
+            (11, None, "en", []),
+            (1, 2, "de", []),
+        ],
+    )
+    def test_range(
+        self,
+        catalogue: ChapterCatalogue,
+        start: float | None,
+        end: float | None,
+        language: str | None,
+        expected: list[float | None],
+    ) -> None:
+        assert numbers(catalogue.range(start, end, language)) == expected
+
+    def test_range_added(self, catalogue: ChapterCatalogue) -> None:
+        assert numbers(catalogue.range(5, None, "en")) == [10]
+        catalogue.add(make_entry(6, 2))
+        assert numbers(catalogue.range(5, None, "en")) == [6, 10]
+
+    @pytest.mark.parametrize(
+        "count, language, expected",
+        [
+            (1, "en", [10]),
+            (4, "en", [2, 2, 2.5, 3, 10]),
+            (10, "en", [1, 2, 2, 2.5, 3, 10]),
+            (2, None, [4, 10]),
+            (0, None, []),
+        ],
+    )
+    def test_latest(
+        self,
+        catalogue: ChapterCatalogue,
+        count: int,
+        language: str | None,
+        expected: list[float],
+    ) -> None:
+        assert numbers(catalogue.latest(count, language)) == expected
+
+    def test_volume(self, catalogue: ChapterCatalogue) -> None:
+        assert numbers(catalogue.volume(1, "en")) == [1, 2, 2, 2.5, 3]
+        assert numbers(catalogue.volume(2)) == [4, 10]
+        assert numbers(catalogue.volume(None)) == [None]
+        assert catalogue.volume(3) == []
+
+
+class TestReleasePolicy:
+    def test_invalid_criteria(self) -> None:
+        with pytest.raises(ValueError, match="Unknown release criteria: size"):
+            ReleasePolicy(criteria=["groups", "size"])
+
+    @pytest.mark.parametrize(
+        "policy, expected",
+        [
+            (ReleasePolicy(), "c"),
+            (ReleasePolicy(["B"]), "b-id"),
+            (ReleasePolicy(["a-id"]), "a-id"),
+            (ReleasePolicy(["a-id"], ["version", "groups"]), "c"),
+            (ReleasePolicy(criteria=["pages", "version"]), "b-id"),
+            (ReleasePolicy(criteria=["newest"]), "a-id"),
+            (ReleasePolicy(criteria=[]), "a-id"),
+        ],
+    )
+    def test_select(self, policy: ReleasePolicy, expected: str) -> None:
+        entries: list[CatalogueEntry] = [
+            make_entry(1, group="a-id", published_at="2023-03-01T00:00:00+00:00"),
+            make_entry(1, group="b-id", group_name="b", pages=30),
+            make_entry(1, group="c", version=2),
+            make_entry(2, group="a-id"),
+            make_entry(None, group="a-id"),
+            make_entry(None, group="b-id"),
+        ]
+        selected: list[CatalogueEntry] = policy.select(entries)
+        assert len(selected) == 4
+        assert selected[0].job.chapter_id == f"en-1-{expected}"
+        assert selected[1:] == entries[3:]
+
+    def test_select_volumes(self) -> None:
+        entries: list[CatalogueEntry] = [make_entry(1, 1), make_entry(1, 2)]
+        assert ReleasePolicy().select(entries) == entries
@@ -0,0 +1,24 @@
+from pathlib import Path
+from pymanga.checkpoint import ChapterCheckpoint
+
+
+class TestChapterCheckpoint:
+    def test_for_chapter(self, tmp_path: Path) -> None:
+        checkpoint: ChapterCheckpoint = ChapterCheckpoint.for_chapter(
+            tmp_path, "chapter-id", "hash"
+        )
+        assert checkpoint.directory == tmp_path / ".partial" / "chapter-id-hash"
+        assert checkpoint.archive == checkpoint.directory / "pages.cbz"
+
+    def test_pages(self, tmp_path: Path) -> None:
+        checkpoint: ChapterCheckpoint = ChapterCheckpoint(tmp_path / "checkpoint")
+        assert checkpoint.load_page(0) == b""
+        checkpoint.save_page(0, b"")
+        assert not checkpoint.directory.exists()
+        checkpoint.save_page(0, b"fake")
+        assert checkpoint.load_page(0) == b"fake"
+        checkpoint.clear_page(0)
+        assert checkpoint.load_page(0) == b""
+        checkpoint.save_page(1, b"fake")
+        checkpoint.remove()
+        assert not checkpoint.directory.exists()
@@ -1,17 +1,22 @@
+import asyncio
+from contextlib import aclosing
 import json
 from pathlib import Path
 from typing import Any
 from unittest.mock import MagicMock
 import httpx
+from pydantic import BaseModel
 import pytest
 from pytest_mock import MockerFixture
 from conftest import FakeResponse
+from pymanga.cache import ResponseCache
 from pymanga.client import Client, SearchTags
 from pymanga.exception import MangadexClientError
 from pymanga.models.chapter import Chapter
 from pymanga.models.common import Response
 from pymanga.models.download_chapter_info import DownloadInfo
-from pymanga.models.manga import Manga, Tag
+from pymanga.models.manga import Manga, MangaSummary, Tag
+from pymanga.ratelimit import Backoff
 
 
 @pytest.mark.asyncio
@@ -21,6 +26,7 @@ class TestClient:
         [
             ("tests/samples/chapter_results.json", Chapter),
             ("tests/samples/manga_results.json", Manga),
+            ("tests/samples/manga_results.json", MangaSummary),
             ("tests/samples/tag_results.json", Tag),
         ],
     )
@@ -29,11 +35,11 @@ class TestClient:
         client: Client,
         mocker: MockerFixture,
         json_path: str,
-        model: type[Manga | Chapter | Tag],
+        model: type[Manga | MangaSummary | Chapter | Tag],
     ) -> None:
-        json_data: dict[str, Any] = json.loads(Path(json_path).read_text())
+        content: bytes = Path(json_path).read_bytes()
         mocker.patch.object(
-            client.session, "get", return_value=FakeResponse(json_data, b"")
+            client.session, "get", return_value=FakeResponse(dict(), content)
         )
         result: Response = await client._call("any", dict(), model=model)
         assert isinstance(result, Response)
@@ -44,6 +50,143 @@ class TestClient:
         with pytest.raises(MangadexClientError):
             await client._call("any", dict(), model=Manga)
 
+    async def test__call_throttled(self, client: Client, mocker: MockerFixture) -> None:
+        content: bytes = Path("tests/samples/manga_results.json").read_bytes()
+        observe_mock: MagicMock = mocker.patch.object(client.rate_limiter, "observe")
+        get_mock: MagicMock = mocker.patch.object(
+            client.session,
+            "get",
+            side_effect=[
+                FakeResponse(dict(), b"", status_code=429),
+                FakeResponse(dict(), content),
+            ],
+        )
+        result: Response = await client._call("any", dict(), model=Manga)
+        assert isinstance(result.data[0], Manga)
+        assert get_mock.call_count == 2
+        assert observe_mock.call_count == 2
+
+    async def test__call_throttled_error(
+        self, client: Client, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(client.rate_limiter, "observe")
+        response: MagicMock = mocker.MagicMock(status_code=429)
+        response.raise_for_status.side_effect = httpx.HTTPStatusError(
+            "fake", request=mocker.MagicMock(), response=response
+        )
+        get_mock: MagicMock = mocker.patch.object(
+            client.session, "get", return_value=response
+        )
+        with pytest.raises(MangadexClientError):
+            await client._call("any", dict(), model=Manga)
+        assert get_mock.call_count == client.max_retries + 1
+
+    async def test__call_server_error(
+        self, client: Client, mocker: MockerFixture
+    ) -> None:
+        content: bytes = Path("tests/samples/manga_results.json").read_bytes()
+        sleep_mock: MagicMock = mocker.patch("pymanga.client.asyncio.sleep")
+        delay_mock: MagicMock = mocker.patch.object(Backoff, "delay", return_value=0.25)
+        get_mock: MagicMock = mocker.patch.object(
+            client.session,
+            "get",
+            side_effect=[
+                FakeResponse(dict(), b"", status_code=503),
+                FakeResponse(dict(), b"", status_code=502),
+                FakeResponse(dict(), content),
+            ],
+        )
+        result: Response = await client._call("any", dict(), model=Manga)
+        assert isinstance(result.data[0], Manga)
+        assert get_mock.call_count == 3
+        assert [call.args for call in delay_mock.call_args_list] == [(0,), (1,)]
+        sleep_mock.assert_any_call(0.25)
+        snapshot: dict[str, Any] = client.metrics.snapshot()
+        assert {
+            (counter["name"], counter["labels"].get("status")): counter["value"]
+            for counter in snapshot["counters"]
+        } == {
+            ("pymanga_requests_total", "502"): 1,
+            ("pymanga_requests_total", "503"): 1,
+            ("pymanga_requests_total", "200"): 1,
+            ("pymanga_received_bytes_total", None): len(content),
+            ("pymanga_retries_total", None): 2,
+        }
+        assert snapshot["histograms"][0]["count"] == 3
+
+    async def test__call_not_found(self, client: Client, mocker: MockerFixture) -> None:
+        mocker.patch.object(client.rate_limiter, "observe")
+        response: MagicMock = mocker.MagicMock(status_code=404)
+        response.raise_for_status.side_effect = httpx.HTTPStatusError(
+            "fake", request=mocker.MagicMock(), response=response
+        )
+        get_mock: MagicMock = mocker.patch.object(
+            client.session, "get", return_value=response
+        )
+        with pytest.raises(MangadexClientError):
+            await client._call("any", dict(), model=Manga)
+        get_mock.assert_called_once()
+
+    async def test_sessions(self, mocker: MockerFixture) -> None:
+        async with Client("https://api.mangadex.org", Path("output")) as client:
+            session: httpx.AsyncClient = client.session
+            assert client.session is session
+            assert client.image_session is not session
+            assert session.timeout.read == client.sessions.api.read_timeout
+            assert client.image_session.timeout.pool is None
+            image_session: httpx.AsyncClient = client.image_session
+        assert session.is_closed and image_session.is_closed
+        assert client.session is not session
+        await client.aclose()
+
+    async def test_aclose(
+        self, client: Client, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        close_mock: MagicMock = mocker.patch.object(client.metrics, "close")
+        client.cache = ResponseCache(tmp_path / "responses.sqlite")
+        client.cache.get("key")
+        await client.aclose()
+        close_mock.assert_called_once()
+        assert client.cache._connection is None
+
+    async def test__call_cache(
+        self, client: Client, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        content: bytes = Path("tests/samples/manga_results.json").read_bytes()
+        client.cache = ResponseCache(tmp_path / "responses.sqlite")
+        get_mock: MagicMock = mocker.patch.object(
+            client.session,
+            "get",
+            return_value=FakeResponse(
+                json.loads(content), content, headers={"ETag": '"abc"'}
+            ),
+        )
+        for _ in range(2):
+            result: Response = await client._call("/manga", dict(), model=Manga)
+            assert isinstance(result.data[0], Manga)
+        assert get_mock.call_count == 1
+        await client._call("/manga", dict(), model=Manga, use_cache=False)
+        assert get_mock.call_count == 2
+
+    async def test__call_cache_revalidate(
+        self, client: Client, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        content: bytes = Path("tests/samples/manga_results.json").read_bytes()
+        client.cache = ResponseCache(tmp_path / "responses.sqlite", ttls={})
+        client.cache.default_ttl = -1
+        get_mock: MagicMock = mocker.patch.object(
+            client.session,
+            "get",
+            side_effect=[
+                FakeResponse(json.loads(content), content, headers={"ETag": '"abc"'}),
+                FakeResponse(dict(), b"", status_code=304),
+            ],
+        )
+        await client._call("/manga", dict(), model=Manga)
+        result: Response = await client._call("/manga", dict(), model=Manga)
+        assert isinstance(result.data[0], Manga)
+        assert get_mock.call_args.kwargs["headers"] == {"If-None-Match": '"abc"'}
+
     async def test_get_tags(self, client: Client, mocker: MockerFixture) -> None:
         response: Response[Tag] = Response[Tag].model_validate(
             json.loads(Path("tests/samples/tag_results.json").read_text())
@@ -70,6 +213,19 @@ class TestClient:
         )
         assert len(mangas) == 2
 
+    async def test_get_mangas_summary(
+        self, client: Client, mocker: MockerFixture
+    ) -> None:
+        content: bytes = Path("tests/samples/manga_results.json").read_bytes()
+        mocker.patch.object(
+            client.session, "get", return_value=FakeResponse(dict(), content)
+        )
+        mangas: list[MangaSummary] = await client.get_mangas(
+            "Jujutsu Kaisen", model=MangaSummary
+        )
+        assert all(type(manga) is MangaSummary for manga in mangas)
+        assert mangas[0].attributes.title["en"] == "Naruto"
+
     @pytest.mark.parametrize(
         "content_rating",
         [
@@ -95,12 +251,124 @@ class TestClient:
             "title": "Jujutsu Kaisen offered me some a+ combat in s2",
             "includedTags[]": [],
             "excludedTags[]": [],
+            "limit": 100,
             "offset": 1,
         }
         if len(content_rating):
             checked_params["contentRating[]"] = content_rating
         _call_mock.assert_called_with("/manga", checked_params, model=Manga)
 
+    async def test_get_mangas_by_ids(
+        self, client: Client, mocker: MockerFixture
+    ) -> None:
+        sample: Response[Manga] = Response[Manga].model_validate(
+            json.loads(Path("tests/samples/manga_results.json").read_text())
+        )
+
+        async def call(url: str, params: dict[str, Any], **kwargs: Any) -> Response:
+            return sample.model_copy(
+                update={
+                    "data": [
+                        sample.data[0].model_copy(update={"id": manga_id})
+                        for manga_id in params["ids[]"]
+                        if manga_id != "missing"
+                    ]
+                }
+            )
+
+        call_mock: MagicMock = mocker.patch.object(client, "_call", side_effect=call)
+        ids: list[str] = [str(i) for i in range(250)]
+        mangas: list[Manga] = await client.get_mangas_by_ids(
+            [*reversed(ids), "missing", "0"], ["safe"]
+        )
+        assert [manga.id for manga in mangas] == list(reversed(ids))
+        assert [call.args[1]["limit"] for call in call_mock.call_args_list] == [
+            100,
+            100,
+            51,
+        ]
+        assert call_mock.call_args.args[0] == "/manga"
+        assert call_mock.call_args.args[1]["contentRating[]"] == ["safe"]
+
+    async def test_get_chapters_by_ids(
+        self, client: Client, mocker: MockerFixture
+    ) -> None:
+        sample: Response[Chapter] = Response[Chapter].model_validate(
+            json.loads(Path("tests/samples/chapter_results.json").read_text())
+        )
+        other: Chapter = sample.data[0].model_copy(update={"id": "other"})
+        sample.data.append(other)
+        call_mock: MagicMock = mocker.patch.object(client, "_call", return_value=sample)
+        chapters: list[Chapter] = await client.get_chapters_by_ids(
+            ["other", sample.data[0].id, "missing"]
+        )
+        assert chapters == [other, sample.data[0]]
+        call_mock.assert_called_once_with(
+            "/chapter",
+            {
+                "includes[]": ["manga", "scanlation_group"],
+                "limit": 3,
+                "ids[]": ["other", sample.data[0].id, "missing"],
+            },
+            model=Chapter,
+        )
+
+    async def test_get_manga_coalesced(
+        self, client: Client, mocker: MockerFixture
+    ) -> None:
+        sample: Response[Manga] = Response[Manga].model_validate(
+            json.loads(Path("tests/samples/manga_results.json").read_text())
+        )
+        call_mock: MagicMock = mocker.patch.object(client, "_call", return_value=sample)
+        manga_id: str = sample.data[0].id
+        mangas: list[Manga | None] = await asyncio.gather(
+            client.get_manga(manga_id),
+            client.get_manga(manga_id),
+            client.get_manga("missing"),
+        )
+        assert mangas == [sample.data[0], sample.data[0], None]
+        call_mock.assert_called_once()
+        assert call_mock.call_args.args[1]["ids[]"] == [manga_id, "missing"]
+        chapter_mock: MagicMock = mocker.patch.object(
+            client,
+            "_call",
+            return_value=Response[Chapter].model_validate(
+                json.loads(Path("tests/samples/chapter_results.json").read_text())
+            ),
+        )
+        chapters: list[Chapter | None] = await asyncio.gather(
+            *[client.get_chapter(str(i)) for i in range(150)]
+        )
+        assert chapters == [None] * 150
+        assert chapter_mock.call_count == 2
+
+    async def test_get_manga_content_rating(
+        self, client: Client, mocker: MockerFixture
+    ) -> None:
+        sample: Response[Manga] = Response[Manga].model_validate(
+            json.loads(Path("tests/samples/manga_results.json").read_text())
+        )
+        call_mock: MagicMock = mocker.patch.object(client, "_call", return_value=sample)
+        manga_id: str = sample.data[0].id
+        await asyncio.gather(
+            client.get_manga(manga_id),
+            client.get_manga(manga_id, ["safe"]),
+            client.get_manga("other", ["safe"]),
+            client.get_chapter("chapter"),
+        )
+        assert call_mock.call_count == 3
+        everything: tuple[str, ...] = ("erotica", "pornographic", "safe", "suggestive")
+        assert {
+            (call.args[0], tuple(call.args[1]["contentRating[]"])): call.args[1][
+                "ids[]"
+            ]
+            for call in call_mock.call_args_list
+        } == {
+            ("/manga", everything): [manga_id],
+            ("/manga", ("safe",)): [manga_id, "other"],
+            ("/chapter", everything): ["chapter"],
+        }
+
     async def test_get_chapters(self, client: Client, mocker: MockerFixture) -> None:
         first_response: Response[Chapter] = Response[Chapter].model_validate(
             json.loads(Path("tests/samples/chapter_results.json").read_text())
@@ -133,21 +401,319 @@ class TestClient:
         checked_params: dict[str, Any] = {
             "manga": "Jujutsu Kaisen offered me some a+ combat in s2",
             "includeExternalUrl": 0,
+            "includes[]": ["scanlation_group"],
             "order[chapter]": "asc",
             "translatedLanguage[]": "en",
+            "limit": 100,
             "offset": 1,
             "contentRating[]": ["safe"],
         }
         _call_mock.assert_called_with("/chapter", checked_params, model=Chapter)
 
-    async def test_get_download_info(
+    async def test_iter_chapters(self, client: Client, mocker: MockerFixture) -> None:
+        first_response: Response[Chapter] = Response[Chapter].model_validate(
+            json.loads(Path("tests/samples/chapter_results.json").read_text())
+        )
+        second_response: Response[Chapter] = Response[Chapter].model_validate(
+            json.loads(Path("tests/samples/chapter_second_results.json").read_text())
+        )
+        mocker.patch.object(
+            client, "_call", side_effect=[first_response, second_response]
+        )
+        chapters: list[Chapter] = [
+            chapter async for chapter in client.iter_chapters("any", "en")
+        ]
+        assert [chapter.id for chapter in chapters] == [
+            first_response.data[0].id,
+            second_response.data[0].id,
+        ]
+
+    @pytest.mark.parametrize("updated_since", [None, "2024-01-01T00:00:00"])
+    async def test_iter_feed(
+        self, client: Client, mocker: MockerFixture, updated_since: str | None
+    ) -> None:
+        response: Response[Chapter] = Response[Chapter].model_validate(
+            json.loads(Path("tests/samples/chapter_results.json").read_text())
+        )
+        response.total = 1
+        _call_mock: MagicMock = mocker.patch.object(
+            client, "_call", return_value=response
+        )
+        chapters: list[Chapter] = [
+            chapter
+            async for chapter in client.iter_feed(
+                "manga-id", "en", ["safe"], updated_since
+            )
+        ]
+        assert chapters == response.data
+        checked_params: dict[str, Any] = {
+            "includeExternalUrl": 0,
+            "includes[]": ["manga", "scanlation_group"],
+            "order[chapter]": "asc",
+            "translatedLanguage[]": "en",
+            "contentRating[]": ["safe"],
+            "limit": 500,
+        }
+        if updated_since is not None:
+            checked_params["updatedAtSince"] = updated_since
+        _call_mock.assert_called_once_with(
+            "/manga/manga-id/feed", checked_params, model=Chapter
+        )
+
+    async def test_count_updates(self, client: Client, mocker: MockerFixture) -> None:
+        response: Response[Chapter] = Response[Chapter].model_validate(
+            json.loads(Path("tests/samples/chapter_results.json").read_text())
+        )
+        _call_mock: MagicMock = mocker.patch.object(
+            client, "_call", return_value=response
+        )
+        assert await client.count_updates("2024-01-01T00:00:00", "en") == 2
+        _call_mock.assert_called_once_with(
+            "/chapter",
+            {
+                "includeExternalUrl": 0,
+                "includes[]": ["manga", "scanlation_group"],
+                "order[createdAt]": "asc",
+                "translatedLanguage[]": "en",
+                "updatedAtSince": "2024-01-01T00:00:00",
+                "limit": 1,
+            },
+            model=Chapter,
+            use_cache=False,
+        )
+
+    async def test_iter_updates(self, client: Client, mocker: MockerFixture) -> None:
+        response: Response[Chapter] = Response[Chapter].model_validate(
+            json.loads(Path("tests/samples/chapter_results.json").read_text())
+        )
+        response.total = 1
+        _call_mock: MagicMock = mocker.patch.object(
+            client, "_call", return_value=response
+        )
+        chapters: list[Chapter] = [
+            chapter
+            async for chapter in client.iter_updates(
+                "2024-01-01T00:00:00", "en", ["safe"]
+            )
+        ]
+        assert chapters == response.data
+        _call_mock.assert_called_once_with(
+            "/chapter",
+            {
+                "includeExternalUrl": 0,
+                "includes[]": ["manga", "scanlation_group"],
+                "order[createdAt]": "asc",
+                "translatedLanguage[]": "en",
+                "updatedAtSince": "2024-01-01T00:00:00",
+                "contentRating[]": ["safe"],
+                "limit": 100,
+            },
+            model=Chapter,
+        )
+
+    async def test__paginate_prefetch(
         self, client: Client, mocker: MockerFixture
     ) -> None:
-        json_data: dict[str, Any] = json.loads(
-            Path("tests/samples/download_chapter_info.json").read_text()
+        in_flight: list[int] = [0]
+        peak: list[int] = [0]
+
+        async def fake_call(
+            url: str, params: dict[str, Any], *, model: type[BaseModel]
+        ) -> Response[Manga]:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+            return Response[Manga](
+                result="ok",
+                response="collection",
+                data=[],
+                limit=10,
+                offset=params.get("offset", 0),
+                total=100,
+            )
+
+        call_mock: MagicMock = mocker.patch.object(
+            client, "_call", side_effect=fake_call
         )
+        client.page_prefetch = 2
+        offsets: list[int] = [
+            response.offset
+            async for response in client._paginate("/manga", dict(), model=Manga)
+        ]
+        assert offsets == list(range(0, 100, 10))
+        assert call_mock.call_count == 10
+        assert peak[0] == 2
+
+    async def test__paginate_early_stop(
+        self, client: Client, mocker: MockerFixture
+    ) -> None:
+        cancelled: list[int] = []
+
+        async def fake_call(
+            url: str, params: dict[str, Any], *, model: type[BaseModel]
+        ) -> Response[Manga]:
+            try:
+                if params.get("offset", 0) > 10:
+                    await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(params["offset"])
+                raise
+            return Response[Manga](
+                result="ok",
+                response="collection",
+                data=[],
+                limit=10,
+                offset=params.get("offset", 0),
+                total=100,
+            )
+
+        mocker.patch.object(client, "_call", side_effect=fake_call)
+        async with aclosing(client._paginate("/manga", dict(), model=Manga)) as pages:
+            async for response in pages:
+                if response.offset == 10:
+                    break
+        assert cancelled == [20, 30, 40]
+
+    @pytest.mark.parametrize(
+        "order, requests",
+        [({"order[chapter]": "asc"}, 7), ({"order[createdAt]": "asc"}, 6)],
+    )
+    async def test__paginate_windows(
+        self,
+        client: Client,
+        mocker: MockerFixture,
+        order: dict[str, str],
+        requests: int,
+    ) -> None:
+        items: list[tuple[str, str]] = [
+            (str(i), f"2020-01-01T00:00:{i // 2:02d}+00:00") for i in range(25)
+        ]
+
+        async def fake_call(
+            url: str, params: dict[str, Any], *, model: type[BaseModel]
+        ) -> Response[Chapter]:
+            matching: list[tuple[str, str]] = [
+                item
+                for item in items
+                if item[1][:19] >= params.get("createdAtSince", "")
+            ]
+            offset: int = params.get("offset", 0)
+            assert offset + params["limit"] <= 10
+            data: list[dict[str, Any]] = [
+                dict(
+                    chapter_json,
+                    id=id,
+                    attributes=dict(chapter_json["attributes"], createdAt=created_at),
+                )
+                for id, created_at in matching[offset : offset + params["limit"]]
+            ]
+            return Response[Chapter].model_validate(
+                dict(
+                    result="ok",
+                    response="collection",
+                    data=data,
+                    limit=params["limit"],
+                    offset=offset,
+                    total=len(matching),
+                )
+            )
+
+        chapter_json: dict[str, Any] = json.loads(
+            Path("tests/samples/chapter.json").read_text()
+        )
+        mocker.patch("pymanga.client.MAX_OFFSET", 10)
+        call_mock: MagicMock = mocker.patch.object(
+            client, "_call", side_effect=fake_call
+        )
+        ids: list[str] = [
+            page_item.id
+            async for page in client._paginate(
+                "/chapter", order, model=Chapter, limit=5
+            )
+            for page_item in page.data
+        ]
+        assert ids == [item[0] for item in items]
+        assert call_mock.call_count == requests
+        for call in call_mock.call_args_list[1:]:
+            assert "order[chapter]" not in call.args[1]
+            assert call.args[1]["order[createdAt]"] == "asc"
+
+    async def test__paginate_windows_summary(
+        self, client: Client, mocker: MockerFixture
+    ) -> None:
+        manga_json: dict[str, Any] = json.loads(
+            Path("tests/samples/manga.json").read_text()
+        )
+        items: list[dict[str, Any]] = [
+            dict(
+                manga_json,
+                id=str(i),
+                attributes=dict(
+                    manga_json["attributes"],
+                    createdAt=f"2020-01-01T{i // 3600:02d}:{i // 60 % 60:02d}:"
+                    f"{i % 60:02d}+00:00",
+                ),
+            )
+            for i in range(10_050)
+        ]
+
+        async def fake_call(
+            url: str, params: dict[str, Any], *, model: type[BaseModel]
+        ) -> Response:
+            matching: list[dict[str, Any]] = [
+                item
+                for item in items
+                if item["attributes"]["createdAt"][:19]
+                >= params.get("createdAtSince", "")
+            ]
+            offset: int = params.get("offset", 0)
+            assert offset + params["limit"] <= 10_000
+            return Response[model].model_validate(  # type: ignore[valid-type]
+                dict(
+                    result="ok",
+                    response="collection",
+                    data=matching[offset : offset + params["limit"]],
+                    limit=params["limit"],
+                    offset=offset,
+                    total=len(matching),
+                )
+            )
+
+        mocker.patch.object(client, "_call", side_effect=fake_call)
+        mangas: list[MangaSummary] = await client.get_mangas(
+            "Naruto", model=MangaSummary
+        )
+        assert [manga.id for manga in mangas] == [item["id"] for item in items]
+
+    async def test__paginate_windows_stuck(
+        self, client: Client, mocker: MockerFixture
+    ) -> None:
+        chapter_json: dict[str, Any] = json.loads(
+            Path("tests/samples/chapter.json").read_text()
+        )
+        response: Response[Chapter] = Response[Chapter].model_validate(
+            dict(
+                result="ok",
+                response="collection",
+                data=[chapter_json],
+                limit=1,
+                offset=0,
+                total=20,
+            )
+        )
+        mocker.patch("pymanga.client.MAX_OFFSET", 1)
+        mocker.patch.object(client, "_call", return_value=response)
+        with pytest.raises(MangadexClientError):
+            async for _ in client._paginate("/chapter", dict(), model=Chapter):
+                pass
+
+    async def test_get_download_info(
+        self, client: Client, mocker: MockerFixture
+    ) -> None:
+        content: bytes = Path("tests/samples/download_chapter_info.json").read_bytes()
         mocker.patch.object(
-            client.session, "get", return_value=FakeResponse(json_data, b"")
+            client.session, "get", return_value=FakeResponse(dict(), content)
         )
         result: DownloadInfo = await client.get_chapter_download_info("any")
         assert isinstance(result, DownloadInfo)
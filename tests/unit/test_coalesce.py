@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from pymanga.coalesce import RequestCoalescer
+
+
+class Backend:
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+        self.release: asyncio.Event = asyncio.Event()
+        self.release.set()
+
+    async def fetch(self, ids: list[str]) -> dict[str, str]:
+        self.calls.append(ids)
+        await self.release.wait()
+        return {key: key.upper() for key in ids if key != "missing"}
+
+
+@pytest.mark.asyncio
+class TestRequestCoalescer:
+    async def test_window(self) -> None:
+        backend: Backend = Backend()
+        coalescer: RequestCoalescer[str] = RequestCoalescer(backend.fetch)
+        results: list[str | None] = await asyncio.gather(
+            coalescer.get("a"),
+            coalescer.get("b"),
+            coalescer.get("a"),
+            coalescer.get("missing"),
+        )
+        assert results == ["A", "B", "A", None]
+        assert backend.calls == [["a", "b", "missing"]]
+        assert await coalescer.get("c") == "C"
+        assert backend.calls[-1] == ["c"]
+
+    async def test_max_batch(self) -> None:
+        backend: Backend = Backend()
+        coalescer: RequestCoalescer[str] = RequestCoalescer(
+            backend.fetch, window=10, max_batch=2
+        )
+        results: list[str | None] = await asyncio.wait_for(
+            asyncio.gather(*[coalescer.get(key) for key in "abcd"]), 1
+        )
+        assert results == ["A", "B", "C", "D"]
+        assert backend.calls == [["a", "b"], ["c", "d"]]
+
+    async def test_in_flight(self) -> None:
+        backend: Backend = Backend()
+        backend.release.clear()
+        coalescer: RequestCoalescer[str] = RequestCoalescer(backend.fetch, window=0)
+        first: asyncio.Task[str | None] = asyncio.create_task(coalescer.get("a"))
+        while not backend.calls:
+            await asyncio.sleep(0)
+        second: asyncio.Task[str | None] = asyncio.create_task(coalescer.get("a"))
+        await asyncio.sleep(0)
+        first.cancel()
+        backend.release.set()
+        assert await second == "A"
+        assert backend.calls == [["a"]]
+
+    async def test_error(self) -> None:
+        async def fetch(ids: list[str]) -> dict[str, str]:
+            raise ValueError("fake")
+
+        coalescer: RequestCoalescer[str] = RequestCoalescer(fetch)
+        results: list[str | None | BaseException] = await asyncio.gather(
+            coalescer.get("a"), coalescer.get("b"), return_exceptions=True
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+
+    async def test_invalid_batch(self) -> None:
+        with pytest.raises(ValueError):
+            RequestCoalescer(Backend().fetch, max_batch=0)
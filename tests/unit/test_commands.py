@@ -2,14 +2,42 @@ import json
 from pathlib import Path
 from typing import Any
 from unittest.mock import MagicMock
+import zipfile
 import pytest
 from pytest_mock import MockerFixture
-from pymanga.__main__ import download, _download_manga
+from conftest import PAGE, async_iter, write_cbz
+from pymanga.__main__ import (
+    batch,
+    download,
+    enqueue,
+    sync,
+    verify,
+    work,
+    _batch_download,
+    _client,
+    _download_manga,
+    _enqueue,
+    _sync_library,
+    _verify_library,
+    _work,
+)
+from pymanga.batch import BatchDownload
+from pymanga.catalogue import ReleasePolicy
 from pymanga.client import Client, SearchTags
+from pymanga.exception import MangadexClientError
+from pymanga.index import ChapterIndex, IndexedChapter
+from pymanga.integrity import ArchiveCheck
+from pymanga.jobqueue import JobQueue, QueueWorker
+from pymanga.metrics import SpanLog
 from pymanga.models.chapter import Chapter
 from pymanga.models.common import Response
 from pymanga.models.download_chapter_info import DownloadInfo
 from pymanga.models.manga import Manga
+from pymanga.scheduler import ChapterJob, DownloadScheduler, DownloadSettings
+from pymanga.session import SessionSettings
+from pymanga.shaping import BandwidthSchedule
+from pymanga.sync import LibrarySync
+from pymanga.transcode import TranscodeOptions
 
 
 class TestCommands:
@@ -17,9 +45,322 @@ class TestCommands:
         download_mock: MagicMock = mocker.patch("pymanga.__main__._download_manga")
         download("Jujustu Kaisen")
         download_mock.assert_called_once_with(
-            "Jujustu Kaisen", "en", None, None, [], [], [], Path("./output"), False
+            "Jujustu Kaisen",
+            "en",
+            None,
+            None,
+            [],
+            [],
+            [],
+            Path("./output"),
+            False,
+            DownloadSettings(),
+            latest=None,
+            volume=None,
+            policy=ReleasePolicy(),
+        )
+
+    def test_download_releases(self, mocker: MockerFixture) -> None:
+        download_mock: MagicMock = mocker.patch("pymanga.__main__._download_manga")
+        download("Jujustu Kaisen", preferred_groups="a,b", release_criteria="pages")
+        assert download_mock.call_args.kwargs["policy"] == ReleasePolicy(
+            ["a", "b"], ["pages"]
+        )
+        download("Jujustu Kaisen", all_releases=True)
+        assert download_mock.call_args.kwargs["policy"] is None
+
+    def test_download_releases_invalid(self, mocker: MockerFixture) -> None:
+        download_mock: MagicMock = mocker.patch("pymanga.__main__._download_manga")
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        download("Jujustu Kaisen", release_criteria="groups,size")
+        download_mock.assert_not_called()
+        print_mock.assert_called_once_with(
+            "Invalid release selection: Unknown release criteria: size"
+        )
+
+    def test_download_transcode(self, mocker: MockerFixture) -> None:
+        download_mock: MagicMock = mocker.patch("pymanga.__main__._download_manga")
+        download("Jujustu Kaisen", height=1600, grayscale=True, image_format="webp")
+        assert download_mock.call_args.args[-1].transcode == TranscodeOptions(
+            height=1600, grayscale=True, format="webp"
+        )
+
+    def test_download_transcode_invalid(self, mocker: MockerFixture) -> None:
+        download_mock: MagicMock = mocker.patch("pymanga.__main__._download_manga")
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        download("Jujustu Kaisen", image_format="bmp")
+        download_mock.assert_not_called()
+        print_mock.assert_called_once_with(
+            "Invalid transcoding: Unsupported image format: bmp"
+        )
+
+    def test_download_http2(self, mocker: MockerFixture) -> None:
+        download_mock: MagicMock = mocker.patch("pymanga.__main__._download_manga")
+        download("Jujustu Kaisen", http2=True)
+        assert download_mock.call_args.args[-1].sessions == SessionSettings(http2=True)
+        download_mock.reset_mock()
+        mocker.patch("pymanga.session.h2", None)
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        download("Jujustu Kaisen", http2=True)
+        download_mock.assert_not_called()
+        print_mock.assert_called_once_with(
+            "Invalid session: HTTP/2 requires h2, install pymanga[http2]."
+        )
+
+    def test_download_metrics(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        download_mock: MagicMock = mocker.patch("pymanga.__main__._download_manga")
+        download(
+            "Jujustu Kaisen",
+            metrics=tmp_path / "metrics.prom",
+            trace=tmp_path / "trace.jsonl",
+        )
+        settings: DownloadSettings = download_mock.call_args.args[-1]
+        assert settings.metrics_path == tmp_path / "metrics.prom"
+        assert settings.trace_path == tmp_path / "trace.jsonl"
+        client: Client = _client(tmp_path, settings)
+        assert client.metrics.hooks == [SpanLog(tmp_path / "trace.jsonl")]
+        assert _client(tmp_path, DownloadSettings()).metrics.hooks == []
+
+    def test_download_bandwidth(self, mocker: MockerFixture) -> None:
+        download_mock: MagicMock = mocker.patch("pymanga.__main__._download_manga")
+        download("Jujustu Kaisen", bandwidth="8,22:00-07:00=unlimited")
+        assert download_mock.call_args.args[-1].bandwidth == BandwidthSchedule.parse(
+            "8,22:00-07:00=unlimited"
+        )
+        download_mock.reset_mock()
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        download("Jujustu Kaisen", bandwidth="fast")
+        download_mock.assert_not_called()
+        print_mock.assert_called_once_with(
+            "Invalid bandwidth: 'fast': could not convert string to float: 'fast'"
+        )
+
+    def test_sync(self, mocker: MockerFixture) -> None:
+        sync_mock: MagicMock = mocker.patch("pymanga.__main__._sync_library")
+        sync(["a", "b"], content_rating="safe,suggestive")
+        sync_mock.assert_called_once_with(
+            ["a", "b"],
+            "en",
+            ["safe", "suggestive"],
+            Path("output"),
+            False,
+            DownloadSettings(),
+            ReleasePolicy(),
+        )
+
+    def test_sync_pages(self, mocker: MockerFixture) -> None:
+        sync_mock: MagicMock = mocker.patch("pymanga.__main__._sync_library")
+        sync(["a"], width=800, archive_workers=4, data_saver_fallback=True)
+        settings: DownloadSettings = sync_mock.call_args.args[5]
+        assert settings.transcode == TranscodeOptions(width=800)
+        assert settings.archive_workers == 4
+        assert settings.data_saver_fallback
+
+    @pytest.mark.asyncio
+    async def test__sync_library(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        run_mock: MagicMock = mocker.patch.object(
+            LibrarySync, "run", return_value=[ChapterJob("1", "chapter 1")]
+        )
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        await _sync_library(["a"], "en", [], tmp_path, False)
+        assert run_mock.call_args.args[0] == ["a"]
+        scheduler: DownloadScheduler = run_mock.call_args.args[1]
+        assert scheduler.index is not None
+        assert scheduler.index.path == tmp_path / ".index.sqlite"
+        print_mock.assert_called_once_with("Failed to download 1 chapters.")
+
+    @pytest.mark.asyncio
+    async def test__sync_library_listing_failure(
+        self, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        mocker.patch.object(LibrarySync, "run", side_effect=MangadexClientError("fake"))
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        await _sync_library(["a"], "en", [], tmp_path, False)
+        print_mock.assert_called_once_with("Failed to list the chapters: fake")
+
+    def test_batch(self, mocker: MockerFixture) -> None:
+        batch_mock: MagicMock = mocker.patch("pymanga.__main__._batch_download")
+        batch(Path("manifest.json"), chapter_concurrency=8, split_spreads=True)
+        batch_mock.assert_called_once_with(
+            Path("manifest.json"),
+            Path("output"),
+            False,
+            DownloadSettings(
+                chapter_concurrency=8,
+                transcode=TranscodeOptions(split_spreads=True),
+            ),
+            policy=ReleasePolicy(),
         )
 
+    def test_batch_transcode_invalid(self, mocker: MockerFixture) -> None:
+        batch_mock: MagicMock = mocker.patch("pymanga.__main__._batch_download")
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        batch(Path("manifest.json"), grayscale=True, quality=0)
+        batch_mock.assert_not_called()
+        print_mock.assert_called_once_with(
+            "Invalid transcoding: The quality must be between 1 and 100."
+        )
+
+    @pytest.mark.asyncio
+    async def test__batch_download(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        manifest: Path = tmp_path / "manifest.json"
+        manifest.write_text('[{"id": "a"}, {"title": "b"}]')
+
+        async def run(
+            self: BatchDownload, entries: list, scheduler: DownloadScheduler
+        ) -> list[ChapterJob]:
+            self.failed.append(entries[1])
+            return [ChapterJob("1", "chapter 1")]
+
+        run_mock: MagicMock = mocker.patch.object(
+            BatchDownload, "run", autospec=True, side_effect=run
+        )
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        await _batch_download(manifest, tmp_path, False)
+        assert len(run_mock.call_args.args[1]) == 2
+        print_mock.assert_any_call("Failed to resolve 1 mangas.")
+        print_mock.assert_any_call("Failed to download 1 chapters.")
+
+    @pytest.mark.asyncio
+    async def test__batch_download_listing_failure(
+        self, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        manifest: Path = tmp_path / "manifest.json"
+        manifest.write_text('[{"id": "a"}]')
+        mocker.patch.object(
+            BatchDownload, "run", side_effect=MangadexClientError("fake")
+        )
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        await _batch_download(manifest, tmp_path, False)
+        print_mock.assert_called_once_with("Failed to list the chapters: fake")
+
+    @pytest.mark.asyncio
+    async def test__batch_download_invalid(
+        self, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        run_mock: MagicMock = mocker.patch.object(BatchDownload, "run")
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        await _batch_download(tmp_path / "missing.json", tmp_path, False)
+        run_mock.assert_not_called()
+        assert print_mock.call_args.args[0].startswith("Invalid manifest")
+
+    def test_enqueue(self, mocker: MockerFixture) -> None:
+        enqueue_mock: MagicMock = mocker.patch("pymanga.__main__._enqueue")
+        enqueue(Path("manifest.json"), queue=Path("queue.sqlite"))
+        enqueue_mock.assert_called_once_with(
+            Path("manifest.json"),
+            Path("output"),
+            Path("queue.sqlite"),
+            DownloadSettings(),
+            ReleasePolicy(),
+        )
+
+    def test_enqueue_all_releases(self, mocker: MockerFixture) -> None:
+        enqueue_mock: MagicMock = mocker.patch("pymanga.__main__._enqueue")
+        enqueue(Path("manifest.json"), all_releases=True)
+        assert enqueue_mock.call_args.args[-1] is None
+
+    def test_sync_release_criteria_invalid(self, mocker: MockerFixture) -> None:
+        sync_mock: MagicMock = mocker.patch("pymanga.__main__._sync_library")
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        sync(["a"], release_criteria="cheapest")
+        sync_mock.assert_not_called()
+        print_mock.assert_called_once_with(
+            "Invalid release selection: Unknown release criteria: cheapest"
+        )
+
+    @pytest.mark.asyncio
+    async def test__enqueue(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        manifest: Path = tmp_path / "manifest.json"
+        manifest.write_text('[{"id": "a"}]')
+        mocker.patch.object(
+            BatchDownload,
+            "jobs",
+            side_effect=async_iter([ChapterJob("1", "chapter 1", 1, "2024")]),
+        )
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        await _enqueue(manifest, tmp_path)
+        print_mock.assert_called_once_with("Queued 1 chapters.")
+        assert JobQueue(tmp_path / ".queue.sqlite").counts() == {"pending": 1}
+
+    @pytest.mark.asyncio
+    async def test__enqueue_invalid(
+        self, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        await _enqueue(tmp_path / "missing.json", tmp_path)
+        assert print_mock.call_args.args[0].startswith("Invalid manifest")
+
+    def test_work_transcode_invalid(self, mocker: MockerFixture) -> None:
+        work_mock: MagicMock = mocker.patch("pymanga.__main__._work")
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        work(grayscale=True, quality=0)
+        work_mock.assert_not_called()
+        print_mock.assert_called_once_with(
+            "Invalid transcoding: The quality must be between 1 and 100."
+        )
+
+    def test_work(self, mocker: MockerFixture) -> None:
+        work_mock: MagicMock = mocker.patch("pymanga.__main__._work")
+        work(batch_size=5)
+        work_mock.assert_called_once_with(
+            Path("output"), None, False, DownloadSettings(), 5, 300.0, 1
+        )
+
+    def test_work_processes(self, mocker: MockerFixture) -> None:
+        context_mock: MagicMock = mocker.patch("multiprocessing.get_context")
+        work(processes=3)
+        context_mock.assert_called_once_with("spawn")
+        process_mock: MagicMock = context_mock.return_value.Process
+        assert process_mock.call_count == 3
+        assert process_mock.call_args.kwargs["args"][-1] == 3
+        assert process_mock.return_value.start.call_count == 3
+        assert process_mock.return_value.join.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test__work(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        run_mock: MagicMock = mocker.patch.object(QueueWorker, "run", return_value=2)
+        split_mock: MagicMock = mocker.patch("pymanga.ratelimit.RateLimiter.split")
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        await _work(tmp_path, None, False, DownloadSettings(), 10, 60.0, 2)
+        run_mock.assert_called_once()
+        split_mock.assert_called_once_with(2)
+        assert print_mock.call_args.args[0].startswith("Downloaded 2 chapters")
+
+    def test_verify(self, mocker: MockerFixture) -> None:
+        verify_mock: MagicMock = mocker.patch("pymanga.__main__._verify_library")
+        verify(repair=True, workers=8)
+        verify_mock.assert_called_once_with(
+            Path("output"), True, False, 8, DownloadSettings()
+        )
+
+    @pytest.mark.asyncio
+    async def test__verify_library(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        write_cbz(tmp_path / "intact.cbz", 2)
+        tmp_path.joinpath("broken.cbz").write_bytes(b"fake")
+        with zipfile.ZipFile(tmp_path / "gaps.cbz", "w") as archive:
+            archive.writestr("0002.png", PAGE)
+        index: ChapterIndex = ChapterIndex(tmp_path / ".index.sqlite")
+        index.record(
+            IndexedChapter("1", 2, "2022", "hash", str(tmp_path / "gaps.cbz"), 1)
+        )
+        index.close()
+        run_mock: MagicMock = mocker.patch.object(
+            DownloadScheduler, "run", return_value=[]
+        )
+        print_mock: MagicMock = mocker.patch("pymanga.__main__.print")
+        damaged: list[ArchiveCheck] = await _verify_library(tmp_path, False, False)
+        assert [check.path.name for check in damaged] == ["broken.cbz", "gaps.cbz"]
+        print_mock.assert_any_call("Damaged | gaps: 1 pages missing")
+        print_mock.assert_called_with("Checked 3 archives, 2 damaged.")
+        run_mock.assert_not_called()
+        await _verify_library(tmp_path, True, False)
+        run_mock.assert_called_once_with(
+            [ChapterJob("1", "gaps", 2, "2022", salvage=str(tmp_path / "gaps.cbz"))]
+        )
+        print_mock.assert_any_call("Cannot repair | broken: not in the index")
+        print_mock.assert_called_with("Repaired 1 of 1 archives.")
+
     def test_download_command_no_mangas(self, mocker: MockerFixture) -> None:
         mocker.patch.object(Client, "get_mangas", return_value=[])
         download_mock: MagicMock = mocker.patch("pymanga.__main__.print")
@@ -32,7 +373,7 @@ class TestCommands:
         )
         mangas: list[Manga] = Response[Manga].model_validate(mangas_json).data
         mocker.patch.object(Client, "get_mangas", return_value=mangas)
-        mocker.patch.object(Client, "get_chapters", return_value=[])
+        mocker.patch.object(Client, "iter_chapters", side_effect=async_iter([]))
         mocker.patch("builtins.input", return_value=1)
         download_mock: MagicMock = mocker.patch("pymanga.__main__.print")
         download("Jujustu Kaisen")
@@ -51,6 +392,7 @@ class TestCommands:
     )
     async def test__download_manga(
         self,
+        tmp_path: Path,
         mocker: MockerFixture,
         input_value: str,
         expected_call_count: int,
@@ -70,7 +412,7 @@ class TestCommands:
         chapters: list[Chapter] = Response[Chapter].model_validate(chapters_json).data
         download: DownloadInfo = DownloadInfo.model_validate(download_json)
         mocker.patch.object(Client, "get_mangas", return_value=mangas)
-        mocker.patch.object(Client, "get_chapters", return_value=chapters)
+        mocker.patch.object(Client, "iter_chapters", side_effect=async_iter(chapters))
         mocker.patch.object(Client, "get_chapter_download_info", return_value=download)
         get_tags_mock: MagicMock = mocker.patch.object(
             Client,
@@ -87,14 +429,164 @@ class TestCommands:
             [],
             [],
             [],
-            Path("output"),
+            tmp_path,
             False,
         )
         assert download_mock.call_count == expected_call_count
         get_tags_mock.assert_not_called()
 
     @pytest.mark.asyncio
-    async def test_download_manga_with_tags(self, mocker: MockerFixture) -> None:
+    @pytest.mark.parametrize(
+        "selection, expected",
+        [
+            (dict(from_chapter=2, to_chapter=10.5), ["2", "2", "10.5"]),
+            (dict(latest=2), ["10.5", "11"]),
+            (dict(volume=1), ["1", "2", "2"]),
+            (dict(volume=1, policy=ReleasePolicy()), ["1", "2"]),
+        ],
+    )
+    async def test__download_manga_selection(
+        self,
+        tmp_path: Path,
+        mocker: MockerFixture,
+        selection: dict[str, Any],
+        expected: list[str],
+    ) -> None:
+        mangas: list[Manga] = (
+            Response[Manga]
+            .model_validate_json(Path("tests/samples/manga_results.json").read_bytes())
+            .data
+        )
+        sample: Chapter = Chapter.model_validate_json(
+            Path("tests/samples/chapter.json").read_bytes()
+        )
+        chapters: list[Chapter] = [
+            sample.model_copy(
+                update=dict(
+                    id=f"{number}-{i}",
+                    attributes=sample.attributes.model_copy(
+                        update=dict(chapter=number, volume="1" if i < 3 else "2")
+                    ),
+                )
+            )
+            for i, number in enumerate(["1", "2", "2", "10.5", "11", None])
+        ]
+        mocker.patch.object(Client, "get_mangas", return_value=mangas)
+        mocker.patch.object(Client, "iter_chapters", side_effect=async_iter(chapters))
+        mocker.patch("builtins.input", return_value="1")
+        jobs: list[ChapterJob] = []
+
+        async def run(queued: Any) -> list[ChapterJob]:
+            jobs.extend([job async for job in queued])
+            return []
+
+        mocker.patch.object(DownloadScheduler, "run", side_effect=run)
+        await _download_manga(
+            "Jujustu Kaisen",
+            "en",
+            selection.pop("from_chapter", None),
+            selection.pop("to_chapter", None),
+            [],
+            [],
+            [],
+            tmp_path,
+            False,
+            **selection,
+        )
+        assert [job.name.split(" ")[0] for job in jobs] == [
+            number.replace(".", ",") for number in expected
+        ]
+
+    @pytest.mark.asyncio
+    async def test__download_manga_streams_range(
+        self, tmp_path: Path, mocker: MockerFixture
+    ) -> None:
+        mangas: list[Manga] = (
+            Response[Manga]
+            .model_validate_json(Path("tests/samples/manga_results.json").read_bytes())
+            .data
+        )
+        sample: Chapter = Chapter.model_validate_json(
+            Path("tests/samples/chapter.json").read_bytes()
+        )
+        jobs: list[ChapterJob] = []
+        listed_before: list[int] = []
+
+        async def iter_chapters(*args: Any) -> Any:
+            for number in ["1", "2", "3", "4"]:
+                listed_before.append(len(jobs))
+                yield sample.model_copy(
+                    update=dict(
+                        id=number,
+                        attributes=sample.attributes.model_copy(
+                            update=dict(chapter=number)
+                        ),
+                    )
+                )
+
+        async def run(queued: Any) -> list[ChapterJob]:
+            async for job in queued:
+                jobs.append(job)
+            return []
+
+        mocker.patch.object(Client, "get_mangas", return_value=mangas)
+        mocker.patch.object(Client, "iter_chapters", side_effect=iter_chapters)
+        mocker.patch("builtins.input", return_value="1")
+        mocker.patch.object(DownloadScheduler, "run", side_effect=run)
+        mocker.patch("pymanga.__main__.LISTING_BATCH", 1)
+        await _download_manga(
+            "Jujustu Kaisen", "en", 2, None, [], [], [], tmp_path, False
+        )
+        assert [job.chapter_id for job in jobs] == ["2", "3", "4"]
+        assert listed_before == [0, 0, 0, 1]
+
+    def test_download_streams(self, tmp_path: Path, mocker: MockerFixture) -> None:
+        mangas: list[Manga] = (
+            Response[Manga]
+            .model_validate_json(Path("tests/samples/manga_results.json").read_bytes())
+            .data
+        )
+        sample: Chapter = Chapter.model_validate_json(
+            Path("tests/samples/chapter.json").read_bytes()
+        )
+        jobs: list[ChapterJob] = []
+        listed_before: list[int] = []
+
+        async def iter_chapters(*args: Any) -> Any:
+            for chapter_id, number in [
+                ("1a", "1"),
+                ("1b", "1"),
+                ("2", "2"),
+                ("3", "3"),
+            ]:
+                listed_before.append(len(jobs))
+                yield sample.model_copy(
+                    update=dict(
+                        id=chapter_id,
+                        attributes=sample.attributes.model_copy(
+                            update=dict(chapter=number)
+                        ),
+                    )
+                )
+
+        async def run(queued: Any) -> list[ChapterJob]:
+            async for job in queued:
+                jobs.append(job)
+            return []
+
+        mocker.patch.object(Client, "get_mangas", return_value=mangas)
+        mocker.patch.object(Client, "iter_chapters", side_effect=iter_chapters)
+        mocker.patch("builtins.input", return_value="1")
+        mocker.patch.object(DownloadScheduler, "run", side_effect=run)
+        mocker.patch("pymanga.__main__.LISTING_BATCH", 1)
+        download("Jujustu Kaisen", output=tmp_path, report=False)
+        assert [job.chapter_id for job in jobs] == ["1a", "2", "3"]
+        assert listed_before == [0, 0, 0, 1]
+
+    @pytest.mark.asyncio
+    async def test_download_manga_with_tags(
+        self, tmp_path: Path, mocker: MockerFixture
+    ) -> None:
         mangas_json: dict[str, Any] = json.loads(
             Path("tests/samples/manga_results.json").read_text()
         )
@@ -108,7 +600,7 @@ class TestCommands:
         chapters: list[Chapter] = Response[Chapter].model_validate(chapters_json).data
         download: DownloadInfo = DownloadInfo.model_validate(download_json)
         mocker.patch.object(Client, "get_mangas", return_value=mangas)
-        mocker.patch.object(Client, "get_chapters", return_value=chapters)
+        mocker.patch.object(Client, "iter_chapters", side_effect=async_iter(chapters))
         mocker.patch.object(Client, "get_chapter_download_info", return_value=download)
         get_tags_mock: MagicMock = mocker.patch.object(
             Client,
@@ -125,8 +617,111 @@ class TestCommands:
             ["shounen", "action"],
             ["yaoi"],
             ["safe", "suggestive"],
-            Path("output"),
+            tmp_path,
             False,
         )
         get_tags_mock.assert_called_once()
         download_mock.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test__download_manga_cache(
+        self, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        get_mangas_mock: MagicMock = mocker.patch.object(
+            Client, "get_mangas", autospec=True, return_value=[]
+        )
+        await _download_manga(
+            "Jujustu Kaisen",
+            "en",
+            None,
+            None,
+            [],
+            [],
+            [],
+            tmp_path,
+            False,
+            DownloadSettings(cache_dir=tmp_path / "cache", refresh_cache=True),
+        )
+        client: Client = get_mangas_mock.call_args.args[0]
+        assert client.cache is not None
+        assert client.cache.path == tmp_path / "cache" / "responses.sqlite"
+        assert client.cache.bypass
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "version, updated_at, expected_call_count",
+        [
+            (2, "2021-05-17T02:39:06+00:00", 0),
+            (1, "2021-05-17T02:39:06+00:00", 1),
+            (2, "2021-05-16T00:00:00+00:00", 1),
+        ],
+    )
+    async def test__download_manga_index(
+        self,
+        tmp_path: Path,
+        mocker: MockerFixture,
+        version: int,
+        updated_at: str,
+        expected_call_count: int,
+    ) -> None:
+        mangas_json: dict[str, Any] = json.loads(
+            Path("tests/samples/manga_results.json").read_text()
+        )
+        chapters_json: dict[str, Any] = json.loads(
+            Path("tests/samples/chapter_results.json").read_text()
+        )
+        mangas: list[Manga] = Response[Manga].model_validate(mangas_json).data
+        chapters: list[Chapter] = Response[Chapter].model_validate(chapters_json).data
+        mocker.patch.object(Client, "get_mangas", return_value=mangas)
+        mocker.patch.object(Client, "iter_chapters", side_effect=async_iter(chapters))
+        mocker.patch.object(
+            Client,
+            "get_chapter_download_info",
+            return_value=DownloadInfo.model_validate(
+                json.loads(Path("tests/samples/download_chapter_info.json").read_text())
+            ),
+        )
+        mocker.patch("builtins.input", return_value="1")
+        download_mock: MagicMock = mocker.patch.object(DownloadInfo, "download")
+        index: ChapterIndex = ChapterIndex(tmp_path / ".index.sqlite")
+        index.record(
+            IndexedChapter(chapters[0].id, version, updated_at, None, "renamed.cbz", 4)
+        )
+        index.close()
+        await _download_manga(
+            "Jujustu Kaisen", "en", None, None, [], [], [], tmp_path, False
+        )
+        assert download_mock.call_count == expected_call_count
+
+    @pytest.mark.asyncio
+    async def test__download_manga_adopt(
+        self, tmp_path: Path, mocker: MockerFixture
+    ) -> None:
+        mangas_json: dict[str, Any] = json.loads(
+            Path("tests/samples/manga_results.json").read_text()
+        )
+        chapters_json: dict[str, Any] = json.loads(
+            Path("tests/samples/chapter_results.json").read_text()
+        )
+        mangas: list[Manga] = Response[Manga].model_validate(mangas_json).data
+        chapters: list[Chapter] = Response[Chapter].model_validate(chapters_json).data
+        mocker.patch.object(Client, "get_mangas", return_value=mangas)
+        mocker.patch.object(Client, "iter_chapters", side_effect=async_iter(chapters))
+        mocker.patch("builtins.input", return_value="1")
+        download_mock: MagicMock = mocker.patch.object(DownloadInfo, "download")
+        chapter_name: str = (
+            f"{chapters[0].attributes.chapter} - "
+            f"{mangas[0].attributes.title.get('en')}"
+            f" -{chapters[0].attributes.title}"
+        ).replace(".", ",")
+        write_cbz(tmp_path / f"{chapter_name}.cbz", chapters[0].attributes.pages)
+        await _download_manga(
+            "Jujustu Kaisen", "en", None, None, [], [], [], tmp_path, False
+        )
+        download_mock.assert_not_called()
+        indexed: IndexedChapter | None = ChapterIndex(tmp_path / ".index.sqlite").get(
+            chapters[0].id
+        )
+        assert indexed is not None
+        assert indexed.size == tmp_path.joinpath(f"{chapter_name}.cbz").stat().st_size
+        assert indexed.hash is None
@@ -0,0 +1,166 @@
+import json
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock
+import pytest
+from pytest_mock import MockerFixture
+from conftest import write_cbz
+from pymanga.index import ChapterIndex, IndexedChapter, SyncPlan
+from pymanga.models.chapter import Chapter
+from pymanga.models.common import Response
+
+
+@pytest.fixture
+def chapter() -> Chapter:
+    chapters_json: dict[str, Any] = json.loads(
+        Path("tests/samples/chapter_results.json").read_text()
+    )
+    return Response[Chapter].model_validate(chapters_json).data[0]
+
+
+class TestChapterIndex:
+    def test_record(self, tmp_path: Path) -> None:
+        index: ChapterIndex = ChapterIndex(tmp_path / "index.sqlite")
+        assert index.get("1") is None
+        chapter: IndexedChapter = IndexedChapter(
+            "1", 1, "2021-05-17T02:39:06+00:00", "hash", "1.cbz", 4, 10.0
+        )
+        index.record(chapter)
+        assert index.get("1") == chapter
+        index.record(
+            IndexedChapter("1", 2, "2021-05-18T00:00:00+00:00", "new", "2.cbz", 8)
+        )
+        indexed: IndexedChapter | None = index.get("1")
+        assert indexed is not None
+        assert indexed.version == 2
+        assert indexed.path == "2.cbz"
+        index.close()
+        index.close()
+        assert ChapterIndex(tmp_path / "index.sqlite").get("1") == indexed
+
+    @pytest.mark.parametrize(
+        "version, updated_at, action",
+        [
+            (None, None, "fetch"),
+            (2, "2021-05-17T02:39:06+00:00", "skip"),
+            (3, "2021-05-16T00:00:00+00:00", "skip"),
+            (1, "2021-05-18T00:00:00+00:00", "refetch"),
+            (2, "2021-05-16T00:00:00+00:00", "refetch"),
+        ],
+    )
+    def test_plan(
+        self,
+        tmp_path: Path,
+        chapter: Chapter,
+        version: int | None,
+        updated_at: str | None,
+        action: str,
+    ) -> None:
+        index: ChapterIndex = ChapterIndex(tmp_path / "index.sqlite")
+        if version is not None and updated_at is not None:
+            index.record(
+                IndexedChapter(chapter.id, version, updated_at, None, "1.cbz", 4)
+            )
+        plan: SyncPlan = index.plan([chapter])
+        assert getattr(plan, action) == [chapter]
+        assert sum(len(chapters) for chapters in vars(plan).values()) == 1
+
+    def test_plan_batches(self, tmp_path: Path, chapter: Chapter) -> None:
+        index: ChapterIndex = ChapterIndex(tmp_path / "index.sqlite", batch_size=2)
+        chapters: list[Chapter] = [
+            chapter.model_copy(update={"id": str(i)}) for i in range(5)
+        ]
+        for indexed in chapters[::2]:
+            index.record(
+                IndexedChapter(
+                    indexed.id,
+                    indexed.attributes.version,
+                    indexed.attributes.updated_at,
+                    None,
+                    f"{indexed.id}.cbz",
+                    4,
+                )
+            )
+        plan: SyncPlan = index.plan(chapters)
+        assert [chapter.id for chapter in plan.skip] == ["0", "2", "4"]
+        assert [chapter.id for chapter in plan.fetch] == ["1", "3"]
+        assert plan.refetch == []
+
+    def test_downloaded(
+        self, tmp_path: Path, chapter: Chapter, mocker: MockerFixture
+    ) -> None:
+        index: ChapterIndex = ChapterIndex(tmp_path / "index.sqlite")
+        chapters: list[Chapter] = [
+            chapter.model_copy(update={"id": str(i)}) for i in range(4)
+        ]
+        index.record(
+            IndexedChapter("0", chapter.attributes.version, "9999", None, "0.cbz", 4)
+        )
+        index.record(IndexedChapter("1", 0, "", None, "1.cbz", 4))
+        write_cbz(tmp_path / "2.cbz", chapter.attributes.pages)
+        plan_spy: MagicMock = mocker.spy(index, "plan")
+        adopt_spy: MagicMock = mocker.spy(index, "adopt")
+        downloaded: set[str] = index.downloaded(
+            [(chapter, tmp_path / f"{chapter.id}.cbz") for chapter in chapters]
+        )
+        assert downloaded == {"0", "2"}
+        plan_spy.assert_called_once()
+        assert [call.args[0].id for call in adopt_spy.call_args_list] == ["2", "3"]
+
+    @pytest.mark.asyncio
+    async def test_run(self, tmp_path: Path, chapter: Chapter) -> None:
+        index: ChapterIndex = ChapterIndex(tmp_path / "index.sqlite")
+        write_cbz(tmp_path / "a.cbz", chapter.attributes.pages)
+        downloaded: set[str] = await index.run(
+            index.downloaded, [(chapter, tmp_path / "a.cbz")]
+        )
+        assert downloaded == {chapter.id}
+        index.close()
+        assert index._executor is None
+        assert index.get(chapter.id) is not None
+
+    def test_locate_uses_index(self, tmp_path: Path) -> None:
+        index: ChapterIndex = ChapterIndex(tmp_path / "index.sqlite")
+        plan: list[tuple] = index.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM chapters WHERE path = ?", ("a.cbz",)
+        ).fetchall()
+        assert "chapters_path" in plan[0][-1]
+
+    def test_last_synced(self, tmp_path: Path) -> None:
+        index: ChapterIndex = ChapterIndex(tmp_path / "index.sqlite")
+        assert index.last_synced("manga") is None
+        index.mark_synced("manga", "2024-01-01T00:00:00")
+        index.mark_synced("manga", "2024-01-02T00:00:00")
+        assert index.last_synced("manga") == "2024-01-02T00:00:00"
+        assert index.last_synced("other") is None
+
+    def test_adopt(self, tmp_path: Path, chapter: Chapter) -> None:
+        index: ChapterIndex = ChapterIndex(tmp_path / "index.sqlite")
+        assert not index.adopt(chapter, tmp_path / "missing.cbz")
+        assert index.get(chapter.id) is None
+        write_cbz(tmp_path / "chapter.cbz", chapter.attributes.pages)
+        assert index.adopt(chapter, tmp_path / "chapter.cbz")
+        indexed: IndexedChapter | None = index.get(chapter.id)
+        assert indexed is not None
+        assert indexed.path == str(tmp_path / "chapter.cbz")
+        assert indexed.size == (tmp_path / "chapter.cbz").stat().st_size
+        assert indexed.version == chapter.attributes.version
+        assert index.locate(tmp_path / "chapter.cbz") == indexed
+        assert index.locate(tmp_path / "missing.cbz") is None
+
+    def test_adopt_reads_no_page(
+        self, tmp_path: Path, chapter: Chapter, mocker: MockerFixture
+    ) -> None:
+        index: ChapterIndex = ChapterIndex(tmp_path / "index.sqlite")
+        write_cbz(tmp_path / "chapter.cbz", chapter.attributes.pages)
+        read_mock: MagicMock = mocker.patch("pymanga.integrity._check_entry")
+        assert index.adopt(chapter, tmp_path / "chapter.cbz")
+        read_mock.assert_not_called()
+
+    def test_adopt_incomplete(self, tmp_path: Path, chapter: Chapter) -> None:
+        index: ChapterIndex = ChapterIndex(tmp_path / "index.sqlite")
+        write_cbz(tmp_path / "chapter.cbz", chapter.attributes.pages - 1)
+        assert not index.adopt(chapter, tmp_path / "chapter.cbz")
+        tmp_path.joinpath("broken.cbz").write_bytes(b"fake")
+        assert not index.adopt(chapter, tmp_path / "broken.cbz")
+        assert index.get(chapter.id) is None
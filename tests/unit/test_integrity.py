@@ -0,0 +1,117 @@
+import hashlib
+import io
+from pathlib import Path
+import zipfile
+import pytest
+from conftest import PAGE, write_cbz
+from pymanga.integrity import (
+    ArchiveCheck,
+    check_archive,
+    check_file,
+    check_image,
+    salvage,
+)
+
+JPEG: bytes = b"\xff\xd8\xff\xe0fake\xff\xd9"
+GIF: bytes = b"GIF89afake;"
+WEBP: bytes = b"RIFF\x08\x00\x00\x00WEBPfake"
+
+
+class TestCheckImage:
+    @pytest.mark.parametrize("content", [PAGE, JPEG, JPEG + b"\x00\x00", GIF, WEBP])
+    def test_whole(self, content: bytes) -> None:
+        assert check_image(content[:12], content[-32:], len(content)) is None
+
+    @pytest.mark.parametrize(
+        "content, problem",
+        [
+            (PAGE[:-4], "truncated PNG"),
+            (JPEG[:-1], "truncated JPEG"),
+            (GIF[:-1], "truncated GIF"),
+            (WEBP[:-1], "truncated WebP"),
+            (b"<html>error</html>", "not an image"),
+        ],
+    )
+    def test_damaged(self, content: bytes, problem: str) -> None:
+        assert check_image(content[:12], content[-32:], len(content)) == problem
+
+    def test_check_file(self) -> None:
+        file: io.BytesIO = io.BytesIO(b"\x00" * 100 + PAGE)
+        assert check_file(file) == "not an image"
+        file = io.BytesIO(PAGE + b"\x00" * 100)
+        assert check_file(file) == "truncated PNG"
+        file = io.BytesIO(PAGE)
+        assert check_file(file) is None
+        assert file.tell() == 0
+
+
+class TestCheckArchive:
+    def test_intact(self, tmp_path: Path) -> None:
+        write_cbz(tmp_path / "chapter.cbz", 3)
+        check: ArchiveCheck = check_archive(tmp_path / "chapter.cbz", 3)
+        assert check.intact
+        assert check.pages == {0, 1, 2}
+
+    def test_damaged(self, tmp_path: Path) -> None:
+        with zipfile.ZipFile(tmp_path / "chapter.cbz", "w") as archive:
+            archive.writestr("0001.png", PAGE)
+            archive.writestr("0002.png", PAGE[:-4])
+            info: zipfile.ZipInfo = zipfile.ZipInfo("0003-1.png")
+            info.comment = f"sha256:{hashlib.sha256(b'other').hexdigest()}".encode()
+            archive.writestr(info, PAGE)
+            archive.writestr("0003-2.png", PAGE)
+            archive.writestr("0005.png", PAGE)
+            archive.writestr("ComicInfo.xml", "<ComicInfo/>")
+        check: ArchiveCheck = check_archive(tmp_path / "chapter.cbz")
+        assert not check.intact
+        assert check.pages == {0, 4}
+        assert check.damaged == {1, 2}
+        assert check.missing == 1
+        assert check.problems == [
+            "0002.png: truncated PNG",
+            "0003-1.png: checksum mismatch",
+        ]
+        assert check_archive(tmp_path / "chapter.cbz", 7).missing == 3
+
+    def test_structure(self, tmp_path: Path) -> None:
+        with zipfile.ZipFile(tmp_path / "chapter.cbz", "w") as archive:
+            archive.writestr("0001.png", PAGE)
+            archive.writestr("0002.png", PAGE[:-4])
+        assert check_archive(tmp_path / "chapter.cbz", 2, read=False).intact
+        assert check_archive(tmp_path / "chapter.cbz", 3, read=False).missing == 1
+        tmp_path.joinpath("broken.cbz").write_bytes(b"fake")
+        assert not check_archive(tmp_path / "broken.cbz", read=False).intact
+
+    def test_unnumbered(self, tmp_path: Path) -> None:
+        with zipfile.ZipFile(tmp_path / "chapter.cbz", "w") as archive:
+            archive.writestr("x1-abc.png", PAGE)
+            archive.writestr("x2-def.png", PAGE)
+        assert check_archive(tmp_path / "chapter.cbz").intact
+        assert check_archive(tmp_path / "chapter.cbz", 2).intact
+        assert check_archive(tmp_path / "chapter.cbz", 3).missing == 1
+
+    def test_unreadable(self, tmp_path: Path) -> None:
+        tmp_path.joinpath("chapter.cbz").write_bytes(b"fake")
+        check: ArchiveCheck = check_archive(tmp_path / "chapter.cbz")
+        assert not check.intact
+        assert len(check.problems) == 1
+
+
+class TestSalvage:
+    def test_salvage(self, tmp_path: Path) -> None:
+        with zipfile.ZipFile(tmp_path / "chapter.cbz", "w") as archive:
+            archive.writestr("0001.png", PAGE)
+            archive.writestr("0002-1.png", PAGE)
+            archive.writestr("0002-2.png", b"fake")
+            archive.writestr("0003.png", PAGE)
+            archive.writestr("0004.png", PAGE)
+        target: Path = tmp_path / ".partial" / "pages.cbz"
+        assert salvage(tmp_path / "chapter.cbz", target, 3) == 2
+        with zipfile.ZipFile(target) as archive:
+            assert archive.namelist() == ["0001.png", "0003.png"]
+            assert archive.read("0003.png") == PAGE
+
+    def test_salvage_nothing(self, tmp_path: Path) -> None:
+        tmp_path.joinpath("chapter.cbz").write_bytes(b"fake")
+        assert salvage(tmp_path / "chapter.cbz", tmp_path / "pages.cbz") == 0
+        assert not tmp_path.joinpath("pages.cbz").exists()
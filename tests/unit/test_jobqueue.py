@@ -0,0 +1,208 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Any
+from unittest.mock import MagicMock
+import pytest
+from pytest_mock import MockerFixture
+from pymanga.client import Client
+from pymanga.jobqueue import JobQueue, QueueWorker, enqueue_all
+from pymanga.scheduler import ChapterJob, DownloadScheduler
+
+
+@pytest.fixture
+def queue(tmp_path: Path) -> JobQueue:
+    return JobQueue(tmp_path / "queue.sqlite", max_attempts=2)
+
+
+def make_jobs(count: int, version: int = 1) -> list[ChapterJob]:
+    return [
+        ChapterJob(str(i), f"chapter {i}", version, "2024-01-01") for i in range(count)
+    ]
+
+
+class TestJobQueue:
+    def test_claim(self, queue: JobQueue) -> None:
+        queue.enqueue(make_jobs(3))
+        assert queue.claim("a", 2, 60) == make_jobs(2)
+        assert queue.claim("b", 2, 60) == make_jobs(3)[2:]
+        assert queue.claim("c", 2, 60) == []
+        assert queue.counts() == {"leased": 3}
+
+    def test_claim_series(self, queue: JobQueue) -> None:
+        jobs: list[ChapterJob] = [
+            replace(job, series="manga", weight=2.5) for job in make_jobs(2)
+        ]
+        queue.enqueue(jobs)
+        assert queue.claim("a", 2, 60) == jobs
+
+    def test_migrate(self, tmp_path: Path) -> None:
+        connection: sqlite3.Connection = sqlite3.connect(tmp_path / "queue.sqlite")
+        connection.execute(
+            "CREATE TABLE jobs ("
+            "chapter_id TEXT PRIMARY KEY, name TEXT NOT NULL, version INTEGER, "
+            "updated_at TEXT, status TEXT NOT NULL DEFAULT 'pending', "
+            "attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, "
+            "lease_expires REAL NOT NULL DEFAULT 0, error TEXT)"
+        )
+        connection.execute(
+            "INSERT INTO jobs (chapter_id, name, version, updated_at) "
+            "VALUES ('0', 'chapter 0', 1, '2024-01-01')"
+        )
+        connection.commit()
+        connection.close()
+        queue: JobQueue = JobQueue(tmp_path / "queue.sqlite")
+        assert queue.claim("a", 1, 60) == make_jobs(1)
+        queue.enqueue([ChapterJob("1", "chapter 1", series="manga", weight=2)])
+        assert queue.claim("a", 1, 60) == [
+            ChapterJob("1", "chapter 1", series="manga", weight=2)
+        ]
+        queue.close()
+
+    def test_complete(self, queue: JobQueue) -> None:
+        queue.enqueue(make_jobs(2))
+        queue.claim("a", 2, 60)
+        queue.complete("a", "0")
+        queue.complete("b", "1")
+        assert queue.counts() == {"done": 1, "leased": 1}
+
+    def test_fail(self, queue: JobQueue) -> None:
+        queue.enqueue(make_jobs(1))
+        queue.claim("a", 1, 60)
+        queue.fail("a", "0", "error")
+        assert queue.counts() == {"pending": 1}
+        queue.claim("a", 1, 60)
+        queue.fail("a", "0", "error")
+        assert queue.counts() == {"failed": 1}
+        assert queue.claim("a", 1, 60) == []
+
+    def test_expired_lease(self, queue: JobQueue) -> None:
+        queue.enqueue(make_jobs(1))
+        assert queue.claim("a", 1, -1) == make_jobs(1)
+        assert queue.claim("b", 1, -1) == make_jobs(1)
+        queue.complete("a", "0")
+        assert queue.counts() == {"leased": 1}
+        assert queue.claim("c", 1, 60) == []
+        assert queue.counts() == {"failed": 1}
+
+    def test_renew(self, queue: JobQueue) -> None:
+        queue.enqueue(make_jobs(2))
+        queue.claim("a", 2, -1)
+        queue.renew("a", ["0"], 60)
+        queue.renew("b", ["1"], 60)
+        assert queue.claim("b", 2, 60) == make_jobs(2)[1:]
+
+    def test_enqueue_again(self, queue: JobQueue) -> None:
+        queue.enqueue(make_jobs(2))
+        queue.claim("a", 2, 60)
+        queue.complete("a", "0")
+        queue.complete("a", "1")
+        queue.enqueue(make_jobs(1))
+        queue.enqueue(make_jobs(2, version=2)[1:])
+        assert queue.counts() == {"done": 1, "pending": 1}
+        assert queue.claim("a", 2, 60) == make_jobs(2, version=2)[1:]
+        queue.close()
+        queue.close()
+
+    def test_concurrent_claims(self, queue: JobQueue) -> None:
+        queue.enqueue(make_jobs(50))
+
+        def claim(worker: int) -> list[str]:
+            other: JobQueue = JobQueue(queue.path)
+            claimed: list[str] = []
+            while jobs := other.claim(str(worker), 3, 60):
+                claimed.extend(job.chapter_id for job in jobs)
+            other.close()
+            return claimed
+
+        with ThreadPoolExecutor(4) as executor:
+            claims: list[list[str]] = list(executor.map(claim, range(4)))
+        claimed: list[str] = [chapter_id for ids in claims for chapter_id in ids]
+        assert sorted(claimed, key=int) == [str(i) for i in range(50)]
+
+
+@pytest.mark.asyncio
+class TestQueueWorker:
+    async def test_run(
+        self, queue: JobQueue, client: Client, mocker: MockerFixture
+    ) -> None:
+        queue.enqueue(make_jobs(5))
+        scheduler: DownloadScheduler = DownloadScheduler(client, client.output)
+        attempts: list[str] = []
+
+        async def run(jobs: list[ChapterJob]) -> list[ChapterJob]:
+            attempts.extend(job.chapter_id for job in jobs)
+            return [job for job in jobs if job.chapter_id == "3"]
+
+        mocker.patch.object(scheduler, "run", side_effect=run)
+        worker: QueueWorker = QueueWorker(queue, scheduler, "a", batch_size=2)
+        assert await worker.run() == 4
+        assert attempts == ["0", "1", "2", "3", "3", "4"]
+        assert queue.counts() == {"done": 4, "failed": 1}
+
+    async def test_run_waits_for_leases(
+        self, queue: JobQueue, client: Client, mocker: MockerFixture
+    ) -> None:
+        queue.enqueue(make_jobs(1))
+        queue.claim("gone", 1, 0.05)
+        scheduler: DownloadScheduler = DownloadScheduler(client, client.output)
+        mocker.patch.object(scheduler, "run", return_value=[])
+        worker: QueueWorker = QueueWorker(queue, scheduler, "a", poll_interval=0.01)
+        assert await worker.run() == 1
+        assert queue.counts() == {"done": 1}
+
+    async def test_run_batch_renews(
+        self, queue: JobQueue, client: Client, mocker: MockerFixture
+    ) -> None:
+        queue.enqueue(make_jobs(1))
+        jobs: list[ChapterJob] = queue.claim("a", 1, 0.03)
+        scheduler: DownloadScheduler = DownloadScheduler(client, client.output)
+
+        async def run(jobs: list[ChapterJob]) -> list[ChapterJob]:
+            await asyncio.sleep(0.1)
+            assert queue.claim("b", 1, 60) == []
+            return []
+
+        mocker.patch.object(scheduler, "run", side_effect=run)
+        renew_mock: MagicMock = mocker.spy(queue, "renew")
+        await QueueWorker(queue, scheduler, "a", lease=0.03).run_batch(jobs)
+        assert renew_mock.call_count >= 2
+        assert queue.counts() == {"done": 1}
+
+    async def test_run_off_the_loop(
+        self, queue: JobQueue, client: Client, mocker: MockerFixture
+    ) -> None:
+        queue.enqueue(make_jobs(1))
+        scheduler: DownloadScheduler = DownloadScheduler(client, client.output)
+        mocker.patch.object(scheduler, "run", return_value=[])
+        threads: set[int] = set()
+        claim: Any = queue.claim
+        complete: Any = queue.complete
+
+        def spy(method: Any) -> Any:
+            def wrapper(*args: Any) -> Any:
+                threads.add(threading.get_ident())
+                return method(*args)
+
+            return wrapper
+
+        mocker.patch.object(queue, "claim", side_effect=spy(claim))
+        mocker.patch.object(queue, "complete", side_effect=spy(complete))
+        assert await QueueWorker(queue, scheduler, "a").run() == 1
+        assert threads and threading.get_ident() not in threads
+
+
+@pytest.mark.asyncio
+async def test_enqueue_all(queue: JobQueue, mocker: MockerFixture) -> None:
+    enqueue_mock: MagicMock = mocker.spy(queue, "enqueue")
+
+    async def jobs() -> Any:
+        for job in make_jobs(5):
+            yield job
+
+    assert await enqueue_all(queue, jobs(), batch_size=2) == 5
+    assert enqueue_mock.call_count == 3
+    assert queue.counts() == {"pending": 5}
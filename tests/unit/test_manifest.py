@@ -0,0 +1,113 @@
+import json
+from pathlib import Path
+import pytest
+from pytest_mock import MockerFixture
+from pymanga.manifest import ManifestEntry, load_manifest
+
+
+class TestManifestEntry:
+    @pytest.mark.parametrize(
+        "from_chapter, to_chapter, chapter, expected",
+        [
+            (None, None, None, True),
+            (None, None, "3", True),
+            (2, 4, "3", True),
+            (2, 4, "4", True),
+            (2, 4, "4.5", False),
+            (2, None, "1", False),
+            (None, 4, "10", False),
+            (2, 4, None, False),
+        ],
+    )
+    def test_includes(
+        self,
+        from_chapter: float | None,
+        to_chapter: float | None,
+        chapter: str | None,
+        expected: bool,
+    ) -> None:
+        entry: ManifestEntry = ManifestEntry(
+            id="manga", from_chapter=from_chapter, to_chapter=to_chapter
+        )
+        assert entry.includes(chapter) is expected
+
+    def test_validation(self) -> None:
+        with pytest.raises(ValueError):
+            ManifestEntry()
+        assert ManifestEntry(title="Naruto", content_rating="safe,suggestive") == (
+            ManifestEntry(title="Naruto", content_rating=["safe", "suggestive"])
+        )
+        assert ManifestEntry(id="manga", groups="a,b").groups == ["a", "b"]
+        assert ManifestEntry(title="Naruto").name == "Naruto"
+        assert ManifestEntry(id="manga").name == "manga"
+        assert ManifestEntry(id="manga", weight="2").weight == 2
+        with pytest.raises(ValueError):
+            ManifestEntry(id="manga", weight=0)
+
+
+class TestLoadManifest:
+    def test_json(self, tmp_path: Path) -> None:
+        path: Path = tmp_path / "manifest.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "mangas": [
+                        {"id": "manga", "language": "fr", "to_chapter": 10},
+                        {"title": "Naruto", "content_rating": ["safe"]},
+                    ]
+                }
+            )
+        )
+        assert load_manifest(path) == [
+            ManifestEntry(id="manga", language="fr", to_chapter=10),
+            ManifestEntry(title="Naruto", content_rating=["safe"]),
+        ]
+
+    def test_csv(self, tmp_path: Path) -> None:
+        path: Path = tmp_path / "manifest.csv"
+        path.write_text(
+            "id,title,language,from_chapter,to_chapter,content_rating\n"
+            'manga,,en,1,10,"safe,suggestive"\n'
+            ",Naruto,,,,\n"
+        )
+        assert load_manifest(path) == [
+            ManifestEntry(
+                id="manga",
+                from_chapter=1,
+                to_chapter=10,
+                content_rating=["safe", "suggestive"],
+            ),
+            ManifestEntry(title="Naruto"),
+        ]
+
+    def test_yaml(self, tmp_path: Path) -> None:
+        pytest.importorskip("yaml")
+        path: Path = tmp_path / "manifest.yaml"
+        path.write_text("- id: manga\n  from_chapter: 2.5\n- title: Naruto\n")
+        assert load_manifest(path) == [
+            ManifestEntry(id="manga", from_chapter=2.5),
+            ManifestEntry(title="Naruto"),
+        ]
+
+    def test_yaml_missing(self, tmp_path: Path, mocker: MockerFixture) -> None:
+        mocker.patch("pymanga.manifest.yaml", None)
+        path: Path = tmp_path / "manifest.yml"
+        path.write_text("- id: manga\n")
+        with pytest.raises(ValueError, match="PyYAML"):
+            load_manifest(path)
+
+    @pytest.mark.parametrize(
+        "filename, content",
+        [
+            ("manifest.txt", "manga"),
+            ("manifest.json", '"manga"'),
+            ("manifest.json", '["manga"]'),
+            ("manifest.json", '[{"language": "en"}]'),
+            ("manifest.json", '[{"id": "manga", "to_chapter": "last"}]'),
+        ],
+    )
+    def test_invalid(self, tmp_path: Path, filename: str, content: str) -> None:
+        path: Path = tmp_path / filename
+        path.write_text(content)
+        with pytest.raises(ValueError):
+            load_manifest(path)
@@ -0,0 +1,194 @@
+import asyncio
+import json
+from pathlib import Path
+import time
+from typing import Any
+import pytest
+from pymanga.metrics import (
+    Histogram,
+    Labels,
+    Metrics,
+    MetricsExporter,
+    MetricsHook,
+    Span,
+    SpanLog,
+)
+
+
+class RecordingHook(MetricsHook):
+    def __init__(self) -> None:
+        self.records: list[tuple[str, str, float, Labels]] = []
+        self.spans: list[Span] = []
+
+    def record(self, kind: str, name: str, value: float, labels: Labels) -> None:
+        self.records.append((kind, name, value, labels))
+
+    def finish(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+class TestHistogram:
+    def test_cumulative(self) -> None:
+        histogram: Histogram = Histogram((0.1, 1.0))
+        for value in [0.05, 0.1, 0.5, 2.0]:
+            histogram.observe(value)
+        assert histogram.cumulative() == [("0.1", 2), ("1", 3), ("+Inf", 4)]
+        assert (histogram.sum, histogram.count) == (2.65, 4)
+
+
+class TestMetrics:
+    def test_record(self) -> None:
+        hook: RecordingHook = RecordingHook()
+        metrics: Metrics = Metrics([hook])
+        metrics.increment("requests", host="a")
+        metrics.increment("requests", 2, host="a")
+        metrics.gauge("depth", 3, queue="pages")
+        metrics.gauge("depth", 1, queue="pages")
+        metrics.observe("seconds", 0.2, endpoint="/manga", status=200)
+        assert metrics.counters == {("requests", (("host", "a"),)): 3}
+        assert metrics.gauges == {("depth", (("queue", "pages"),)): 1}
+        assert hook.records[-1] == (
+            "histogram",
+            "seconds",
+            0.2,
+            (("endpoint", "/manga"), ("status", "200")),
+        )
+        assert len(hook.records) == 5
+
+    def test_prometheus(self) -> None:
+        metrics: Metrics = Metrics()
+        metrics.increment("requests", endpoint='/a"b')
+        metrics.increment("requests", endpoint="/c")
+        metrics.gauge("depth", 2)
+        metrics.observe("seconds", 0.3)
+        lines: list[str] = metrics.prometheus().splitlines()
+        assert lines[:5] == [
+            "# TYPE requests counter",
+            'requests{endpoint="/a\\"b"} 1',
+            'requests{endpoint="/c"} 1',
+            "# TYPE depth gauge",
+            "depth 2",
+        ]
+        assert "# TYPE seconds histogram" in lines
+        assert 'seconds_bucket{le="0.25"} 0' in lines
+        assert 'seconds_bucket{le="0.5"} 1' in lines
+        assert lines[-2:] == ["seconds_sum 0.3", "seconds_count 1"]
+
+    def test_snapshot(self) -> None:
+        metrics: Metrics = Metrics()
+        metrics.increment("requests", host="a")
+        metrics.observe("seconds", 0.3)
+        snapshot: dict[str, Any] = metrics.snapshot()
+        assert snapshot["counters"] == [
+            {"name": "requests", "labels": {"host": "a"}, "value": 1}
+        ]
+        assert snapshot["gauges"] == []
+        assert snapshot["histograms"][0]["buckets"]["+Inf"] == 1
+
+    def test_export(self, tmp_path: Path) -> None:
+        metrics: Metrics = Metrics()
+        metrics.increment("requests")
+        metrics.export(tmp_path / "metrics.prom")
+        metrics.export(tmp_path / "metrics.prom")
+        assert (tmp_path / "metrics.prom").read_text() == metrics.prometheus()
+        metrics.export(tmp_path / "metrics.jsonl")
+        metrics.export(tmp_path / "metrics.jsonl")
+        lines: list[str] = (tmp_path / "metrics.jsonl").read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])["counters"][0]["name"] == "requests"
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "metrics.jsonl",
+            "metrics.prom",
+        ]
+
+    def test_span(self) -> None:
+        hook: RecordingHook = RecordingHook()
+        metrics: Metrics = Metrics([hook])
+        with metrics.span("chapter", chapter="a") as chapter:
+            with metrics.span("page", index=0) as page:
+                pass
+            with pytest.raises(ZeroDivisionError):
+                with metrics.span("page", index=1):
+                    divmod(1, 0)
+        with metrics.span("chapter") as other:
+            pass
+        assert [span.name for span in hook.spans] == [
+            "page",
+            "page",
+            "chapter",
+            "chapter",
+        ]
+        assert page.trace_id == chapter.trace_id != other.trace_id
+        assert page.parent_id == chapter.span_id
+        assert chapter.parent_id is None
+        assert [span.status for span in hook.spans] == ["ok", "error", "ok", "ok"]
+        assert chapter.attributes == {"chapter": "a"}
+        assert chapter.duration >= page.duration >= 0
+        assert (
+            metrics.histograms[("pymanga_span_seconds", (("span", "page"),))].count == 2
+        )
+
+    @pytest.mark.asyncio
+    async def test_span_tasks(self) -> None:
+        hook: RecordingHook = RecordingHook()
+        metrics: Metrics = Metrics([hook])
+
+        async def page(index: int) -> None:
+            with metrics.span("page", index=index):
+                await asyncio.sleep(0)
+
+        with metrics.span("chapter") as chapter:
+            await asyncio.gather(page(0), page(1))
+        assert [span.parent_id for span in hook.spans[:2]] == [chapter.span_id] * 2
+
+    def test_timed(self) -> None:
+        metrics: Metrics = Metrics()
+        assert metrics.timed("seconds", divmod, step="write")(7, 2) == (3, 1)
+        assert metrics.histograms[("seconds", (("step", "write"),))].count == 1
+
+
+class TestSpanLog:
+    def test_finish(self, tmp_path: Path) -> None:
+        metrics: Metrics = Metrics([SpanLog(tmp_path / "trace.jsonl")])
+        with metrics.span("chapter", chapter="a"):
+            with metrics.span("page", index=0):
+                pass
+        metrics.close()
+        spans: list[dict[str, Any]] = [
+            json.loads(line)
+            for line in (tmp_path / "trace.jsonl").read_text().splitlines()
+        ]
+        assert [span["name"] for span in spans] == ["page", "chapter"]
+        assert spans[0]["parent_id"] == spans[1]["span_id"]
+        assert spans[1]["attributes"] == {"chapter": "a"}
+
+    def test_buffered(self, tmp_path: Path) -> None:
+        log: SpanLog = SpanLog(tmp_path / "trace.jsonl", interval=0.05)
+        metrics: Metrics = Metrics([log])
+        with metrics.span("chapter"):
+            pass
+        assert not (tmp_path / "trace.jsonl").exists()
+        for _ in range(100):
+            if (tmp_path / "trace.jsonl").exists():
+                break
+            time.sleep(0.01)
+        assert len((tmp_path / "trace.jsonl").read_text().splitlines()) == 1
+        with metrics.span("chapter"):
+            pass
+        metrics.close()
+        metrics.close()
+        assert len((tmp_path / "trace.jsonl").read_text().splitlines()) == 2
+        assert log._thread is None
+
+
+@pytest.mark.asyncio
+class TestMetricsExporter:
+    async def test_export(self, tmp_path: Path) -> None:
+        metrics: Metrics = Metrics()
+        path: Path = tmp_path / "metrics.jsonl"
+        async with MetricsExporter(metrics, path, interval=0.01):
+            metrics.increment("requests")
+            await asyncio.sleep(0.05)
+        lines: list[str] = path.read_text().splitlines()
+        assert len(lines) >= 2
+        assert json.loads(lines[-1])["counters"][0]["value"] == 1
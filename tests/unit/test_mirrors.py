@@ -0,0 +1,32 @@
+import pytest
+from pymanga.mirrors import MirrorRanking, NodeStats
+
+
+class TestNodeStats:
+    def test_record(self) -> None:
+        stats: NodeStats = NodeStats()
+        stats.record(1.0)
+        stats.record(3.0)
+        stats.record(None)
+        assert stats.requests == 3
+        assert stats.failures == 1
+        assert stats.error_rate == pytest.approx(1 / 3)
+        assert stats.latency == pytest.approx(2.0)
+
+
+class TestMirrorRanking:
+    def test_is_bad(self) -> None:
+        mirrors: MirrorRanking = MirrorRanking(max_latency=2.0, min_requests=2)
+        mirrors.record("https://slow.mangadex.network/token", 3.0)
+        assert not mirrors.is_bad("https://slow.mangadex.network/other")
+        mirrors.record("https://slow.mangadex.network/token", 3.0)
+        assert mirrors.is_bad("https://slow.mangadex.network/other")
+        assert not mirrors.is_bad("https://unknown.mangadex.network")
+
+    def test_is_bad_error_rate(self) -> None:
+        mirrors: MirrorRanking = MirrorRanking(max_error_rate=0.5, min_requests=2)
+        mirrors.record("https://node.mangadex.network", 0.1)
+        mirrors.record("https://node.mangadex.network", None)
+        assert not mirrors.is_bad("https://node.mangadex.network")
+        mirrors.record("https://node.mangadex.network", None)
+        assert mirrors.is_bad("https://node.mangadex.network")
@@ -1,17 +1,34 @@
 import asyncio
+import hashlib
+import io
 import json
 from pathlib import Path
-from typing import Any
-from unittest.mock import MagicMock
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterator
+from unittest.mock import AsyncMock, MagicMock
 import httpx
+import zipfile
 import pytest
+from PIL import Image
 from pytest_mock import MockerFixture
-from conftest import FakeResponse
-from pymanga.exception import DownloadImageError
+from conftest import PAGE, FakeResponse
+from pymanga.archive import CbzWriter
+from pymanga.buffers import ByteBudget
+from pymanga.checkpoint import ChapterCheckpoint
+from pymanga.exception import DownloadImageError, MangadexClientError
+from pymanga.mirrors import MirrorRanking
 from pymanga.models.manga import Manga, Tag
-from pymanga.models.chapter import Chapter
+from pymanga.models.chapter import Chapter, Relationship
 from pymanga.models.common import Response
-from pymanga.models.download_chapter_info import DownloadInfo
+from pymanga.report import PageReport, ReportQueue
+from pymanga.shaping import BandwidthSchedule, BandwidthShaper
+from pymanga.models.download_chapter_info import (
+    ChapterDownload,
+    DownloadInfo,
+    DownloadOptions,
+)
+from pymanga.transcode import TranscodeOptions
+from pymanga.workers import WorkerPool, process_page
 
 
 class TestMangaModels:
@@ -24,6 +41,20 @@ class TestMangaModels:
         assert manga.type == "manga"
         assert len(manga.relationships) == 130
 
+    def test_chapter_model_manga(self) -> None:
+        chapter: Chapter = Chapter.model_validate(
+            json.loads(Path("tests/samples/chapter.json").read_text())
+        )
+        assert chapter.manga_title is None
+        chapter.relationships = [
+            Relationship(id="group", type="scanlation_group"),
+            Relationship(id="manga", type="manga", attributes={"title": {"en": "A"}}),
+        ]
+        assert chapter.manga is chapter.relationships[1]
+        assert chapter.manga_title == "A"
+        chapter.relationships = []
+        assert chapter.manga is None
+
     def test_chapter_model(self) -> None:
         chapter_json: dict[str, Any] = json.loads(
             Path("tests/samples/chapter.json").read_text()
@@ -46,77 +77,468 @@ class TestMangaModels:
         assert len(download_chapter_info.chapter.data) == 6
         assert len(download_chapter_info.chapter.data_saver) == 6
 
+    def test_download_chapter_info_model_url(self) -> None:
+        download_chapter_info: DownloadInfo = DownloadInfo.model_validate(
+            json.loads(Path("tests/samples/download_chapter_info.json").read_text())
+        )
+        assert download_chapter_info.url(0) == (
+            "https://uploads.mangadex.org/data/3303dd03ac8d27452cce3f2a882e94b2/"
+            f"{download_chapter_info.chapter.data[0]}"
+        )
+        assert download_chapter_info.url(1, data_saver=True) == (
+            "https://uploads.mangadex.org/data-saver/3303dd03ac8d27452cce3f2a882e94b2/"
+            f"{download_chapter_info.chapter.data_saver[1]}"
+        )
+
     @pytest.mark.asyncio
-    @pytest.mark.parametrize("throwable", [None, httpx.HTTPError])
-    async def test__download_chapter_info_model_download(
-        self, tmp_path: Path, mocker: MockerFixture, throwable: type[Exception] | None
+    @pytest.mark.parametrize("data_saver", [False, True])
+    async def test_download_chapter_info_model_download(
+        self, tmp_path: Path, mocker: MockerFixture, data_saver: bool
     ) -> None:
-        if throwable:
-            mocker.patch.object(
-                httpx.AsyncClient, "get", side_effect=throwable("fake_error")
+        stream_mock: MagicMock = mocker.patch.object(
+            httpx.AsyncClient, "stream", return_value=FakeResponse(dict(), PAGE)
+        )
+        download_chapter_info: DownloadInfo = DownloadInfo.model_validate(
+            json.loads(Path("tests/samples/download_chapter_info.json").read_text())
+        )
+        await download_chapter_info.download(
+            tmp_path, "chapter_name", httpx.AsyncClient(), data_saver
+        )
+        pages: int = len(download_chapter_info.chapter.data)
+        assert stream_mock.call_count == pages
+        for index in range(pages):
+            stream_mock.assert_any_call(
+                "GET", download_chapter_info.url(index, data_saver), headers={}
             )
-        else:
-            mocker.patch.object(
-                httpx.AsyncClient, "get", return_value=FakeResponse(dict(), b"fake")
+        assert list(tmp_path.iterdir()) == [tmp_path / "chapter_name.cbz"]
+        with zipfile.ZipFile(tmp_path / "chapter_name.cbz") as archive:
+            assert len(archive.namelist()) == pages
+
+    @pytest.mark.asyncio
+    async def test_download_chapter_info_model_download_error(
+        self, tmp_path: Path, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(
+            httpx.AsyncClient, "stream", side_effect=httpx.HTTPError("fake_error")
+        )
+        download_chapter_info: DownloadInfo = DownloadInfo.model_validate(
+            json.loads(Path("tests/samples/download_chapter_info.json").read_text())
+        )
+        with pytest.raises(DownloadImageError):
+            await download_chapter_info.download(
+                tmp_path, "chapter_name", httpx.AsyncClient()
             )
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_download_chapter_info_model_download_error_pool(
+        self, tmp_path: Path, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(
+            httpx.AsyncClient, "stream", side_effect=httpx.HTTPError("fake_error")
+        )
         download_chapter_info: DownloadInfo = DownloadInfo.model_validate(
             json.loads(Path("tests/samples/download_chapter_info.json").read_text())
         )
-        semaphore: asyncio.Semaphore = asyncio.Semaphore(5)
-        if throwable:
+        async with WorkerPool(1) as archive_pool:
+            run_spy: MagicMock = mocker.spy(archive_pool, "run")
             with pytest.raises(DownloadImageError):
-                await download_chapter_info._download(
-                    "https://api.mangadex.org",
-                    httpx.AsyncClient(),
+                await download_chapter_info.download(
                     tmp_path,
-                    semaphore,
+                    "chapter_name",
+                    httpx.AsyncClient(),
+                    options=DownloadOptions(archive_pool=archive_pool),
                 )
-            return
-        await download_chapter_info._download(
-            "https://api.mangadex.org", httpx.AsyncClient(), tmp_path, semaphore
-        )
-        expected_len: int = 0 if throwable else 1
-        assert len(list(tmp_path.iterdir())) == expected_len
+        func, *args = run_spy.call_args.args
+        assert func.__name__ == "finish" and args == [False]
+        assert list(tmp_path.iterdir()) == []
+
+    def test_download_options_max_attempts(self) -> None:
+        with pytest.raises(ValueError):
+            DownloadOptions(max_attempts=0)
 
     @pytest.mark.asyncio
-    @pytest.mark.parametrize("data_saver", [False, True])
-    async def test_download_chapter_info_model_download(
-        self, tmp_path: Path, mocker: MockerFixture, data_saver: bool
+    async def test_download_chapter_info_model_download_resume(
+        self, tmp_path: Path, mocker: MockerFixture
     ) -> None:
-        mocker.patch(
-            "httpx.AsyncClient.get", return_value=FakeResponse(dict(), b"fake")
-        )
         download_chapter_info: DownloadInfo = DownloadInfo.model_validate(
             json.loads(Path("tests/samples/download_chapter_info.json").read_text())
         )
-        download_mock: MagicMock = mocker.patch.object(
-            download_chapter_info, "_download"
+        last_page: str = download_chapter_info.chapter.data[-1]
+
+        def failing_stream(method: str, url: str, **kwargs: Any) -> FakeResponse:
+            if url.endswith(last_page):
+                raise httpx.ConnectError("fake")
+            return FakeResponse(dict(), PAGE)
+
+        mocker.patch.object(httpx.AsyncClient, "stream", side_effect=failing_stream)
+        with pytest.raises(DownloadImageError):
+            await download_chapter_info.download(
+                tmp_path,
+                "chapter_name",
+                httpx.AsyncClient(),
+                options=DownloadOptions(semaphore=asyncio.Semaphore(1)),
+                chapter_id="chapter-id",
+            )
+        checkpoint: ChapterCheckpoint = ChapterCheckpoint.for_chapter(
+            tmp_path, "chapter-id", download_chapter_info.chapter.hash
+        )
+        with zipfile.ZipFile(checkpoint.archive) as archive:
+            resumed: int = len(archive.namelist())
+        assert 0 < resumed < len(download_chapter_info.chapter.data)
+        stream_mock: MagicMock = mocker.patch.object(
+            httpx.AsyncClient, "stream", return_value=FakeResponse(dict(), PAGE)
         )
-        client: httpx.AsyncClient = httpx.AsyncClient()
         await download_chapter_info.download(
-            tmp_path, "chapter_name", client, data_saver
-        )
-        assert download_mock.call_count == len(
-            download_chapter_info.chapter.data
-            if not data_saver
-            else download_chapter_info.chapter.data_saver
-        )
-        urls: list[str] = (
-            download_chapter_info.chapter.data
-            if not data_saver
-            else download_chapter_info.chapter.data_saver
-        )
-        for url in urls:
-            download_mock.assert_any_call(
-                f"{download_chapter_info.base_url}/"
-                f"{'data' if not data_saver else 'data-saver'}/"
-                f"{download_chapter_info.chapter.hash}/{url}",
-                client,
-                mocker.ANY,
-                mocker.ANY,
+            tmp_path, "chapter_name", httpx.AsyncClient(), chapter_id="chapter-id"
+        )
+        assert (
+            stream_mock.call_count == len(download_chapter_info.chapter.data) - resumed
+        )
+        assert not checkpoint.directory.exists()
+        with zipfile.ZipFile(tmp_path / "chapter_name.cbz") as archive:
+            assert len(archive.namelist()) == len(download_chapter_info.chapter.data)
+
+
+@pytest.fixture
+def chapter_download(tmp_path: Path) -> ChapterDownload:
+    download_chapter_info: DownloadInfo = DownloadInfo.model_validate(
+        json.loads(Path("tests/samples/download_chapter_info.json").read_text())
+    )
+    writer: CbzWriter = CbzWriter(tmp_path / "chapter.cbz")
+    writer.open()
+    return ChapterDownload(
+        download_chapter_info,
+        httpx.AsyncClient(),
+        writer,
+        DownloadOptions(max_attempts=2),
+        checkpoint=ChapterCheckpoint(tmp_path / "checkpoint"),
+    )
+
+
+@pytest.mark.asyncio
+class TestChapterDownload:
+    async def test_download_page(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(
+            httpx.AsyncClient, "stream", return_value=FakeResponse(dict(), PAGE)
+        )
+        await chapter_download.download_page(0)
+        chapter_download.writer.close()
+        with zipfile.ZipFile(chapter_download.writer.path) as archive:
+            assert archive.namelist() == ["0001.png"]
+            assert archive.read("0001.png") == PAGE
+            assert archive.getinfo("0001.png").comment == (
+                f"sha256:{hashlib.sha256(PAGE).hexdigest()}".encode()
+            )
+
+    async def test_download_page_pools(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(
+            httpx.AsyncClient, "stream", return_value=FakeResponse(dict(), PAGE)
+        )
+        async with WorkerPool(1) as archive_pool, WorkerPool(1) as page_pool:
+            submit_mock: MagicMock = mocker.spy(page_pool, "submit")
+            chapter_download.options.archive_pool = archive_pool
+            chapter_download.options.page_pool = page_pool
+            await asyncio.gather(*[chapter_download.download_page(i) for i in range(3)])
+            submit_mock.assert_not_called()
+            chapter_download.options.transcode = TranscodeOptions()
+            await chapter_download.download_page(3)
+        submit_mock.assert_called_once_with(
+            process_page, PAGE, mocker.ANY, TranscodeOptions()
+        )
+        assert chapter_download.options.buffers.used == 0
+        chapter_download.writer.close()
+        with zipfile.ZipFile(chapter_download.writer.path) as archive:
+            assert len(archive.namelist()) == 4
+
+    async def test_download_page_spilled(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        class ChunkedResponse(FakeResponse):
+            async def aiter_bytes(
+                self, chunk_size: int | None = None
+            ) -> AsyncIterator[bytes]:
+                for start in range(0, len(self.content), 4):
+                    yield self.content[start : start + 4]
+
+        content: bytes = PAGE
+        mocker.patch.object(
+            httpx.AsyncClient, "stream", return_value=ChunkedResponse(dict(), content)
+        )
+        chapter_download.options.buffers = ByteBudget(6)
+        rollover_mock: MagicMock = mocker.spy(SpooledTemporaryFile, "rollover")
+        await chapter_download.download_page(0)
+        rollover_mock.assert_called_once()
+        assert chapter_download.options.buffers.used == 0
+        chapter_download.writer.close()
+        with zipfile.ZipFile(chapter_download.writer.path) as archive:
+            assert archive.read("0001.png") == content
+
+    async def test_download_page_bandwidth(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(
+            httpx.AsyncClient, "stream", return_value=FakeResponse(dict(), PAGE)
+        )
+        consume_mock: AsyncMock = mocker.patch.object(
+            BandwidthShaper, "consume", return_value=0.5
+        )
+        chapter_download.options.bandwidth = BandwidthShaper(BandwidthSchedule(10))
+        await chapter_download.download_page(0)
+        consume_mock.assert_called_once_with(len(PAGE))
+        counters: dict[Any, float] = chapter_download.options.metrics.counters
+        assert counters[("pymanga_shaped_seconds_total", ())] == 0.5
+
+    async def test_download_page_transcode(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        buffer: io.BytesIO = io.BytesIO()
+        Image.new("RGB", (400, 300), "red").save(buffer, "PNG")
+        mocker.patch.object(
+            httpx.AsyncClient,
+            "stream",
+            return_value=FakeResponse(dict(), buffer.getvalue()),
+        )
+        chapter_download.options.transcode = TranscodeOptions(
+            height=150, grayscale=True, format="webp", split_spreads=True
+        )
+        await chapter_download.download_page(0)
+        assert chapter_download.writer.has(0)
+        chapter_download.writer.close()
+        with zipfile.ZipFile(chapter_download.writer.path) as archive:
+            assert archive.namelist() == ["0001-1.webp", "0001-2.webp"]
+            with Image.open(archive.open("0001-1.webp")) as image:
+                assert image.format == "WEBP"
+                assert image.size == (100, 150)
+
+    async def test_download_page_report(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(
+            httpx.AsyncClient,
+            "stream",
+            return_value=FakeResponse(dict(), PAGE, headers={"X-Cache": "HIT"}),
+        )
+        reports: list[PageReport] = []
+
+        async def sink(batch: list[PageReport]) -> None:
+            reports.extend(batch)
+
+        chapter_download.options.mirrors = MirrorRanking()
+        async with ReportQueue(sink) as queue:
+            chapter_download.options.reports = queue
+            await chapter_download.download_page(0)
+        assert len(reports) == 1
+        assert reports[0].url == chapter_download.info.url(0)
+        assert reports[0].success
+        assert reports[0].cached
+        assert reports[0].size == len(PAGE)
+        assert (
+            chapter_download.options.mirrors.nodes["uploads.mangadex.org"].requests == 1
+        )
+
+    async def test_download_page_report_error(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(
+            httpx.AsyncClient, "stream", side_effect=httpx.ConnectError("fake")
+        )
+        reports: list[PageReport] = []
+
+        async def sink(batch: list[PageReport]) -> None:
+            reports.extend(batch)
+
+        async with ReportQueue(sink) as queue:
+            chapter_download.options.reports = queue
+            with pytest.raises(DownloadImageError):
+                await chapter_download.download_page(0)
+        assert [report.success for report in reports] == [False, False]
+        assert [report.size for report in reports] == [0, 0]
+
+    async def test_download_page_already_written(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        stream_mock: MagicMock = mocker.patch.object(httpx.AsyncClient, "stream")
+        chapter_download.writer.write(0, "1-a.jpg", b"fake")
+        await chapter_download.download_page(0)
+        stream_mock.assert_not_called()
+
+    async def test_download_page_error(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        stream_mock: MagicMock = mocker.patch.object(
+            httpx.AsyncClient, "stream", side_effect=httpx.HTTPError("fake_error")
+        )
+        with pytest.raises(DownloadImageError):
+            await chapter_download.download_page(0)
+        assert stream_mock.call_count == 2
+
+    async def test_download_page_range(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        stream_mock: MagicMock = mocker.patch.object(
+            httpx.AsyncClient,
+            "stream",
+            return_value=FakeResponse(dict(), PAGE[2:], status_code=206),
+        )
+        assert chapter_download.checkpoint is not None
+        chapter_download.checkpoint.save_page(0, PAGE[:2])
+        await chapter_download.download_page(0)
+        stream_mock.assert_called_once_with(
+            "GET", chapter_download.info.url(0), headers={"Range": "bytes=2-"}
+        )
+        assert chapter_download.checkpoint.load_page(0) == b""
+        chapter_download.writer.close()
+        with zipfile.ZipFile(chapter_download.writer.path) as archive:
+            assert archive.read("0001.png") == PAGE
+
+    async def test_download_page_interrupted(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        class InterruptedResponse(FakeResponse):
+            async def aiter_bytes(
+                self, chunk_size: int | None = None
+            ) -> AsyncIterator[bytes]:
+                yield self.content
+                raise httpx.ReadError("fake")
+
+        mocker.patch.object(
+            httpx.AsyncClient,
+            "stream",
+            return_value=InterruptedResponse(dict(), b"fa"),
+        )
+        chapter_download.options.max_attempts = 1
+        with pytest.raises(DownloadImageError):
+            await chapter_download.download_page(0)
+        assert chapter_download.checkpoint is not None
+        assert chapter_download.checkpoint.load_page(0) == b"fa"
+
+    async def test_download_page_short(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(
+            httpx.AsyncClient,
+            "stream",
+            return_value=FakeResponse(
+                dict(), PAGE[:4], headers={"Content-Length": str(len(PAGE))}
+            ),
+        )
+        chapter_download.options.max_attempts = 1
+        with pytest.raises(DownloadImageError):
+            await chapter_download.download_page(0)
+        assert chapter_download.checkpoint is not None
+        assert chapter_download.checkpoint.load_page(0) == PAGE[:4]
+
+    async def test_download_page_corrupted(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        stream_mock: MagicMock = mocker.patch.object(
+            httpx.AsyncClient,
+            "stream",
+            side_effect=[FakeResponse(dict(), b"<html>"), FakeResponse(dict(), PAGE)],
+        )
+        assert chapter_download.checkpoint is not None
+        chapter_download.checkpoint.save_page(0, b"<ht")
+        await chapter_download.download_page(0)
+        assert stream_mock.call_count == 2
+        assert stream_mock.call_args.kwargs["headers"] == {}
+        assert (
+            chapter_download.options.metrics.counters[
+                ("pymanga_corrupted_pages_total", (("host", "uploads.mangadex.org"),))
+            ]
+            == 1
+        )
+        chapter_download.writer.close()
+        with zipfile.ZipFile(chapter_download.writer.path) as archive:
+            assert archive.read("0001.png") == PAGE
+
+    async def test_run_missing_pages(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(ChapterDownload, "download_page")
+        with pytest.raises(DownloadImageError, match="Missing 6 of 6 pages"):
+            await chapter_download.run()
+
+    async def test_download_page_failover(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        def failing_stream(method: str, url: str, **kwargs: Any) -> FakeResponse:
+            if url.startswith("https://uploads.mangadex.org"):
+                raise httpx.ConnectError("fake")
+            return FakeResponse(dict(), PAGE)
+
+        stream_mock: MagicMock = mocker.patch.object(
+            httpx.AsyncClient, "stream", side_effect=failing_stream
+        )
+        refreshed: DownloadInfo = chapter_download.info.model_copy(
+            update={"base_url": "https://node.mangadex.network/token"}
+        )
+        refresh_mock: AsyncMock = mocker.AsyncMock(return_value=refreshed)
+        chapter_download.refresh = refresh_mock
+        chapter_download.options.mirrors = MirrorRanking()
+        await asyncio.gather(
+            chapter_download.download_page(0), chapter_download.download_page(1)
+        )
+        refresh_mock.assert_called_once()
+        assert chapter_download.info.base_url == "https://node.mangadex.network/token"
+        assert stream_mock.call_count == 4
+        assert (
+            chapter_download.options.mirrors.nodes["uploads.mangadex.org"].failures == 2
+        )
+
+    async def test_download_page_failover_refresh_error(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(
+            httpx.AsyncClient, "stream", side_effect=httpx.ConnectError("fake")
+        )
+        chapter_download.refresh = mocker.AsyncMock(
+            side_effect=MangadexClientError("fake")
+        )
+        with pytest.raises(DownloadImageError):
+            await chapter_download.download_page(0)
+        assert chapter_download.info.base_url == "https://uploads.mangadex.org"
+
+    async def test_download_page_bad_node(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(
+            httpx.AsyncClient, "stream", return_value=FakeResponse(dict(), PAGE)
+        )
+        mirrors: MirrorRanking = MirrorRanking(max_latency=-1, min_requests=1)
+        chapter_download.options.mirrors = mirrors
+        chapter_download.options.max_refreshes = 1
+        refresh_mock: AsyncMock = mocker.AsyncMock(
+            return_value=chapter_download.info.model_copy(
+                update={"base_url": "https://node.mangadex.network/token"}
             )
-        assert len(list(tmp_path.iterdir())) == 1
+        )
+        chapter_download.refresh = refresh_mock
+        for index in range(3):
+            await chapter_download.download_page(index)
+        refresh_mock.assert_called_once()
+
+    async def test_download_page_data_saver_fallback(
+        self, chapter_download: ChapterDownload, mocker: MockerFixture
+    ) -> None:
+        def failing_stream(method: str, url: str, **kwargs: Any) -> FakeResponse:
+            if "/data/" in url:
+                raise httpx.ConnectError("fake")
+            return FakeResponse(dict(), PAGE)
+
+        mocker.patch.object(httpx.AsyncClient, "stream", side_effect=failing_stream)
+        chapter_download.options.data_saver_fallback = True
+        await chapter_download.download_page(0)
+        chapter_download.writer.close()
+        with zipfile.ZipFile(chapter_download.writer.path) as archive:
+            assert archive.namelist() == ["0001.jpg"]
+
 
+class TestResponseModels:
     @pytest.mark.parametrize(
         "json_path, model",
         [
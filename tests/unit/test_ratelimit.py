@@ -0,0 +1,183 @@
+import asyncio
+from datetime import timedelta
+import time
+import httpx
+import pytest
+from pymanga.ratelimit import (
+    AdaptiveConcurrency,
+    Backoff,
+    RateLimiter,
+    TokenBucket,
+    default_rate_limiter,
+)
+
+
+@pytest.fixture
+def rate_limiter() -> RateLimiter:
+    return RateLimiter(
+        buckets={
+            "api": TokenBucket(rate=1000, capacity=2),
+            "endpoint": TokenBucket(rate=1000, capacity=1),
+        },
+        concurrency={"api": AdaptiveConcurrency(limit=2, maximum=4)},
+    )
+
+
+def make_response(status_code: int, headers: dict[str, str]) -> httpx.Response:
+    response: httpx.Response = httpx.Response(status_code, headers=headers)
+    response.elapsed = timedelta(seconds=0.1)
+    return response
+
+
+class TestTokenBucket:
+    def test_reserve(self) -> None:
+        bucket: TokenBucket = TokenBucket(rate=10, capacity=2)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+        assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+    def test_pause(self) -> None:
+        bucket: TokenBucket = TokenBucket(rate=10, capacity=10)
+        bucket.pause(2)
+        assert bucket.reserve() == pytest.approx(2.1, abs=0.01)
+
+    @pytest.mark.asyncio
+    async def test_acquire(self) -> None:
+        bucket: TokenBucket = TokenBucket(rate=100, capacity=1)
+        start: float = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        assert time.monotonic() - start >= 0.015
+
+
+class TestAdaptiveConcurrency:
+    @pytest.mark.asyncio
+    async def test_acquire(self) -> None:
+        concurrency: AdaptiveConcurrency = AdaptiveConcurrency(limit=2)
+        running: list[int] = [0]
+        peak: list[int] = [0]
+
+        async def task() -> None:
+            await concurrency.acquire()
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+            concurrency.release()
+
+        await asyncio.gather(*[task() for _ in range(6)])
+        assert peak[0] == 2
+        assert concurrency.active == 0
+
+    @pytest.mark.asyncio
+    async def test_acquire_cancelled(self) -> None:
+        concurrency: AdaptiveConcurrency = AdaptiveConcurrency(limit=1)
+        await concurrency.acquire()
+        waiting: asyncio.Task = asyncio.create_task(concurrency.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        concurrency.release()
+        await asyncio.wait_for(concurrency.acquire(), 1)
+        assert concurrency.active == 1
+
+    def test_record(self) -> None:
+        concurrency: AdaptiveConcurrency = AdaptiveConcurrency(
+            limit=4, minimum=1, maximum=5, latency_target=1
+        )
+        concurrency.record_latency(0.1)
+        assert concurrency.limit == 4.25
+        concurrency.record_latency(2)
+        assert concurrency.limit == pytest.approx(3.825)
+        concurrency.record_failure()
+        assert concurrency.limit == pytest.approx(1.9125)
+        for _ in range(3):
+            concurrency.record_failure()
+        assert concurrency.limit == 1
+        for _ in range(100):
+            concurrency.record_latency(0.1)
+        assert concurrency.limit == 5
+
+
+@pytest.mark.asyncio
+class TestRateLimiter:
+    async def test_split(self, rate_limiter: RateLimiter) -> None:
+        rate_limiter.split(4)
+        assert rate_limiter.buckets["api"].rate == 250
+        assert rate_limiter.buckets["api"].capacity == 1
+        assert rate_limiter.buckets["api"].tokens == 1
+        assert rate_limiter.buckets["endpoint"].capacity == 1
+
+    async def test_limit(self, rate_limiter: RateLimiter) -> None:
+        async with rate_limiter.limit("api", "endpoint"):
+            assert rate_limiter.concurrency["api"].active == 1
+        assert rate_limiter.concurrency["api"].active == 0
+        assert rate_limiter.buckets["endpoint"].tokens < 1
+
+    async def test_limit_error(self, rate_limiter: RateLimiter) -> None:
+        with pytest.raises(httpx.HTTPError):
+            async with rate_limiter.limit("api"):
+                raise httpx.HTTPError("fake")
+        assert rate_limiter.concurrency["api"].limit == 1
+        assert rate_limiter.concurrency["api"].active == 0
+
+    @pytest.mark.parametrize(
+        "status_code, headers, expected",
+        [
+            (200, {}, None),
+            (429, {}, 1.0),
+            (429, {"Retry-After": "3"}, 3.0),
+            (429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0.0),
+            (429, {"Retry-After": "soon"}, 1.0),
+            (200, {"X-RateLimit-Remaining": "1"}, None),
+        ],
+    )
+    async def test_observe(
+        self,
+        rate_limiter: RateLimiter,
+        status_code: int,
+        headers: dict[str, str],
+        expected: float | None,
+    ) -> None:
+        delay: float | None = rate_limiter.observe(
+            "api", make_response(status_code, headers)
+        )
+        assert delay == expected
+
+    async def test_observe_rate_limit_headers(self, rate_limiter: RateLimiter) -> None:
+        headers: dict[str, str] = {
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Retry-After": str(int(time.time()) + 10),
+        }
+        delay: float | None = rate_limiter.observe(
+            "api", make_response(200, headers), "endpoint"
+        )
+        assert delay is not None and 8 < delay <= 10
+        assert rate_limiter.buckets["endpoint"].reserve() > 8
+        assert rate_limiter.buckets["api"].reserve() == 0
+
+    async def test_observe_server_error(self, rate_limiter: RateLimiter) -> None:
+        rate_limiter.observe("api", make_response(503, {}))
+        assert rate_limiter.concurrency["api"].limit == 1
+
+
+class TestBackoff:
+    @pytest.mark.parametrize(
+        "status_code, expected", [(200, False), (404, False), (429, True), (503, True)]
+    )
+    def test_retryable(self, status_code: int, expected: bool) -> None:
+        assert Backoff.retryable(make_response(status_code, {})) is expected
+
+    def test_delay(self) -> None:
+        backoff: Backoff = Backoff(base=1.0, cap=5.0)
+        for attempt, ceiling in [(0, 1.0), (1, 2.0), (2, 4.0), (3, 5.0), (10, 5.0)]:
+            delays: list[float] = [backoff.delay(attempt) for _ in range(50)]
+            assert all(0.0 <= delay <= ceiling for delay in delays)
+            assert len(set(delays)) > 1
+
+
+def test_default_rate_limiter() -> None:
+    assert default_rate_limiter() is default_rate_limiter()
+    assert {"api", "at-home-server", "at-home"} <= set(default_rate_limiter().buckets)
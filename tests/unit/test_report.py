@@ -0,0 +1,109 @@
+import asyncio
+from unittest.mock import MagicMock
+import httpx
+import pytest
+from pytest_mock import MockerFixture
+from conftest import FakeResponse
+from pymanga.report import AtHomeReporter, PageReport, ReportQueue
+
+
+class TestPageReport:
+    def test_payload(self) -> None:
+        report: PageReport = PageReport(
+            "https://node.mangadex.network/data/hash/1.png", True, 1024, 0.25, True
+        )
+        assert report.payload() == {
+            "url": "https://node.mangadex.network/data/hash/1.png",
+            "success": True,
+            "cached": True,
+            "bytes": 1024,
+            "duration": 250,
+        }
+
+
+@pytest.mark.asyncio
+class TestAtHomeReporter:
+    async def test_call(self, mocker: MockerFixture) -> None:
+        post_mock: MagicMock = mocker.patch.object(
+            httpx.AsyncClient, "post", return_value=FakeResponse(dict(), b"")
+        )
+        reports: list[PageReport] = [
+            PageReport("https://node.mangadex.network/data/hash/1.png", True, 1, 0.1),
+            PageReport("https://uploads.mangadex.org/data/hash/2.png", True, 1, 0.1),
+        ]
+        await AtHomeReporter(httpx.AsyncClient())(reports)
+        post_mock.assert_called_once_with(
+            "https://api.mangadex.network/report", json=reports[0].payload()
+        )
+
+    async def test_call_error(self, mocker: MockerFixture) -> None:
+        post_mock: MagicMock = mocker.patch.object(
+            httpx.AsyncClient, "post", side_effect=httpx.HTTPError("fake_error")
+        )
+        reports: list[PageReport] = [
+            PageReport("https://a.mangadex.network/data/hash/1.png", False, 0, 0.1),
+            PageReport("https://b.mangadex.network/data/hash/1.png", True, 1, 0.1),
+        ]
+        await AtHomeReporter(httpx.AsyncClient())(reports)
+        assert post_mock.call_count == 2
+
+
+@pytest.mark.asyncio
+class TestReportQueue:
+    async def test_batches(self) -> None:
+        batches: list[list[PageReport]] = []
+
+        async def sink(reports: list[PageReport]) -> None:
+            batches.append(reports)
+
+        async with ReportQueue(sink, batch_size=2) as queue:
+            for index in range(5):
+                queue.put(PageReport(f"https://node/{index}", True, index, 0.1))
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert [report.size for batch in batches for report in batch] == [
+            0,
+            1,
+            2,
+            3,
+            4,
+        ]
+
+    async def test_flush_interval(self) -> None:
+        sent: asyncio.Event = asyncio.Event()
+
+        async def sink(reports: list[PageReport]) -> None:
+            sent.set()
+
+        async with ReportQueue(sink, flush_interval=0.01) as queue:
+            queue.put(PageReport("https://node/1", True, 1, 0.1))
+            await asyncio.wait_for(sent.wait(), 1)
+
+    async def test_put_full(self) -> None:
+        async def sink(reports: list[PageReport]) -> None:
+            pass
+
+        queue: ReportQueue = ReportQueue(sink, max_pending=1)
+        await queue.start()
+        queue.put(PageReport("https://node/1", True, 1, 0.1))
+        queue.put(PageReport("https://node/2", True, 1, 0.1))
+        assert queue.dropped == 1
+        await queue.close()
+
+    async def test_put_not_started(self) -> None:
+        async def sink(reports: list[PageReport]) -> None:
+            pass
+
+        with pytest.raises(ValueError):
+            ReportQueue(sink).put(PageReport("https://node/1", True, 1, 0.1))
+
+    async def test_sink_error(self) -> None:
+        calls: list[int] = []
+
+        async def sink(reports: list[PageReport]) -> None:
+            calls.append(len(reports))
+            raise RuntimeError("fake_error")
+
+        async with ReportQueue(sink, batch_size=1) as queue:
+            queue.put(PageReport("https://node/1", True, 1, 0.1))
+            queue.put(PageReport("https://node/2", True, 1, 0.1))
+        assert calls == [1, 1]
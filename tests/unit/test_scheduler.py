@@ -0,0 +1,336 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock
+import zipfile
+import httpx
+import pytest
+from pytest_mock import MockerFixture
+from conftest import PAGE, FakeResponse
+from pymanga.client import Client
+from pymanga.exception import DownloadImageError, MangadexClientError
+from pymanga.index import ChapterIndex, IndexedChapter
+from pymanga.integrity import check_archive
+from pymanga.models.chapter import Chapter
+from pymanga.models.common import Response
+from pymanga.models.download_chapter_info import DownloadInfo, DownloadOptions
+from pymanga.report import PageReport
+from pymanga.scheduler import ChapterJob, DownloadScheduler, DownloadSettings
+from pymanga.shaping import BandwidthSchedule, FairSemaphore, _current_flow
+
+
+@pytest.fixture
+def download_info() -> DownloadInfo:
+    download_json: dict[str, Any] = json.loads(
+        Path("tests/samples/download_chapter_info.json").read_text()
+    )
+    return DownloadInfo.model_validate(download_json)
+
+
+class TestChapterJob:
+    def test_from_chapter(self) -> None:
+        chapter: Chapter = (
+            Response[Chapter]
+            .model_validate(
+                json.loads(Path("tests/samples/chapter_results.json").read_text())
+            )
+            .data[0]
+        )
+        chapter.attributes.title = "A.B/C"
+        job: ChapterJob = ChapterJob.from_chapter(chapter, "Manga")
+        assert job == ChapterJob(
+            chapter.id,
+            f"{chapter.attributes.chapter} - Manga -A,B,C".replace(".", ","),
+            chapter.attributes.version,
+            chapter.attributes.updated_at,
+            chapter.manga.id if chapter.manga else None,
+        )
+
+    def test_flow(self) -> None:
+        assert ChapterJob("1", "chapter 1", series="manga").flow == "manga"
+        assert ChapterJob("1", "chapter 1").flow == "1"
+
+
+@pytest.mark.asyncio
+class TestDownloadScheduler:
+    @pytest.mark.parametrize(
+        "settings",
+        [
+            DownloadSettings(chapter_concurrency=0),
+            DownloadSettings(image_concurrency=0),
+        ],
+    )
+    async def test_invalid_concurrency(
+        self, client: Client, tmp_path: Path, settings: DownloadSettings
+    ) -> None:
+        with pytest.raises(ValueError):
+            DownloadScheduler(client, tmp_path, settings)
+
+    async def test_run(
+        self, client: Client, mocker: MockerFixture, download_info: DownloadInfo
+    ) -> None:
+        lookup_mock: MagicMock = mocker.patch.object(
+            client, "get_chapter_download_info", return_value=download_info
+        )
+        download_mock: MagicMock = mocker.patch.object(DownloadInfo, "download")
+        jobs: list[ChapterJob] = [ChapterJob(str(i), f"chapter {i}") for i in range(7)]
+        scheduler: DownloadScheduler = DownloadScheduler(
+            client, client.output, DownloadSettings(chapter_concurrency=2)
+        )
+        failed: list[ChapterJob] = await scheduler.run(jobs)
+        assert failed == []
+        assert lookup_mock.call_count == 7
+        assert download_mock.call_count == 7
+        options: set[int] = {
+            id(call.kwargs["options"]) for call in download_mock.call_args_list
+        }
+        assert len(options) == 1
+        assert isinstance(
+            download_mock.call_args.kwargs["options"].semaphore, FairSemaphore
+        )
+        assert download_mock.call_args.kwargs["options"].bandwidth is None
+
+    async def test_run_flows(
+        self, client: Client, mocker: MockerFixture, download_info: DownloadInfo
+    ) -> None:
+        mocker.patch.object(
+            client, "get_chapter_download_info", return_value=download_info
+        )
+        flows: list[tuple[str, float]] = []
+
+        async def download(*args: Any, options: DownloadOptions, **kwargs: Any) -> None:
+            flows.append(_current_flow.get())
+
+        mocker.patch.object(DownloadInfo, "download", side_effect=download)
+        scheduler: DownloadScheduler = DownloadScheduler(
+            client,
+            client.output,
+            DownloadSettings(report=False, bandwidth=BandwidthSchedule(10)),
+        )
+        await scheduler.run(
+            [
+                ChapterJob("1", "chapter 1"),
+                ChapterJob("2", "chapter 2", series="a", weight=2),
+            ]
+        )
+        assert sorted(flows) == [("1", 1.0), ("a", 2.0)]
+
+    async def test_run_report_sink(
+        self, client: Client, mocker: MockerFixture, download_info: DownloadInfo
+    ) -> None:
+        mocker.patch.object(
+            client, "get_chapter_download_info", return_value=download_info
+        )
+        reports: list[PageReport] = []
+
+        async def download(*args: Any, options: DownloadOptions, **kwargs: Any) -> None:
+            assert options.reports is not None
+            options.reports.put(PageReport("https://node/1", True, 1, 0.1))
+
+        async def sink(batch: list[PageReport]) -> None:
+            reports.extend(batch)
+
+        mocker.patch.object(DownloadInfo, "download", side_effect=download)
+        scheduler: DownloadScheduler = DownloadScheduler(
+            client, client.output, report_sink=sink
+        )
+        await scheduler.run([ChapterJob(str(i), f"chapter {i}") for i in range(3)])
+        assert len(reports) == 3
+
+    async def test_run_index(
+        self,
+        client: Client,
+        mocker: MockerFixture,
+        download_info: DownloadInfo,
+        tmp_path: Path,
+    ) -> None:
+        mocker.patch.object(
+            client, "get_chapter_download_info", return_value=download_info
+        )
+
+        async def download(output: Path, name: str, *args: Any, **kwargs: Any) -> None:
+            if name != "missing":
+                output.joinpath(f"{name}.cbz").write_bytes(b"fake")
+
+        mocker.patch.object(DownloadInfo, "download", side_effect=download)
+        index: ChapterIndex = ChapterIndex(tmp_path / "index.sqlite")
+        tmp_path.joinpath("old name.cbz").write_bytes(b"old")
+        index.record(
+            IndexedChapter("1", 1, "2021", None, str(tmp_path / "old name.cbz"), 3)
+        )
+        scheduler: DownloadScheduler = DownloadScheduler(
+            client, tmp_path, DownloadSettings(report=False), index=index
+        )
+        await scheduler.run(
+            [
+                ChapterJob("1", "new name", 2, "2022"),
+                ChapterJob("2", "missing", 1, "2022"),
+                ChapterJob("3", "unversioned"),
+            ]
+        )
+        indexed: IndexedChapter | None = index.get("1")
+        assert indexed is not None
+        assert (indexed.version, indexed.updated_at) == (2, "2022")
+        assert indexed.hash == download_info.chapter.hash
+        assert indexed.path == str(tmp_path / "new name.cbz")
+        assert indexed.size == 4
+        assert not tmp_path.joinpath("old name.cbz").exists()
+        assert index.get("2") is None
+        assert index.get("3") is None
+
+    @pytest.mark.parametrize(
+        "indexed_hash, expected_fetches", [(None, 4), ("other", 6)]
+    )
+    async def test_run_salvage(
+        self,
+        client: Client,
+        mocker: MockerFixture,
+        download_info: DownloadInfo,
+        tmp_path: Path,
+        indexed_hash: str | None,
+        expected_fetches: int,
+    ) -> None:
+        mocker.patch.object(
+            client, "get_chapter_download_info", return_value=download_info
+        )
+        stream_mock: MagicMock = mocker.patch.object(
+            httpx.AsyncClient, "stream", return_value=FakeResponse(dict(), PAGE)
+        )
+        damaged: Path = tmp_path / "chapter.cbz"
+        with zipfile.ZipFile(damaged, "w") as archive:
+            archive.writestr("0001.png", PAGE)
+            archive.writestr("0002.png", PAGE[:-4])
+            archive.writestr("0003.png", PAGE)
+        index: ChapterIndex = ChapterIndex(tmp_path / "index.sqlite")
+        index.record(IndexedChapter("1", 1, "2021", indexed_hash, str(damaged), 3))
+        scheduler: DownloadScheduler = DownloadScheduler(
+            client, tmp_path, DownloadSettings(report=False), index=index
+        )
+        failed: list[ChapterJob] = await scheduler.run(
+            [ChapterJob("1", "chapter", 1, "2021", salvage=str(damaged))]
+        )
+        assert failed == []
+        assert stream_mock.call_count == expected_fetches
+        assert check_archive(damaged, len(download_info.chapter.data)).intact
+        assert not tmp_path.joinpath(
+            ".partial", f"1-{download_info.chapter.hash}"
+        ).exists()
+
+    async def test_run_no_report(
+        self, client: Client, mocker: MockerFixture, download_info: DownloadInfo
+    ) -> None:
+        mocker.patch.object(
+            client, "get_chapter_download_info", return_value=download_info
+        )
+        download_mock: MagicMock = mocker.patch.object(DownloadInfo, "download")
+        scheduler: DownloadScheduler = DownloadScheduler(
+            client, client.output, DownloadSettings(report=False)
+        )
+        await scheduler.run([ChapterJob("1", "chapter 1")])
+        assert download_mock.call_args.kwargs["options"].reports is None
+
+    async def test_run_overlaps_chapters(
+        self, client: Client, mocker: MockerFixture, download_info: DownloadInfo
+    ) -> None:
+        mocker.patch.object(
+            client, "get_chapter_download_info", return_value=download_info
+        )
+        running: list[int] = [0]
+        peak: list[int] = [0]
+
+        async def fake_download(*args: Any, **kwargs: Any) -> None:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+
+        mocker.patch.object(DownloadInfo, "download", side_effect=fake_download)
+        jobs: list[ChapterJob] = [ChapterJob(str(i), f"chapter {i}") for i in range(6)]
+        scheduler: DownloadScheduler = DownloadScheduler(
+            client, client.output, DownloadSettings(chapter_concurrency=3)
+        )
+        await scheduler.run(jobs)
+        assert peak[0] == 3
+
+    async def test_run_failures(
+        self, client: Client, mocker: MockerFixture, download_info: DownloadInfo
+    ) -> None:
+        mocker.patch.object(
+            client,
+            "get_chapter_download_info",
+            side_effect=[MangadexClientError("fake"), *[download_info] * 4],
+        )
+        mocker.patch.object(
+            DownloadInfo,
+            "download",
+            side_effect=[
+                DownloadImageError("fake"),
+                OSError("No space left on device"),
+                zipfile.BadZipFile("fake"),
+                None,
+            ],
+        )
+        print_mock: MagicMock = mocker.patch("pymanga.scheduler.print")
+        jobs: list[ChapterJob] = [ChapterJob(str(i), f"chapter {i}") for i in range(5)]
+        scheduler: DownloadScheduler = DownloadScheduler(client, client.output)
+        failed: list[ChapterJob] = await scheduler.run(jobs)
+        assert [job.chapter_id for job in failed] == ["0", "1", "2", "3"]
+        print_mock.assert_any_call("Failed | chapter 2: No space left on device")
+        assert client.metrics.counters == {
+            ("pymanga_chapters_total", (("status", "failed"),)): 3,
+            ("pymanga_chapters_total", (("status", "downloaded"),)): 1,
+        }
+
+    async def test_run_listing_failure(
+        self, client: Client, mocker: MockerFixture, download_info: DownloadInfo
+    ) -> None:
+        mocker.patch.object(
+            client, "get_chapter_download_info", return_value=download_info
+        )
+        cancelled: list[str] = []
+
+        async def fake_download(
+            self: DownloadInfo, output: Path, name: str, *args: Any, **kwargs: Any
+        ) -> None:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+
+        mocker.patch.object(
+            DownloadInfo, "download", autospec=True, side_effect=fake_download
+        )
+
+        async def jobs() -> Any:
+            yield ChapterJob("0", "chapter 0")
+            await asyncio.sleep(0.01)
+            raise MangadexClientError("fake")
+
+        scheduler: DownloadScheduler = DownloadScheduler(client, client.output)
+        with pytest.raises(MangadexClientError):
+            await asyncio.wait_for(scheduler.run(jobs()), 1)
+        assert cancelled == ["chapter 0"]
+
+    async def test_run_metrics(
+        self,
+        client: Client,
+        mocker: MockerFixture,
+        download_info: DownloadInfo,
+        tmp_path: Path,
+    ) -> None:
+        mocker.patch.object(
+            client, "get_chapter_download_info", return_value=download_info
+        )
+        mocker.patch.object(DownloadInfo, "download")
+        scheduler: DownloadScheduler = DownloadScheduler(
+            client,
+            client.output,
+            DownloadSettings(report=False, metrics_path=tmp_path / "metrics.prom"),
+        )
+        await scheduler.run([ChapterJob(str(i), f"chapter {i}") for i in range(3)])
+        exported: str = (tmp_path / "metrics.prom").read_text()
+        assert 'pymanga_chapters_total{status="downloaded"} 3' in exported
+        assert 'pymanga_span_seconds_count{span="chapter"} 3' in exported
+        assert 'pymanga_queue_depth{queue="chapters"}' in exported
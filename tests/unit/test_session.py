@@ -0,0 +1,40 @@
+import httpx
+import pytest
+from pytest_mock import MockerFixture
+from pymanga.session import PoolSettings, SessionSettings
+
+
+class TestPoolSettings:
+    def test_limits_timeout(self) -> None:
+        pool: PoolSettings = PoolSettings(
+            max_connections=4,
+            max_keepalive_connections=2,
+            keepalive_expiry=5.0,
+            connect_timeout=1.0,
+            read_timeout=2.0,
+            write_timeout=3.0,
+            pool_timeout=None,
+        )
+        assert pool.limits == httpx.Limits(
+            max_connections=4, max_keepalive_connections=2, keepalive_expiry=5.0
+        )
+        assert pool.timeout == httpx.Timeout(
+            connect=1.0, read=2.0, write=3.0, pool=None
+        )
+
+
+class TestSessionSettings:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("http2", [False, True])
+    async def test_build(self, http2: bool) -> None:
+        pool: PoolSettings = PoolSettings(read_timeout=2.0)
+        async with SessionSettings(http2=http2).build(pool) as session:
+            assert session.timeout == pool.timeout
+            assert session._transport._pool._http2 is http2
+            assert session._transport._pool._max_connections == pool.max_connections
+
+    def test_http2_missing(self, mocker: MockerFixture) -> None:
+        mocker.patch("pymanga.session.h2", None)
+        assert SessionSettings().http2 is False
+        with pytest.raises(ValueError, match="pymanga\\[http2\\]"):
+            SessionSettings(http2=True)
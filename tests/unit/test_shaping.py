@@ -0,0 +1,141 @@
+import asyncio
+from datetime import datetime, time
+from unittest.mock import MagicMock
+import pytest
+from pytest_mock import MockerFixture
+from pymanga.shaping import (
+    BandwidthSchedule,
+    BandwidthShaper,
+    BandwidthWindow,
+    FairQueue,
+    FairSemaphore,
+)
+
+
+class TestBandwidthSchedule:
+    def test_parse(self) -> None:
+        schedule: BandwidthSchedule = BandwidthSchedule.parse(
+            "8,22:00-07:00=unlimited,12-14=2"
+        )
+        assert schedule == BandwidthSchedule(
+            1_000_000,
+            (
+                BandwidthWindow(time(22), time(7), None),
+                BandwidthWindow(time(12), time(14), 250_000),
+            ),
+        )
+        assert BandwidthSchedule.parse("unlimited") == BandwidthSchedule()
+
+    @pytest.mark.parametrize("spec", ["fast", "0", "25:00-07:00=1", "1-2=x"])
+    def test_parse_invalid(self, spec: str) -> None:
+        with pytest.raises(ValueError):
+            BandwidthSchedule.parse(spec)
+
+    def test_rate_at(self) -> None:
+        schedule: BandwidthSchedule = BandwidthSchedule.parse("8,22:00-07:00=16")
+        assert schedule.rate_at(datetime(2024, 1, 1, 23, 30)) == 2_000_000
+        assert schedule.rate_at(datetime(2024, 1, 1, 6, 59)) == 2_000_000
+        assert schedule.rate_at(datetime(2024, 1, 1, 7)) == 1_000_000
+        assert BandwidthSchedule().rate_at(datetime.now()) is None
+
+    def test_split(self) -> None:
+        schedule: BandwidthSchedule = BandwidthSchedule.parse("8,1-2=unlimited,3-4=4")
+        assert schedule.split(2) == BandwidthSchedule.parse("4,1-2=unlimited,3-4=2")
+
+
+@pytest.mark.asyncio
+class TestBandwidthShaper:
+    async def test_consume(self, mocker: MockerFixture) -> None:
+        sleep_mock: MagicMock = mocker.patch("pymanga.shaping.asyncio.sleep")
+        shaper: BandwidthShaper = BandwidthShaper(BandwidthSchedule(rate=100))
+        assert await shaper.consume(100) == 0
+        assert await shaper.consume(50) == pytest.approx(0.5, abs=0.01)
+        sleep_mock.assert_called_once()
+
+    async def test_consume_unlimited(self) -> None:
+        shaper: BandwidthShaper = BandwidthShaper(BandwidthSchedule())
+        assert await shaper.consume(10**9) == 0
+        assert shaper.bucket is None
+
+    async def test_consume_schedule_change(self, mocker: MockerFixture) -> None:
+        mocker.patch("pymanga.shaping.asyncio.sleep")
+        schedule: BandwidthSchedule = BandwidthSchedule(rate=100)
+        shaper: BandwidthShaper = BandwidthShaper(schedule)
+        await shaper.consume(10)
+        mocker.patch.object(BandwidthSchedule, "rate_at", return_value=20.0)
+        await shaper.consume(10)
+        assert shaper.bucket is not None
+        assert (shaper.bucket.rate, shaper.bucket.capacity) == (20, 20)
+
+
+@pytest.mark.asyncio
+class TestFairQueue:
+    async def test_get_by_weight(self) -> None:
+        queue: FairQueue[str] = FairQueue()
+        for index in range(6):
+            await queue.put("long", f"long {index}")
+        for index in range(2):
+            await queue.put("short", f"short {index}", weight=2)
+        assert [await queue.get() for _ in range(8)] == [
+            "long 0",
+            "short 0",
+            "short 1",
+            "long 1",
+            "long 2",
+            "long 3",
+            "long 4",
+            "long 5",
+        ]
+        assert queue.qsize() == 0
+
+    async def test_put_full_flow(self) -> None:
+        queue: FairQueue[int] = FairQueue(maxsize=1)
+        await queue.put("a", 1)
+        blocked: asyncio.Task[None] = asyncio.create_task(queue.put("a", 2))
+        await asyncio.wait_for(queue.put("b", 3), 1)
+        await asyncio.sleep(0)
+        assert not blocked.done()
+        assert await queue.get() == 1
+        await asyncio.wait_for(blocked, 1)
+        assert queue.qsize() == 2
+
+
+@pytest.mark.asyncio
+class TestFairSemaphore:
+    async def test_flows(self) -> None:
+        semaphore: FairSemaphore = FairSemaphore(1)
+        order: list[str] = []
+
+        async def transfer(flow: str, weight: float = 1.0) -> None:
+            with FairSemaphore.flow(flow, weight):
+                async with semaphore:
+                    order.append(flow)
+                    await asyncio.sleep(0)
+
+        await asyncio.gather(
+            *[transfer("long") for _ in range(4)],
+            *[transfer("short", weight=2) for _ in range(2)],
+            *[transfer("other") for _ in range(2)],
+        )
+        assert order == [
+            "long",
+            "short",
+            "other",
+            "short",
+            "long",
+            "other",
+            "long",
+            "long",
+        ]
+        assert semaphore.active == 0
+
+    async def test_cancelled(self) -> None:
+        semaphore: FairSemaphore = FairSemaphore(1)
+        await semaphore.acquire()
+        waiting: asyncio.Task[None] = asyncio.create_task(semaphore.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        semaphore.release()
+        assert semaphore.active == 0
+        await asyncio.wait_for(semaphore.acquire(), 1)
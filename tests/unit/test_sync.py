@@ -0,0 +1,242 @@
+import json
+from pathlib import Path
+from typing import Any, AsyncIterator
+from unittest.mock import MagicMock
+import pytest
+from pytest_mock import MockerFixture
+from conftest import async_iter, write_cbz
+from pymanga.catalogue import ReleasePolicy
+from pymanga.client import Client
+from pymanga.exception import MangadexClientError
+from pymanga.index import ChapterIndex, IndexedChapter
+from pymanga.models.chapter import Chapter, Relationship
+from pymanga.models.common import Response
+from pymanga.scheduler import ChapterJob, DownloadScheduler
+from pymanga.sync import LibrarySync
+
+
+def make_chapter(chapter_id: str, manga_id: str, updated_at: str) -> Chapter:
+    chapter: Chapter = (
+        Response[Chapter]
+        .model_validate(
+            json.loads(Path("tests/samples/chapter_results.json").read_text())
+        )
+        .data[0]
+    )
+    return chapter.model_copy(
+        update={
+            "id": chapter_id,
+            "attributes": chapter.attributes.model_copy(
+                update={"updated_at": updated_at}
+            ),
+            "relationships": [
+                Relationship(
+                    id=manga_id,
+                    type="manga",
+                    attributes={"title": {"en": f"Manga {manga_id}"}},
+                )
+            ],
+        }
+    )
+
+
+@pytest.fixture
+def index(tmp_path: Path) -> ChapterIndex:
+    return ChapterIndex(tmp_path / "index.sqlite")
+
+
+@pytest.mark.asyncio
+class TestLibrarySync:
+    async def test_chapters_feeds(
+        self, client: Client, index: ChapterIndex, mocker: MockerFixture
+    ) -> None:
+        index.mark_synced("b", "2024-01-01T00:00:00")
+        feed_mock: MagicMock = mocker.patch.object(
+            client,
+            "iter_feed",
+            side_effect=async_iter([make_chapter("1", "a", "2024-01-02")]),
+        )
+        count_mock: MagicMock = mocker.patch.object(client, "count_updates")
+        library: LibrarySync = LibrarySync(client, index, "en", ["safe"])
+        chapters: list[Chapter] = [
+            chapter async for chapter in library.chapters(["a", "b"])
+        ]
+        assert [chapter.id for chapter in chapters] == ["1", "1"]
+        feed_mock.assert_any_call("a", "en", ["safe"], None)
+        feed_mock.assert_any_call("b", "en", ["safe"], "2024-01-01T00:00:00")
+        count_mock.assert_not_called()
+
+    async def test_chapters_updates(
+        self, client: Client, index: ChapterIndex, mocker: MockerFixture
+    ) -> None:
+        for manga_id, since in [
+            ("a", "2024-01-01T00:00:00"),
+            ("b", "2024-01-03T00:00:00"),
+            ("c", "2024-01-02T00:00:00"),
+        ]:
+            index.mark_synced(manga_id, since)
+        mocker.patch.object(client, "count_updates", return_value=3)
+        updates_mock: MagicMock = mocker.patch.object(
+            client,
+            "iter_updates",
+            side_effect=async_iter(
+                [
+                    make_chapter("1", "a", "2024-01-02T00:00:00+00:00"),
+                    make_chapter("2", "b", "2024-01-02T00:00:00+00:00"),
+                    make_chapter("3", "other", "2024-01-04T00:00:00+00:00"),
+                    make_chapter("4", "c", "2024-01-04T00:00:00+00:00"),
+                    make_chapter("5", "a", "2024-01-05T00:00:00+00:00"),
+                ]
+            ),
+        )
+        feed_mock: MagicMock = mocker.patch.object(client, "iter_feed")
+        library: LibrarySync = LibrarySync(client, index)
+        chapters: list[Chapter] = [
+            chapter async for chapter in library.chapters(["a", "b", "c"])
+        ]
+        assert [chapter.id for chapter in chapters] == ["1", "5", "4"]
+        updates_mock.assert_called_once_with("2024-01-01T00:00:00", "en", [])
+        feed_mock.assert_not_called()
+
+    async def test_chapters_too_many_updates(
+        self, client: Client, index: ChapterIndex, mocker: MockerFixture
+    ) -> None:
+        for manga_id in "abc":
+            index.mark_synced(manga_id, "2024-01-01T00:00:00")
+        mocker.patch.object(client, "count_updates", return_value=250)
+        updates_mock: MagicMock = mocker.patch.object(client, "iter_updates")
+        feed_mock: MagicMock = mocker.patch.object(
+            client, "iter_feed", side_effect=async_iter([])
+        )
+        library: LibrarySync = LibrarySync(client, index)
+        assert [chapter async for chapter in library.chapters(["a", "b", "c"])] == []
+        updates_mock.assert_not_called()
+        assert feed_mock.call_count == 3
+
+    @pytest.mark.parametrize("synced, shared", [(2, False), (3, True)])
+    async def test_chapters_min_shared(
+        self,
+        client: Client,
+        index: ChapterIndex,
+        mocker: MockerFixture,
+        synced: int,
+        shared: bool,
+    ) -> None:
+        manga_ids: list[str] = list("abc"[:synced])
+        for manga_id in manga_ids:
+            index.mark_synced(manga_id, "2024-01-01T00:00:00")
+        count_mock: MagicMock = mocker.patch.object(
+            client, "count_updates", return_value=1
+        )
+        mocker.patch.object(client, "iter_updates", side_effect=async_iter([]))
+        feed_mock: MagicMock = mocker.patch.object(
+            client, "iter_feed", side_effect=async_iter([])
+        )
+        library: LibrarySync = LibrarySync(client, index)
+        assert [chapter async for chapter in library.chapters(manga_ids)] == []
+        assert count_mock.called == shared
+        assert feed_mock.call_count == (0 if shared else synced)
+
+    async def test_run(
+        self,
+        client: Client,
+        index: ChapterIndex,
+        mocker: MockerFixture,
+        tmp_path: Path,
+    ) -> None:
+        index.record(
+            IndexedChapter("1", 2, "2024-01-01T00:00:00+00:00", None, "1.cbz", 4)
+        )
+        chapters: list[Chapter] = [
+            make_chapter("1", "a", "2024-01-01T00:00:00+00:00"),
+            make_chapter("2", "a", "2024-01-01T00:00:00+00:00"),
+            make_chapter("3", "b", "2024-01-01T00:00:00+00:00"),
+            make_chapter("4", "c", "2024-01-01T00:00:00+00:00"),
+        ]
+        mocker.patch.object(LibrarySync, "chapters", side_effect=async_iter(chapters))
+        existing: ChapterJob = ChapterJob.from_chapter(chapters[3], "Manga c")
+        write_cbz(tmp_path / f"{existing.name}.cbz", chapters[3].attributes.pages)
+        queued: list[ChapterJob] = []
+
+        async def run(jobs: Any) -> list[ChapterJob]:
+            queued.extend([job async for job in jobs])
+            return [job for job in queued if job.chapter_id == "3"]
+
+        scheduler: DownloadScheduler = DownloadScheduler(client, tmp_path)
+        mocker.patch.object(scheduler, "run", side_effect=run)
+        plan_spy: MagicMock = mocker.spy(index, "plan")
+        failed: list[ChapterJob] = await LibrarySync(client, index).run(
+            ["a", "b", "c"], scheduler
+        )
+        assert [job.chapter_id for job in queued] == ["2", "3"]
+        assert [
+            [chapter.id for chapter in call.args[0]] for call in plan_spy.call_args_list
+        ] == [["1", "2"], ["3"], ["4"]]
+        assert queued[0].name.endswith("Manga a -" + str(chapters[1].attributes.title))
+        assert failed == [queued[1]]
+        assert index.last_synced("a") is not None
+        assert index.last_synced("b") is None
+        assert index.last_synced("c") is not None
+        assert index.get("4") is not None
+
+    async def test_run_policy(
+        self,
+        client: Client,
+        index: ChapterIndex,
+        mocker: MockerFixture,
+        tmp_path: Path,
+    ) -> None:
+        chapters: list[Chapter] = [
+            make_chapter("1", "a", "2024-01-01T00:00:00+00:00"),
+            make_chapter("2", "a", "2024-01-01T00:00:00+00:00"),
+            make_chapter("3", "b", "2024-01-01T00:00:00+00:00"),
+        ]
+        chapters[1] = chapters[1].model_copy(
+            update={
+                "attributes": chapters[1].attributes.model_copy(update={"pages": 99})
+            }
+        )
+        mocker.patch.object(LibrarySync, "chapters", side_effect=async_iter(chapters))
+        queued: list[ChapterJob] = []
+
+        async def run(jobs: Any) -> list[ChapterJob]:
+            queued.extend([job async for job in jobs])
+            return []
+
+        scheduler: DownloadScheduler = DownloadScheduler(client, tmp_path)
+        mocker.patch.object(scheduler, "run", side_effect=run)
+        await LibrarySync(client, index, policy=ReleasePolicy(criteria=["pages"])).run(
+            ["a", "b"], scheduler
+        )
+        assert [job.chapter_id for job in queued] == ["2", "3"]
+
+    async def test_run_feed_failure(
+        self,
+        client: Client,
+        index: ChapterIndex,
+        mocker: MockerFixture,
+        tmp_path: Path,
+    ) -> None:
+        async def iter_feed(manga_id: str, *args: Any) -> AsyncIterator[Chapter]:
+            if manga_id == "b":
+                raise MangadexClientError("fake")
+            yield make_chapter(manga_id, manga_id, "2024-01-01T00:00:00+00:00")
+
+        mocker.patch.object(client, "iter_feed", side_effect=iter_feed)
+        print_mock: MagicMock = mocker.patch("pymanga.sync.print")
+        queued: list[ChapterJob] = []
+
+        async def run(jobs: Any) -> list[ChapterJob]:
+            queued.extend([job async for job in jobs])
+            return []
+
+        scheduler: DownloadScheduler = DownloadScheduler(client, tmp_path)
+        mocker.patch.object(scheduler, "run", side_effect=run)
+        library: LibrarySync = LibrarySync(client, index)
+        assert await library.run(["a", "b", "c"], scheduler) == []
+        assert [job.chapter_id for job in queued] == ["a", "c"]
+        assert library.failed == ["b"]
+        print_mock.assert_any_call("Failed | b: fake")
+        assert index.last_synced("a") is not None
+        assert index.last_synced("b") is None
+        assert index.last_synced("c") is not None
@@ -0,0 +1,100 @@
+import io
+from PIL import Image
+import pytest
+from pymanga.transcode import TranscodeOptions, transcode_page
+
+
+def make_page(size: tuple[int, int], mode: str = "RGB", format: str = "PNG") -> bytes:
+    buffer: io.BytesIO = io.BytesIO()
+    image: Image.Image = Image.new(mode, size, "red")
+    image.paste("blue", (0, 0, size[0] // 2, size[1]))
+    image.save(buffer, format)
+    return buffer.getvalue()
+
+
+def open_page(content: bytes) -> Image.Image:
+    image: Image.Image = Image.open(io.BytesIO(content))
+    image.load()
+    return image
+
+
+class TestTranscodeOptions:
+    @pytest.mark.parametrize(
+        "kwargs", [{"format": "bmp"}, {"quality": 0}, {"quality": 101}]
+    )
+    def test_invalid(self, kwargs: dict) -> None:
+        with pytest.raises(ValueError):
+            TranscodeOptions(**kwargs)
+
+
+class TestTranscodePage:
+    def test_resize(self) -> None:
+        suffix, pages = transcode_page(
+            make_page((800, 1200)), ".png", TranscodeOptions(width=400, height=400)
+        )
+        assert suffix == ".png"
+        assert open_page(pages[0]).size == (267, 400)
+
+    def test_no_upscale(self) -> None:
+        _, pages = transcode_page(
+            make_page((100, 150)), ".png", TranscodeOptions(width=400)
+        )
+        assert open_page(pages[0]).size == (100, 150)
+
+    def test_grayscale_jpeg(self) -> None:
+        suffix, pages = transcode_page(
+            make_page((100, 150), "RGBA"),
+            ".png",
+            TranscodeOptions(grayscale=True, format="jpeg", quality=50),
+        )
+        assert suffix == ".jpg"
+        assert open_page(pages[0]).format == "JPEG"
+        assert open_page(pages[0]).mode == "L"
+
+    def test_jpeg_from_rgba(self) -> None:
+        _, pages = transcode_page(
+            make_page((100, 150), "RGBA"), ".png", TranscodeOptions(format="jpg")
+        )
+        assert open_page(pages[0]).mode == "RGB"
+
+    def test_webp_smaller(self) -> None:
+        content: bytes = make_page((800, 1200), format="PNG")
+        suffix, pages = transcode_page(content, ".png", TranscodeOptions(format="webp"))
+        assert suffix == ".webp"
+        assert len(pages[0]) < len(content)
+
+    @pytest.mark.parametrize(
+        "right_to_left, first", [(True, (255, 0, 0)), (False, (0, 0, 255))]
+    )
+    def test_split_spreads(
+        self, right_to_left: bool, first: tuple[int, int, int]
+    ) -> None:
+        suffix, pages = transcode_page(
+            make_page((400, 300), format="JPEG"),
+            ".jpg",
+            TranscodeOptions(split_spreads=True, right_to_left=right_to_left),
+        )
+        assert suffix == ".jpg"
+        assert len(pages) == 2
+        assert [open_page(page).size for page in pages] == [(200, 300), (200, 300)]
+        red, green, blue = open_page(pages[0]).getpixel((100, 150))
+        assert abs(red - first[0]) < 10 and abs(blue - first[2]) < 10
+
+    def test_split_portrait(self) -> None:
+        _, pages = transcode_page(
+            make_page((300, 400)), ".png", TranscodeOptions(split_spreads=True)
+        )
+        assert len(pages) == 1
+
+    def test_unsupported_format_kept(self) -> None:
+        suffix, pages = transcode_page(
+            make_page((100, 150), format="GIF"), ".gif", TranscodeOptions(width=50)
+        )
+        assert suffix == ".png"
+        assert open_page(pages[0]).size == (50, 75)
+
+    def test_invalid_page(self) -> None:
+        assert transcode_page(b"fake", ".png", TranscodeOptions(width=50)) == (
+            ".png",
+            [b"fake"],
+        )
@@ -0,0 +1,65 @@
+import asyncio
+import hashlib
+import threading
+from unittest.mock import MagicMock
+import pytest
+from pytest_mock import MockerFixture
+from pymanga.transcode import TranscodeOptions
+from pymanga.workers import WorkerPool, page_checksum, process_page
+
+
+def test_page_checksum() -> None:
+    assert page_checksum(b"fake") == hashlib.sha256(b"fake").hexdigest()
+
+
+def test_process_page(mocker: MockerFixture) -> None:
+    assert process_page(b"fake", "1-a.png") == (
+        "1-a.png",
+        [(b"fake", page_checksum(b"fake"))],
+    )
+    transcode_mock: MagicMock = mocker.patch(
+        "pymanga.workers.transcode_page", return_value=(".webp", [b"a", b"b"])
+    )
+    options: TranscodeOptions = TranscodeOptions(format="webp")
+    assert process_page(b"fake", "1-a.png", options) == (
+        "1-a.webp",
+        [(b"a", page_checksum(b"a")), (b"b", page_checksum(b"b"))],
+    )
+    transcode_mock.assert_called_once_with(b"fake", ".png", options)
+
+
+@pytest.mark.asyncio
+class TestWorkerPool:
+    async def test_run(self) -> None:
+        async with WorkerPool(2) as pool:
+            name: str = await pool.run(lambda: threading.current_thread().name)
+        assert name.startswith("pymanga")
+        assert pool._executor is None
+
+    async def test_run_processes(self) -> None:
+        async with WorkerPool(1, processes=True) as pool:
+            checksum: str = await pool.run(page_checksum, b"fake")
+        assert checksum == page_checksum(b"fake")
+
+    async def test_run_backpressure(self) -> None:
+        release: threading.Event = threading.Event()
+        async with WorkerPool(1, max_pending=2) as pool:
+            tasks: list[asyncio.Task] = [
+                asyncio.create_task(pool.run(release.wait, 5)) for _ in range(3)
+            ]
+            await asyncio.sleep(0.05)
+            assert pool._slots.locked()
+            assert pool.executor._work_queue.qsize() == 1
+            assert pool.pending == 2
+            release.set()
+            assert await asyncio.gather(*tasks) == [True, True, True]
+            assert pool.pending == 0
+
+    async def test_run_error(self) -> None:
+        async with WorkerPool(1) as pool:
+            with pytest.raises(ZeroDivisionError):
+                await pool.run(divmod, 1, 0)
+
+    async def test_invalid_workers(self) -> None:
+        with pytest.raises(ValueError):
+            WorkerPool(0)